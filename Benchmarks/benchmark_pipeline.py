@@ -0,0 +1,301 @@
+""" End-to-end benchmark of the analysis pipeline: load -> SVD -> fit -> DAS -> reconstruct -> render.\n
+The datasets are simulated with SimulateData.sim_MultiExcitation (seeded, so they are the same on every machine) and cached in --data-dir.
+Every stage is timed (--repeats runs, min and median are kept) and its peak memory is measured in one extra run with tracemalloc.
+The results are written to a JSON file, which can serve as baseline for later runs (--compare).
+
+usage (from the repository root):
+    python -m Benchmarks.benchmark_pipeline --sizes 100x100 1000x1000 --output benchmark_results.json
+    python -m Benchmarks.benchmark_pipeline --sizes 100x100 1000x1000 --compare benchmark_results.json
+sizes are given as <nr of time steps>x<nr of wavelengths>, the default includes the slow 2000x5000 dataset.
+"""
+
+import argparse
+import configparser
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from FunctionsUsedByPlotClasses import (get_DAS_from_lSVs_res_amplitudes, get_retained_rightSVs_leftSVs_singularvs, get_SVD_reconstructed_data_for_GUI,
+                                        get_SVDGF_reconstructed_data, get_SVDGFit_parameters, get_TA_data_after_start_time, TA_analysis_pipeline)
+from SimulateData import sim_MultiExcitation
+from SupportClasses import saveData
+
+DEFAULT_SIZES = ["100x100", "1000x1000", "2000x5000"]
+# part of the names of the cached datasets, increased whenever the simulated data changes
+SIMULATION_VERSION = 2
+NOISE_SCALE = 0.005
+# a fit has converged if every fitted decay time is within this fraction of its simulated decay constant
+DECAY_TIME_TOLERANCE = 0.25
+STAGES = ["load", "SVD_retained_components", "SVD_reconstruction", "global_fit", "DAS", "SVDGF_reconstruction", "render_heatmap"]
+
+def get_simulated_decay_constants(nr_of_components):
+    """ 30, 66, 145, 319, ... : well separated and inside the time range (0, 600) of the simulation, so that also 4 components can be fitted. """
+    return [30 * 2.2**i for i in range(nr_of_components)]
+
+def write_simulation_config_file(path, nr_of_time_steps, nr_of_wavelengths, nr_of_components):
+    """ a sim_MultiExcitation config with nr_of_components gaussians spread over the wavelength range and decay constants spread over the time range. """
+    wavelength_range, time_range = (200, 1400), (0, 600)
+    conf_parser = configparser.ConfigParser()
+    conf_parser["matrix_dimensions"] = {"wavelength_range": str(wavelength_range), "time_range": str(time_range),
+                                        "wavelength_stepsize": str((wavelength_range[1]-wavelength_range[0])/nr_of_wavelengths),
+                                        "time_stepsize": str((time_range[1]-time_range[0])/nr_of_time_steps)}
+    conf_parser["components"] = {"amplitudes": str(tuple((-1)**i * 2 for i in range(nr_of_components))),
+                                    "wavelength_expectation_values": str(tuple(int(300 + 800*(i+0.5)/nr_of_components) for i in range(nr_of_components))),
+                                    "wavelength_std_deviations": str(tuple(100 for _ in range(nr_of_components))),
+                                    "decay_constants": str(tuple(get_simulated_decay_constants(nr_of_components)))}
+    conf_parser["noise"] = {"scale": str(NOISE_SCALE), "pump_noise_scale": "2.0", "probe_noise_scale": "2.0"}
+
+    with open(path, "w") as file:
+        conf_parser.write(file)
+
+    return conf_parser
+
+def get_dataset(data_dir, nr_of_time_steps, nr_of_wavelengths, nr_of_components, seed):
+    """ path to the simulated data file (in the format of the GUI data files), it is only simulated if it is not cached yet. """
+    name = f"benchmark_v{SIMULATION_VERSION}_{nr_of_time_steps}x{nr_of_wavelengths}_{nr_of_components}components_seed{seed}"
+    data_file = os.path.join(data_dir, name + ".txt")
+    if os.path.exists(data_file):
+        return data_file
+
+    os.makedirs(data_dir, exist_ok=True)
+    config_file = os.path.join(data_dir, name + ".ini")
+    write_simulation_config_file(config_file, nr_of_time_steps, nr_of_wavelengths, nr_of_components)
+
+    simulation = sim_MultiExcitation.MultiExcitation(config_file, seed=seed)
+    simulation.compute_data_matrix_vectorized()
+    formatted_data_matrix = saveData.get_data_matrix_formatted(simulation.data_matrix, simulation.time_steps, simulation.wavelength_steps)
+    np.savetxt(data_file + ".part", formatted_data_matrix, delimiter='\t', fmt='%.7e')
+    os.replace(data_file + ".part", data_file)
+
+    return data_file
+
+def render_heatmap(data_matrix):
+    """ offscreen (Agg) heatmap as made by the plot classes. """
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=(10, 5), dpi=50)
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1)
+    sns.heatmap(data_matrix, ax=axes, cbar_kws={'label': 'amplitude'}, cmap="RdBu_r")
+    canvas.draw()
+    figure.clear()
+
+    return None
+
+def run_pipeline_stages(data_file, components_list, initial_fit_parameter_values, stage_callback, dtype=np.float64):
+    """ runs all stages, stage_callback(stage_name, function) runs and measures one stage and returns its result.
+    Returns the lmfit result and the fitted decay times. """
+    data_matrix, time_delays, wavelengths = stage_callback("load", lambda: get_TA_data_after_start_time.run(data_file, "-999999", dtype=dtype))
+    start_time = time_delays[0]
+
+    retained_rSVs, retained_lSVs, retained_singular_values = stage_callback("SVD_retained_components", lambda: get_retained_rightSVs_leftSVs_singularvs.run(data_matrix, components_list))
+    stage_callback("SVD_reconstruction", lambda: get_SVD_reconstructed_data_for_GUI.run(data_matrix, components_list))
+
+    fit_result, fit_params = stage_callback("global_fit", lambda: get_SVDGFit_parameters.run(retained_rSVs, retained_singular_values, components_list, time_delays, start_time, initial_fit_parameter_values, 0, 0,
+                                                                                             initialize_amplitudes_linearly=True))
+    DAS = stage_callback("DAS", lambda: get_DAS_from_lSVs_res_amplitudes.run(retained_lSVs, fit_params, components_list, wavelengths, data_file, start_time))
+
+    decay_times = ['{:.9f}'.format(fit_params[f'tau_component{component}'].value) for component in components_list]
+    indeces_for_DAS_matrix = list(range(len(components_list)))
+    SVDGF_reconstructed_data = stage_callback("SVDGF_reconstruction", lambda: get_SVDGF_reconstructed_data.run(DAS, decay_times, time_delays, wavelengths, indeces_for_DAS_matrix, start_time))
+
+    stage_callback("render_heatmap", lambda: render_heatmap(SVDGF_reconstructed_data))
+
+    return fit_result, [fit_params[f'tau_component{component}'].value for component in components_list]
+
+def get_initial_fit_parameter_values(nr_of_components):
+    """ the simulated decay constants (times 1.3) as initial decay times. The initial amplitudes are not used,
+    the benchmarks fit them linearly for the initial decay times (initialize_amplitudes_linearly). """
+    initial_fit_parameter_values = {"time_constants": [1.3 * decay_constant for decay_constant in get_simulated_decay_constants(nr_of_components)]}
+    for rSV_index in range(nr_of_components):
+        initial_fit_parameter_values[f"amps_rSV{rSV_index}"] = [0.7 for _ in range(nr_of_components)]
+
+    return initial_fit_parameter_values
+
+def has_converged(decay_times, nr_of_components):
+    """ whether the fitted decay times are those of the simulation, see DECAY_TIME_TOLERANCE. """
+    return all(abs(decay_time/decay_constant - 1) <= DECAY_TIME_TOLERANCE
+                for decay_time, decay_constant in zip(sorted(decay_times), get_simulated_decay_constants(nr_of_components)))
+
+class StageError(Exception):
+    """ a stage of the pipeline failed, e.g. a fit that did not converge on a simulated dataset. """
+    def __init__(self, stage, error):
+        super().__init__(f"{stage}: {type(error).__name__}: {' '.join(str(error).split())}")
+        self.stage = stage
+
+def run_stage(stage_name, function):
+    try:
+        return function()
+    except (ArithmeticError, ValueError, np.linalg.LinAlgError) as error:
+        raise StageError(stage_name, error) from error
+
+def benchmark_dataset(data_file, nr_of_components, repeats, measure_memory, dtype=np.float64):
+    """ stage times (and peak memory), fit info and the error of the first stage that failed (None if all ran).
+    The stages before a failed one are still reported. """
+    components_list = list(range(nr_of_components))
+    initial_fit_parameter_values = get_initial_fit_parameter_values(nr_of_components)
+
+    stage_times = {stage: [] for stage in STAGES}
+
+    def timed_stage(stage_name, function):
+        start = time.perf_counter()
+        result = run_stage(stage_name, function)
+        stage_times[stage_name].append(time.perf_counter() - start)
+        return result
+
+    error = None
+    try:
+        for _ in range(repeats):
+            fit_result, decay_times = run_pipeline_stages(data_file, components_list, initial_fit_parameter_values, timed_stage, dtype)
+    except StageError as stage_error:
+        error = str(stage_error)
+        measure_memory = False
+
+    stage_peak_memory = {}
+
+    def memory_traced_stage(stage_name, function):
+        tracemalloc.start()
+        try:
+            return run_stage(stage_name, function)
+        finally:
+            stage_peak_memory[stage_name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    if measure_memory:
+        run_pipeline_stages(data_file, components_list, initial_fit_parameter_values, memory_traced_stage, dtype)
+
+    stages = {}
+    for stage in STAGES:
+        if not stage_times[stage]:
+            continue
+        stages[stage] = {"seconds_min": min(stage_times[stage]), "seconds_median": statistics.median(stage_times[stage])}
+        if measure_memory:
+            stages[stage]["peak_memory_MB"] = stage_peak_memory[stage] / 2**20
+
+    fit_info = None if error is not None else {"nfev": int(fit_result.nfev), "chisqr": float(fit_result.chisqr), "decay_times": decay_times,
+                                                "converged": has_converged(decay_times, nr_of_components)}
+
+    return stages, fit_info, error
+
+def get_metadata():
+    import lmfit
+    import matplotlib
+    import scipy
+
+    try:
+        git_commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        git_commit = None
+
+    return {"date": datetime.now().isoformat(timespec="seconds"), "git_commit": git_commit, "platform": platform.platform(), "processor": platform.processor(),
+            "cpu_count": os.cpu_count(), "python": sys.version.split()[0], "numpy": np.__version__, "scipy": scipy.__version__,
+            "lmfit": lmfit.__version__, "matplotlib": matplotlib.__version__}
+
+def make_comparison_report(baseline, current, threshold):
+    """ a text table of the stage times (min) of current relative to baseline. Changes larger than threshold (relative) are flagged.
+    Results are matched by dataset and precision, a float32 run is not compared with a float64 baseline. """
+    baseline_results = {(result["dataset"], result.get("precision", "float64")): result for result in baseline["results"]}
+    lines = [f"comparison with baseline from {baseline['metadata']['date']} (commit {baseline['metadata']['git_commit']}), threshold {threshold:.0%}",
+                f"{'dataset':<34}{'stage':<26}{'baseline s':>12}{'current s':>12}{'ratio':>8}  {'memory MB (base -> now)':<24}"]
+    nr_of_regressions = 0
+
+    for result in current["results"]:
+        baseline_result = baseline_results.get((result["dataset"], result["precision"]))
+        if baseline_result is None:
+            lines.append(f"{result['dataset']:<34}not in baseline with precision {result['precision']}")
+            continue
+        for failed_result, name in ((baseline_result, "baseline"), (result, "current run")):
+            if failed_result.get("error") is not None:
+                lines.append(f"{result['dataset']:<34}failed in the {name}: {failed_result['error'][:150]}")
+
+        for stage, stage_result in result["stages"].items():
+            baseline_stage = baseline_result["stages"].get(stage)
+            if baseline_stage is None:
+                continue
+            ratio = stage_result["seconds_min"] / baseline_stage["seconds_min"] if baseline_stage["seconds_min"] > 0 else float("inf")
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  SLOWER"
+                nr_of_regressions += 1
+            elif ratio < 1 - threshold:
+                flag = "  faster"
+            memory = ""
+            if "peak_memory_MB" in stage_result and "peak_memory_MB" in baseline_stage:
+                memory = f"{baseline_stage['peak_memory_MB']:.1f} -> {stage_result['peak_memory_MB']:.1f}"
+            lines.append(f"{result['dataset']:<34}{stage:<26}{baseline_stage['seconds_min']:>12.4f}{stage_result['seconds_min']:>12.4f}{ratio:>8.2f}  {memory:<24}{flag}")
+
+    lines.append(f"\n{nr_of_regressions} stage(s) slower than the baseline by more than {threshold:.0%}")
+
+    return "\n".join(lines), nr_of_regressions
+
+def parse_size(size):
+    try:
+        nr_of_time_steps, nr_of_wavelengths = (int(nr) for nr in size.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size {size!r} is not of the form <time steps>x<wavelengths>, e.g. 1000x1000")
+
+    return nr_of_time_steps, nr_of_wavelengths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="end-to-end benchmark of the TA analysis pipeline")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[parse_size(size) for size in DEFAULT_SIZES], help=f"dataset sizes <time steps>x<wavelengths> (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument("--components", nargs="+", type=int, default=[2, 4], help="numbers of simulated and fitted components (default: 2 4)")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per dataset (default: 3)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the (slower) run that measures the peak memory per stage")
+    parser.add_argument("--precision", choices=list(TA_analysis_pipeline.PRECISIONS), default=TA_analysis_pipeline.DEFAULT_PRECISION,
+                        help="dtype of the data matrix, SVD, DAS and reconstruction (default: float64), see also Benchmarks.precision_accuracy_report")
+    parser.add_argument("--seed", type=int, default=12345, help="seed of the simulated datasets")
+    parser.add_argument("--data-dir", default=os.path.join("Benchmarks", "data"), help="where the simulated datasets are cached")
+    parser.add_argument("--output", default=None, help="JSON file to write the results to (e.g. a new baseline)")
+    parser.add_argument("--compare", default=None, help="JSON baseline to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change of a stage time that is reported as slower/faster (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for nr_of_time_steps, nr_of_wavelengths in args.sizes:
+        for nr_of_components in args.components:
+            dataset_name = f"{nr_of_time_steps}x{nr_of_wavelengths}_{nr_of_components}components"
+            data_file = get_dataset(args.data_dir, nr_of_time_steps, nr_of_wavelengths, nr_of_components, args.seed)
+
+            print(f"benchmarking {dataset_name} ...", flush=True)
+            stages, fit_info, error = benchmark_dataset(data_file, nr_of_components, args.repeats, not args.no_memory, TA_analysis_pipeline.get_dtype(args.precision))
+            results.append({"dataset": dataset_name, "nr_of_time_steps": nr_of_time_steps, "nr_of_wavelengths": nr_of_wavelengths,
+                            "nr_of_components": nr_of_components, "precision": args.precision, "repeats": args.repeats, "fit": fit_info, "stages": stages,
+                            "error": error})
+            if error is not None:
+                print(f"    FAILED in {error[:200]}")
+            elif not fit_info["converged"]:
+                print(f"    the fit did not converge to the simulated decay constants: {[float(f'{tau:.4g}') for tau in fit_info['decay_times']]}")
+
+            for stage, stage_result in stages.items():
+                memory = f"{stage_result['peak_memory_MB']:>9.1f} MB" if "peak_memory_MB" in stage_result else ""
+                print(f"    {stage:<26}{stage_result['seconds_min']:>10.4f} s (median {stage_result['seconds_median']:.4f} s){memory}")
+
+    current = {"metadata": get_metadata(), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        report, nr_of_regressions = make_comparison_report(baseline, current, args.threshold)
+        print("\n" + report)
+        return 1 if nr_of_regressions else 0
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,196 @@
+""" Leak check of the tabs of the GUI, in two parts:\n
+* headless: --cycles data objects like those of the SVDGF tabs (the results of the pipeline on a simulated dataset, a LazySVD and an offscreen figure)
+  are made and released with SupportClasses/MemoryAccounting.release. The large arrays and the figure of every released object must have been freed
+  (they are watched with weak references while the released object itself is still alive, as it is in the data_objs of a notebook).
+* GUI: opens and removes --cycles original data tabs of the simulated dataset in the real GUI. Needs a display (on a server e.g. xvfb-run),
+  without one (or with --headless) this part is skipped.\n
+Before and after the cycles of each part (after --warm-up cycles, which fill the caches of matplotlib, tk and numpy) the resident memory of the process is recorded,
+for the GUI also the widgets on the figure frames of the tabs and the memory accounted to the data objects.
+It exits with 1 if the resident memory grew by more than --threshold MB, if widgets were left behind or if arrays or figures of a released object are still alive.
+
+usage (from the repository root, the GUI expects its configFiles there):
+    python -m Benchmarks.leak_check_tabs --cycles 100
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tkinter as tk
+import weakref
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from Benchmarks.benchmark_pipeline import get_dataset, get_initial_fit_parameter_values
+from FunctionsUsedByPlotClasses import get_lazy_SVD, TA_analysis_pipeline
+from SupportClasses import MemoryAccounting
+
+class HeadlessTab():
+    """ holds what the data object of an SVDGF tab holds, without tk. """
+    def __init__(self, data_file):
+        self.SVDGF_result = TA_analysis_pipeline.run_SVDGF(data_file, [0, 1], get_initial_fit_parameter_values(2))
+        self.data_matrix = self.SVDGF_result.data.data_matrix
+        self.lazy_SVD = get_lazy_SVD.LazySVD(self.data_matrix)
+        self.lazy_SVD.get_components(5)
+        self.fig = Figure(figsize=(10, 5), dpi=50)
+        FigureCanvasAgg(self.fig)
+        self.fig.add_subplot(1, 1, 1).imshow(self.SVDGF_result.SVDGF_reconstructed_data, aspect="auto")
+        self.fig.canvas.draw()
+
+        return None
+
+    def get_weakrefs(self):
+        """ weak references to the large arrays and the figure (by name), all of them have to be dead once this object is released. """
+        objects = {"data_matrix": self.data_matrix, "SVDGF_reconstructed_data": self.SVDGF_result.SVDGF_reconstructed_data, "difference_matrix": self.SVDGF_result.difference_matrix,
+                    "DAS": self.SVDGF_result.DAS, "retained_lSVs": self.SVDGF_result.components.retained_lSVs, "retained_rSVs": self.SVDGF_result.components.retained_rSVs, "figure": self.fig}
+        objects.update({f"lazy_SVD.components[{i}]": component for i, component in enumerate(self.lazy_SVD.components)})
+
+        return {name: weakref.ref(obj) for name, obj in objects.items()}
+
+def make_and_release_headless_tab(data_file):
+    """ the bytes accounted to a new HeadlessTab and the names of its arrays and figures that are still alive after it was released. """
+    data_obj = HeadlessTab(data_file)
+    weakrefs = data_obj.get_weakrefs()
+    nbytes = MemoryAccounting.release(data_obj)
+    # data_obj is still referenced here, like a removed tab in the data_objs of its notebook: only release may free its data
+    alive = [name for name, ref in weakrefs.items() if ref() is not None]
+
+    return nbytes, alive
+
+def check_headless(data_file, cycles, warm_up, threshold):
+    """ True if the arrays and figures of all released data objects have been freed and the resident memory grew by at most threshold MB. """
+    for _ in range(warm_up):
+        make_and_release_headless_tab(data_file)
+    gc.collect()
+    rss_baseline = MemoryAccounting.get_rss()
+
+    start = time.time()
+    released, nr_of_alive_objects = [], {}
+    for cycle in range(cycles):
+        nbytes, alive = make_and_release_headless_tab(data_file)
+        released.append(nbytes)
+        for name in alive:
+            nr_of_alive_objects[name] = nr_of_alive_objects.get(name, 0) + 1
+        if (cycle + 1) % 10 == 0:
+            rss = MemoryAccounting.get_rss()
+            print(f"{cycle+1:>5} data objects: resident memory {MemoryAccounting.format_bytes(rss) if rss is not None else 'not available'}", flush=True)
+    gc.collect()
+    rss_end = MemoryAccounting.get_rss()
+
+    print(f"\nheadless: {cycles} data objects of {MemoryAccounting.format_bytes(max(released, default=0))} each made and released in {time.time() - start:.1f} s")
+    print("arrays and figures alive after release: " + (", ".join(f"{name} ({count}x)" for name, count in nr_of_alive_objects.items()) or "none"))
+    passed = not nr_of_alive_objects and min(released, default=1) > 0
+
+    return check_rss_growth(rss_baseline, rss_end, threshold) and passed
+
+def check_rss_growth(rss_baseline, rss_end, threshold):
+    if rss_baseline is None or rss_end is None:
+        print("the resident memory can not be measured on this system (no /proc and no psutil)")
+        return True
+    growth_MB = (rss_end - rss_baseline)/1024**2
+    print(f"resident memory: {MemoryAccounting.format_bytes(rss_baseline)} -> {MemoryAccounting.format_bytes(rss_end)} ({growth_MB:+.1f} MB, threshold {threshold:g} MB)")
+
+    return growth_MB <= threshold
+
+def has_display():
+    try:
+        tk.Tk().destroy()
+    except tk.TclError:
+        return False
+
+    return True
+
+def wait_for_jobs(root, app, job_group, timeout=60):
+    """ runs the tk event loop until the jobs of job_group are done, their results are delivered in the gui thread. """
+    start = time.time()
+    while app.job_scheduler.has_pending_jobs(group=job_group):
+        if time.time() - start > timeout:
+            raise TimeoutError(f"the {job_group} jobs did not finish within {timeout} s.")
+        root.update()
+        time.sleep(0.01)
+    root.update()
+
+    return None
+
+def open_and_remove_orig_tab(root, app):
+    app.show_orig_data_heatmap()
+    tab_idx = app.next_tab_idx_orig
+    wait_for_jobs(root, app, "ORIG")
+
+    data_obj = app.nbCon_orig.data_objs[tab_idx]
+    if not hasattr(data_obj, "btn_delete_attrs"):
+        raise RuntimeError(f"the ORIG tab {tab_idx+1} was not made, see the output above.")
+    data_obj.remove_tab(app.nbCon_orig)
+    root.update()
+
+    return None
+
+def get_state(app):
+    """ resident memory, widgets on the figure frames and the memory accounted to the data objects of the ORIG tabs. """
+    gc.collect()
+    nr_of_widgets = sum(len(frame.winfo_children()) for frame in app.nbCon_orig.figure_frames)
+    accounted = sum(sum(usage.values()) for _, _, usage in MemoryAccounting.get_tab_usages({"ORIG": app.nbCon_orig}))
+
+    return MemoryAccounting.get_rss(), nr_of_widgets, accounted
+
+def check_gui(data_file, cycles, warm_up, threshold, size, data_matrix_MB):
+    """ True if the ORIG tabs leave no widgets or accounted memory behind and the resident memory grew by at most threshold MB. """
+    import TA_analysis_GUI
+
+    root = tk.Tk()
+    app = TA_analysis_GUI.GuiAppTAAnalysis(root)
+    app.curr_reconstruct_data_file_strVar.set(os.path.abspath(data_file))
+    root.update()
+
+    try:
+        for _ in range(warm_up):
+            open_and_remove_orig_tab(root, app)
+        rss_baseline, widgets_baseline, _ = get_state(app)
+
+        start = time.time()
+        for cycle in range(cycles):
+            open_and_remove_orig_tab(root, app)
+            if (cycle + 1) % 10 == 0:
+                rss, _, _ = get_state(app)
+                print(f"{cycle+1:>5} tabs: resident memory {MemoryAccounting.format_bytes(rss) if rss is not None else 'not available'}", flush=True)
+        rss_end, widgets_end, accounted_end = get_state(app)
+    finally:
+        app.job_scheduler.shutdown()
+        root.destroy()
+
+    print(f"\nGUI: {cycles} tabs of a {size} data matrix ({data_matrix_MB:.1f} MB) opened and removed in {time.time() - start:.1f} s")
+    print(f"widgets on the figure frames: {widgets_baseline} -> {widgets_end}")
+    print(f"memory accounted to removed tabs: {MemoryAccounting.format_bytes(accounted_end)}")
+    passed = check_rss_growth(rss_baseline, rss_end, threshold) and widgets_end <= widgets_baseline and accounted_end == 0
+
+    print("GUI: " + ("passed" if passed else "FAILED: memory is not released when tabs are removed"))
+
+    return passed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="makes and releases data objects of tabs (headless) and opens and removes tabs of the TA analysis GUI, checks that their memory is released")
+    parser.add_argument("--cycles", type=int, default=100, help="data objects to release and tabs to open and remove (default: 100)")
+    parser.add_argument("--warm-up", type=int, default=5, help="cycles before the baseline is taken (default: 5)")
+    parser.add_argument("--size", default="500x500", help="<nr of time steps>x<nr of wavelengths> of the simulated dataset (default: 500x500)")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed growth of the resident memory in MB (default: 20)")
+    parser.add_argument("--seed", type=int, default=12345, help="seed of the simulated dataset")
+    parser.add_argument("--data-dir", default=os.path.join("Benchmarks", "data"), help="where the simulated dataset is cached")
+    parser.add_argument("--headless", action="store_true", help="only the headless part, also if there is a display")
+    args = parser.parse_args(argv)
+
+    nr_of_time_steps, nr_of_wavelengths = (int(value) for value in args.size.lower().split("x"))
+    data_file = get_dataset(args.data_dir, nr_of_time_steps, nr_of_wavelengths, 2, args.seed)
+    data_matrix_MB = nr_of_time_steps*nr_of_wavelengths*8/1024**2
+
+    passed = check_headless(data_file, args.cycles, args.warm_up, args.threshold)
+    print("headless: " + ("passed" if passed else "FAILED: memory is not released when data objects are released"))
+
+    if args.headless or not has_display():
+        print("\nGUI: skipped, " + ("--headless" if args.headless else "no display"))
+        return 0 if passed else 1
+    return 0 if check_gui(data_file, args.cycles, args.warm_up, args.threshold, args.size, data_matrix_MB) and passed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
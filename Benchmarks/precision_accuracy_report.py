@@ -0,0 +1,145 @@
+""" Accuracy of the float32 precision policy (TA_analysis_pipeline.PRECISIONS) compared with float64.\n
+Every benchmark dataset (see benchmark_pipeline) is analysed with the complete SVD and SVDGF pipeline in float64 and in float32.
+The report lists the deviation of the float32 results from the float64 ones: retained singular values, SVD reconstruction,
+fitted decay times, DAS and SVDGF reconstruction, together with the size of the data matrix and the time of both runs.
+The deviations of the reconstructions are also given relative to the float64 residual (data - SVDGF reconstruction),
+i.e. to the noise of the data, float32 is accurate enough if they are much smaller than 1.
+Ill-conditioned fits (e.g. many components) can end in a different minimum after a change of the input in the 7th digit,
+then the decay times and reduced chi-square of both fits are listed to tell this apart from a loss of accuracy.
+
+usage (from the repository root):
+    python -m Benchmarks.precision_accuracy_report --sizes 100x100 1000x1000 --output precision_report.json
+exits with 1 if a deviation is larger than --tolerance, if the pipeline fails in float32 but not in float64,
+or if a fit does not converge to the simulated decay constants (see benchmark_pipeline.has_converged).
+Datasets on which already the float64 pipeline fails (e.g. the fit does not converge) are listed, but not compared.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from Benchmarks import benchmark_pipeline
+from FunctionsUsedByPlotClasses import TA_analysis_pipeline
+
+DEFAULT_SIZES = ["100x100", "1000x1000"]
+
+def relative_deviation(value, reference):
+    """ ||value - reference|| / ||reference|| (Frobenius norm), in float64. """
+    reference = np.asarray(reference, dtype=np.float64)
+    norm = np.linalg.norm(reference)
+    deviation = np.linalg.norm(np.asarray(value, dtype=np.float64) - reference)
+
+    return float(deviation / norm) if norm > 0 else float(deviation)
+
+def run_pipeline(data_file, components_list, initial_fit_parameter_values, precision):
+    start = time.perf_counter()
+    ta_data = TA_analysis_pipeline.load_data(data_file, precision)
+    SVD_result = TA_analysis_pipeline.get_SVD_reconstruction(ta_data, components_list)
+    SVDGF_result = TA_analysis_pipeline.run_SVDGF(data_file, components_list, initial_fit_parameter_values, ta_data=ta_data, initialize_amplitudes_linearly=True)
+
+    return SVD_result, SVDGF_result, time.perf_counter() - start
+
+def compare_precisions(data_file, nr_of_components):
+    components_list = list(range(nr_of_components))
+    initial_fit_parameter_values = benchmark_pipeline.get_initial_fit_parameter_values(nr_of_components)
+
+    try:
+        SVD_64, SVDGF_64, seconds_64 = run_pipeline(data_file, components_list, initial_fit_parameter_values, "float64")
+    except TA_analysis_pipeline.PipelineError as error:
+        return {"float64_error": " ".join(str(error).split())}
+    try:
+        SVD_32, SVDGF_32, seconds_32 = run_pipeline(data_file, components_list, initial_fit_parameter_values, "float32")
+    except TA_analysis_pipeline.PipelineError as error:
+        return {"float32_error": " ".join(str(error).split())}
+
+    decay_times_64 = np.array([SVDGF_64.fit.decay_times_as_dict[f"tau_component{component}"] for component in components_list])
+    decay_times_32 = np.array([SVDGF_32.fit.decay_times_as_dict[f"tau_component{component}"] for component in components_list])
+    residual_norm = np.linalg.norm(SVDGF_64.difference_matrix)
+
+    deviations = {"retained_singular_values": relative_deviation(SVD_32.components.retained_singular_values, SVD_64.components.retained_singular_values),
+                    "SVD_reconstruction": relative_deviation(SVD_32.SVD_reconstructed_data, SVD_64.SVD_reconstructed_data),
+                    "decay_times_max": float(np.max(np.abs(decay_times_32 - decay_times_64) / np.abs(decay_times_64))),
+                    "DAS": relative_deviation(SVDGF_32.DAS, SVDGF_64.DAS),
+                    "SVDGF_reconstruction": relative_deviation(SVDGF_32.SVDGF_reconstructed_data, SVDGF_64.SVDGF_reconstructed_data)}
+    relative_to_residual = {"SVD_reconstruction": float(np.linalg.norm(SVD_32.SVD_reconstructed_data.astype(np.float64) - SVD_64.SVD_reconstructed_data) / residual_norm),
+                            "SVDGF_reconstruction": float(np.linalg.norm(SVDGF_32.SVDGF_reconstructed_data.astype(np.float64) - SVDGF_64.SVDGF_reconstructed_data) / residual_norm)}
+
+    return {"deviations": deviations, "relative_to_residual": relative_to_residual,
+            "data_matrix_MB": {"float64": SVD_64.data.data_matrix.nbytes / 2**20, "float32": SVD_32.data.data_matrix.nbytes / 2**20},
+            "seconds": {"float64": seconds_64, "float32": seconds_32},
+            "decay_times": {"float64": decay_times_64.tolist(), "float32": decay_times_32.tolist()},
+            "redchi": {"float64": float(SVDGF_64.fit.redchi), "float32": float(SVDGF_32.fit.redchi)},
+            "converged": {"float64": benchmark_pipeline.has_converged(decay_times_64, nr_of_components), "float32": benchmark_pipeline.has_converged(decay_times_32, nr_of_components)}}
+
+def make_report(results, tolerance):
+    lines = [f"float32 compared with float64, tolerance {tolerance:g} (relative)",
+                f"{'dataset':<30}{'quantity':<28}{'deviation':>12}{'/ residual':>12}"]
+    nr_of_violations = 0
+
+    for result in results:
+        if "float64_error" in result:
+            lines.append(f"{result['dataset']:<30}not compared, already float64 failed: {result['float64_error'][:150]}")
+            continue
+        if "float32_error" in result:
+            lines.append(f"{result['dataset']:<30}FAILED only in float32: {result['float32_error'][:150]}")
+            nr_of_violations += 1
+            continue
+
+        for quantity, deviation in result["deviations"].items():
+            flag = ""
+            if deviation > tolerance:
+                flag = "  TOO LARGE"
+                nr_of_violations += 1
+            relative_to_residual = result["relative_to_residual"].get(quantity)
+            lines.append(f"{result['dataset']:<30}{quantity:<28}{deviation:>12.2e}" + (f"{relative_to_residual:>12.2e}" if relative_to_residual is not None else " "*12) + flag)
+        if result["deviations"]["decay_times_max"] > tolerance:
+            lines.append(f"{result['dataset']:<30}{'fit ended in other minimum':<28}"
+                            + f"  float64 redchi {result['redchi']['float64']:.4g} taus {[float(f'{tau:.4g}') for tau in result['decay_times']['float64']]},"
+                            + f" float32 redchi {result['redchi']['float32']:.4g} taus {[float(f'{tau:.4g}') for tau in result['decay_times']['float32']]}")
+        for precision, converged in result["converged"].items():
+            if not converged:
+                lines.append(f"{result['dataset']:<30}{'fit did not converge':<28}  {precision} taus {[float(f'{tau:.4g}') for tau in result['decay_times'][precision]]}")
+                nr_of_violations += 1
+        lines.append(f"{result['dataset']:<30}{'data matrix MB / seconds':<28}"
+                        + f"  float64 {result['data_matrix_MB']['float64']:.1f} MB {result['seconds']['float64']:.3f} s,"
+                        + f" float32 {result['data_matrix_MB']['float32']:.1f} MB {result['seconds']['float32']:.3f} s")
+
+    lines.append(f"\n{nr_of_violations} deviation(s) larger than {tolerance:g}")
+
+    return "\n".join(lines), nr_of_violations
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="accuracy of the float32 precision policy of the TA analysis pipeline, compared with float64")
+    parser.add_argument("--sizes", nargs="+", type=benchmark_pipeline.parse_size, default=[benchmark_pipeline.parse_size(size) for size in DEFAULT_SIZES],
+                        help=f"dataset sizes <time steps>x<wavelengths> (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument("--components", nargs="+", type=int, default=[2, 4], help="numbers of simulated and fitted components (default: 2 4)")
+    parser.add_argument("--seed", type=int, default=12345, help="seed of the simulated datasets")
+    parser.add_argument("--data-dir", default=os.path.join("Benchmarks", "data"), help="where the simulated datasets are cached")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="largest accepted relative deviation (default: 1e-3)")
+    parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    results = []
+    for nr_of_time_steps, nr_of_wavelengths in args.sizes:
+        for nr_of_components in args.components:
+            dataset_name = f"{nr_of_time_steps}x{nr_of_wavelengths}_{nr_of_components}components"
+            data_file = benchmark_pipeline.get_dataset(args.data_dir, nr_of_time_steps, nr_of_wavelengths, nr_of_components, args.seed)
+
+            print(f"comparing precisions for {dataset_name} ...", flush=True)
+            results.append(dict(compare_precisions(data_file, nr_of_components), dataset=dataset_name))
+
+    report, nr_of_violations = make_report(results, args.tolerance)
+    print("\n" + report)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"metadata": benchmark_pipeline.get_metadata(), "tolerance": args.tolerance, "results": results}, file, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    return 1 if nr_of_violations else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
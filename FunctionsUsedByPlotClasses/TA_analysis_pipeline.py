@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+A compute API without any tkinter dependency for the complete analysis pipeline:\n
+load -> crop -> SVD -> fit -> DAS -> reconstruct.\n
+Repeated scans can be merged into one averaged data matrix with a noise map before (merge_scans).
+With a kinetic scheme the species associated spectra (SAS) are computed from the DAS.\n
+Every stage returns a dataclass and raises a subclass of PipelineError if it fails.
+PipelineError is a ValueError, so code that catches ValueErrors keeps working.\n
+The GUI data objects are one consumer of this module, the same pipeline can be run without a display,
+e.g. in worker processes or in batch runs.\n
+The precision policy (PRECISIONS) decides the dtype of the data matrix when it is loaded, cropping, SVD, DAS and reconstruction keep that dtype.
+Only the nonlinear fit is always computed in float64.
+"""
+
+import ast
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+import lmfit
+import numpy as np
+
+from FunctionsUsedByPlotClasses import (get_appended_TA_data, get_averaged_scans, get_closest_nr_from_array_like, get_DAS_from_lSVs_res_amplitudes, get_fit_method_race, get_full_matrix_global_fit, get_kinetic_scheme_SAS, get_noise_weights, get_retained_rightSVs_leftSVs_singularvs, get_SVD_rank_estimate, get_SVD_reconstructed_data_for_GUI,
+                                        get_SVDGF_reconstructed_data, get_SVDGFit_parameters, get_SVDGFit_uncertainties, get_TA_data_after_start_time)
+
+# issued by get_SVDGFit_parameters.initialize_fit_parameters if default initial values had to be used, global_fit returns its message in GlobalFitResult.warnings instead
+InsufficientInitialValuesWarning = get_SVDGFit_parameters.InsufficientInitialValuesWarning
+# confidence intervals of the fit by resampling, see estimate_fit_uncertainties
+FitUncertainties = get_SVDGFit_uncertainties.FitUncertainties
+UNCERTAINTY_METHODS = get_SVDGFit_uncertainties.METHODS
+# which components carry signal, see estimate_rank
+RankEstimate = get_SVD_rank_estimate.RankEstimate
+ScanAverage = get_averaged_scans.ScanAverage
+NoiseWeights = get_noise_weights.NoiseWeights
+KineticScheme = get_kinetic_scheme_SAS.KineticScheme
+MethodRace = get_fit_method_race.MethodRace
+
+# TA data has about 4-5 significant digits: float32 halves the memory of all matrices and doubles the BLAS throughput,
+# see Benchmarks/precision_accuracy_report.py for its deviation from float64.
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+DEFAULT_PRECISION = "float64"
+
+# modified z-score of the distance of a scan from the others above which it is not averaged
+OUTLIER_THRESHOLD = get_averaged_scans.OUTLIER_THRESHOLD
+
+# weighting of the residuals of the global fit: none, the noise of each wavelength before time zero or the noise map of averaged scans
+WEIGHTINGS = get_noise_weights.WEIGHTINGS
+
+# what the global fit fits: the retained right SVs (weighted by their singular values) or the complete data matrix, see get_full_matrix_global_fit
+FIT_ENGINES = ("SVD vectors", "full matrix")
+
+# kinetic schemes that only need the selected components, any other kinetic scheme is read from a file, see read_kinetic_scheme
+KINETIC_SCHEME_PRESETS = get_kinetic_scheme_SAS.PRESETS
+
+# lmfit methods of the fit method race, "auto" fits with the best of them for the kind of fit, see race_fit_methods and resolve_fit_method
+FIT_METHODS = get_fit_method_race.METHODS
+DEFAULT_FIT_METHOD_RACE_TIME_BUDGET = get_fit_method_race.DEFAULT_TIME_BUDGET
+
+# live mode of the original data tabs: off, rows appended to the data file or one new data file per scan in its directory
+LIVE_MODES = ("off", "append rows", "new files in directory")
+
+FIT_HINT = ("\n\nMaybe try it with another fit method (Fit method menu) or changed initial fit parameter values (button in bottom left corner),"
+            +" or another start time-value or another set of components ...")
+
+class PipelineError(ValueError):
+    """ base class of all errors raised by the pipeline. stage names the pipeline stage that failed. """
+    stage = "pipeline"
+
+    def __init__(self, message, filename=None):
+        super().__init__(message)
+        self.filename = filename
+
+    def __str__(self):
+        message = super().__str__()
+        if self.filename:
+            return f"{self.stage} failed for {self.filename}:\n{message}"
+        return f"{self.stage} failed:\n{message}"
+
+class DataLoadError(PipelineError):
+    stage = "loading the data file"
+
+class MatrixBoundsError(PipelineError):
+    stage = "cropping the data matrix"
+
+class TargetModelError(PipelineError):
+    stage = "reading the target model"
+
+class FitError(PipelineError):
+    stage = "global fit"
+
+class ReconstructionError(PipelineError):
+    stage = "data reconstruction"
+
+class UncertaintyError(PipelineError):
+    stage = "uncertainty estimation"
+
+class WeightingError(PipelineError):
+    stage = "estimating the noise weights"
+
+class KineticSchemeError(PipelineError):
+    stage = "solving the kinetic scheme"
+
+@dataclass
+class TAData:
+    """ a (cropped) TA data matrix, shape (nr of wavelengths, nr of time delays), with its axes as strings as in the data file.
+    noise_map: the standard error of each value if the data is an average of scans, else None. """
+    filename: str
+    data_matrix: np.ndarray
+    time_delays: list
+    wavelengths: list
+    matrix_bounds_dict: dict = field(default_factory=dict)
+    noise_map: Optional[np.ndarray] = None
+
+    @property
+    def start_time(self):
+        return self.time_delays[0]
+
+    @property
+    def precision(self):
+        return self.data_matrix.dtype.name
+
+@dataclass
+class SVDComponents:
+    """ the retained singular vectors and values. """
+    components_list: list
+    retained_rSVs: np.ndarray
+    retained_lSVs: np.ndarray
+    retained_singular_values: np.ndarray
+
+@dataclass
+class SVDReconstructionResult:
+    data: TAData
+    components: SVDComponents
+    SVD_reconstructed_data: np.ndarray
+    singular_values: np.ndarray
+    U_matrix: np.ndarray
+    VT_matrix: np.ndarray
+    difference_matrix: np.ndarray
+
+@dataclass
+class GlobalFitResult:
+    """ the result of the SVD-assisted global fit. decay_times are formatted strings as used in the GUI. """
+    fit_result: lmfit.minimizer.MinimizerResult
+    fit_params: lmfit.Parameters
+    decay_times: list
+    decay_times_as_dict: dict
+    amplitudes: dict
+    fit_method_name: str
+    parsed_user_defined_summands: list = field(default_factory=list)
+    warnings: list = field(default_factory=list)
+    weighting: str = "none"
+    fit_engine: str = "SVD vectors"
+    # only for the full matrix fit, which computes the DAS itself
+    DAS: Optional[np.ndarray] = None
+    noise_weights: Optional[NoiseWeights] = None
+
+    def get_stderrs_as_dict(self):
+        return {name: param.stderr for name, param in self.fit_params.items() if name.startswith("tau_")}
+
+    @property
+    def chisqr(self):
+        return self.fit_result.chisqr
+
+    @property
+    def redchi(self):
+        return self.fit_result.redchi
+
+    @property
+    def irf_parameters(self):
+        """ time_zero and FWHM of the IRF if the fit used it, else {}. """
+        return get_SVDGFit_parameters.get_irf_parameters(self.fit_params)
+
+@dataclass
+class SVDGFResult:
+    data: TAData
+    components: SVDComponents
+    fit: GlobalFitResult
+    DAS: np.ndarray
+    indeces_for_DAS_matrix: list
+    SVDGF_reconstructed_data: np.ndarray
+    difference_matrix: np.ndarray
+    # only with a kinetic scheme: the species associated spectra (as the DAS) and the populations of the compartments (as the right SVs)
+    kinetic_scheme: Optional[KineticScheme] = None
+    SAS: Optional[np.ndarray] = None
+    populations: Optional[np.ndarray] = None
+
+def get_dtype(precision):
+    """ the dtype of precision, one of PRECISIONS. """
+    try:
+        return PRECISIONS[precision]
+    except KeyError:
+        raise PipelineError(f"unknown precision {precision!r}, use one of {list(PRECISIONS)}.") from None
+
+def load_data(filename, precision=DEFAULT_PRECISION):
+    """ load the complete data matrix of filename as float matrix of the given precision. """
+    dtype = get_dtype(precision)
+    try:
+        data_matrix, time_delays, wavelengths = get_TA_data_after_start_time.run(filename, "-999999", dtype=dtype)
+    except (ValueError, IndexError, OSError, UnboundLocalError) as error:
+        # UnboundLocalError: file ending that get_TA_data_after_start_time does not know
+        raise DataLoadError(f"{type(error).__name__}: {error}\nMaybe due to the data file format!", filename=filename) from error
+
+    return TAData(filename, data_matrix, time_delays, wavelengths)
+
+def crop_data(ta_data, matrix_bounds_dict):
+    """ crop ta_data to the indeces in matrix_bounds_dict (as produced by the MatrixBounds_Toplevel). An empty dict keeps the complete matrix. """
+    if not matrix_bounds_dict:
+        return ta_data
+
+    try:
+        min_wavelength_index = matrix_bounds_dict["min_wavelength_index"]
+        max_wavelength_index = matrix_bounds_dict["max_wavelength_index"]
+        min_time_delay_index = matrix_bounds_dict["min_time_delay_index"]
+        max_time_delay_index = matrix_bounds_dict["max_time_delay_index"]
+    except KeyError as error:
+        raise MatrixBoundsError(f"the matrix bounds dict has no key {error}.", filename=ta_data.filename) from error
+
+    data_matrix = ta_data.data_matrix[min_wavelength_index:max_wavelength_index+1, min_time_delay_index:max_time_delay_index+1]
+    if data_matrix.size == 0:
+        raise MatrixBoundsError(f"the matrix bounds {matrix_bounds_dict} leave an empty data matrix.", filename=ta_data.filename)
+
+    noise_map = None if ta_data.noise_map is None else ta_data.noise_map[min_wavelength_index:max_wavelength_index+1, min_time_delay_index:max_time_delay_index+1]
+
+    return TAData(ta_data.filename, data_matrix, ta_data.time_delays[min_time_delay_index:max_time_delay_index+1],
+                    ta_data.wavelengths[min_wavelength_index:max_wavelength_index+1], matrix_bounds_dict, noise_map)
+
+def load_and_crop_data(filename, matrix_bounds_dict, precision=DEFAULT_PRECISION):
+    return crop_data(load_data(filename, precision), matrix_bounds_dict)
+
+def load_growing_data(filename, matrix_bounds_dict, precision=DEFAULT_PRECISION):
+    """ like load_and_crop_data, but the file is read with a DataFileTail, which afterwards reads only the rows appended to the file, see read_appended_data.
+    Returns: TAData, DataFileTail """
+    data_file_tail = get_appended_TA_data.DataFileTail(filename)
+    appended_data = read_appended_data(data_file_tail, {}, precision)
+    if appended_data is None:
+        raise DataLoadError("the file does not contain any time delays yet.", filename=filename)
+
+    time_delays, data_matrix = appended_data
+    return crop_data(TAData(filename, data_matrix, time_delays, data_file_tail.wavelengths), matrix_bounds_dict), data_file_tail
+
+def read_appended_data(data_file_tail, matrix_bounds_dict, precision=DEFAULT_PRECISION):
+    """ the time delays and data columns appended to the file since the last read, restricted to the wavelengths of matrix_bounds_dict. None if there are none.
+    (the time delay bounds of matrix_bounds_dict do not restrict time delays that are measured later) """
+    try:
+        time_delays, rows = data_file_tail.read_new_rows()
+    except (ValueError, OSError, UnicodeDecodeError) as error:
+        raise DataLoadError(f"{type(error).__name__}: {error}\nMaybe due to the data file format!", filename=data_file_tail.filename) from error
+
+    if not time_delays:
+        return None
+
+    data_matrix = rows.T.astype(get_dtype(precision))
+    if matrix_bounds_dict:
+        data_matrix = data_matrix[matrix_bounds_dict["min_wavelength_index"]:matrix_bounds_dict["max_wavelength_index"]+1, :]
+
+    return time_delays, data_matrix
+
+def merge_scans(scan_files, matrix_bounds_dict, precision=DEFAULT_PRECISION, outlier_threshold=OUTLIER_THRESHOLD):
+    """ the average of repeated scans, streamed one file at a time (see get_averaged_scans). Outlier scans are rejected, scans with other time delays
+    or wavelengths than the first one are skipped. The mean is computed in float64 and returned in the given precision.
+    Returns: TAData of the average with its noise map (named after the first scan), ScanAverage (to add later scans, see read_new_scans_of_directory) """
+    if not scan_files:
+        raise DataLoadError("no scan files given.")
+
+    reference_ta_data = None
+    skipped_scans = {}
+    def read_scan(scan_file):
+        nonlocal reference_ta_data
+        if reference_ta_data is None:
+            reference_ta_data = load_and_crop_data(scan_file, matrix_bounds_dict, precision)
+            return reference_ta_data.data_matrix
+        return next(read_new_scans([scan_file], reference_ta_data, matrix_bounds_dict, precision, skipped_scans), (None, None))[1]
+
+    try:
+        scan_average = get_averaged_scans.merge_scans(scan_files, read_scan, outlier_threshold)
+    except ValueError as error:
+        raise DataLoadError(f"could not average the scans: {error}", filename=scan_files[0]) from error
+    scan_average.skipped_scans.update(skipped_scans)
+
+    return get_averaged_TA_data(reference_ta_data, scan_average), scan_average
+
+def get_averaged_TA_data(reference_ta_data, scan_average):
+    """ TAData with the mean and the noise map of scan_average, in the precision and with the axes of reference_ta_data. """
+    dtype = reference_ta_data.data_matrix.dtype
+
+    return TAData(reference_ta_data.filename, scan_average.mean.astype(dtype), reference_ta_data.time_delays, reference_ta_data.wavelengths,
+                    reference_ta_data.matrix_bounds_dict, scan_average.get_noise_map().astype(dtype))
+
+def get_noise_map_filename(filename):
+    """ the noise map of an averaged data file is saved next to it, in the same format. """
+    stem, extension = os.path.splitext(filename)
+    return stem + "_noise_map" + extension
+
+def is_noise_map_file(filename):
+    return os.path.splitext(filename)[0].endswith("_noise_map")
+
+def load_scans_of_directory(filename, matrix_bounds_dict, precision=DEFAULT_PRECISION, outlier_threshold=OUTLIER_THRESHOLD):
+    """ the average of filename and all data files in its directory that have its extension, its time delays and wavelengths, e.g. one file per scan.
+    Returns: TAData (with noise map), DataDirectoryScans (to find the scans measured later), ScanAverage """
+    directory_scans = get_appended_TA_data.DataDirectoryScans(os.path.dirname(os.path.abspath(filename)), os.path.splitext(filename)[1])
+    other_files = [scan_file for scan_file in directory_scans.get_new_files(wait_until_complete=False)
+                    if os.path.abspath(scan_file) != os.path.abspath(filename) and not is_noise_map_file(scan_file)]
+
+    ta_data, scan_average = merge_scans([filename] + other_files, matrix_bounds_dict, precision, outlier_threshold)
+
+    return ta_data, directory_scans, scan_average
+
+def read_new_scans(scan_files, reference_ta_data, matrix_bounds_dict, precision=DEFAULT_PRECISION, skipped_scans=None):
+    """ yields (scan file, data matrix) of scan_files. files with other time delays or wavelengths than reference_ta_data or that can not be read are skipped,
+    the reasons are added to the dict skipped_scans (scan file: reason) if it is given. """
+    if skipped_scans is None:
+        skipped_scans = {}
+    for scan_file in scan_files:
+        try:
+            scan = load_and_crop_data(scan_file, matrix_bounds_dict, precision)
+        except PipelineError as error:
+            skipped_scans[scan_file] = str(error)
+            continue
+        if scan.time_delays != reference_ta_data.time_delays or scan.wavelengths != reference_ta_data.wavelengths:
+            skipped_scans[scan_file] = f"its time delays or wavelengths differ from those of {reference_ta_data.filename}"
+            continue
+        yield scan_file, scan.data_matrix
+
+def read_new_scans_of_directory(directory_scans, reference_ta_data, matrix_bounds_dict, precision=DEFAULT_PRECISION):
+    """ the complete scan files that appeared in the directory since the last call: ([(scan file, data matrix), ...], {skipped scan file: reason}),
+    None if there are none. """
+    new_scan_files = [scan_file for scan_file in directory_scans.get_new_files() if not is_noise_map_file(scan_file)]
+    skipped_scans = {}
+    new_scans = list(read_new_scans(new_scan_files, reference_ta_data, matrix_bounds_dict, precision, skipped_scans))
+
+    return (new_scans, skipped_scans) if new_scan_files else None
+
+def check_components_list(ta_data, components_list):
+    if not components_list:
+        raise PipelineError("no components selected.", filename=ta_data.filename)
+    if max(components_list) >= min(ta_data.data_matrix.shape):
+        raise PipelineError(f"component {max(components_list)} does not exist for a data matrix of shape {ta_data.data_matrix.shape}.", filename=ta_data.filename)
+
+    return None
+
+def get_SVD_components(ta_data, components_list, noise_weights=None):
+    """ with noise_weights the SVD of the whitened data matrix, its singular vectors are returned in the units of the data again
+    (the left ones are not orthonormal then, but the DAS and the reconstruction are computed from them as usual). """
+    check_components_list(ta_data, components_list)
+
+    if noise_weights is None:
+        retained_rSVs, retained_lSVs, retained_singular_values = get_retained_rightSVs_leftSVs_singularvs.run(ta_data.data_matrix, components_list)
+    else:
+        retained_rSVs, retained_lSVs, retained_singular_values = get_retained_rightSVs_leftSVs_singularvs.run(noise_weights.whiten(ta_data.data_matrix), components_list)
+        retained_rSVs, retained_lSVs = noise_weights.unwhiten_right_SVs(retained_rSVs), noise_weights.unwhiten_left_SVs(retained_lSVs)
+
+    return SVDComponents(list(components_list), retained_rSVs, retained_lSVs, retained_singular_values)
+
+def get_noise_weights_of_data(ta_data, weighting, time_zero=0.0):
+    """ the NoiseWeights of ta_data for weighting (one of WEIGHTINGS), None for "none".
+    "noise before time zero": if the matrix bounds cut off the time delays before time_zero, they are read from the complete data file.
+    "noise map": the noise map of ta_data, or the one saved next to its data file (see get_noise_map_filename). """
+    if weighting not in WEIGHTINGS:
+        raise WeightingError(f"unknown weighting {weighting}, use one of {WEIGHTINGS}.", filename=ta_data.filename)
+    if weighting == "none":
+        return None
+
+    try:
+        if weighting == "noise before time zero":
+            return get_noise_weights.from_pre_time_zero(get_pre_time_zero_data(ta_data, time_zero), len(ta_data.time_delays))
+        return get_noise_weights.from_noise_map(get_noise_map(ta_data))
+    except ValueError as error:
+        raise WeightingError(str(error), filename=ta_data.filename) from error
+
+def get_pre_time_zero_data(ta_data, time_zero):
+    """ the data of the wavelengths of ta_data at the time delays before time_zero. """
+    is_before_time_zero = np.array([float(time_delay) for time_delay in ta_data.time_delays]) < time_zero
+    if np.count_nonzero(is_before_time_zero) >= get_noise_weights.MIN_NR_OF_NOISE_TIME_DELAYS or not ta_data.matrix_bounds_dict:
+        return ta_data.data_matrix[:, is_before_time_zero]
+
+    complete_ta_data = load_data(ta_data.filename, ta_data.precision)
+    bounds = ta_data.matrix_bounds_dict
+    is_before_time_zero = np.array([float(time_delay) for time_delay in complete_ta_data.time_delays]) < time_zero
+
+    return complete_ta_data.data_matrix[bounds["min_wavelength_index"]:bounds["max_wavelength_index"]+1, is_before_time_zero]
+
+def get_noise_map(ta_data):
+    """ the noise map of ta_data, or the one saved next to its data file, cropped like ta_data. """
+    if ta_data.noise_map is not None:
+        return ta_data.noise_map
+
+    noise_map_filename = get_noise_map_filename(ta_data.filename)
+    if not os.path.exists(noise_map_filename):
+        raise ValueError(f"the data has no noise map and there is no {os.path.basename(noise_map_filename)} next to the data file, e.g. merge the scans first (see merge_scans).")
+
+    noise_map = crop_data(load_data(noise_map_filename, ta_data.precision), ta_data.matrix_bounds_dict)
+    if noise_map.data_matrix.shape != ta_data.data_matrix.shape:
+        raise ValueError(f"the noise map in {noise_map_filename} has shape {noise_map.data_matrix.shape}, the data matrix has shape {ta_data.data_matrix.shape}.")
+
+    return noise_map.data_matrix
+
+def estimate_rank(ta_data, time_zero=0.0, max_rank=get_SVD_rank_estimate.MAX_RANK):
+    """ suggests the SVD components to use, RankEstimate.suggested_components. time delays before time_zero are used to estimate the noise. """
+    U, sigma, VT = np.linalg.svd(ta_data.data_matrix, full_matrices=False)
+
+    return get_SVD_rank_estimate.run(sigma, U, VT, ta_data.data_matrix, ta_data.time_delays, time_zero=time_zero, max_rank=max_rank)
+
+def get_SVD_cache_key(ta_data):
+    return (ta_data.filename, repr(sorted(ta_data.matrix_bounds_dict.items())), ta_data.precision)
+
+def get_SVD_reconstruction(ta_data, components_list, SVD_cache=None):
+    """ with an SVD_cache (get_incremental_SVD.SVDCache) a data file that has only grown by new time delays since it was last decomposed
+    is updated incrementally instead of decomposed again. U_matrix, VT_matrix and singular_values then only contain the leading components. """
+    if SVD_cache is None:
+        components = get_SVD_components(ta_data, components_list)
+        SVD_reconstructed_data, singular_values, U_matrix, VT_matrix = get_SVD_reconstructed_data_for_GUI.run(ta_data.data_matrix, components_list)
+    else:
+        check_components_list(ta_data, components_list)
+        U_matrix, singular_values, VT_matrix = SVD_cache.get_SVD(get_SVD_cache_key(ta_data), ta_data.data_matrix, ta_data.time_delays, max(components_list) + 1)
+        components = SVDComponents(list(components_list), VT_matrix[components_list, :], U_matrix[:, components_list], singular_values[components_list])
+        SVD_reconstructed_data = (components.retained_lSVs * components.retained_singular_values) @ components.retained_rSVs
+    difference_matrix = ta_data.data_matrix - SVD_reconstructed_data
+
+    return SVDReconstructionResult(ta_data, components, SVD_reconstructed_data, singular_values, U_matrix, VT_matrix, difference_matrix)
+
+def read_target_model_summands(target_model_configuration_file):
+    """ the target model configuration file contains a dict {"summand_component0": "exp(-t/k0)", ...}. """
+    try:
+        with open(target_model_configuration_file, mode='r') as dict_file:
+            summands_of_user_defined_fit_function = ast.literal_eval(dict_file.read().strip())
+    except (SyntaxError, ValueError, FileNotFoundError) as error:
+        raise TargetModelError("getting the user defined summands for fit function from file failed, or the dict was empty.\n"
+                                +"Check the file!\n"
+                                +"computation is discontinued!", filename=target_model_configuration_file) from error
+
+    return summands_of_user_defined_fit_function
+
+def parse_summand(summand_str: str):
+    """ translate a summand like exp(-t/k0) into an asteval expression of time_delays and taus. """
+    if summand_str == "":
+        return "0"
+    summand_str_with_time_delays_parsed = summand_str.replace("t", "time_delays")
+    summand_str_with_decay_constants_parsed = summand_str_with_time_delays_parsed
+    list_of_ks_in_summand_str = re.findall(r'k\d+', summand_str_with_time_delays_parsed)
+    for k_str in list_of_ks_in_summand_str:
+        summand_str_with_decay_constants_parsed = re.sub(r'k\d+', f"taus[\"component{k_str[1:]}\"]", summand_str_with_decay_constants_parsed, count=1)
+
+    summand_str_with_brackets_added = "(" +summand_str_with_decay_constants_parsed+ ")"
+
+    return summand_str_with_brackets_added
+
+def parse_target_model_summands(all_summands_dict: dict, components_list):
+    try:
+        return [parse_summand(all_summands_dict[f"summand_component{component}"]) for component in components_list]
+    except KeyError as error:
+        raise TargetModelError(f"the target model has no summand {error} for the selected components {components_list}.") from error
+
+def read_kinetic_scheme(kinetic_scheme, components_list):
+    """ one of KINETIC_SCHEME_PRESETS or a kinetic scheme file, which contains a dict {"transfers": [(0, 1, 1.0), ...], "initial_populations": {0: 1.0}}.
+    Returns None for None. """
+    if kinetic_scheme is None:
+        return None
+
+    try:
+        if kinetic_scheme in KINETIC_SCHEME_PRESETS:
+            scheme = get_kinetic_scheme_SAS.get_preset(kinetic_scheme, list(components_list))
+        else:
+            with open(kinetic_scheme, mode='r') as dict_file:
+                scheme = get_kinetic_scheme_SAS.from_dict(ast.literal_eval(dict_file.read().strip()), name=os.path.basename(kinetic_scheme))
+        get_kinetic_scheme_SAS.check(scheme, list(components_list))
+    except (SyntaxError, ValueError, OSError) as error:
+        raise TargetModelError(f"{type(error).__name__}: {error}", filename=kinetic_scheme) from error
+
+    return scheme
+
+def get_SAS(ta_data, components, fit, DAS, kinetic_scheme):
+    """ the SAS and the populations of the compartments of kinetic_scheme (a KineticScheme) for the fitted decay times. """
+    decay_times = [fit.decay_times_as_dict[f"tau_component{component}"] for component in components.components_list]
+    try:
+        mixing_matrix = get_kinetic_scheme_SAS.get_mixing_matrix(kinetic_scheme, components.components_list, decay_times)
+    except (ValueError, np.linalg.LinAlgError) as error:
+        raise KineticSchemeError(str(error), filename=ta_data.filename) from error
+    populations = get_kinetic_scheme_SAS.get_populations(mixing_matrix, [float(time_delay) for time_delay in ta_data.time_delays], decay_times, **fit.irf_parameters)
+
+    return get_kinetic_scheme_SAS.get_SAS(DAS, mixing_matrix), populations.astype(ta_data.data_matrix.dtype)
+
+def get_decay_times_and_amplitudes(fit_params, components_list):
+    """ the fitted decay times (as formatted strings and as dict) and amplitudes of the global fit parameters. """
+    decay_times = ['{:.9f}'.format(fit_params[f'tau_component{component}'].value) for component in components_list]
+    decay_times_as_dict = {f"tau_component{component}": fit_params[f"tau_component{component}"].value for component in components_list}
+    amplitudes = {}
+    for component in components_list:
+        for component_index in range(len(components_list)):
+            amplitudes[f"amp_rSV{component_index}_component{component}"] = fit_params[f"amp_rSV{component_index}_component{component}"].value
+
+    return decay_times, decay_times_as_dict, amplitudes
+
+def global_fit(ta_data, components, initial_fit_parameter_values, time_zero=0, temp_resolution=0, parsed_user_defined_summands=None, fit_method_name="leastsq",
+                fit_time_zero=False, fit_temp_resolution=False, noise_weights=None, fit_engine="SVD vectors", initialize_amplitudes_linearly=False):
+    """ the SVD-assisted global fit of the retained right singular vectors (weighted by their singular values).
+    With fit_engine "full matrix" the complete data matrix is fitted instead, the DAS are computed by variable projection.
+    With temp_resolution > 0 the exponentials are convoluted with a gaussian IRF of this FWHM at time_zero, which are fitted too if fit_time_zero/fit_temp_resolution.
+    With noise_weights, components have to be those of the whitened data matrix (get_SVD_components with the same noise_weights).
+    With initialize_amplitudes_linearly (always with noise_weights) the initial amplitudes are fitted linearly for the initial decay times,
+    only the initial decay times of initial_fit_parameter_values are used then. """
+    parsed_user_defined_summands = parsed_user_defined_summands or []
+    if fit_engine not in FIT_ENGINES:
+        raise FitError(f"unknown fit engine {fit_engine}, use one of {FIT_ENGINES}.", filename=ta_data.filename)
+
+    DAS = None
+    # e.g. that default initial values were used, returned by the fit functions instead of issued (warnings can not be caught per thread)
+    fit_warnings = []
+    try:
+        if fit_engine == "full matrix":
+            fit_result, fit_params, DAS = get_full_matrix_global_fit.run(ta_data.data_matrix, components.components_list, ta_data.time_delays, ta_data.start_time,
+                                                                        initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands=parsed_user_defined_summands,
+                                                                        fit_method_name=fit_method_name, fit_time_zero=fit_time_zero, fit_temp_resolution=fit_temp_resolution,
+                                                                        noise_weights=noise_weights, retained_lSVs=components.retained_lSVs, fit_warnings=fit_warnings)
+        else:
+            fit_result, fit_params = get_SVDGFit_parameters.run(components.retained_rSVs, components.retained_singular_values, components.components_list, ta_data.time_delays,
+                                                                ta_data.start_time, initial_fit_parameter_values, time_zero, temp_resolution,
+                                                                parsed_user_defined_summands=parsed_user_defined_summands, fit_method_name=fit_method_name,
+                                                                fit_time_zero=fit_time_zero, fit_temp_resolution=fit_temp_resolution,
+                                                                time_weights=None if noise_weights is None else noise_weights.time_weights,
+                                                                # the initial amplitudes are meant for the unweighted vectors
+                                                                initialize_amplitudes_linearly=initialize_amplitudes_linearly or noise_weights is not None, fit_warnings=fit_warnings)
+    except (ValueError, TypeError) as error:
+        if str(error) == "":
+            raise FitError(f"{type(error).__name__} without message, i.e.: the fit might not have converged." + FIT_HINT, filename=ta_data.filename) from error
+        raise FitError(str(error), filename=ta_data.filename) from error
+
+    decay_times, decay_times_as_dict, amplitudes = get_decay_times_and_amplitudes(fit_params, components.components_list)
+
+    return GlobalFitResult(fit_result, fit_params, decay_times, decay_times_as_dict, amplitudes, fit_method_name, parsed_user_defined_summands, fit_warnings,
+                            "none" if noise_weights is None else noise_weights.weighting, fit_engine, None if DAS is None else DAS.astype(ta_data.data_matrix.dtype), noise_weights)
+
+def get_DAS(ta_data, components, fit):
+    if fit.DAS is not None:
+        return fit.DAS
+    return get_DAS_from_lSVs_res_amplitudes.run(components.retained_lSVs, fit.fit_params, components.components_list, ta_data.wavelengths, ta_data.filename, ta_data.start_time)
+
+def reconstruct(ta_data, DAS, decay_times, indeces_for_DAS_matrix, irf_parameters=None):
+    """ data matrix reconstructed from the DAS at indeces_for_DAS_matrix and their decay times (convoluted with the IRF of irf_parameters, see GlobalFitResult.irf_parameters). """
+    try:
+        return get_SVDGF_reconstructed_data.run(DAS[:, indeces_for_DAS_matrix], [decay_times[x] for x in indeces_for_DAS_matrix], ta_data.time_delays, ta_data.wavelengths,
+                                                indeces_for_DAS_matrix, ta_data.start_time, **(irf_parameters or {}))
+    except (ValueError, FloatingPointError) as error:
+        raise ReconstructionError(f"{type(error).__name__}: {error}"
+                                    +"\n\nLikely due to some error in fit procedure which lead to very small fitted decay constants in course of which we get numbers like exp(-bigNumber),"
+                                    +" which underflows a float."
+                                    +f"\n{decay_times=}" + FIT_HINT, filename=ta_data.filename) from error
+
+def run_SVDGF(filename, components_list, initial_fit_parameter_values, matrix_bounds_dict=None, time_zero=0, temp_resolution=0, target_model_configuration_file: Optional[str]=None,
+                fit_method_name="leastsq", indeces_for_DAS_matrix=None, ta_data=None, precision=DEFAULT_PRECISION, fit_time_zero=False, fit_temp_resolution=False, weighting="none",
+                fit_engine="SVD vectors", kinetic_scheme=None, initialize_amplitudes_linearly=False):
+    """ the complete SVD-GlobalFit pipeline for one data file.
+
+    Args:
+        filename (str): path to the data file.
+        components_list (list of ints): the SVD components used for the fit.
+        initial_fit_parameter_values (dict): as in configFiles/initial_fit_parameter_values.txt.
+        matrix_bounds_dict (dict, optional): indeces to crop the data matrix. Defaults to None, i.e. the complete matrix.
+        time_zero (float, optional): time zero of the IRF. Defaults to 0.
+        temp_resolution (float, optional): FWHM of the gaussian IRF, if > 0 the exponentials of the fit function are convoluted with it. Defaults to 0, i.e. no IRF.
+        target_model_configuration_file (str, optional): if given, the summands in this file are used as fit function instead of a sum of exponentials.
+        fit_method_name (str, optional): lmfit method. Defaults to "leastsq".
+        indeces_for_DAS_matrix (list of ints, optional): which DAS to use for the reconstruction. Defaults to None, i.e. all.
+        ta_data (TAData, optional): already loaded and cropped data, then filename, matrix_bounds_dict and precision are not used.
+        precision (str, optional): one of PRECISIONS, the dtype of the data matrix and of all results except the fit. Defaults to "float64".
+        fit_time_zero (bool, optional): fit time_zero of the IRF instead of keeping it fixed. Defaults to False.
+        fit_temp_resolution (bool, optional): fit the FWHM of the IRF instead of keeping it fixed. Defaults to False.
+        weighting (str, optional): one of WEIGHTINGS, weights the residuals of the fit by the estimated noise. Defaults to "none".
+        fit_engine (str, optional): one of FIT_ENGINES, fit the retained right SVs or the complete data matrix. Defaults to "SVD vectors".
+        kinetic_scheme (str, optional): one of KINETIC_SCHEME_PRESETS or a kinetic scheme file, the SAS of its compartments are computed from the DAS. Defaults to None.
+        initialize_amplitudes_linearly (bool, optional): fit the initial amplitudes linearly for the initial decay times instead of using those of initial_fit_parameter_values. Defaults to False.
+
+    Returns:
+        SVDGFResult: all intermediate and final results.
+    """
+    if ta_data is None:
+        ta_data = load_and_crop_data(filename, matrix_bounds_dict or {}, precision)
+
+    noise_weights = get_noise_weights_of_data(ta_data, weighting, time_zero)
+    components = get_SVD_components(ta_data, components_list, noise_weights)
+
+    parsed_user_defined_summands = []
+    if target_model_configuration_file:
+        parsed_user_defined_summands = parse_target_model_summands(read_target_model_summands(target_model_configuration_file), components.components_list)
+    if kinetic_scheme is not None and parsed_user_defined_summands:
+        raise TargetModelError("a kinetic scheme needs the sum of exponentials as fit function, not the user defined fit function.", filename=target_model_configuration_file)
+    scheme = read_kinetic_scheme(kinetic_scheme, components.components_list)
+
+    fit = global_fit(ta_data, components, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands, fit_method_name, fit_time_zero, fit_temp_resolution, noise_weights,
+                        fit_engine, initialize_amplitudes_linearly)
+    DAS = get_DAS(ta_data, components, fit)
+
+    if indeces_for_DAS_matrix is None:
+        indeces_for_DAS_matrix = list(range(len(components.components_list)))
+    SVDGF_reconstructed_data = reconstruct(ta_data, DAS, fit.decay_times, indeces_for_DAS_matrix, fit.irf_parameters)
+    difference_matrix = ta_data.data_matrix - SVDGF_reconstructed_data
+
+    SAS, populations = (None, None) if scheme is None else get_SAS(ta_data, components, fit, DAS, scheme)
+
+    return SVDGFResult(ta_data, components, fit, DAS, list(indeces_for_DAS_matrix), SVDGF_reconstructed_data, difference_matrix, scheme, SAS, populations)
+
+def get_matrix_bounds_dict(ta_data, min_wavelength, max_wavelength, min_time_delay, max_time_delay):
+    """ the matrix bounds dict (as made by the MatrixBounds_Toplevel) for the wavelengths and time delays closest to the input values. """
+    matrix_bounds_dict = {"min_wavelength_index": get_closest_nr_from_array_like.get_index(ta_data.wavelengths, float(min_wavelength)),
+                            "max_wavelength_index": get_closest_nr_from_array_like.get_index(ta_data.wavelengths, float(max_wavelength)),
+                            "min_time_delay_index": get_closest_nr_from_array_like.get_index(ta_data.time_delays, float(min_time_delay)),
+                            "max_time_delay_index": get_closest_nr_from_array_like.get_index(ta_data.time_delays, float(max_time_delay))}
+
+    if (matrix_bounds_dict["min_wavelength_index"] >= matrix_bounds_dict["max_wavelength_index"]
+            or matrix_bounds_dict["min_time_delay_index"] >= matrix_bounds_dict["max_time_delay_index"]):
+        raise MatrixBoundsError("min values need to be smaller than max values (at least their corresponding indeces do not comply).", filename=ta_data.filename)
+
+    return matrix_bounds_dict
+
+def estimate_fit_uncertainties(SVDGF_result, method="residuals", **options):
+    """ confidence intervals of the fitted decay times and bands of the DAS by resampling and refitting on a process pool,
+    see get_SVDGFit_uncertainties.run for the methods and options. Returns a FitUncertainties. """
+    components, fit = SVDGF_result.components, SVDGF_result.fit
+    try:
+        return get_SVDGFit_uncertainties.run(components.retained_rSVs, components.retained_singular_values, components.retained_lSVs, components.components_list,
+                                                SVDGF_result.data.time_delays, fit.fit_params, method=method, data_matrix=SVDGF_result.data.data_matrix,
+                                                parsed_user_defined_summands=fit.parsed_user_defined_summands, fit_method_name=fit.fit_method_name, noise_weights=fit.noise_weights, **options)
+    except (ValueError, TypeError) as error:
+        raise UncertaintyError(str(error), filename=SVDGF_result.data.filename) from error
+
+def get_dataset_type(fit, components_list):
+    """ the kind of fit a best fit method is remembered for by the fit method race. """
+    return get_fit_method_race.get_dataset_type(len(components_list), bool(fit.irf_parameters), bool(fit.parsed_user_defined_summands), fit.weighting)
+
+def race_fit_methods(SVDGF_result, initial_fit_parameter_values, time_zero=0, temp_resolution=0, fit_time_zero=False, fit_temp_resolution=False, methods=FIT_METHODS,
+                        time_budget=DEFAULT_FIT_METHOD_RACE_TIME_BUDGET, max_workers=None):
+    """ every method fits the retained right SVs of SVDGF_result from the initial fit parameter values, with the IRF and weights of its fit, in parallel
+    and within time_budget seconds, see get_fit_method_race. Also with the fit engine "full matrix" the right SVs are raced. Returns a MethodRace. """
+    ta_data, components, fit = SVDGF_result.data, SVDGF_result.components, SVDGF_result.fit
+    time_delays = np.array([float(time_delay) for time_delay in ta_data.time_delays])
+    time_weights = None if fit.noise_weights is None else fit.noise_weights.time_weights
+    try:
+        start_params = get_SVDGFit_parameters.initialize_fit_parameters(components.components_list, initial_fit_parameter_values)
+        if temp_resolution > 0 and not fit.parsed_user_defined_summands:
+            get_SVDGFit_parameters.add_irf_parameters(start_params, time_delays, time_zero, temp_resolution, fit_time_zero, fit_temp_resolution)
+        problem = get_fit_method_race.make_problem(components.retained_rSVs, components.retained_singular_values, components.components_list, time_delays, start_params,
+                                                    fit.parsed_user_defined_summands, time_weights)
+        if fit.noise_weights is not None:
+            # as global_fit does: the initial amplitudes are meant for the unweighted vectors
+            get_SVDGFit_parameters.set_linear_amplitudes(start_params, problem["vectors"], time_delays, components.components_list, fit.parsed_user_defined_summands, time_weights)
+            problem["start_params_json"] = start_params.dumps()
+
+        return get_fit_method_race.run(problem, methods, time_budget, max_workers)
+    except ValueError as error:
+        raise FitError(str(error), filename=ta_data.filename) from error
+
+def remember_best_fit_method(best_fit_methods_file, method_race, dataset_type):
+    """ saves the best method of method_race for dataset_type (see get_dataset_type), used by later fits with the fit method "auto". Returns the method, None if all failed. """
+    if method_race.best is None:
+        return None
+    try:
+        get_fit_method_race.remember_best_method(best_fit_methods_file, dataset_type, method_race.best.method)
+    except (SyntaxError, ValueError, OSError) as error:
+        raise FitError(f"{type(error).__name__}: {error}", filename=best_fit_methods_file) from error
+
+    return method_race.best.method
+
+def resolve_fit_method(fit_method_name, best_fit_methods_file, components_list, temp_resolution=0, use_target_model=False, weighting="none"):
+    """ fit_method_name, or for "auto" the best method of the last race of this kind of fit ("leastsq" if it has not been raced). """
+    if fit_method_name != "auto":
+        return fit_method_name
+
+    use_irf = temp_resolution > 0 and not use_target_model
+    try:
+        return get_fit_method_race.get_best_method(best_fit_methods_file, get_fit_method_race.get_dataset_type(len(components_list), use_irf, use_target_model, weighting))
+    except (SyntaxError, ValueError, OSError) as error:
+        raise FitError(f"{type(error).__name__}: {error}", filename=best_fit_methods_file) from error
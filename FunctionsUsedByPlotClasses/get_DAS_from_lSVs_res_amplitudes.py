@@ -45,7 +45,8 @@ def make_plot(resulting_fit_params, retained_components, wavelengths, DAS, path_
 def run(retained_leftSVs, resulting_fit_params, retained_components, wavelengths, filename, start_time):
     nr_of_retained_components = len(retained_components)
 
-    DAS = np.zeros((len(wavelengths), nr_of_retained_components))
+    # same precision as the left singular vectors
+    DAS = np.zeros((len(wavelengths), nr_of_retained_components), dtype=retained_leftSVs.dtype)
     for k in range(nr_of_retained_components):
         for i in range(nr_of_retained_components):
             DAS[:, k] += resulting_fit_params[f'amp_rSV{i}_component{retained_components[k]}'].value * retained_leftSVs[:, i]
@@ -3,11 +3,13 @@
 
 import numpy as np
 
+from FunctionsUsedByPlotClasses import get_SVDGFit_parameters
+
 def exp_decay(amplitude, time_steps, decay_const):
     """ time_steps input must be a np.array! """
     return amplitude * np.exp(-time_steps/decay_const)
 
-def run(DAS, decay_constants, time_delays, wavelengths, retained_DAS, start_time):
+def run(DAS, decay_constants, time_delays, wavelengths, retained_DAS, start_time, time_zero=0, irf_fwhm=0):
     """ given the selected DAS and their corresponding decay times, this function computes a data matrix as\n
     data_matrix = Sum (i over components/selected DAS):
     DAS_i(lambda)*exp(-t/decay_constant_i).\n
@@ -22,9 +24,11 @@ def run(DAS, decay_constants, time_delays, wavelengths, retained_DAS, start_time
         wavelengths (list of floats): list of the wavelengths for which intensities were measured.
         retained_DAS (list of ints): which DAS to be used for data reconstruction.
         start_time (float): the time at which we have cut off the original data matrix for the fit.
+        time_zero (float, optional): time zero of the IRF, only used if irf_fwhm > 0.
+        irf_fwhm (float, optional): if > 0, the exponentials are convoluted with the gaussian IRF as in the fit (see get_SVDGFit_parameters.get_irf_parameters).
 
     Returns:
-        2d matrix of floats: the computed data matrix
+        2d matrix of floats: the computed data matrix, in the precision (dtype) of the DAS
     """
 
     # need time_delays as floats and only those after start_time
@@ -34,30 +38,19 @@ def run(DAS, decay_constants, time_delays, wavelengths, retained_DAS, start_time
     time_delays = np.array(time_delays)
 
     decay_constants = [float(decay_constant) for decay_constant in decay_constants]
-    nr_of_wavelenghts = len(wavelengths)
-    nr_of_time_delays = len(time_delays)
-
-    DAS = DAS.T
-
-    # print(f'\nnew method: {decay_constants=}\n')
-
-    """ SVD_GlobalFit TA data computed with loop """
-    SVDGF_reconstructed_data_matrix = np.zeros((nr_of_wavelenghts, nr_of_time_delays))
 
     # to get numpy RuntimeWarnings as catchable Exceptions
-    # e.g. when dividing by zero, or otherwise nan produced
-    np.seterr(all='raise')
-
-    try:
-        for component in range(len(retained_DAS)):
-            DAS_component = DAS[component, :]
-            decay_constant_component = decay_constants[component]
-            for index, amplitude in enumerate(DAS_component):
-                SVDGF_reconstructed_data_matrix[index, :] += exp_decay(amplitude, time_delays, decay_constant_component)
-    except FloatingPointError:
-        raise
-
-    # reset the np warnings setting to warn in console only
-    np.seterr(all='warn')
-
-    return SVDGF_reconstructed_data_matrix
\ No newline at end of file
+    # e.g. when dividing by zero, or otherwise nan produced.
+    # errstate restores the previous setting also if an exception is raised.
+    # the exponentials are computed in float64, so that the same decay times raise, whatever the precision of the DAS.
+    with np.errstate(all='raise'):
+        if irf_fwhm > 0:
+            exp_decays = get_SVDGFit_parameters.irf_convoluted_exp_decays(time_delays, decay_constants[:len(retained_DAS)], time_zero, irf_fwhm)
+        else:
+            exp_decays = np.array([exp_decay(1.0, time_delays, decay_constants[component]) for component in range(len(retained_DAS))])
+
+    # SVDGF TA data as one matrix product: sum over the components of DAS_i(lambda) * exp(-t/decay_constant_i).
+    # exponentials that are below the smallest float32 are zero in float32 anyway, this cast does not raise.
+    SVDGF_reconstructed_data_matrix = np.matmul(DAS, exp_decays.astype(DAS.dtype))
+
+    return SVDGF_reconstructed_data_matrix
@@ -10,6 +10,11 @@ Inputs: \n
 * time_delays = all the time steps in datafile at which data is taken - are used in exp decays of fit\n
 * initial fit parameter values = dictionary of values to use as initial fit parameter values\n
 * time_zero, is also used for convolution in fit function and to reduce the number of time_delays.\n
+If temp_resolution (the FWHM of the IRF) is > 0, the exponentials of the fit function are convoluted with a gaussian IRF centered at time_zero,
+using the closed form of the convolution (irf_convoluted_exp_decays). time_zero and the FWHM can optionally be fitted too.
+This does not apply to a user defined fit function (target model).\n
+With time_weights (see get_noise_weights) the vectors to fit are multiplied by them once before the fit, each evaluation multiplies the model by them,
+i.e. the residual of each time delay is weighted. The weighting of the wavelengths is done by whitening the data matrix before the SVD.\n
 The fit parameters: \n
 * the decay consts of exp decays in fit function - shared parameters\n
 * the amplitudes of exp decays in fit function - individual parameters, i.e. different for each fitted right_SV.\n
@@ -22,8 +27,15 @@ import numpy as np
 import lmfit
 import math
 import scipy.signal
-import asteval
-import tkinter as tk
+import scipy.special
+import warnings
+
+# FWHM of a gaussian = 2*sqrt(2*ln(2)) * its standard deviation
+FWHM_PER_SIGMA = 2*math.sqrt(2*math.log(2))
+MAX_EXPONENT = 300
+
+class InsufficientInitialValuesWarning(UserWarning):
+    """ the initial fit parameter values do not cover all selected components, default values are used instead. """
 
 def convolute_first_part_of_fit_function(sum_of_exponentials, time_delays, index_of_first_increased_time_interval, gaussian_for_convolution):
     """ convolutes the part of the fit function (sum of exponentials) that corresponds to the small initial time intervals
@@ -40,6 +52,44 @@ def convolute_first_part_of_fit_function(sum_of_exponentials, time_delays, index
 
     return convolution
 
+def irf_convoluted_exp_decays(time_delays, decay_constants, time_zero, irf_fwhm):
+    """ the exponential decays exp(-(t - time_zero)/tau) (zero before time_zero) convoluted with a normalised gaussian IRF of FWHM irf_fwhm, in closed form:\n
+    0.5 * exp(-(t - time_zero)/tau + sigma**2/(2*tau**2)) * erfc((sigma**2/tau - (t - time_zero)) / (sqrt(2)*sigma))\n
+    where erfc(x) * exp(...) overflows/underflows (x >= 0, i.e. large t/tau or a sharp IRF) it is computed
+    as 0.5 * exp(-u**2/2) * erfcx(x) with u = (t - time_zero)/sigma, which is the same value.\n
+    vectorized over time delays and decay constants: returns an array of shape (nr of decay constants, nr of time delays).
+    """
+    sigma = irf_fwhm/FWHM_PER_SIGMA
+    u = (np.asarray(time_delays, dtype=np.float64)[np.newaxis, :] - time_zero)/sigma
+    s = sigma/np.asarray(decay_constants, dtype=np.float64)[:, np.newaxis]
+    u, s = np.broadcast_arrays(u, s)
+    x = (s - u)/math.sqrt(2)
+
+    decays = np.empty(x.shape)
+    # long before time_zero exp(-u**2/2) underflows to 0, which is the correct value
+    with np.errstate(under='ignore'):
+        is_scaled = x >= 0
+        decays[is_scaled] = 0.5*np.exp(-0.5*u[is_scaled]**2)*scipy.special.erfcx(x[is_scaled])
+        is_unscaled = ~is_scaled
+        # a negative tau close to 0 (while fitting) lets the rising exponential overflow, it is capped to keep the residuals finite
+        decays[is_unscaled] = 0.5*np.exp(np.minimum(s[is_unscaled]*(0.5*s[is_unscaled] - u[is_unscaled]), MAX_EXPONENT))*scipy.special.erfc(x[is_unscaled])
+
+    return decays
+
+def get_irf_parameters(fit_params):
+    """ {"time_zero": ..., "irf_fwhm": ...} of fit_params if the fit used the IRF, else {}. Can be passed on as keyword arguments to model_func. """
+    if "irf_fwhm" not in fit_params:
+        return {}
+
+    return {"time_zero": fit_params["time_zero"].value, "irf_fwhm": fit_params["irf_fwhm"].value}
+
+def add_irf_parameters(fit_params, time_delays, time_zero, temp_resolution, fit_time_zero, fit_temp_resolution):
+    """ time_zero and the FWHM of the IRF as fit parameters, fixed unless fit_time_zero/fit_temp_resolution. """
+    fit_params.add("time_zero", value=float(time_zero), vary=fit_time_zero, min=float(time_delays[0]), max=float(time_delays[-1]))
+    fit_params.add("irf_fwhm", value=float(temp_resolution), vary=fit_temp_resolution, min=float(temp_resolution)/100)
+
+    return fit_params
+
 def model_func_user_defined(time_delays, amplitudes, decay_constants, retained_components, parsed_user_defined_summands, asteval_interpreter: asteval.Interpreter = asteval.Interpreter(use_numpy=True)):
     taus = {}
     for (i,comp) in enumerate(retained_components):
@@ -54,11 +104,14 @@ def model_func_user_defined(time_delays, amplitudes, decay_constants, retained_c
 
     return exp_sum
 
-def model_func(time_delays, amplitudes, decay_constants, index_of_first_increased_time_interval=0, gaussian_for_convolution=0):
+def model_func(time_delays, amplitudes, decay_constants, index_of_first_increased_time_interval=0, gaussian_for_convolution=0, time_zero=0, irf_fwhm=0):
     """ model function for fit: a sum of exponentials (as many as SVD components are used for SVDGF reconstruction).\n
     the amplitudes of the expontials are individual fit parameters, the decay constants are shared fit parameters.\n
-    the first part (up to index_of_first_increased_time_interval) is convoluted with a gaussian IRF of the same length.
+    if irf_fwhm > 0, the exponentials start at time_zero and are convoluted with the gaussian IRF (see irf_convoluted_exp_decays).
     """
+    if irf_fwhm > 0:
+        return np.matmul(np.asarray(amplitudes, dtype=np.float64), irf_convoluted_exp_decays(time_delays, decay_constants, time_zero, irf_fwhm))
+
     exp_sum = np.zeros(len(time_delays))
     for amp, decay_constant in zip(amplitudes, decay_constants):
         exp_sum += amp*np.exp(-(time_delays/decay_constant))
@@ -93,15 +146,61 @@ def model_func_dataset(time_delays, idx_of_vector, fit_params, retained_componen
     else:
         return model_func(time_delays, amplitudes, decay_constants, index_of_first_increased_time_interval=index_of_first_increased_time_interval, gaussian_for_convolution=gaussian_for_convolution)
 
-def objective(fit_params, time_delays, vectors_to_fit, retained_components, index_of_first_increased_time_interval, gaussian_for_convolution, parsed_user_defined_summands, asteval_interpreter):
+def get_amplitudes_matrix(fit_params, retained_components):
+    """ the amplitudes as matrix, element [i, k] = amp_rSV{i}_component{retained_components[k]}, so that the model of all vectors is amplitudes @ model basis. """
+    return np.array([[fit_params[f'amp_rSV{idx_of_vector}_component{component}'].value for component in retained_components] for idx_of_vector in range(len(retained_components))])
+
+def set_amplitudes(fit_params, amplitudes, retained_components):
+    """ inverse of get_amplitudes_matrix. """
+    for idx_of_vector in range(len(retained_components)):
+        for k, component in enumerate(retained_components):
+            fit_params[f'amp_rSV{idx_of_vector}_component{component}'].value = float(amplitudes[idx_of_vector, k])
+
+    return fit_params
+
+def get_model_basis(time_delays, fit_params, retained_components, parsed_user_defined_summands=None, asteval_interpreter=None):
+    """ the summands of the fit function with unit amplitudes, shape (nr of components, nr of time delays).
+    The fit function is linear in the amplitudes: the model of all vectors is get_amplitudes_matrix(fit_params) @ model basis. """
+    decay_constants = [fit_params[f'tau_component{component}'].value for component in retained_components]
+
+    if parsed_user_defined_summands:
+        asteval_interpreter = asteval_interpreter or asteval.Interpreter(use_numpy=True)
+        return np.array([model_func_user_defined(time_delays, unit_amplitudes, decay_constants, retained_components, parsed_user_defined_summands, asteval_interpreter)
+                            for unit_amplitudes in np.eye(len(retained_components))])
+
+    irf_parameters = get_irf_parameters(fit_params)
+    if irf_parameters:
+        return irf_convoluted_exp_decays(time_delays, decay_constants, irf_parameters["time_zero"], irf_parameters["irf_fwhm"])
+
+    return np.exp(-(time_delays[np.newaxis, :]/np.array(decay_constants)[:, np.newaxis]))
+
+def objective_irf(fit_params, time_delays, vectors_to_fit, retained_components, time_weights=None):
+    """ objective for the fit function with IRF: the convoluted decays are computed once for all vectors, the model of all vectors is one matrix product. """
+    decay_constants = [fit_params[f'tau_component{component}'].value for component in retained_components]
+    amplitudes = get_amplitudes_matrix(fit_params, retained_components)
+    decays = irf_convoluted_exp_decays(time_delays, decay_constants, fit_params["time_zero"].value, fit_params["irf_fwhm"].value)
+    if time_weights is not None:
+        decays = decays*time_weights
+
+    return (vectors_to_fit - np.matmul(amplitudes, decays)).flatten()
+
+def objective(fit_params, time_delays, vectors_to_fit, retained_components, index_of_first_increased_time_interval, gaussian_for_convolution, parsed_user_defined_summands, asteval_interpreter,
+                time_weights=None):
     """ calculate total residual for fits to several \"vectors\" held
-    in a 2-D array, and modeled by model function """
+    in a 2-D array, and modeled by model function.
+    With time_weights the vectors_to_fit have already been multiplied by them (see start_the_fit), only the model is weighted here. """
+    if "irf_fwhm" in fit_params:
+        return objective_irf(fit_params, time_delays, vectors_to_fit, retained_components, time_weights)
+
     nr_of_vectors = len(retained_components)
     resid = np.zeros(shape=vectors_to_fit.shape)
 
     # make residuals for vectors in vectors_to_fit
     for i in range(0, nr_of_vectors):
-        resid[i, :] = vectors_to_fit[i, :] - model_func_dataset(time_delays, i, fit_params, retained_components, index_of_first_increased_time_interval, gaussian_for_convolution, parsed_user_defined_summands, asteval_interpreter)
+        resid[i, :] = model_func_dataset(time_delays, i, fit_params, retained_components, index_of_first_increased_time_interval, gaussian_for_convolution, parsed_user_defined_summands, asteval_interpreter)
+    if time_weights is not None:
+        resid *= time_weights
+    resid = vectors_to_fit - resid
 
     # now flatten this to a 1D array, as minimize() needs
     return resid.flatten()
@@ -152,7 +251,9 @@ def get_gaussian_for_convolution(time_delays, time_zero, temp_resolution, index_
 
     return gaussian_for_convolution
 
-def initialize_fit_parameters(retained_components, initial_fit_parameter_values):
+def initialize_fit_parameters(retained_components, initial_fit_parameter_values, fit_warnings=None):
+    """ lmfit Parameters with the initial values of the retained components, default values if initial_fit_parameter_values does not cover all of them.
+    Then an InsufficientInitialValuesWarning is issued, or, if fit_warnings (a list) is given, its message is appended to it. """
     minimumNrOfValues = 100
     user_file_has_too_few_values = False
     for key in initial_fit_parameter_values.keys():
@@ -162,11 +263,16 @@ def initialize_fit_parameters(retained_components, initial_fit_parameter_values)
     # minimumNrOfValues-1 corresponds to the index of the highest component for which initial values have been defined
     if (minimumNrOfValues-1 < retained_components[-1]):
         user_file_has_too_few_values = True
-        tk.messagebox.showerror("Warning,", "There are insufficient parameter values in your initial fit parameter values file.\n"+
-                                            "One common mistake is defining initial values for the components e.g. [0,1,2] but trying to conduct a fit for components e.g. [0,1,3]\n\n"
-                                            "For more info see the help button in the set initial fit parameter values window.\n\n"+
-                                            "Meanwhile, the program will use default initial values for the fit parameters:\n"+
-                                            "all decay constants = 50.0, all amplitudes = 0.7")
+        # no messagebox here: this module has to work without a gui. the GUI shows the warnings of the fit result.
+        message = ("There are insufficient parameter values in your initial fit parameter values file.\n"+
+                    "One common mistake is defining initial values for the components e.g. [0,1,2] but trying to conduct a fit for components e.g. [0,1,3]\n\n"
+                    "For more info see the help button in the set initial fit parameter values window.\n\n"+
+                    "Meanwhile, the program will use default initial values for the fit parameters:\n"+
+                    "all decay constants = 50.0, all amplitudes = 0.7")
+        if fit_warnings is None:
+            warnings.warn(message, InsufficientInitialValuesWarning)
+        else:
+            fit_warnings.append(message)
 
     fit_params = lmfit.Parameters()
     if user_file_has_too_few_values:
@@ -189,36 +295,69 @@ def initialize_fit_parameters(retained_components, initial_fit_parameter_values)
     return fit_params
 
 
-def start_the_fit(retained_components, time_delays, retained_rSVs, retained_singular_values, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands, fit_method_name):
+def start_the_fit(retained_components, time_delays, retained_rSVs, retained_singular_values, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands, fit_method_name,
+                    fit_time_zero=False, fit_temp_resolution=False, time_weights=None, initialize_amplitudes_linearly=False, fit_warnings=None):
     """ initialize vectors to fit and fit parameters, then calls lmfit function """
     # multiplication of each retained right SV with its respective singular value:
     vectors_to_fit = np.zeros((len(retained_components), len(time_delays)))
     for component in range(len(retained_components)):
         sing_value = retained_singular_values[component]
         vectors_to_fit[component, :] = sing_value*retained_rSVs[component, :]
+    # weighted once here, not in every evaluation of the objective
+    if time_weights is not None:
+        vectors_to_fit *= time_weights
 
     # initialize fit parameters
-    fit_params = initialize_fit_parameters(retained_components, initial_fit_parameter_values)
-
+    fit_params = initialize_fit_parameters(retained_components, initial_fit_parameter_values, fit_warnings)
+    # the IRF only applies to the sum of exponentials, not to a user defined fit function
+    if temp_resolution > 0 and not parsed_user_defined_summands:
+        add_irf_parameters(fit_params, time_delays, time_zero, temp_resolution, fit_time_zero, fit_temp_resolution)
+    if initialize_amplitudes_linearly:
+        set_linear_amplitudes(fit_params, vectors_to_fit, time_delays, retained_components, parsed_user_defined_summands, time_weights)
+
+    return fit_vectors(vectors_to_fit, time_delays, retained_components, fit_params, parsed_user_defined_summands, fit_method_name, time_weights=time_weights)
+
+def set_linear_amplitudes(fit_params, vectors_to_fit, time_delays, retained_components, parsed_user_defined_summands, time_weights=None):
+    """ the amplitudes that fit the vectors best for the initial decay times (linear least squares), e.g. for weighted vectors,
+    to which the initial amplitudes of the initial fit parameter values do not apply. """
+    model_basis = get_model_basis(time_delays, fit_params, retained_components, parsed_user_defined_summands)
+    if time_weights is not None:
+        model_basis = model_basis*time_weights
+    amplitudes = np.linalg.lstsq(model_basis.T, vectors_to_fit.T, rcond=None)[0].T
+
+    return set_amplitudes(fit_params, amplitudes, retained_components)
+
+def fit_vectors(vectors_to_fit, time_delays, retained_components, fit_params, parsed_user_defined_summands, fit_method_name, index_of_first_increased_time_interval=None, asteval_interpreter=None,
+                time_weights=None):
+    """ the lmfit minimization of the vectors (singular values * right SVs), starting at fit_params. Also used to refit resampled vectors, see get_SVDGFit_uncertainties.
+    With time_weights, vectors_to_fit have to be multiplied by them already. """
     # need this index for the convolution in fit procedure:
-    index_of_first_increased_time_interval = get_index_at_which_time_intervals_increase_the_first_time(time_delays)
+    if index_of_first_increased_time_interval is None:
+        index_of_first_increased_time_interval = get_index_at_which_time_intervals_increase_the_first_time(time_delays)
 
     # this is the gaussian (array length = index_of_first_increased_time_interval )
     # with which the first part of the fit function is convoluted in fit function
     # gaussian_for_convolution = get_gaussian_for_convolution(time_delays, time_zero, temp_resolution, index_of_first_increased_time_interval)
+    # replaced by the closed form of the convolution, see irf_convoluted_exp_decays
     gaussian_for_convolution = None
 
     # instantiate the asteval Interpreter, is however only used when user defined fit function is used.
-    asteval_interpreter = asteval.Interpreter(use_numpy=True)
+    if asteval_interpreter is None:
+        asteval_interpreter = asteval.Interpreter(use_numpy=True)
 
     # run the global fit over all the data sets, i.e. all VT_i
     # per default uses method='levenberg-marquardt-leastsq' = 'leastsq'
     # could change the fit method via "method" argument. see web for possible fit methods
-    result = lmfit.minimize(objective, fit_params, method=fit_method_name, args=(time_delays, vectors_to_fit, retained_components, index_of_first_increased_time_interval, gaussian_for_convolution, parsed_user_defined_summands, asteval_interpreter))
+    result = lmfit.minimize(objective, fit_params, method=fit_method_name, args=(time_delays, vectors_to_fit, retained_components, index_of_first_increased_time_interval, gaussian_for_convolution, parsed_user_defined_summands, asteval_interpreter, time_weights))
 
     return result
 
-def run(retained_rSVs, retained_singular_values, retained_components, time_delays, start_time, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands=False, fit_method_name='leastsq'):
+def run(retained_rSVs, retained_singular_values, retained_components, time_delays, start_time, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands=False, fit_method_name='leastsq',
+        fit_time_zero=False, fit_temp_resolution=False, time_weights=None, initialize_amplitudes_linearly=False, fit_warnings=None):
+    """ the global fit. With temp_resolution > 0 the exponentials are convoluted with the IRF, fit_time_zero and fit_temp_resolution make its time_zero and FWHM fit parameters.
+    time_weights (one per time delay, e.g. NoiseWeights.time_weights) weight the residuals, None for an unweighted fit.
+    initialize_amplitudes_linearly: the initial amplitudes are fitted linearly to the vectors for the initial decay times instead of taken from initial_fit_parameter_values.
+    fit_warnings: list to which warnings about the fit are appended instead of being issued, see initialize_fit_parameters. """
 
     # for the fit function we need the time_delays reduced to the ones after start_time
     start_time_index = time_delays.index(str(start_time))
@@ -226,8 +365,15 @@ def run(retained_rSVs, retained_singular_values, retained_components, time_delay
     time_delays = [float(time_delay) for time_delay in time_delays]
     time_delays = np.array(time_delays)
 
+    # the nonlinear fit is always computed in float64, also if the data matrix and its SVD are float32
+    retained_rSVs = np.asarray(retained_rSVs, dtype=np.float64)
+    retained_singular_values = np.asarray(retained_singular_values, dtype=np.float64)
+    if time_weights is not None:
+        time_weights = np.asarray(time_weights, dtype=np.float64)[start_time_index:]
+
     try:
-        result = start_the_fit(retained_components, time_delays, retained_rSVs, retained_singular_values, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands, fit_method_name)
+        result = start_the_fit(retained_components, time_delays, retained_rSVs, retained_singular_values, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands, fit_method_name,
+                                fit_time_zero, fit_temp_resolution, time_weights, initialize_amplitudes_linearly, fit_warnings)
         resulting_fit_params = result.params
 
     except (ValueError,TypeError) as error:
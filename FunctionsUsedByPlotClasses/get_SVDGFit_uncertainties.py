@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Confidence intervals of the SVD_GlobalFit by resampling, also where lmfit can not estimate a covariance (stderr = None).\n
+Every replicate is a resampled version of the fitted vectors (singular values * right SVs), which is refitted starting at the best fit:\n
+* "residuals": bootstrap of the residuals of the best fit, whole time delays (all vectors at once) are drawn with replacement.\n
+* "monte carlo": gaussian noise with the standard deviation of the residuals of each vector is added to the best fit model.\n
+* "wavelengths": the rows (wavelengths) of the data matrix are drawn with replacement and the SVD is recomputed,
+this includes the uncertainty of the singular vectors themselves.\n
+A weighted fit (noise_weights) is resampled as it was fitted: the vectors, the model and the residuals are weighted by the time weights,
+the replicates are refitted with them and the "wavelengths" replicates are SVDs of the whitened data matrix.\n
+The replicates are fitted in chunks on a process pool. After every check_every replicates the percentile intervals of the fitted decay times
+(and of the IRF parameters, if they are fitted) and the bands of the DAS are compared with the previous check, the resampling stops once they
+change by less than rtol, relative to the width of the interval resp. to the largest amplitude of the DAS.\n
+Replicate i is always drawn with a random generator seeded with (seed, i), so the result does not depend on the nr of workers.\n
+Returns: \n
+* FitUncertainties: the intervals, the DAS bands and the fitted values of all replicates.
+"""
+
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent import futures
+from dataclasses import dataclass
+
+import asteval
+import lmfit
+import numpy as np
+import scipy.linalg
+
+from FunctionsUsedByPlotClasses import get_SVDGFit_parameters
+
+METHODS = ("residuals", "monte carlo", "wavelengths")
+
+# the replicates of the chunks that are submitted ahead, per worker
+CHUNKS_AHEAD_PER_WORKER = 2
+
+@dataclass
+class FitUncertainties:
+    """ percentile confidence intervals of the fitted parameters and of the DAS. """
+    method: str
+    confidence_level: float
+    parameter_names: list
+    best_values: np.ndarray
+    intervals: np.ndarray       # shape (nr of parameters, 2): lower and upper bound
+    stds: np.ndarray
+    DAS_bands: np.ndarray       # shape (2, nr of wavelengths, nr of components): lower and upper bound
+    replicate_values: np.ndarray        # shape (nr of successful replicates, nr of parameters)
+    nr_of_replicates: int
+    nr_of_failed_fits: int
+    converged: bool
+    seconds: float
+
+    def get_intervals_as_dict(self):
+        return {name: tuple(interval) for name, interval in zip(self.parameter_names, self.intervals.tolist())}
+
+    def get_report(self):
+        """ e.g. "tau_component0 = 1.5 (95% interval 1.46 .. 1.55, std 0.023)", one line per parameter. """
+        lines = [f"{self.method} resampling: {self.nr_of_replicates} replicates, {self.nr_of_failed_fits} failed fits, "
+                    + ("converged" if self.converged else "not converged") + f", {self.seconds:.1f} s"]
+        for name, best_value, (lower, upper), std in zip(self.parameter_names, self.best_values, self.intervals, self.stds):
+            lines.append(f"{name} = {best_value:.6g} ({self.confidence_level:.0%} interval {lower:.6g} .. {upper:.6g}, std {std:.2g})")
+
+        return "\n".join(lines)
+
+def get_varied_nonlinear_parameter_names(fit_params, retained_components):
+    """ the decay times and the IRF parameters that have been fitted, these get confidence intervals. """
+    names = [f"tau_component{component}" for component in retained_components]
+
+    return names + [name for name in ("time_zero", "irf_fwhm") if name in fit_params and fit_params[name].vary]
+
+def make_problem(method, retained_rSVs, retained_singular_values, retained_lSVs, retained_components, time_delays, fit_params, fit_method_name, parsed_user_defined_summands, data_matrix, seed,
+                    noise_weights=None):
+    """ everything a worker needs to fit replicates, picklable. Sent once to every worker.
+    With noise_weights the vectors, the model basis and the residuals are weighted by its time weights, as in the fit. """
+    time_delays = np.array([float(time_delay) for time_delay in time_delays])
+    vectors = np.asarray(retained_singular_values, dtype=np.float64)[:, np.newaxis]*np.asarray(retained_rSVs, dtype=np.float64)
+    if vectors.shape[1] != len(time_delays):
+        raise ValueError(f"the right singular vectors have {vectors.shape[1]} entries, but there are {len(time_delays)} time delays.")
+
+    model_basis = get_SVDGFit_parameters.get_model_basis(time_delays, fit_params, retained_components, parsed_user_defined_summands)
+    time_weights = None if noise_weights is None else noise_weights.time_weights
+    if time_weights is not None:
+        time_weights = np.asarray(time_weights, dtype=np.float64)
+        vectors, model_basis = vectors*time_weights, model_basis*time_weights
+    model = np.matmul(get_SVDGFit_parameters.get_amplitudes_matrix(fit_params, retained_components), model_basis)
+    # the singular vectors of the fit are those of the whitened data matrix
+    if method == "wavelengths" and noise_weights is not None:
+        data_matrix = noise_weights.whiten(np.asarray(data_matrix, dtype=np.float64))
+
+    return {"method": method, "seed": seed, "time_delays": time_delays, "retained_components": list(retained_components),
+            "fit_params_json": fit_params.dumps(), "fit_method_name": fit_method_name, "parsed_user_defined_summands": parsed_user_defined_summands or [],
+            "parameter_names": get_varied_nonlinear_parameter_names(fit_params, retained_components),
+            "vectors": vectors, "model_basis": model_basis, "model": model, "residuals": vectors - model, "time_weights": time_weights,
+            "retained_lSVs": np.asarray(retained_lSVs, dtype=np.float64), "data_matrix": data_matrix if method == "wavelengths" else None,
+            "index_of_first_increased_time_interval": get_SVDGFit_parameters.get_index_at_which_time_intervals_increase_the_first_time(time_delays)}
+
+def prepare_problem(problem):
+    """ the lmfit Parameters are sent as json and only loaded once per worker, the asteval interpreter is reused for all replicates. """
+    return dict(problem, fit_params=lmfit.Parameters().loads(problem["fit_params_json"]), asteval_interpreter=asteval.Interpreter(use_numpy=True))
+
+def get_replicate_vectors(problem, rng):
+    """ the (weighted) vectors of a replicate. The singular values * right SVs of the whitened data matrix are the weighted vectors of a weighted fit. """
+    nr_of_time_delays = len(problem["time_delays"])
+
+    if problem["method"] == "residuals":
+        return problem["model"] + problem["residuals"][:, rng.integers(0, nr_of_time_delays, nr_of_time_delays)]
+
+    if problem["method"] == "monte carlo":
+        noise_stds = np.std(problem["residuals"], axis=1)
+        return problem["model"] + rng.standard_normal(problem["model"].shape)*noise_stds[:, np.newaxis]
+
+    nr_of_wavelengths = problem["data_matrix"].shape[0]
+    _, singular_values, VT = scipy.linalg.svd(problem["data_matrix"][rng.integers(0, nr_of_wavelengths, nr_of_wavelengths)], full_matrices=False)
+    components = problem["retained_components"]
+
+    return singular_values[components, np.newaxis].astype(np.float64)*VT[components].astype(np.float64)
+
+def get_linear_amplitudes(model_basis, vectors):
+    """ the amplitudes that fit the vectors best for a given model basis (linear least squares). """
+    return np.linalg.lstsq(model_basis.T, vectors.T, rcond=None)[0].T
+
+def fit_replicate(problem, replicate_index):
+    """ the fitted nonlinear parameters and the amplitudes of one replicate (the DAS are retained_lSVs @ amplitudes, computed by the caller). """
+    rng = np.random.default_rng([problem["seed"], replicate_index])
+    vectors = get_replicate_vectors(problem, rng)
+    retained_components = problem["retained_components"]
+
+    # start at the best fit, the amplitudes are fitted linearly to the replicate first (the SVD of a "wavelengths" replicate can be rotated)
+    fit_params = problem["fit_params"]
+    for name in problem["parameter_names"]:
+        fit_params[name].value = problem["best_values"][name]
+    get_SVDGFit_parameters.set_amplitudes(fit_params, get_linear_amplitudes(problem["model_basis"], vectors), retained_components)
+
+    result = get_SVDGFit_parameters.fit_vectors(vectors, problem["time_delays"], retained_components, fit_params, problem["parsed_user_defined_summands"], problem["fit_method_name"],
+                                                problem["index_of_first_increased_time_interval"], problem["asteval_interpreter"], time_weights=problem["time_weights"])
+    values = np.array([result.params[name].value for name in problem["parameter_names"]])
+
+    if problem["method"] == "wavelengths":
+        # the DAS on the original wavelengths: amplitudes of the original vectors for the decay times of the replicate
+        model_basis = get_SVDGFit_parameters.get_model_basis(problem["time_delays"], result.params, retained_components, problem["parsed_user_defined_summands"], problem["asteval_interpreter"])
+        if problem["time_weights"] is not None:
+            model_basis = model_basis*problem["time_weights"]
+        amplitudes = get_linear_amplitudes(model_basis, problem["vectors"])
+    else:
+        amplitudes = get_SVDGFit_parameters.get_amplitudes_matrix(result.params, retained_components)
+
+    return values, amplitudes
+
+def fit_chunk(problem, replicate_indices):
+    """ fits the replicates, a failed fit is returned as None. """
+    results = []
+    for replicate_index in replicate_indices:
+        try:
+            values, amplitudes = fit_replicate(problem, replicate_index)
+        except (ValueError, TypeError, ArithmeticError, np.linalg.LinAlgError):
+            results.append(None)
+            continue
+        results.append((values, amplitudes) if np.all(np.isfinite(values)) and np.all(np.isfinite(amplitudes)) else None)
+
+    return results
+
+def get_mp_context():
+    """ the workers are not forked from the calling process: in the gui it runs threads (tk, job scheduler), and forking a process with threads is unsafe.
+    The forkserver starts them from a clean process with this module preloaded, which is much faster than spawning every worker. """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+
+    return context
+
+# the problem of the worker process, set by initialize_worker
+_worker_problem = None
+
+def initialize_worker(problem):
+    global _worker_problem
+    _worker_problem = prepare_problem(problem)
+
+    return None
+
+def fit_chunk_in_worker(replicate_indices):
+    return fit_chunk(_worker_problem, replicate_indices)
+
+def get_chunk_results(problem, chunks, max_workers, should_stop=None):
+    """ yields the results of the chunks in order, until should_stop() returns True. With a pool, CHUNKS_AHEAD_PER_WORKER chunks per worker
+    are submitted ahead, the pending ones are cancelled once the caller stops iterating. """
+    chunks = itertools.takewhile(lambda _: should_stop is None or not should_stop(), chunks)
+    if max_workers <= 1:
+        prepared_problem = prepare_problem(problem)
+        for chunk in chunks:
+            yield fit_chunk(prepared_problem, chunk)
+        return None
+
+    executor = futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=get_mp_context(), initializer=initialize_worker, initargs=(problem,))
+    pending = []
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(fit_chunk_in_worker, chunk))
+            if len(pending) >= CHUNKS_AHEAD_PER_WORKER*max_workers:
+                break
+        while pending:
+            results = pending.pop(0).result()
+            next_chunk = next(chunks, None)
+            if next_chunk is not None:
+                pending.append(executor.submit(fit_chunk_in_worker, next_chunk))
+            yield results
+    finally:
+        # waits for the chunks that are already running: a worker that is still sending its result would block the pool from shutting down
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return None
+
+def get_intervals(replicate_values, replicate_DAS, confidence_level):
+    percentiles = [50*(1 - confidence_level), 50*(1 + confidence_level)]
+
+    return np.percentile(replicate_values, percentiles, axis=0).T, np.percentile(replicate_DAS, percentiles, axis=0)
+
+def get_change_of_intervals(previous, current, best_values, DAS_scale):
+    """ the largest change of an interval bound relative to the width of the interval, or of a DAS band relative to the largest amplitude of its DAS. """
+    (previous_intervals, previous_bands), (intervals, bands) = previous, current
+    widths = np.maximum(intervals[:, 1] - intervals[:, 0], 1e-12*np.maximum(np.abs(best_values), 1))
+    interval_change = np.max(np.abs(intervals - previous_intervals)/widths[:, np.newaxis])
+    band_change = np.max(np.abs(bands - previous_bands)/DAS_scale)
+
+    return max(interval_change, band_change)
+
+def run(retained_rSVs, retained_singular_values, retained_lSVs, retained_components, time_delays, fit_params, method="residuals", data_matrix=None, parsed_user_defined_summands=None,
+        fit_method_name="leastsq", confidence_level=0.95, min_replicates=100, max_replicates=1000, check_every=50, rtol=0.05, max_workers=None, seed=0, should_stop=None, noise_weights=None):
+    """confidence intervals of the decay times (and fitted IRF parameters) and bands of the DAS by resampling and refitting.
+
+    Args:
+        retained_rSVs, retained_singular_values, retained_lSVs (np.ndarray): the retained SVD components the fit has been done with.
+        retained_components (list of ints): the retained components.
+        time_delays (list): the time delays of the fitted right SVs.
+        fit_params (lmfit.Parameters): the best fit, the replicates are started there.
+        method (str, optional): one of METHODS. Defaults to "residuals".
+        data_matrix (np.ndarray, optional): the (cropped) data matrix the SVD has been computed of, needed for method "wavelengths".
+        parsed_user_defined_summands (list, optional): the target model, if the fit used one.
+        fit_method_name (str, optional): lmfit method. Defaults to "leastsq".
+        confidence_level (float, optional): of the percentile intervals. Defaults to 0.95.
+        min_replicates, max_replicates (int, optional): the resampling stops early (converged) after at least min_replicates, at the latest after max_replicates.
+        check_every (int, optional): the intervals are compared after every check_every replicates. Defaults to 50.
+        rtol (float, optional): the intervals have converged once they change by less than rtol between two checks. Defaults to 0.05.
+        max_workers (int, optional): size of the process pool. Defaults to (nr of cpus - 1), 1 fits the replicates in this process.
+        seed (int, optional): seed of the resampling. Defaults to 0.
+        should_stop (callable, optional): polled before every chunk is started, e.g. to cancel from the gui. The replicates fitted so far are used.
+        noise_weights (NoiseWeights, optional): the weights of a weighted fit (GlobalFitResult.noise_weights), the replicates are weighted the same way. Defaults to None.
+
+    Returns:
+        FitUncertainties
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown resampling method {method!r}, use one of {list(METHODS)}.")
+    if method == "wavelengths" and data_matrix is None:
+        raise ValueError("resampling the wavelengths needs the data matrix.")
+    if not 0 < confidence_level < 1:
+        raise ValueError(f"the confidence level has to be between 0 and 1, not {confidence_level}.")
+
+    start = time.perf_counter()
+    problem = make_problem(method, retained_rSVs, retained_singular_values, retained_lSVs, retained_components, time_delays, fit_params, fit_method_name, parsed_user_defined_summands, data_matrix, seed,
+                            noise_weights)
+    best_values = np.array([fit_params[name].value for name in problem["parameter_names"]])
+    problem["best_values"] = dict(zip(problem["parameter_names"], best_values))
+    best_DAS = np.matmul(problem["retained_lSVs"], get_SVDGFit_parameters.get_amplitudes_matrix(fit_params, retained_components))
+    DAS_scale = np.maximum(np.max(np.abs(best_DAS), axis=0), np.finfo(float).tiny)
+
+    max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+    chunk_size = max(1, min(16, check_every // max_workers))
+    chunks = (range(first, min(first + chunk_size, max_replicates)) for first in range(0, max_replicates, chunk_size))
+
+    replicate_values, replicate_DAS = [], []
+    nr_of_failed_fits = 0
+    previous = None
+    converged = False
+    # the results are checked replicate by replicate in order, so the stop does not depend on the chunk size
+    for result in itertools.chain.from_iterable(get_chunk_results(problem, chunks, max_workers, should_stop)):
+        if result is None:
+            nr_of_failed_fits += 1
+        else:
+            replicate_values.append(result[0])
+            replicate_DAS.append(np.matmul(problem["retained_lSVs"], result[1]))
+
+        nr_of_replicates = len(replicate_values) + nr_of_failed_fits
+        if nr_of_replicates % check_every != 0 or len(replicate_values) < 2:
+            continue
+
+        current = get_intervals(replicate_values, replicate_DAS, confidence_level)
+        if previous is not None and nr_of_replicates >= min_replicates and get_change_of_intervals(previous, current, best_values, DAS_scale) < rtol:
+            converged = True
+            break
+        previous = current
+
+    if len(replicate_values) < 2:
+        raise ValueError(f"only {len(replicate_values)} of {len(replicate_values) + nr_of_failed_fits} replicate fits succeeded, no intervals can be computed."
+                            + "\nMaybe try it with another fit method or resampling method.")
+
+    replicate_values = np.array(replicate_values)
+    intervals, DAS_bands = get_intervals(replicate_values, np.array(replicate_DAS), confidence_level)
+
+    return FitUncertainties(method, confidence_level, problem["parameter_names"], best_values, intervals, np.std(replicate_values, axis=0, ddof=1), DAS_bands,
+                            replicate_values, len(replicate_values) + nr_of_failed_fits, nr_of_failed_fits, converged, time.perf_counter() - start)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Estimates how many SVD components of a TA data matrix (nr of wavelengths x nr of time delays) carry signal.\n
+Uses the singular values and vectors of the SVD that has already been computed, four independent estimates are made:\n
+* noise floor: the noise is estimated from the time delays before time zero. No singular value of a noise matrix of the same size
+  is expected above noise_std*(sqrt(m)+sqrt(n)), the edge of the Marchenko-Pastur distribution.\n
+* Marchenko-Pastur: the optimal hard threshold of Gavish and Donoho, the noise level is estimated from the median singular value.
+  Needs all singular values, but no time delays before time zero.\n
+* autocorrelation: singular vectors of signal are smooth, those of noise are not. The lag one autocorrelation of the
+  left and right singular vectors has to be above AUTOCORRELATION_THRESHOLD.\n
+* cross validation: bi-cross-validated (Owen and Perry) reconstruction error of blocks of the data matrix that were left out.\n
+Returns: a RankEstimate. The suggested components are 0 .. rank-1, rank is the smallest rank of the available estimates:
+noise in real TA data is not white (scattering, chirp, drifts of the probe), so the threshold based estimates tend to overestimate the rank.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+METHODS = ("noise floor", "Marchenko-Pastur", "autocorrelation", "cross validation")
+# at most as many components are suggested as there are component checkbuttons in the gui
+MAX_RANK = 10
+# Henry and Hofrichter use 0.8 for the right singular vectors
+AUTOCORRELATION_THRESHOLD = 0.8
+# least number of time delays before time zero for the noise floor estimate
+MIN_NR_OF_NOISE_TIME_DELAYS = 3
+
+@dataclass
+class RankEstimate:
+    """ ranks[method] is None if the method could not be used. scores[method] has one value per component 0 .. max_rank-1,
+    for "cross validation" it is the relative error of the reconstruction with rank 0 .. max_rank instead. """
+    rank: int
+    max_rank: int
+    ranks: dict
+    scores: dict
+    thresholds: dict = field(default_factory=dict)
+    noise_std: Optional[float] = None
+    seconds: float = 0.0
+
+    @property
+    def suggested_components(self):
+        return [i for i in range(self.rank)]
+
+    def get_summary(self):
+        ranks_str = ", ".join(f"{method}: {'n/a' if rank is None else rank}" for method, rank in self.ranks.items())
+        return f"suggested components: {self.suggested_components} ({ranks_str})"
+
+    def get_report(self):
+        lines = [self.get_summary(), ""]
+        if self.noise_std is not None:
+            lines.append(f"noise std (before time zero): {self.noise_std:.3g}")
+        lines.append(f"{'comp':>4} {'s/noise':>8} {'s/MP':>8} {'autocorr':>8} {'cv error':>8}")
+        for i in range(self.max_rank):
+            values = [self.scores[method][i] if self.scores.get(method) is not None else None for method in METHODS[:3]]
+            # the cross validation error of the reconstruction that includes component i
+            values.append(self.scores["cross validation"][i+1] if self.scores.get("cross validation") is not None else None)
+            values_str = " ".join(f"{'n/a':>8}" if value is None else f"{value:>8.3g}" for value in values)
+            lines.append(f"{i:>4} {values_str}")
+        lines.append(f"(s = singular value, a score > 1 or an autocorrelation > {AUTOCORRELATION_THRESHOLD} indicates signal, estimated in {self.seconds*1000:.0f} ms)")
+
+        return "\n".join(lines)
+
+def get_noise_std(data_matrix, time_delays, time_zero=0.0):
+    """ the standard deviation of the noise of the time delays before time_zero, None if there are too few of them. """
+    time_delays = np.asarray(time_delays, dtype=float)
+    noise = data_matrix[:, time_delays < time_zero]
+    if noise.shape[1] < MIN_NR_OF_NOISE_TIME_DELAYS:
+        return None
+
+    # an offset of the baseline is not noise
+    noise = noise - noise.mean(axis=1, keepdims=True)
+    noise_std = float(np.sqrt(np.sum(noise.astype(np.float64)**2)/(noise.shape[0]*(noise.shape[1]-1))))
+    # e.g. repeated rows in the data file
+    if not np.isfinite(noise_std) or noise_std == 0:
+        return None
+
+    return noise_std
+
+def get_noise_floor_threshold(noise_std, shape):
+    return noise_std*(np.sqrt(shape[0]) + np.sqrt(shape[1]))
+
+def get_marchenko_pastur_threshold(singular_values, shape):
+    """ optimal hard threshold for unknown noise (Gavish and Donoho 2014). singular_values must be all min(shape) of them. """
+    beta = min(shape)/max(shape)
+    omega = 0.56*beta**3 - 0.95*beta**2 + 1.82*beta + 1.43
+
+    return omega*np.median(singular_values)
+
+def get_autocorrelations(leftSVs, rightSVs):
+    """ lag one autocorrelation of the (normalized) singular vectors, the smaller one of left and right. """
+    left = np.sum(leftSVs[:-1, :]*leftSVs[1:, :], axis=0)
+    right = np.sum(rightSVs[:, :-1]*rightSVs[:, 1:], axis=1)
+
+    return np.minimum(left, right)
+
+def get_leading_rank(is_signal):
+    """ the number of leading components that are signal. """
+    is_signal = np.asarray(is_signal, dtype=bool)
+    if np.all(is_signal):
+        return len(is_signal)
+    return int(np.argmin(is_signal))
+
+def get_truncated_svd(matrix, rank, rng, nr_of_power_iterations=2, oversampling=10):
+    """ the leading rank singular triplets by a randomized SVD (Halko et al.), much faster than the full SVD for small ranks. """
+    sketch = matrix @ rng.standard_normal((matrix.shape[1], min(rank + oversampling, min(matrix.shape))))
+    for _ in range(nr_of_power_iterations):
+        Q, _ = np.linalg.qr(sketch)
+        sketch = matrix @ (matrix.T @ Q)
+    Q, _ = np.linalg.qr(sketch)
+    U_small, sigma, VT = np.linalg.svd(Q.T @ matrix, full_matrices=False)
+
+    return (Q @ U_small)[:, :rank], sigma[:rank], VT[:rank, :]
+
+def get_cross_validation_errors(data_matrix, max_rank, nr_of_folds=2, seed=0):
+    """ bi-cross-validation: the held out block A of [[A, B], [C, D]] is predicted as B D_k^+ C, D_k^+ being the pseudo inverse of the rank k approximation of D.
+    Returns the error for ranks 0 .. max_rank, relative to the error of rank 0. """
+    rng = np.random.default_rng(seed)
+    nr_of_rows, nr_of_cols = data_matrix.shape
+    row_folds = np.array_split(rng.permutation(nr_of_rows), nr_of_folds)
+    col_folds = np.array_split(rng.permutation(nr_of_cols), nr_of_folds)
+
+    errors = np.zeros(max_rank + 1)
+    for rows in row_folds:
+        other_rows = np.setdiff1d(np.arange(nr_of_rows), rows)
+        for cols in col_folds:
+            other_cols = np.setdiff1d(np.arange(nr_of_cols), cols)
+            A = data_matrix[np.ix_(rows, cols)]
+            B = data_matrix[np.ix_(rows, other_cols)]
+            C = data_matrix[np.ix_(other_rows, cols)]
+            D = data_matrix[np.ix_(other_rows, other_cols)]
+
+            U, sigma, VT = get_truncated_svd(D, max_rank, rng)
+            nonzero = sigma > np.finfo(np.float64).eps*max(sigma[0], np.finfo(np.float64).tiny)
+            U, sigma, VT = U[:, nonzero], sigma[nonzero], VT[nonzero, :]
+            B_V = (B @ VT.T)/sigma
+            UT_C = U.T @ C
+            prediction = np.zeros_like(A)
+            errors[0] += np.sum(A**2)
+            for k in range(len(sigma)):
+                prediction += np.outer(B_V[:, k], UT_C[k, :])
+                errors[k+1] += np.sum((A - prediction)**2)
+            # D has a lower rank than max_rank, the prediction does not change anymore
+            errors[len(sigma)+1:] += np.sum((A - prediction)**2)
+
+    return errors/errors[0]
+
+def run(singular_values, leftSVs, rightSVs, data_matrix, time_delays, time_zero=0.0, max_rank=MAX_RANK, seed=0):
+    """
+    Args:
+        singular_values (np.ndarray): all min(data_matrix.shape) singular values.
+        leftSVs (np.ndarray): at least max_rank left singular vectors as columns.
+        rightSVs (np.ndarray): at least max_rank right singular vectors as rows.
+        data_matrix (np.ndarray): the data matrix, shape (nr of wavelengths, nr of time delays).
+        time_delays (list): time delays of the columns of data_matrix, those before time_zero are used for the noise floor.
+        time_zero (float, optional): Defaults to 0.0.
+        max_rank (int, optional): the largest rank that is tested. Defaults to MAX_RANK.
+        seed (int, optional): seed of the random folds of the cross validation. Defaults to 0.
+
+    Returns:
+        RankEstimate
+    """
+    start = time.perf_counter()
+    data_matrix = np.asarray(data_matrix, dtype=np.float64)
+    singular_values = np.asarray(singular_values, dtype=np.float64)
+    if len(singular_values) != min(data_matrix.shape):
+        raise ValueError(f"all {min(data_matrix.shape)} singular values are needed for the rank estimation, got {len(singular_values)}.")
+
+    # a rank estimate needs some singular values that are noise
+    max_rank = max(1, min(max_rank, min(data_matrix.shape)//2, leftSVs.shape[1], rightSVs.shape[0]))
+    ranks, scores, thresholds = {}, {}, {}
+
+    noise_std = get_noise_std(data_matrix, time_delays, time_zero)
+    if noise_std is None:
+        ranks["noise floor"], scores["noise floor"] = None, None
+    else:
+        thresholds["noise floor"] = get_noise_floor_threshold(noise_std, data_matrix.shape)
+        scores["noise floor"] = singular_values[:max_rank]/thresholds["noise floor"]
+        ranks["noise floor"] = get_leading_rank(scores["noise floor"] > 1)
+
+    thresholds["Marchenko-Pastur"] = get_marchenko_pastur_threshold(singular_values, data_matrix.shape)
+    scores["Marchenko-Pastur"] = singular_values[:max_rank]/thresholds["Marchenko-Pastur"]
+    ranks["Marchenko-Pastur"] = get_leading_rank(scores["Marchenko-Pastur"] > 1)
+
+    scores["autocorrelation"] = get_autocorrelations(np.asarray(leftSVs[:, :max_rank], dtype=np.float64), np.asarray(rightSVs[:max_rank, :], dtype=np.float64))
+    ranks["autocorrelation"] = get_leading_rank(scores["autocorrelation"] > AUTOCORRELATION_THRESHOLD)
+
+    scores["cross validation"] = get_cross_validation_errors(data_matrix, max_rank, seed=seed)
+    ranks["cross validation"] = int(np.argmin(scores["cross validation"]))
+
+    available_ranks = [rank for rank in ranks.values() if rank is not None]
+    rank = min(max_rank, max(1, min(available_ranks)))
+
+    return RankEstimate(rank, max_rank, ranks, scores, thresholds, noise_std, time.perf_counter() - start)
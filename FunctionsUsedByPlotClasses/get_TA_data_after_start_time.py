@@ -4,7 +4,8 @@
 Helper module for TA data analysis GUI, used by its PlotClasses.\n\n
 The run(path_to_data, start_time) method returns the TA data matrix at input path_to_data\n
 stripped from the time_steps and wavelenghts and starting from the input start_time value.\n
-It also returns the complete time_steps and wavelengths.
+It also returns the complete time_steps and wavelengths.\n
+If a dtype is given, the data matrix is returned as float array of that dtype instead of as string array.
 """
 
 import numpy as np
@@ -33,6 +34,19 @@ def load_complete_data(data_file):
 
     return data
 
+def load_complete_data_as_floats(data_file):
+    """
+    opens the data file and returns it as float64 matrix, without going through a string array.
+    """
+    if data_file.endswith(".txt") or data_file.endswith(".dat"):
+        with open(data_file, 'r') as file:
+            data = [x.replace(',',' ').split() for x in file]
+    elif data_file.endswith(".csv"):
+        with open(data_file, 'r') as file:
+            data = [x.replace('\n', '').split(",") for x in file]
+
+    return np.array(data, dtype=np.float64)
+
 def load_complete_time_delays(data):
     """
     loads time delays from data file and puts them into array
@@ -51,30 +65,39 @@ def load_complete_wavelengths(data):
 
     return wavelengths
 
-def get_data_at_time(path_to_data, time):
+def get_data_at_time(path_to_data, time, dtype=None):
     """
     returns the data matrix corresponding to the input time, e.g. CPM time.
     also returns the complete time delay and wavelengths lists
     """
-    complete_data = load_complete_data(path_to_data)
-    time_delays = load_complete_time_delays(complete_data)
-    wavelengths = load_complete_wavelengths(complete_data)
+    if dtype is None:
+        complete_data = load_complete_data(path_to_data)
+        time_delays = load_complete_time_delays(complete_data)
+        wavelengths = load_complete_wavelengths(complete_data)
+    else:
+        complete_data = load_complete_data_as_floats(path_to_data)
+        # the same strings as in the string array of load_complete_data
+        time_delays = [str(time_delay) for time_delay in complete_data[1:, 0].tolist()]
+        wavelengths = [str(wavelength) for wavelength in complete_data[0, 1:].tolist()]
 
     time = str(get_closest_nr_from_array_like.run(time_delays, float(time)))
     time_index = time_delays.index(time)
 
     TA_data = complete_data[1:, 1:]
     TA_data_after_time = TA_data[time_index:, :]
+    if dtype is not None:
+        TA_data_after_time = TA_data_after_time.astype(dtype)
 
     return TA_data_after_time.T, time_delays, wavelengths
 
-def run(path_to_data, start_time):
+def run(path_to_data, start_time, dtype=None):
     """
     returns the TA data matrix at input path_to_data\n
     but stripped from the time_steps and wavelenghts and starting from the closest actual time delay to the input start_time value.\n
-    It also returns the complete time_steps and wavelengths.
+    It also returns the complete time_steps and wavelengths.\n
+    With dtype (e.g. np.float32) the data matrix is a float array of that dtype, otherwise a string array.
     """
     time=str(start_time)
-    TA_data_after_time, time_delays, wavelengths = get_data_at_time(path_to_data, time)
+    TA_data_after_time, time_delays, wavelengths = get_data_at_time(path_to_data, time, dtype)
 
     return TA_data_after_time, time_delays, wavelengths
\ No newline at end of file
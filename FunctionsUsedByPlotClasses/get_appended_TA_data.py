@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Reading data files while they are written, e.g. during a measurement (live mode of the original data tabs).\n
+* DataFileTail remembers up to which byte a data file has been read and parses only the complete rows (time delays) appended since.\n
+* DataDirectoryScans finds the data files that have newly appeared in a directory, e.g. one file per scan.\n
+* GrowingMatrix is a matrix that grows by appended columns (or rows) without copying everything on every append.
+"""
+
+import os
+
+import numpy as np
+
+class DataFileTail():
+    def __init__(self, filename):
+        """ the first call of read_new_rows reads the complete file (and its header with the wavelengths), every further call only what has been appended since.
+
+        Args:
+            filename (str): data file in the format of the gui, first row: 0 and the wavelengths, every further row: time delay and the data at that time delay.
+        """
+        self.filename = filename
+        self.offset = 0
+        self.wavelengths = None
+        self.separator = "," if filename.endswith(".csv") else None
+
+        return None
+
+    def read_new_rows(self):
+        """
+        Returns:
+            tuple: (time_delays, rows), the time delays as strings (the same strings as get_TA_data_after_start_time returns)
+            and the data of the complete new rows, shape (nr of new time delays, nr of wavelengths). A row that is still being written is read with the next call.
+        """
+        with open(self.filename, "rb") as file:
+            if os.fstat(file.fileno()).st_size < self.offset:
+                raise ValueError(f"{self.filename} is shorter than before, it has been rewritten instead of appended to.")
+            file.seek(self.offset)
+            chunk = file.read()
+
+        # only complete lines, the last one might still be written
+        end_of_last_line = chunk.rfind(b"\n") + 1
+        self.offset += end_of_last_line
+        lines = [line.replace(",", " ").split() if self.separator is None else line.split(self.separator) for line in chunk[:end_of_last_line].decode().splitlines() if line.strip()]
+
+        if self.wavelengths is None and lines:
+            self.wavelengths = [str(wavelength) for wavelength in np.array(lines.pop(0)[1:], dtype=np.float64).tolist()]
+        if not lines:
+            return [], np.empty((0, 0 if self.wavelengths is None else len(self.wavelengths)))
+
+        rows = np.array(lines, dtype=np.float64)
+        if rows.ndim != 2 or rows.shape[1] != len(self.wavelengths) + 1:
+            raise ValueError(f"the new rows of {self.filename} do not have a value for each of the {len(self.wavelengths)} wavelengths.")
+
+        return [str(time_delay) for time_delay in rows[:, 0].tolist()], rows[:, 1:]
+
+class DataDirectoryScans():
+    def __init__(self, directory, extension):
+        """ the data files with the given extension that appear in directory. A file counts as complete once its size has not changed between two calls.
+
+        Args:
+            directory (str): the directory that is watched.
+            extension (str): e.g. ".txt".
+        """
+        self.directory = directory
+        self.extension = extension
+        self.known_files = set()
+        self.sizes_of_pending_files = {}
+
+        return None
+
+    def get_new_files(self, wait_until_complete=True):
+        """ the complete files that have not been returned yet, sorted by name. With wait_until_complete=False all files are complete, e.g. those present at the start. """
+        new_files = []
+        for entry in sorted(os.scandir(self.directory), key=lambda entry: entry.name):
+            if not entry.is_file() or not entry.name.endswith(self.extension) or entry.path in self.known_files:
+                continue
+
+            size = entry.stat().st_size
+            if not wait_until_complete or (size > 0 and self.sizes_of_pending_files.get(entry.path) == size):
+                self.known_files.add(entry.path)
+                self.sizes_of_pending_files.pop(entry.path, None)
+                new_files.append(entry.path)
+            else:
+                self.sizes_of_pending_files[entry.path] = size
+
+        return new_files
+
+class GrowingMatrix():
+    def __init__(self, matrix, axis=1):
+        """ a copy of matrix that can grow along axis. The buffer doubles its capacity when it is full, so appending costs O(size of the appended part) on average.
+
+        Args:
+            matrix (np.ndarray): 2D initial matrix.
+            axis (int, optional): 1 to append columns, 0 to append rows. Defaults to 1.
+        """
+        self.axis = axis
+        self.size = matrix.shape[axis]
+        shape = list(matrix.shape)
+        shape[axis] = max(2*self.size, 16)
+        self.buffer = np.empty(shape, dtype=matrix.dtype)
+        self.get_slice(0, self.size)[...] = matrix
+
+        return None
+
+    def get_slice(self, start, stop):
+        return self.buffer[:, start:stop] if self.axis == 1 else self.buffer[start:stop, :]
+
+    @property
+    def view(self):
+        """ the current matrix, a view of the buffer. """
+        return self.get_slice(0, self.size)
+
+    def append(self, block):
+        """ appends block (columns or rows) and returns the new view. """
+        nr_of_new = block.shape[self.axis]
+        if self.size + nr_of_new > self.buffer.shape[self.axis]:
+            old_buffer_view = self.view
+            shape = list(self.buffer.shape)
+            shape[self.axis] = max(2*self.buffer.shape[self.axis], self.size + nr_of_new)
+            self.buffer = np.empty(shape, dtype=self.buffer.dtype)
+            self.get_slice(0, self.size)[...] = old_buffer_view
+
+        self.get_slice(self.size, self.size + nr_of_new)[...] = block
+        self.size += nr_of_new
+
+        return self.view
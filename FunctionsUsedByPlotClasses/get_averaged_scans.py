@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Averages repeated scans of the same sample, i.e. data matrices with the same time delays and wavelengths, in bounded memory:
+only the running mean and the running sum of squared deviations per pixel (Welford) and one scan at a time are kept.\n
+Scans that differ too much from the others (e.g. the pump laser dropped out, the sample moved) are rejected.
+The distance of a scan is the rms deviation from the mean of the other scans, a scan is an outlier if the modified z-score
+(median and median absolute deviation of the distances of all scans, Iglewicz and Hoaglin) of its distance is above OUTLIER_THRESHOLD.\n
+* merge_scans: all scans are known, the distances are computed in a second pass over them and the rejected scans are taken out of the statistics again.\n
+* ScanAverage.add_scan: scans that arrive one by one (live mode), each is compared with the distances of the scans accepted so far.\n
+The noise map is the standard error of the mean of each pixel, std/sqrt(nr of scans), e.g. to weight the residuals of a fit.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# modified z-score above which a scan is rejected, 3.5 as recommended by Iglewicz and Hoaglin
+OUTLIER_THRESHOLD = 3.5
+# a scan arriving later is only rejected once this many scans have been averaged
+MIN_NR_OF_SCANS_FOR_REJECTION = 5
+
+class RunningScanStatistics():
+    def __init__(self, shape):
+        """ mean and sum of squared deviations from the mean of each pixel, always float64. """
+        self.nr_of_scans = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.sum_of_squares = np.zeros(shape, dtype=np.float64)
+
+        return None
+
+    def add(self, scan):
+        scan = np.asarray(scan, dtype=np.float64)
+        self.nr_of_scans += 1
+        delta = scan - self.mean
+        self.mean += delta/self.nr_of_scans
+        self.sum_of_squares += delta*(scan - self.mean)
+
+        return None
+
+    def remove(self, scan):
+        """ the inverse of add, for a scan that has been added before. """
+        scan = np.asarray(scan, dtype=np.float64)
+        if self.nr_of_scans <= 1:
+            self.__init__(self.mean.shape)
+            return None
+
+        old_mean = self.mean.copy()
+        self.nr_of_scans -= 1
+        self.mean -= (scan - self.mean)/self.nr_of_scans
+        self.sum_of_squares -= (scan - old_mean)*(scan - self.mean)
+        # rounding errors
+        np.maximum(self.sum_of_squares, 0, out=self.sum_of_squares)
+
+        return None
+
+    def get_variance(self):
+        """ sample variance of each pixel (n-1), zero for a single scan. """
+        if self.nr_of_scans < 2:
+            return np.zeros_like(self.mean)
+        return self.sum_of_squares/(self.nr_of_scans - 1)
+
+    def get_noise_map(self):
+        """ standard error of the mean of each pixel. """
+        return np.sqrt(self.get_variance()/max(self.nr_of_scans, 1))
+
+    def get_distance(self, scan, leave_out=False):
+        """ rms deviation of scan from the mean of the other scans: for a scan that is not in the statistics (leave_out=False)
+        or one that is (leave_out=True). Scaled such that a scan of the same noise has the same expected distance, however many scans have been averaged. """
+        rms_deviation = np.sqrt(np.mean((np.asarray(scan, dtype=np.float64) - self.mean)**2))
+        if leave_out:
+            # scan - mean of the others = n/(n-1) (scan - mean), whose variance is n/(n-1) noise variance
+            return rms_deviation*np.sqrt(self.nr_of_scans/(self.nr_of_scans - 1)) if self.nr_of_scans > 1 else 0.0
+        # the variance of scan - mean is (n+1)/n noise variance
+        return rms_deviation*np.sqrt(self.nr_of_scans/(self.nr_of_scans + 1))
+
+def get_modified_z_scores(distances):
+    """ 0.6745 (distance - median)/MAD, only large distances are suspicious. All zeros if the distances do not scatter. """
+    distances = np.asarray(distances, dtype=np.float64)
+    median = np.median(distances)
+    median_absolute_deviation = np.median(np.abs(distances - median))
+    if median_absolute_deviation == 0:
+        # more than half of the distances are equal, the mean absolute deviation is the fallback
+        mean_absolute_deviation = np.mean(np.abs(distances - median))
+        if mean_absolute_deviation == 0:
+            return np.zeros_like(distances)
+        return (distances - median)/(1.253314*mean_absolute_deviation)
+
+    return 0.6745*(distances - median)/median_absolute_deviation
+
+@dataclass
+class ScanAverage:
+    """ the average of the accepted scans. distances and z_scores are those of the accepted and rejected scans (by name) when they were judged.
+    skipped_scans are the scans that could not be averaged at all (name: reason), e.g. unreadable files. """
+    outlier_threshold: float = OUTLIER_THRESHOLD
+    statistics: RunningScanStatistics = None
+    accepted_scans: list = field(default_factory=list)
+    rejected_scans: list = field(default_factory=list)
+    distances: dict = field(default_factory=dict)
+    z_scores: dict = field(default_factory=dict)
+    skipped_scans: dict = field(default_factory=dict)
+
+    @property
+    def nr_of_scans(self):
+        return 0 if self.statistics is None else self.statistics.nr_of_scans
+
+    @property
+    def mean(self):
+        return self.statistics.mean
+
+    def get_noise_map(self):
+        return self.statistics.get_noise_map()
+
+    def add_scan(self, scan, name):
+        """ adds a scan that arrived later, unless it is an outlier compared with the scans accepted so far. Returns whether it was accepted. """
+        if self.statistics is None:
+            self.statistics = RunningScanStatistics(np.shape(scan))
+        elif np.shape(scan) != self.statistics.mean.shape:
+            raise ValueError(f"scan {name} has shape {np.shape(scan)}, the averaged scans have shape {self.statistics.mean.shape}.")
+
+        if self.nr_of_scans > 0:
+            self.distances[name] = self.statistics.get_distance(scan)
+        if self.nr_of_scans >= MIN_NR_OF_SCANS_FOR_REJECTION:
+            accepted_distances = [self.distances[accepted_scan] for accepted_scan in self.accepted_scans if accepted_scan in self.distances]
+            self.z_scores[name] = float(get_modified_z_scores(accepted_distances + [self.distances[name]])[-1])
+            if self.z_scores[name] > self.outlier_threshold:
+                self.rejected_scans.append(name)
+                return False
+
+        self.statistics.add(scan)
+        self.accepted_scans.append(name)
+
+        return True
+
+    def get_summary(self):
+        summary = f"average of {self.nr_of_scans} scans"
+        if self.rejected_scans:
+            summary += f", rejected as outliers: {', '.join(str(name) for name in self.rejected_scans)}"
+        for name, reason in self.skipped_scans.items():
+            summary += f"\nskipped {name}: {' '.join(str(reason).split())}"
+
+        return summary
+
+def merge_scans(names, read_scan, outlier_threshold=OUTLIER_THRESHOLD):
+    """ averages the scans in two passes over them, only one scan is in memory at a time.
+
+    Args:
+        names (list): e.g. the filenames of the scans.
+        read_scan (callable): returns the data matrix of a name, or None if it should be skipped. Called twice for every scan, three times for outliers.
+        outlier_threshold (float, optional): modified z-score of the distance above which a scan is rejected. Defaults to OUTLIER_THRESHOLD.
+
+    Returns:
+        ScanAverage: further scans can be added with its add_scan.
+    """
+    scan_average = ScanAverage(outlier_threshold)
+    read_names = []
+    for name in names:
+        scan = read_scan(name)
+        if scan is None:
+            continue
+        if scan_average.statistics is None:
+            scan_average.statistics = RunningScanStatistics(np.shape(scan))
+        elif np.shape(scan) != scan_average.statistics.mean.shape:
+            raise ValueError(f"scan {name} has shape {np.shape(scan)}, the averaged scans have shape {scan_average.statistics.mean.shape}.")
+        scan_average.statistics.add(scan)
+        read_names.append(name)
+
+    if not read_names:
+        raise ValueError("none of the scans could be read.")
+
+    # second pass: the distance of every scan from the mean of all others
+    for name in read_names:
+        scan_average.distances[name] = scan_average.statistics.get_distance(read_scan(name), leave_out=True)
+
+    if len(read_names) >= 3:
+        z_scores = get_modified_z_scores([scan_average.distances[name] for name in read_names])
+        scan_average.z_scores = {name: float(z_score) for name, z_score in zip(read_names, z_scores)}
+
+    for name in read_names:
+        # at least one scan is kept
+        if scan_average.z_scores.get(name, 0) > outlier_threshold and scan_average.nr_of_scans > 1:
+            scan_average.statistics.remove(read_scan(name))
+            scan_average.rejected_scans.append(name)
+        else:
+            scan_average.accepted_scans.append(name)
+
+    return scan_average
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Small preview images of colormaps for the colormap selection window: a gradient thumbnail for the list of colormaps and a preview of the
+(downsampled) data of an original data tab with the colormap above its gradient.\n
+The images are rendered with numpy alone (colormap lookup table, no matplotlib figure), as binary PPM data that tk.PhotoImage reads directly.
+Rendering needs no tk, so all colormaps can be rendered in a background thread, only the PhotoImages have to be made in the tk thread.
+The gradient thumbnails do not depend on the data and are rendered once per session.
+"""
+
+import numpy as np
+import seaborn as sns
+
+# (width, height) in pixels
+THUMBNAIL_SIZE = (64, 14)
+PREVIEW_SIZE = (560, 140)
+PREVIEW_GRADIENT_HEIGHT = 20
+
+# gradient thumbnails of the colormaps rendered so far {colormap name: ppm data}
+thumbnail_cache = {}
+
+def get_colormap(colormap_name):
+    """ the colormap as used by the heatmaps, "default" is the default diverging palette. """
+    if colormap_name == "default":
+        return sns.diverging_palette(220, 20, s=300, as_cmap=True)
+
+    return sns.color_palette(colormap_name, as_cmap=True)
+
+def get_downsampled_data(data_matrix, size=PREVIEW_SIZE):
+    """ every n-th row and column of the data matrix (wavelengths x time delays), at most size[1] x size[0] of them. """
+    data_matrix = np.asarray(data_matrix)
+    row_indices = np.unique(np.linspace(0, data_matrix.shape[0] - 1, min(size[1], data_matrix.shape[0])).astype(int))
+    column_indices = np.unique(np.linspace(0, data_matrix.shape[1] - 1, min(size[0], data_matrix.shape[1])).astype(int))
+
+    return np.array(data_matrix[np.ix_(row_indices, column_indices)], dtype=np.float64)
+
+def get_rgb(colormap, values):
+    """ uint8 rgb image of values in [0, 1] (NaN as the bad color of the colormap). """
+    return colormap(values, bytes=True)[..., :3]
+
+def get_stretched(image, size):
+    """ nearest neighbour resize of an image (rows, columns, rgb) to size (width, height). """
+    row_indices = np.linspace(0, image.shape[0] - 1, size[1]).round().astype(int)
+    column_indices = np.linspace(0, image.shape[1] - 1, size[0]).round().astype(int)
+
+    return image[np.ix_(row_indices, column_indices)]
+
+def get_ppm(image):
+    """ binary PPM data of an uint8 rgb image, for tk.PhotoImage(data=..., format="PPM"). """
+    height, width = image.shape[:2]
+
+    return f"P6 {width} {height} 255\n".encode("ascii") + np.ascontiguousarray(image, dtype=np.uint8).tobytes()
+
+def get_gradient(colormap, size):
+    return get_stretched(get_rgb(colormap, np.linspace(0, 1, 256)[np.newaxis, :]), size)
+
+def get_thumbnail(colormap_name):
+    """ the gradient thumbnail of the colormap (cached). """
+    if colormap_name not in thumbnail_cache:
+        thumbnail_cache[colormap_name] = get_ppm(get_gradient(get_colormap(colormap_name), THUMBNAIL_SIZE))
+
+    return thumbnail_cache[colormap_name]
+
+def get_normalized(data):
+    """ data scaled to [0, 1] by its min and max, like the clim of the heatmaps. None for no data. """
+    if data is None or not np.isfinite(data).any():
+        return None
+    data_min, data_max = np.nanmin(data), np.nanmax(data)
+
+    return (data - data_min)/(data_max - data_min) if data_max > data_min else np.zeros_like(data)
+
+def get_preview(colormap_name, normalized_data=None):
+    """ the normalized data (see get_normalized) with the colormap, above its gradient. Only the gradient if normalized_data is None. """
+    colormap = get_colormap(colormap_name)
+    if normalized_data is None:
+        return get_ppm(get_gradient(colormap, PREVIEW_SIZE))
+
+    heatmap = get_stretched(get_rgb(colormap, normalized_data), (PREVIEW_SIZE[0], PREVIEW_SIZE[1] - PREVIEW_GRADIENT_HEIGHT))
+    gradient = get_gradient(colormap, (PREVIEW_SIZE[0], PREVIEW_GRADIENT_HEIGHT))
+
+    return get_ppm(np.concatenate([heatmap, gradient], axis=0))
+
+def render(colormap_names, normalized_data=None):
+    """ {colormap name: (thumbnail ppm, preview ppm)} of all colormaps, without tk (e.g. in a background thread).
+    A colormap that is not known to this matplotlib/seaborn version is left out. """
+    images = {}
+    for colormap_name in colormap_names:
+        try:
+            images[colormap_name] = (get_thumbnail(colormap_name), get_preview(colormap_name, normalized_data))
+        except ValueError:
+            continue
+
+    return images
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+A race of lmfit fit methods on the same SVD_GlobalFit problem, e.g. before fitting many data files of the same kind.\n
+Every method fits the retained right SVs (weighted by their singular values) from the same initial fit parameter values, in worker processes
+of their own and all within one time budget. Each method gets an equal share of it (the whole budget if there is a worker for every method),
+a method that is not done by then is stopped and its best evaluation so far counts.\n
+Each evaluation of the fit function records its chi-square, so the chi-square of every method is comparable, also for stopped methods
+and for the scalar minimizers (nelder, powell, ...), and the number of function evaluations is counted the same way.\n
+The best method (lowest chi-square, the faster one of methods within BEST_CHISQR_RTOL) can be remembered per kind of fit
+(see get_dataset_type) in a file and used again with the fit method "auto".\n
+Returns: \n
+* MethodRace: chi-square, wall time and function evaluations of every method.
+"""
+
+import ast
+import os
+import time
+import warnings
+from concurrent import futures
+from dataclasses import dataclass, field
+
+import asteval
+import lmfit
+import numpy as np
+
+from FunctionsUsedByPlotClasses import get_SVDGFit_parameters, get_SVDGFit_uncertainties
+
+# as in the fit method menu of the gui, without the "auto" entry
+METHODS = ("leastsq", "least_squares", "basinhopping", "ampgo", "nelder", "lbfgsb", "powell", "cg", "cobyla", "bfgs", "tnc")
+DEFAULT_TIME_BUDGET = 60.0
+# methods whose chi-square is within this relative tolerance of the lowest one are equally good, the fastest of them wins
+BEST_CHISQR_RTOL = 1e-4
+# the fit method that is used by "auto" for a kind of fit that has not been raced yet
+DEFAULT_METHOD = "leastsq"
+
+class TimeBudgetExceeded(Exception):
+    """ raised in the fit function once the time budget of the race is over, lmfit does not catch it. """
+
+@dataclass
+class MethodResult:
+    method: str
+    chisqr: float = np.inf
+    nfev: int = 0
+    seconds: float = 0.0
+    stopped: bool = False
+    error: str = ""
+    decay_times: dict = field(default_factory=dict)
+
+    @property
+    def failed(self):
+        return not np.isfinite(self.chisqr)
+
+@dataclass
+class MethodRace:
+    results: list
+    time_budget: float
+    seconds: float
+
+    @property
+    def best(self):
+        """ the MethodResult with the lowest chi-square, of those within BEST_CHISQR_RTOL of it the fastest. None if all failed. """
+        finished = [result for result in self.results if not result.failed]
+        if not finished:
+            return None
+        lowest_chisqr = min(result.chisqr for result in finished)
+
+        return min((result for result in finished if result.chisqr <= lowest_chisqr*(1 + BEST_CHISQR_RTOL)), key=lambda result: result.seconds)
+
+    def get_report(self):
+        """ one line per method, sorted by chi-square. """
+        best = self.best
+        lines = [f"fit method race: {len(self.results)} methods, time budget {self.time_budget:g} s, {self.seconds:.1f} s"
+                    + (f", best: {best.method}" if best is not None else ", all methods failed"),
+                    f"{'method':<15}{'chi-square':>15}{'seconds':>10}{'evaluations':>13}  decay times"]
+        for result in sorted(self.results, key=lambda result: result.chisqr):
+            if result.failed:
+                lines.append(f"{result.method:<15}{'failed':>15}{result.seconds:>10.2f}{result.nfev:>13}  {result.error}")
+                continue
+            decay_times = ", ".join(f"{value:.4g}" for value in result.decay_times.values())
+            lines.append(f"{result.method:<15}{result.chisqr:>15.6e}{result.seconds:>10.2f}{result.nfev:>13}  {decay_times}"
+                            + ("  (stopped at the time budget)" if result.stopped else ""))
+
+        return "\n".join(lines)
+
+class EvaluationTracker():
+    def __init__(self, deadline, parameter_names):
+        """ counts the evaluations of the fit function and keeps the parameters of the lowest chi-square. """
+        self.deadline = deadline
+        self.parameter_names = parameter_names
+        self.nfev = 0
+        self.best_chisqr = np.inf
+        self.best_values = {}
+
+        return None
+
+    def record(self, fit_params, residual):
+        self.nfev += 1
+        chisqr = float(np.sum(residual**2))
+        if chisqr < self.best_chisqr:
+            self.best_chisqr = chisqr
+            self.best_values = {name: fit_params[name].value for name in self.parameter_names}
+        if time.time() > self.deadline:
+            raise TimeBudgetExceeded()
+
+        return None
+
+def make_problem(retained_rSVs, retained_singular_values, retained_components, time_delays, start_params, parsed_user_defined_summands=None, time_weights=None):
+    """ everything a worker needs, picklable. time_delays as floats, the vectors are weighted with time_weights here. """
+    time_delays = np.asarray(time_delays, dtype=np.float64)
+    vectors = np.asarray(retained_singular_values, dtype=np.float64)[:, np.newaxis]*np.asarray(retained_rSVs, dtype=np.float64)
+    if time_weights is not None:
+        time_weights = np.asarray(time_weights, dtype=np.float64)
+        vectors = vectors*time_weights
+
+    return {"vectors": vectors, "time_delays": time_delays, "retained_components": list(retained_components), "start_params_json": start_params.dumps(),
+            "parsed_user_defined_summands": parsed_user_defined_summands or [], "time_weights": time_weights,
+            "index_of_first_increased_time_interval": get_SVDGFit_parameters.get_index_at_which_time_intervals_increase_the_first_time(time_delays)}
+
+def race_method(problem, method, seconds_per_method, deadline):
+    """ fits the problem with one method until it is done, seconds_per_method have passed or the deadline of the race (time.time()) has passed. Runs in a worker process. """
+    deadline = min(deadline, time.time() + seconds_per_method)
+    fit_params = lmfit.Parameters().loads(problem["start_params_json"])
+    retained_components = problem["retained_components"]
+    decay_time_names = [f"tau_component{component}" for component in retained_components]
+    tracker = EvaluationTracker(deadline, decay_time_names)
+    args = (problem["time_delays"], problem["vectors"], retained_components, problem["index_of_first_increased_time_interval"], None, problem["parsed_user_defined_summands"],
+            asteval.Interpreter(use_numpy=True), problem["time_weights"])
+
+    def objective(fit_params, *args):
+        residual = get_SVDGFit_parameters.objective(fit_params, *args)
+        tracker.record(fit_params, residual)
+        return residual
+
+    result = MethodResult(method)
+    start = time.perf_counter()
+    try:
+        # diverging methods overflow, they fail or are stopped, without warnings from every worker
+        with np.errstate(over="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            lmfit.minimize(objective, fit_params, method=method, args=args)
+    except TimeBudgetExceeded:
+        result.stopped = True
+    except (ValueError, TypeError, ArithmeticError, np.linalg.LinAlgError, lmfit.minimizer.AbortFitException) as error:
+        result.error = " ".join(f"{type(error).__name__}: {error}".split())[:80]
+    result.seconds = time.perf_counter() - start
+    result.nfev = tracker.nfev
+
+    # a method that raised an error (e.g. it ran into NaNs) failed, also if some of its evaluations were fine
+    if not result.error:
+        result.chisqr, result.decay_times = tracker.best_chisqr, tracker.best_values
+    if not result.error and result.failed:
+        result.error = "no finite evaluation of the fit function"
+
+    return result
+
+def run(problem, methods=METHODS, time_budget=DEFAULT_TIME_BUDGET, max_workers=None):
+    """ races the methods on the problem (see make_problem) on a process pool, all within time_budget seconds.
+
+    Args:
+        problem (dict): as made by make_problem.
+        methods (tuple of str, optional): lmfit methods. Defaults to METHODS.
+        time_budget (float, optional): seconds for all methods together. Defaults to DEFAULT_TIME_BUDGET.
+        max_workers (int, optional): size of the process pool. Defaults to one per method, at most the nr of cpus. 1 races them one after another in this process.
+
+    Returns:
+        MethodRace
+    """
+    if time_budget <= 0:
+        raise ValueError(f"the time budget has to be positive, not {time_budget}.")
+    unknown_methods = [method for method in methods if method not in METHODS]
+    if unknown_methods:
+        raise ValueError(f"unknown fit methods {unknown_methods}, use some of {list(METHODS)}.")
+
+    start = time.perf_counter()
+    deadline = time.time() + time_budget
+    max_workers = max_workers or min(len(methods), os.cpu_count() or 1)
+    seconds_per_method = time_budget*min(max_workers, len(methods))/len(methods)
+    if max_workers <= 1:
+        results = [race_method(problem, method, seconds_per_method, deadline) for method in methods]
+    else:
+        # the same forkserver context as the uncertainty estimation, the gui runs threads
+        with futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=get_SVDGFit_uncertainties.get_mp_context()) as executor:
+            results = list(executor.map(race_method, [problem]*len(methods), methods, [seconds_per_method]*len(methods), [deadline]*len(methods)))
+
+    return MethodRace(results, time_budget, time.perf_counter() - start)
+
+def get_dataset_type(nr_of_components, use_irf=False, use_target_model=False, weighting="none"):
+    """ the kind of fit a best method is remembered for, e.g. "3 components, IRF, sum of exponentials, weighting none". """
+    return (f"{nr_of_components} components, {'IRF' if use_irf else 'no IRF'}, {'target model' if use_target_model else 'sum of exponentials'}, "
+            + f"weighting {weighting}")
+
+def read_best_methods(best_methods_file):
+    """ {dataset type: fit method} of the file, {} if it does not exist yet. """
+    if not os.path.exists(best_methods_file):
+        return {}
+    with open(best_methods_file, mode='r') as dict_file:
+        best_methods = ast.literal_eval(dict_file.read().strip() or "{}")
+    if not isinstance(best_methods, dict):
+        raise ValueError(f"{best_methods_file} should contain one python dictionary {{dataset type: fit method}}.")
+
+    return best_methods
+
+def remember_best_method(best_methods_file, dataset_type, method):
+    best_methods = read_best_methods(best_methods_file)
+    best_methods[dataset_type] = method
+    with open(best_methods_file, mode="w") as file:
+        file.write(str(best_methods))
+
+    return None
+
+def get_best_method(best_methods_file, dataset_type):
+    """ the remembered best method of dataset_type, DEFAULT_METHOD if it has not been raced yet. """
+    return read_best_methods(best_methods_file).get(dataset_type, DEFAULT_METHOD)
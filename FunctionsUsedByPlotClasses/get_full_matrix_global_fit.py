@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Global fit of the complete (cropped) data matrix instead of the retained right singular vectors, e.g. if the truncation of the SVD
+loses weak components.\n
+The model D ~ DAS @ basis(taus) is linear in the DAS, only the decay times (and the IRF parameters) are lmfit parameters (variable projection,
+Golub and Pereyra): for every set of decay times the best DAS of all wavelengths at once are the projection of the data onto the model basis,
+the residual is D - D Q Q^T with Q an orthonormal basis of the model basis. So there is no fit parameter per wavelength, an evaluation
+costs one small SVD of the basis and two matrix products with the data matrix.\n
+With noise weights (see get_noise_weights) the whitened data matrix is fitted.\n
+Returns: \n
+* the lmfit result, its parameters (the amplitudes of the retained right SVs are added as the projection of the DAS onto the retained left SVs,
+  so the rest of the gui can use the result as that of the SVD-assisted global fit) and the DAS.
+"""
+
+import asteval
+import lmfit
+import numpy as np
+
+from FunctionsUsedByPlotClasses import get_SVDGFit_parameters
+
+def get_orthonormal_basis(model_basis):
+    """ orthonormal columns that span the rows of model_basis. Directions of a (nearly) rank deficient basis, e.g. two equal decay times,
+    are dropped, otherwise the projection would fit noise with them. """
+    U, singular_values, _ = np.linalg.svd(model_basis.T, full_matrices=False)
+    rank = np.count_nonzero(singular_values > singular_values[0]*max(model_basis.shape)*np.finfo(np.float64).eps)
+
+    return U[:, :rank]
+
+def get_weighted_model_basis(time_delays, fit_params, retained_components, parsed_user_defined_summands, asteval_interpreter, time_weights=None):
+    model_basis = get_SVDGFit_parameters.get_model_basis(time_delays, fit_params, retained_components, parsed_user_defined_summands, asteval_interpreter)
+    if time_weights is not None:
+        model_basis = model_basis*time_weights
+
+    return model_basis
+
+def objective(fit_params, time_delays, data_matrix, retained_components, parsed_user_defined_summands, asteval_interpreter, time_weights=None):
+    """ the residual of the complete data matrix for the best DAS of the current decay times, flattened. """
+    Q = get_orthonormal_basis(get_weighted_model_basis(time_delays, fit_params, retained_components, parsed_user_defined_summands, asteval_interpreter, time_weights))
+
+    return (data_matrix - (data_matrix @ Q) @ Q.T).ravel()
+
+def get_DAS(data_matrix, model_basis):
+    """ the DAS of all wavelengths by one least squares solve, shape (nr of wavelengths, nr of components). """
+    return np.linalg.lstsq(model_basis.T, data_matrix.T, rcond=None)[0].T
+
+def correct_statistics(result, nr_of_linear_parameters):
+    """ lmfit only knows the decay times, the DAS are fit parameters too: the degrees of freedom, reduced chi-square and the (by it scaled) standard errors are corrected. """
+    nfree = result.ndata - result.nvarys - nr_of_linear_parameters
+    if nfree <= 0 or not result.redchi:
+        return result
+
+    redchi = result.chisqr/nfree
+    scale = redchi/result.redchi
+    result.nfree, result.redchi = nfree, redchi
+    if result.covar is not None:
+        result.covar = result.covar*scale
+    for name in result.var_names:
+        if result.params[name].stderr is not None:
+            result.params[name].stderr = float(result.params[name].stderr*np.sqrt(scale))
+
+    return result
+
+def run(data_matrix, retained_components, time_delays, start_time, initial_fit_parameter_values, time_zero, temp_resolution, parsed_user_defined_summands=False, fit_method_name='leastsq',
+        fit_time_zero=False, fit_temp_resolution=False, noise_weights=None, retained_lSVs=None, fit_warnings=None):
+    """ the global fit of the complete data matrix, arguments as in get_SVDGFit_parameters.run.
+
+    Args:
+        data_matrix (np.ndarray): shape (nr of wavelengths, nr of time delays).
+        noise_weights (NoiseWeights, optional): weights of the residuals. Defaults to None.
+        retained_lSVs (np.ndarray, optional): retained left SVs (as columns), the DAS are projected onto them to get the amplitudes of the right SVs. Defaults to None.
+        fit_warnings (list, optional): warnings about the fit are appended to it instead of being issued. Defaults to None.
+
+    Returns:
+        tuple: lmfit MinimizerResult, its parameters, DAS in the units of the data.
+    """
+    start_time_index = time_delays.index(str(start_time))
+    time_delays = np.array([float(time_delay) for time_delay in time_delays[start_time_index:]])
+    data_matrix = np.asarray(data_matrix, dtype=np.float64)[:, start_time_index:]
+
+    # weights are applied once here, the objective only weights the model basis
+    time_weights = None
+    if noise_weights is not None:
+        data_matrix = noise_weights.whiten(data_matrix)
+        time_weights = noise_weights.time_weights
+        if time_weights is not None:
+            time_weights = time_weights[start_time_index:]
+
+    # the amplitudes are not fit parameters here
+    fit_params = get_SVDGFit_parameters.initialize_fit_parameters(retained_components, initial_fit_parameter_values, fit_warnings)
+    for name in [name for name in fit_params if name.startswith("amp_")]:
+        fit_params.pop(name)
+    if temp_resolution > 0 and not parsed_user_defined_summands:
+        get_SVDGFit_parameters.add_irf_parameters(fit_params, time_delays, time_zero, temp_resolution, fit_time_zero, fit_temp_resolution)
+
+    asteval_interpreter = asteval.Interpreter(use_numpy=True)
+    try:
+        result = lmfit.minimize(objective, fit_params, method=fit_method_name, args=(time_delays, data_matrix, retained_components, parsed_user_defined_summands, asteval_interpreter, time_weights))
+    except (ValueError, TypeError) as error:
+        raise ValueError(str(error) + "\n\nMaybe try it with another fit method (Fit method menu) or changed initial fit parameter values (button in bottom left corner),"
+                                +" or another start time-value or another set of components ...")
+    correct_statistics(result, data_matrix.shape[0]*len(retained_components))
+
+    DAS = get_DAS(data_matrix, get_weighted_model_basis(time_delays, result.params, retained_components, parsed_user_defined_summands, asteval_interpreter, time_weights))
+    if noise_weights is not None:
+        DAS = noise_weights.unwhiten_left_SVs(DAS)
+
+    # varying, so that the resampling of get_SVDGFit_uncertainties refits them
+    if retained_lSVs is not None:
+        amplitudes = np.linalg.lstsq(np.asarray(retained_lSVs, dtype=np.float64), DAS, rcond=None)[0]
+        for idx_of_vector in range(len(retained_components)):
+            for k, component in enumerate(retained_components):
+                result.params.add(f'amp_rSV{idx_of_vector}_component{component}', value=float(amplitudes[idx_of_vector, k]))
+
+    return result, result.params, DAS
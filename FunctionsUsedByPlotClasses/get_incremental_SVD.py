@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Rank-k SVD of a data matrix (nr of wavelengths x nr of time delays) that grows by new time delays, e.g. a data file that is re-read during a measurement.\n
+New time delays (columns) are folded into the cached U, singular values and VT with the update of Brand (2006). It costs O(k*(m+n)) per new time delay
+and one (k+c)x(k+c) SVD per update of c time delays, instead of a full SVD of the m x n matrix.\n
+Rounding errors slowly destroy the orthogonality of the updated factors, they are re-orthogonalized exactly every REORTHOGONALIZE_EVERY new time delays.\n
+SVDCache keeps one IncrementalSVD per data file and decides whether a re-read matrix can be updated or has to be decomposed again,
+e.g. if a new scan has been averaged into the data, all values change and the SVD is recomputed.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import scipy.linalg
+
+REORTHOGONALIZE_EVERY = 50
+# more components than requested are tracked, the truncation error of the update then hardly affects the requested ones
+EXTRA_RANK = 5
+# number of data files whose SVD is cached
+MAX_NR_OF_CACHED_SVDS = 4
+
+class IncrementalSVD():
+    def __init__(self, data_matrix, rank, reorthogonalize_every=REORTHOGONALIZE_EVERY):
+        """ rank-k SVD of data_matrix, that can be updated with new columns (time delays).
+
+        Args:
+            data_matrix (np.ndarray): shape (nr of wavelengths, nr of time delays).
+            rank (int): number of singular values and vectors that are kept.
+            reorthogonalize_every (int, optional): number of new time delays after which U and VT are re-orthogonalized. Defaults to REORTHOGONALIZE_EVERY.
+        """
+        self.rank = min(rank, min(data_matrix.shape))
+        self.reorthogonalize_every = reorthogonalize_every
+        self.dtype = data_matrix.dtype
+
+        self.recompute(data_matrix)
+
+        return None
+
+    def recompute(self, data_matrix):
+        """ exact truncated SVD, the factors are kept in float64 whatever the precision of the data. """
+        U, sigma, VT = scipy.linalg.svd(np.asarray(data_matrix, dtype=np.float64), full_matrices=False)
+        self.U, self.sigma, self.VT = U[:, :self.rank], sigma[:self.rank], VT[:self.rank, :]
+        self.nr_of_time_delays = data_matrix.shape[1]
+        self.nr_of_new_time_delays_since_reorthogonalization = 0
+
+        return None
+
+    def append_time_delays(self, new_columns):
+        """ Brand's update: [A, C] = [U, J] @ core @ blockdiag(VT, I) with J, K = qr(C - U U^T C) and core = [[diag(sigma), U^T C], [0, K]],
+        only the small core is decomposed. """
+        new_columns = np.asarray(new_columns, dtype=np.float64)
+        k, nr_of_new_columns = len(self.sigma), new_columns.shape[1]
+
+        projection = self.U.T @ new_columns
+        J, K = np.linalg.qr(new_columns - self.U @ projection)
+
+        core = np.zeros((k + nr_of_new_columns, k + nr_of_new_columns))
+        core[:k, :k] = np.diag(self.sigma)
+        core[:k, k:] = projection
+        core[k:, k:] = K
+        core_U, core_sigma, core_VT = np.linalg.svd(core)
+
+        rank = min(self.rank, k + nr_of_new_columns)
+        self.U = np.hstack((self.U, J)) @ core_U[:, :rank]
+        self.sigma = core_sigma[:rank]
+        self.VT = np.hstack((core_VT[:rank, :k] @ self.VT, core_VT[:rank, k:]))
+
+        self.nr_of_time_delays += nr_of_new_columns
+        self.nr_of_new_time_delays_since_reorthogonalization += nr_of_new_columns
+        if self.nr_of_new_time_delays_since_reorthogonalization >= self.reorthogonalize_every:
+            self.reorthogonalize()
+
+        return None
+
+    def reorthogonalize(self):
+        """ exact: U diag(sigma) VT = Qu (Ru diag(sigma) Rv^T) Qv^T, the small middle matrix is decomposed again. """
+        Q_U, R_U = np.linalg.qr(self.U)
+        Q_V, R_V = np.linalg.qr(self.VT.T)
+        core_U, self.sigma, core_VT = np.linalg.svd((R_U * self.sigma) @ R_V.T)
+        self.U = Q_U @ core_U
+        self.VT = core_VT @ Q_V.T
+        self.nr_of_new_time_delays_since_reorthogonalization = 0
+
+        return None
+
+    def get_orthogonality_error(self):
+        """ largest deviation of U^T U and VT VT^T from the identity. """
+        identity = np.eye(len(self.sigma))
+        return max(np.max(np.abs(self.U.T @ self.U - identity)), np.max(np.abs(self.VT @ self.VT.T - identity)))
+
+    def get_SVD(self, rank=None):
+        """ U, singular values and VT of the leading rank components, in the dtype of the data. """
+        rank = len(self.sigma) if rank is None else rank
+        return self.U[:, :rank].astype(self.dtype, copy=False), self.sigma[:rank].astype(self.dtype, copy=False), self.VT[:rank, :].astype(self.dtype, copy=False)
+
+def get_checksum(data_matrix):
+    return hashlib.blake2b(np.ascontiguousarray(data_matrix).tobytes(), digest_size=16).hexdigest()
+
+class SVDCache():
+    def __init__(self, extra_rank=EXTRA_RANK, max_nr_of_cached_SVDs=MAX_NR_OF_CACHED_SVDS):
+        """ the incremental SVDs of the last few data files. used by the data objects in worker threads, so all access is locked. """
+        self.extra_rank = extra_rank
+        self.max_nr_of_cached_SVDs = max_nr_of_cached_SVDs
+        # key -> (IncrementalSVD, time delays, checksum of the decomposed data matrix)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        return None
+
+    def get_SVD(self, key, data_matrix, time_delays, rank):
+        """ U, singular values and VT of the leading rank components of data_matrix.
+
+        Args:
+            key (hashable): identifies the data file, e.g. filename, matrix bounds and precision.
+            data_matrix (np.ndarray): shape (nr of wavelengths, nr of time delays).
+            time_delays (list): time delays of the columns of data_matrix.
+            rank (int): number of components needed.
+
+        Returns:
+            tuple: U, singular values, VT. If data_matrix is the cached one plus new time delays only these are folded into the cached SVD,
+            if it is unchanged nothing is computed, else it is decomposed again.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            nr_of_cached_time_delays = self.get_nr_of_cached_time_delays(entry, data_matrix, time_delays, rank)
+
+            if nr_of_cached_time_delays is None:
+                incremental_SVD = IncrementalSVD(data_matrix, rank + self.extra_rank)
+            else:
+                incremental_SVD = entry[0]
+                if nr_of_cached_time_delays < data_matrix.shape[1]:
+                    incremental_SVD.append_time_delays(data_matrix[:, nr_of_cached_time_delays:])
+
+            self.entries[key] = (incremental_SVD, list(time_delays), get_checksum(data_matrix))
+            while len(self.entries) > self.max_nr_of_cached_SVDs:
+                self.entries.popitem(last=False)
+
+            return incremental_SVD.get_SVD(rank)
+
+    def get_nr_of_cached_time_delays(self, entry, data_matrix, time_delays, rank):
+        """ the number of time delays of the cached SVD if data_matrix starts with the cached data matrix, None if it has to be decomposed again. """
+        if entry is None:
+            return None
+
+        incremental_SVD, cached_time_delays, checksum = entry
+        nr_of_cached_time_delays = len(cached_time_delays)
+        if (incremental_SVD.U.shape[0] != data_matrix.shape[0] or incremental_SVD.dtype != data_matrix.dtype or incremental_SVD.rank < min(rank, min(data_matrix.shape))
+                or list(time_delays[:nr_of_cached_time_delays]) != cached_time_delays):
+            return None
+        # more new than old time delays: a full SVD is not more expensive than the update
+        if data_matrix.shape[1] - nr_of_cached_time_delays > nr_of_cached_time_delays:
+            return None
+        # e.g. a new scan has been averaged into the data
+        if get_checksum(data_matrix[:, :nr_of_cached_time_delays]) != checksum:
+            return None
+
+        return nr_of_cached_time_delays
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Species associated spectra (SAS) of a compartmental kinetic scheme, e.g. A -> B -> C or A -> B, A -> C.\n
+Each selected component is a compartment with the lifetime tau_component{c} of the global fit. A transfer (donor, acceptor, fraction)
+lets the given fraction of the decay of the donor populate the acceptor, the rest of its decay returns to the ground state.
+The populations then follow dc/dt = K c with the rate matrix K, whose solution for the initial populations c0 is, by the eigendecomposition K = V diag(lambda) V^-1,\n
+c(t) = V diag(V^-1 c0) exp(lambda t) = mixing_matrix @ exponentials(t)\n
+For a scheme without cycles (sequential, parallel and branched schemes) the eigenvalues are -1/tau of the compartments, i.e. the populations
+are linear combinations of the exponentials of the global fit and the fit of the scheme is the global fit itself (van Stokkum et al. 2004).
+So the scheme costs nothing in the fit, once the decay times are fitted:\n
+data = DAS @ exponentials = SAS @ populations  =>  DAS = SAS @ mixing_matrix\n
+With an IRF the same mixing matrix applies to the convoluted exponentials.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from FunctionsUsedByPlotClasses import get_SVDGFit_parameters
+
+# schemes that are defined by the selected components alone, in the order of the components
+PRESETS = ("sequential", "parallel")
+# above this condition number of the eigenvectors the decay times of connected compartments are too close for the eigendecomposition
+MAX_CONDITION_NUMBER = 1e10
+
+@dataclass
+class KineticScheme:
+    """ transfers: (donor component, acceptor component, fraction of the decay of the donor). initial_populations: {component: population at time zero}, all others start empty. """
+    transfers: list = field(default_factory=list)
+    initial_populations: dict = field(default_factory=dict)
+    name: str = "user defined"
+
+    def get_description(self):
+        transfers = ", ".join(f"{donor} -> {acceptor} ({fraction:g})" for donor, acceptor, fraction in self.transfers) or "no transfers"
+        initial_populations = ", ".join(f"{component}: {population:g}" for component, population in self.initial_populations.items())
+
+        return f"{self.name}: {transfers}, initial populations {initial_populations}"
+
+def get_preset(name, components):
+    """ sequential: the components in their order, each populates the next one completely and only the first is populated initially.
+    parallel: no transfers, all components are populated initially, its SAS are the DAS. """
+    if name == "sequential":
+        return KineticScheme([(donor, acceptor, 1.0) for donor, acceptor in zip(components[:-1], components[1:])], {components[0]: 1.0}, name)
+    if name == "parallel":
+        return KineticScheme([], {component: 1.0 for component in components}, name)
+
+    raise ValueError(f"unknown kinetic scheme {name!r}, use one of {PRESETS} or a kinetic scheme file.")
+
+def from_dict(scheme_dict, name="user defined"):
+    """ the dict of a kinetic scheme file: {"transfers": [(0, 1, 1.0), (1, 2, 0.6), (1, 3, 0.4)], "initial_populations": {0: 1.0}} """
+    try:
+        transfers = [(int(donor), int(acceptor), float(fraction)) for donor, acceptor, fraction in scheme_dict.get("transfers", [])]
+        initial_populations = {int(component): float(population) for component, population in scheme_dict["initial_populations"].items()}
+    except (KeyError, TypeError, ValueError, AttributeError) as error:
+        raise ValueError(f"{type(error).__name__}: {error}\nthe kinetic scheme has to be a dict with the keys 'transfers', a list of (donor component, acceptor component, fraction), "
+                            +"and 'initial_populations', a dict {component: population}.") from error
+
+    return KineticScheme(transfers, initial_populations, name)
+
+def check(scheme, components):
+    """ raises a ValueError if the scheme does not fit the selected components or has a cycle. """
+    for donor, acceptor, fraction in scheme.transfers:
+        if donor not in components or acceptor not in components:
+            raise ValueError(f"the transfer {donor} -> {acceptor} connects components that are not selected {components}.")
+        if donor == acceptor:
+            raise ValueError(f"the transfer {donor} -> {acceptor} does not lead to another compartment.")
+        if not 0 < fraction <= 1:
+            raise ValueError(f"the fraction of the transfer {donor} -> {acceptor} is {fraction}, it has to be in (0, 1].")
+    for donor in components:
+        total_fraction = sum(fraction for transfer_donor, _, fraction in scheme.transfers if transfer_donor == donor)
+        if total_fraction > 1 + 1e-9:
+            raise ValueError(f"the fractions of the transfers from component {donor} add up to {total_fraction}, more than all of its decay.")
+    if not all(component in components for component in scheme.initial_populations):
+        raise ValueError(f"initial populations {scheme.initial_populations} of components that are not selected {components}.")
+    if not any(scheme.initial_populations.values()):
+        raise ValueError("no compartment is populated initially.")
+
+    # a compartment can only be taken out once all of its donors are (Kahn), what remains is part of a cycle
+    remaining_transfers = list(scheme.transfers)
+    remaining_components = set(components)
+    while True:
+        without_donors = {component for component in remaining_components if not any(acceptor == component for _, acceptor, _ in remaining_transfers)}
+        if not without_donors:
+            break
+        remaining_components -= without_donors
+        remaining_transfers = [transfer for transfer in remaining_transfers if transfer[0] not in without_donors]
+    if remaining_components:
+        raise ValueError(f"the transfers between the components {sorted(remaining_components)} form a cycle. Only schemes without reversible steps are supported: "
+                            +"then the populations are sums of the exponentials of the global fit.")
+
+    return None
+
+def get_rate_matrix(scheme, components, decay_times):
+    """ K[i, j] is the rate from compartment j to compartment i, in the order of components. """
+    index = {component: i for i, component in enumerate(components)}
+    rates = 1/np.asarray(decay_times, dtype=np.float64)
+    rate_matrix = -np.diag(rates)
+    for donor, acceptor, fraction in scheme.transfers:
+        rate_matrix[index[acceptor], index[donor]] += fraction*rates[index[donor]]
+
+    return rate_matrix
+
+def get_mixing_matrix(scheme, components, decay_times):
+    """ the populations of the compartments (rows) as linear combinations of the exponentials exp(-t/tau) of the components (columns). """
+    rate_matrix = get_rate_matrix(scheme, components, decay_times)
+    eigenvalues, eigenvectors = np.linalg.eig(rate_matrix)
+    if np.linalg.cond(eigenvectors) > MAX_CONDITION_NUMBER:
+        raise ValueError(f"the decay times {list(decay_times)} of compartments connected by a transfer are (almost) equal, the kinetic scheme has no eigendecomposition for them.")
+
+    # without cycles the eigenvalues are the diagonal of the rate matrix, i.e. -1/tau: sorting both assigns each eigenvector to its component
+    eigenvectors_of_components = np.empty_like(eigenvectors.real)
+    eigenvectors_of_components[:, np.argsort(np.diag(rate_matrix), kind="stable")] = eigenvectors.real[:, np.argsort(eigenvalues.real, kind="stable")]
+
+    initial_populations = np.array([scheme.initial_populations.get(component, 0.0) for component in components])
+
+    return eigenvectors_of_components*np.linalg.solve(eigenvectors_of_components, initial_populations)[np.newaxis, :]
+
+def get_populations(mixing_matrix, time_delays, decay_times, time_zero=0, irf_fwhm=0):
+    """ the populations of the compartments, shape (nr of components, nr of time delays). vectorized over the time delays:
+    one matrix product with the (IRF convoluted) exponentials of the global fit. """
+    time_delays = np.asarray(time_delays, dtype=np.float64)
+    if irf_fwhm > 0:
+        exponentials = get_SVDGFit_parameters.irf_convoluted_exp_decays(time_delays, decay_times, time_zero, irf_fwhm)
+    else:
+        exponentials = np.exp(-(time_delays[np.newaxis, :]/np.asarray(decay_times, dtype=np.float64)[:, np.newaxis]))
+
+    return mixing_matrix @ exponentials
+
+def get_SAS(DAS, mixing_matrix):
+    """ the SAS of the DAS (both as columns, in the order of the components): DAS = SAS @ mixing_matrix.
+    A compartment that is never populated has no spectrum, its SAS is 0 (least squares). """
+    return np.linalg.lstsq(mixing_matrix.T, np.asarray(DAS, dtype=np.float64).T, rcond=None)[0].T.astype(DAS.dtype, copy=False)
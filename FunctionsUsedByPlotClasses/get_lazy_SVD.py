@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Singular values and vectors of a data matrix that are computed on demand, e.g. for the SVD inspection toplevel, where usually only the
+first 5 - 10 components are looked at.\n
+* get_components(nr): the leading nr singular triplets by a partial SVD (ARPACK, scipy.sparse.linalg.svds). If more are needed later,
+  at least twice as many are computed, up to the full SVD once a partial one would not be faster anymore.\n
+* get_singular_values(): all singular values (as needed by the rank estimation), without computing the singular vectors.\n
+The results are cached. Every result is assigned at once, so a background thread (e.g. the rank estimation) can use the same LazySVD.
+"""
+
+import numpy as np
+import scipy.linalg
+import scipy.sparse.linalg
+
+# above this fraction of min(data_matrix.shape) components the full SVD is computed, ARPACK is not faster anymore
+MAX_PARTIAL_FRACTION = 0.25
+
+class LazySVD():
+    def __init__(self, data_matrix):
+        """ data_matrix: shape (nr of wavelengths, nr of time delays). """
+        self.data_matrix = data_matrix
+        self.max_nr_of_components = min(data_matrix.shape)
+        # (U, singular values, VT) of the leading components computed so far, and whether that is the full SVD
+        self.components = None
+        self.is_full = False
+        self.all_singular_values = None
+
+        return None
+
+    @property
+    def nr_of_components(self):
+        return 0 if self.components is None else len(self.components[1])
+
+    def get_components(self, nr_of_components):
+        """ (U[:, :nr], singular values[:nr], VT[:nr, :]) of the leading nr_of_components components, at most min(data_matrix.shape). """
+        nr_of_components = min(nr_of_components, self.max_nr_of_components)
+        if nr_of_components > self.nr_of_components:
+            self.extend(max(nr_of_components, 2*self.nr_of_components))
+        U, singular_values, VT = self.components
+
+        return U[:, :nr_of_components], singular_values[:nr_of_components], VT[:nr_of_components, :]
+
+    def extend(self, nr_of_components):
+        # svds needs k < min(shape)
+        if nr_of_components >= min(self.max_nr_of_components - 1, MAX_PARTIAL_FRACTION*self.max_nr_of_components):
+            U, singular_values, VT = scipy.linalg.svd(self.data_matrix, full_matrices=False)
+            self.components, self.is_full, self.all_singular_values = (U, singular_values, VT), True, singular_values
+            return None
+
+        # fixed start vector: the same vectors (and signs) every time
+        U, singular_values, VT = scipy.sparse.linalg.svds(self.data_matrix, k=nr_of_components, v0=np.ones(self.max_nr_of_components, dtype=self.data_matrix.dtype), solver="arpack")
+        order = np.argsort(singular_values)[::-1]
+        self.components = (U[:, order], singular_values[order], VT[order, :])
+
+        return None
+
+    def get_singular_values(self):
+        """ all min(data_matrix.shape) singular values. """
+        if self.all_singular_values is None:
+            self.all_singular_values = scipy.linalg.svdvals(self.data_matrix)
+
+        return self.all_singular_values
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Helper module for TA data analysis GUI.\n\n
+Weights for the SVD-assisted global fit, so that noisy wavelengths (e.g. at the edges of the probe spectrum) and noisy time delays
+do not pull the fit as much as the rest of the data.\n
+The noise of a value is modelled as sigma[i, j] ~ wavelength_noise[i] * time_noise[j]. Such a separable noise model can be whitened
+before the SVD: D_w = D / sigma, the SVD of D_w has the same structure as that of D, i.e. the global fit of the right singular vectors
+minimizes the weighted residual sum((D - model)**2/sigma**2) within the retained components.\n
+* from_pre_time_zero: the noise of each wavelength is the standard deviation of the time delays before time zero, all time delays weigh the same.\n
+* from_noise_map: a noise map (the standard error of each value, e.g. of an average of scans) is reduced to the separable model
+  by averaging its logarithm over the time delays and the wavelengths.\n
+All of this is computed once per fit, an evaluation of the fit function only multiplies the model by the time weights.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# "none" keeps the unweighted fit
+WEIGHTINGS = ("none", "noise before time zero", "noise map")
+# least number of time delays before time zero to estimate the noise of each wavelength
+MIN_NR_OF_NOISE_TIME_DELAYS = 3
+# noise values below this fraction of the median noise are raised to it, a single quiet pixel would otherwise get an enormous weight
+NOISE_FLOOR = 0.1
+
+@dataclass
+class NoiseWeights:
+    """ sigma[i, j] ~ wavelength_noise[i] * time_noise[j], both relative to their median: only the ratios matter for the fit,
+    the whitened data keeps the scale of the data and the initial fit parameter values stay as good as without weights. """
+    wavelength_noise: np.ndarray
+    time_noise: np.ndarray
+    weighting: str
+
+    @property
+    def time_weights(self):
+        """ None if all time delays weigh the same, the fit then skips the weighting. """
+        if np.all(self.time_noise == 1):
+            return None
+        return 1/self.time_noise
+
+    def whiten(self, data_matrix):
+        return data_matrix/np.outer(self.wavelength_noise, self.time_noise).astype(data_matrix.dtype, copy=False)
+
+    def unwhiten_left_SVs(self, leftSVs):
+        """ left singular vectors of the whitened matrix (as columns) back in the units of the data, e.g. to compute the DAS. """
+        return leftSVs*self.wavelength_noise[:, np.newaxis].astype(leftSVs.dtype, copy=False)
+
+    def unwhiten_right_SVs(self, rightSVs):
+        """ right singular vectors of the whitened matrix (as rows): singular value * unwhitened right SV is again fitted by the unweighted fit function. """
+        return rightSVs*self.time_noise[np.newaxis, :].astype(rightSVs.dtype, copy=False)
+
+def apply_noise_floor(noise):
+    """ non finite or too small noise values are raised to NOISE_FLOOR * the median of the valid ones. """
+    noise = np.asarray(noise, dtype=np.float64)
+    valid = np.isfinite(noise) & (noise > 0)
+    if not np.any(valid):
+        raise ValueError("the noise estimate does not contain a single positive value.")
+    floor = NOISE_FLOOR*np.median(noise[valid])
+
+    return np.where(valid, np.maximum(noise, floor), floor)
+
+def get_relative(noise):
+    return noise/np.median(noise)
+
+def from_pre_time_zero(pre_time_zero_data, nr_of_time_delays):
+    """
+    Args:
+        pre_time_zero_data (np.ndarray): the data of the time delays before time zero, shape (nr of wavelengths, nr of those time delays).
+        nr_of_time_delays (int): the number of time delays of the data that is fitted.
+
+    Returns:
+        NoiseWeights: the standard deviation of each wavelength (its baseline offset removed), the same for every time delay.
+    """
+    if pre_time_zero_data.shape[1] < MIN_NR_OF_NOISE_TIME_DELAYS:
+        raise ValueError(f"only {pre_time_zero_data.shape[1]} time delays before time zero, at least {MIN_NR_OF_NOISE_TIME_DELAYS} are needed to estimate the noise.")
+
+    wavelength_noise = np.std(np.asarray(pre_time_zero_data, dtype=np.float64), axis=1, ddof=1)
+
+    return NoiseWeights(get_relative(apply_noise_floor(wavelength_noise)), np.ones(nr_of_time_delays), WEIGHTINGS[1])
+
+def from_noise_map(noise_map):
+    """ the separable model closest to noise_map in the log: log(sigma[i, j]) ~ log(wavelength_noise[i]) + log(time_noise[j]). """
+    log_noise = np.log(apply_noise_floor(noise_map))
+    log_wavelength_noise = log_noise.mean(axis=1)
+    log_time_noise = log_noise.mean(axis=0) - log_noise.mean()
+
+    return NoiseWeights(get_relative(np.exp(log_wavelength_noise)), get_relative(np.exp(log_time_noise)), WEIGHTINGS[2])
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 """ A module used to show the heatmap of an input (TA) data file value on the Gui. \n\n
 """
-import gc
 import numpy as np
 import seaborn as sns
 import matplotlib
@@ -11,8 +10,8 @@ import tkinter as tk
 import os
 
 # my own modules
-from FunctionsUsedByPlotClasses import get_TA_data_after_start_time
-from SupportClasses import saveData, ToolTip, SmallToolbar
+from FunctionsUsedByPlotClasses import TA_analysis_pipeline, get_appended_TA_data, get_lazy_SVD
+from SupportClasses import saveData, ToolTip, SmallToolbar, BackgroundWriter, ResultsIndex, DataFileWatcher, MemoryAccounting
 from ToplevelClasses import SVD_inspection_Toplevel, Kinetics_Spectrum_Toplevel
 
 class ORIGData_Heatmap():
@@ -30,6 +29,7 @@ class ORIGData_Heatmap():
         """
 
         self.parent = parent
+        self.precision = self.parent.get_precision()
         self.notebook_container = self.parent.nbCon_orig
         self.filename = filename
         self.matrix_bounds_dict = matrix_bounds_dict
@@ -42,6 +42,16 @@ class ORIGData_Heatmap():
         self.tab_title_filename = tab_title_filename
         self.colormaps_dict = colormaps_dict
 
+        # computed on demand, see get_SVD
+        self.lazy_SVD = None
+
+        # live mode (one of TA_analysis_pipeline.LIVE_MODES): new data is read in the background and the heatmap and kinetics windows are updated, see start_live_mode
+        self.live_mode = self.parent.get_live_mode()
+        self.live_refresh_interval_s = self.parent.get_live_refresh_interval()
+        self.data_file_watcher = None
+        self.heatmap_image = None
+        self.kinetics_toplevels = []
+
         return None
 
     def make_plot(self):
@@ -54,7 +64,7 @@ class ORIGData_Heatmap():
         self.axes.get_figure().set_figwidth(self.parent.heatmaps_figure_geometry_list[0])
         self.axes.get_figure().set_figheight(self.parent.heatmaps_figure_geometry_list[1])
 
-        self.data = self.data_matrix.astype(float)
+        self.data = self.data_matrix
         self.base_filename = os.path.basename(self.filename)
         self.time_index = self.time_delays.index(str(self.start_time))
         self.time_delays = self.time_delays[self.time_index:]
@@ -64,13 +74,10 @@ class ORIGData_Heatmap():
 
         # the index of the position of self.yticks
         self.yticks = np.linspace(0, len(self.wavelengths) - 1, self.num_ticks, dtype=np.int)
-        self.xticks = np.linspace(0, len(self.time_delays) - 1, self.num_ticks, dtype=np.int)
         # the content of labels of these self.yticks
         self.yticklabels = [float(self.wavelengths[idx]) for idx in self.yticks]
-        self.xticklabels = [float(self.time_delays[idx]) for idx in self.xticks]
-
         self.yticklabels = [self.label_format.format(x) for x in self.yticklabels]
-        self.xticklabels = [self.label_format.format(x) for x in self.xticklabels]
+        self.set_xticks()
 
         try:
             cmap_name = self.colormaps_dict["ORIG"]
@@ -99,6 +106,13 @@ class ORIGData_Heatmap():
 
         return None
 
+    def set_xticks(self):
+        # the index of the position of self.xticks and their labels
+        self.xticks = np.linspace(0, len(self.time_delays) - 1, self.num_ticks, dtype=np.int)
+        self.xticklabels = [self.label_format.format(float(self.time_delays[idx])) for idx in self.xticks]
+
+        return None
+
     # this is done in main gui thread.
     def make_canvas(self):
         self.make_plot()
@@ -107,7 +121,9 @@ class ORIGData_Heatmap():
         self.toolbar_orig.grid(row=0, column=4)
 
         self.tab_title = '{:,.1f}'.format(float(self.start_time)) + " " + self.tab_title_filename
-        self.notebook_container.set_tab_title(self.notebook_container.tab_control.index("current"), title=f'{self.tab_idx+1}: ' + self.tab_title)
+        if self.live_mode != "off":
+            self.tab_title = "LIVE " + self.tab_title
+        self.notebook_container.set_tab_title(self.notebook_container.tab_control.index(self.notebook_container.figure_frames[self.tab_idx]), title=f'{self.tab_idx+1}: ' + self.tab_title)
 
         self.btn_delete_attrs = tk.Button(self.notebook_container.figure_frames[self.tab_idx], text="remove tab", fg=self.parent.violet, command=lambda: self.remove_tab(self.notebook_container))
         self.btn_delete_attrs.grid(row=1, column=3, sticky="se")
@@ -130,6 +146,102 @@ class ORIGData_Heatmap():
 
         self.notebook_container.canvases[self.tab_idx].get_tk_widget().grid(row=0, column=0, sticky="nsew", columnspan=4)
 
+        if self.live_mode != "off":
+            self.start_live_mode()
+
+        return None
+
+    # this is done in main gui thread, the new data is read in the thread of the DataFileWatcher.
+    def start_live_mode(self):
+        # the arguments are bound now, the watcher thread does not touch this object
+        matrix_bounds_dict, precision = self.matrix_bounds_dict, self.precision
+        if self.live_mode == "append rows":
+            self.live_data_matrix = get_appended_TA_data.GrowingMatrix(self.data_matrix, axis=1)
+            data_file_tail = self.data_file_tail
+            read_new_data = lambda: TA_analysis_pipeline.read_appended_data(data_file_tail, matrix_bounds_dict, precision)
+        else:
+            directory_scans, reference_ta_data = self.directory_scans, self.TA_data
+            read_new_data = lambda: TA_analysis_pipeline.read_new_scans_of_directory(directory_scans, reference_ta_data, matrix_bounds_dict, precision)
+
+        self.data_file_watcher = DataFileWatcher.DataFileWatcher(self.parent, read_new_data, self.update_live_data, on_error=self.live_mode_failed,
+                                                                refresh_interval_s=self.live_refresh_interval_s, name=f"live mode of ORIG tab {self.tab_idx+1}")
+
+        return None
+
+    def set_live_refresh_interval(self, refresh_interval_s):
+        self.live_refresh_interval_s = refresh_interval_s
+        if self.data_file_watcher is not None:
+            self.data_file_watcher.set_refresh_interval(refresh_interval_s)
+
+        return None
+
+    def update_live_data(self, new_data):
+        """ new time delays are appended to the data matrix, new scans are averaged into it. only the image data of the heatmap is exchanged. """
+        if self.live_mode == "append rows":
+            new_time_delays, new_columns = new_data
+            self.data_matrix = self.live_data_matrix.append(new_columns)
+            self.time_delays = self.time_delays + new_time_delays
+        else:
+            new_scans, skipped_scans = new_data
+            self.scan_average.skipped_scans.update(skipped_scans)
+            for scan_file, scan_data_matrix in new_scans:
+                if not self.scan_average.add_scan(scan_data_matrix, scan_file):
+                    print(f"ORIG tab {self.tab_idx+1}: rejected {scan_file} as outlier (modified z-score {self.scan_average.z_scores[scan_file]:.1f})")
+            print(f"ORIG tab {self.tab_idx+1}: {self.scan_average.get_summary()}")
+            self.TA_data = TA_analysis_pipeline.get_averaged_TA_data(self.TA_data, self.scan_average)
+            self.data_matrix = self.TA_data.data_matrix
+
+        self.data = self.data_matrix
+        if self.live_mode == "append rows":
+            self.TA_data = TA_analysis_pipeline.TAData(self.filename, self.data_matrix, self.time_delays, self.wavelengths, self.matrix_bounds_dict)
+        # the cached SVD belongs to the old data
+        self.lazy_SVD = None
+
+        self.update_heatmap()
+
+        # windows that have been closed in the meantime have deleted their attributes
+        self.kinetics_toplevels = [toplevel for toplevel in self.kinetics_toplevels if hasattr(toplevel, "data_dict")]
+        for toplevel in self.kinetics_toplevels:
+            toplevel.update_data(self.time_delays, self.data_matrix)
+
+        return None
+
+    def update_heatmap(self):
+        """ the QuadMesh of seaborn can not change its shape, so it is replaced once by an image at the same position, afterwards only its data,
+        the x ticks and the color limits change. """
+        if self.heatmap_image is None:
+            quadmesh = self.axes.collections[0]
+            self.heatmap_colorbar = quadmesh.colorbar
+            self.heatmap_image = self.axes.imshow(self.data_matrix, cmap=self.cm, aspect="auto", interpolation="nearest", origin="upper")
+            quadmesh.remove()
+            self.heatmap_colorbar.update_normal(self.heatmap_image)
+
+        nr_of_wavelengths, nr_of_time_delays = self.data_matrix.shape
+        self.heatmap_image.set_data(self.data_matrix)
+        self.heatmap_image.set_extent((0, nr_of_time_delays, nr_of_wavelengths, 0))
+        self.heatmap_image.set_clim(np.nanmin(self.data_matrix), np.nanmax(self.data_matrix))
+        self.axes.set_xlim(0, nr_of_time_delays)
+        self.axes.set_ylim(nr_of_wavelengths, 0)
+
+        self.set_xticks()
+        self.axes.set_xticks(self.xticks)
+        self.axes.set_xticklabels(self.xticklabels, rotation=30, fontsize=14)
+
+        self.notebook_container.figs[self.tab_idx].canvas.draw_idle()
+
+        return None
+
+    def live_mode_failed(self, error):
+        self.data_file_watcher = None
+        tk.messagebox.showerror("Warning, live mode stopped!", f"ORIG tab {self.tab_idx+1}: exception {type(error).__name__} message: \n"+ str(error))
+
+        return None
+
+    def stop_live_mode(self):
+        if self.data_file_watcher is not None:
+            self.data_file_watcher.stop()
+            self.data_file_watcher = None
+
         return None
 
     def configure_figure_frame_size(self, nbContainer, tab_idx):
@@ -141,61 +253,67 @@ class ORIGData_Heatmap():
         return None
 
     # this is done in thread separate from gui main thread.
+    # no messageboxes here: errors of the TA_analysis_pipeline are raised and shown by the gui once the job has failed.
     def make_data(self):
         # get the data
-        try:
-            self.data_matrix_complete, self.time_delays, self.wavelengths = get_TA_data_after_start_time.run(self.filename, "-999999")
-            if not self.matrix_bounds_dict == {}:
-                self.data_matrix = self.data_matrix_complete[self.min_wavelength_index:self.max_wavelength_index+1, self.min_time_delay_index:self.max_time_delay_index+1]
-                self.time_delays = self.time_delays[self.min_time_delay_index:self.max_time_delay_index+1]
-                self.wavelengths = self.wavelengths[self.min_wavelength_index:self.max_wavelength_index+1]
-            else:
-                self.data_matrix = self.data_matrix_complete
-
-            # set start time to the actual time delay that is closest to user input (is used in tab title)
-            self.start_time = self.time_delays[0]
-
-            # already set paths to which data from this data object is to be saved - this way the path stays the same
-            # and can also be used in corresponding Toplevel classes!
-            # i can not do this in __init__, as there the start time is not corrected yet!
-            self.date_dir, self.final_dir = saveData.get_directory_paths(self.start_time, self.tab_idx)
-            self.base_directory = os.getcwd()
-            self.full_path_to_final_dir = saveData.get_final_path(self.base_directory, self.date_dir, "/Original_data/", self.final_dir, self.filename)
-
-        except ValueError as error:
-            tk.messagebox.showerror("Warning,", "an exception occurred!""\nMaybe due to the entered start time or data file format!\n"+
-                                    f"Exception {type(error)} message: \n"+ str(error)+"\n")
-
-
-            # return gui to initial state if above data preparation failed
-            self.parent.return_some_gui_widgets_to_initial_state(button=self.parent.btn_show_orig_data_heatmap, label=self.parent.lbl_reassuring_orig, tab_control=self.notebook_container.tab_control)
-            self.delete_attributes()
-
-            return None
+        # in live mode the file is read such that only new data has to be read later
+        if self.live_mode == "append rows":
+            self.TA_data, self.data_file_tail = TA_analysis_pipeline.load_growing_data(self.filename, self.matrix_bounds_dict, self.precision)
+        elif self.live_mode == "new files in directory":
+            self.TA_data, self.directory_scans, self.scan_average = TA_analysis_pipeline.load_scans_of_directory(self.filename, self.matrix_bounds_dict, self.precision)
+            print(f"ORIG tab {self.tab_idx+1}: {self.scan_average.get_summary()}")
+        else:
+            self.TA_data = TA_analysis_pipeline.load_and_crop_data(self.filename, self.matrix_bounds_dict, self.precision)
+        self.data_matrix, self.time_delays, self.wavelengths = self.TA_data.data_matrix, self.TA_data.time_delays, self.TA_data.wavelengths
+
+        # set start time to the actual time delay that is closest to user input (is used in tab title)
+        self.start_time = self.TA_data.start_time
+
+        # already set paths to which data from this data object is to be saved - this way the path stays the same
+        # and can also be used in corresponding Toplevel classes!
+        # i can not do this in __init__, as there the start time is not corrected yet!
+        self.date_dir, self.final_dir = saveData.get_directory_paths(self.start_time, self.tab_idx)
+        self.base_directory = os.getcwd()
+        self.full_path_to_final_dir = saveData.get_final_path(self.base_directory, self.date_dir, "/Original_data/", self.final_dir, self.filename)
 
         return None
 
     def save_data_to_file(self):
         print(f"\nsaving data: original reconstruction object at tab: {self.tab_idx+1}\n")
 
-        # check if directory exists:
-        if not os.path.exists(self.full_path_to_final_dir):
-            os.makedirs(self.full_path_to_final_dir)
+        # the figure and data are written in the background, the save task takes a snapshot of them now
+        save_task = BackgroundWriter.SaveTask(f"original data tab {self.tab_idx+1}", self.full_path_to_final_dir)
 
         # save data
-        self.notebook_container.figs[self.tab_idx].savefig(self.full_path_to_final_dir+"/originalData.png")
+        save_task.add_figure(self.notebook_container.figs[self.tab_idx], self.full_path_to_final_dir+"/originalData.png")
 
-        saveData.make_log_file(self.full_path_to_final_dir, filename=self.filename, start_time=self.start_time, matrix_bounds=self.matrix_bounds_dict)
+        save_task.add(saveData.make_log_file, self.full_path_to_final_dir, filename=self.filename, start_time=self.start_time, matrix_bounds=self.matrix_bounds_dict)
 
         self.result_data_to_save = {"time_delays": self.time_delays, "wavelengths": self.wavelengths}
-        saveData.save_result_data(self.full_path_to_final_dir, self.result_data_to_save)
+        save_task.add(saveData.save_result_data, self.full_path_to_final_dir, self.result_data_to_save)
 
         # save data matrices
         self.data_matrices_to_save = {"data_matrix": self.data_matrix.T}
-        saveData.save_formatted_data_matrix_after_time(self.full_path_to_final_dir, self.time_delays, self.wavelengths, self.data_matrices_to_save)
+        # an average of scans also has the standard error of each value
+        if self.TA_data.noise_map is not None:
+            self.data_matrices_to_save["noise_map"] = self.TA_data.noise_map.T
+        save_task.add(saveData.save_formatted_data_matrix_after_time, self.full_path_to_final_dir, self.time_delays, self.wavelengths, self.data_matrices_to_save)
+
+        # only indexed once all files are written
+        save_task.add(ResultsIndex.add_result, ResultsIndex.get_index_path(self.parent.base_directory), "ORIG", self.filename, self.full_path_to_final_dir, start_time=self.start_time, matrix_bounds_dict=self.matrix_bounds_dict)
+
+        self.parent.save_in_background(save_task)
 
         return None
 
+    def get_SVD(self):
+        """ the SVD of the data matrix as a get_lazy_SVD.LazySVD: only the components that are asked for are computed, and cached,
+        e.g. for the SVD inspection toplevel and its rank estimation. """
+        if self.lazy_SVD is None:
+            self.lazy_SVD = get_lazy_SVD.LazySVD(self.data_matrix)
+
+        return self.lazy_SVD
+
     def make_SVD_inspection_toplevel(self):
         SVD_inspection_Toplevel.SVD_inspection_Window(self.parent, self.tab_idx, self)
 
@@ -203,20 +321,18 @@ class ORIGData_Heatmap():
 
     def inspect_data_matrix_via_toplevel(self):
         data_dict_for_toplevel = {"type": "original data", "time_delays": self.time_delays, "wavelengths": self.wavelengths, "data_matrix": self.data_matrix, "save_dir": self.full_path_to_final_dir, "data_file": self.filename}
-        Kinetics_Spectrum_Toplevel.Kinetics_Spectrum_Window(self.parent, self.tab_idx, data_dict_for_toplevel)
+        # kept to update it in live mode
+        self.kinetics_toplevels.append(Kinetics_Spectrum_Toplevel.Kinetics_Spectrum_Window(self.parent, self.tab_idx, data_dict_for_toplevel))
 
         return None
 
     # to delete instance attributes to free up memory. is called when tab is removed.
     def delete_attributes(self):
-        attr_lst = list(vars(self))
-        for attr in attr_lst:
-            delattr(self, attr)
-
-        del attr_lst
-        del self
+        # a watcher would otherwise go on delivering data to this object
+        self.stop_live_mode()
 
-        gc.collect()
+        # the widgets of the tab are destroyed, all attributes dropped and the garbage collected once
+        MemoryAccounting.release(self)
 
         return None
 
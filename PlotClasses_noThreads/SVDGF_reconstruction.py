@@ -2,24 +2,21 @@
 # -*- coding: utf-8 -*-
 """ A module to produce a plot of via SVD-assisted-GlobalFit-reconstructed data on the GUI.
 """
-import gc
 import numpy as np
 import seaborn as sns
 import tkinter as tk
 import os
 import lmfit
-import re
 from datetime import datetime
-import ast
 
 # my own modules
-from FunctionsUsedByPlotClasses import get_DAS_from_lSVs_res_amplitudes, get_TA_data_after_start_time, get_retained_rightSVs_leftSVs_singularvs, get_SVDGFit_parameters
-from FunctionsUsedByPlotClasses import get_SVDGF_reconstructed_data
-from SupportClasses import ToolTip, saveData, SmallToolbar
+from FunctionsUsedByPlotClasses import get_SVDGF_reconstructed_data, get_SVDGFit_parameters, TA_analysis_pipeline, get_noise_weights
+from SupportClasses import ToolTip, saveData, SmallToolbar, BackgroundWriter, ResultsIndex, MemoryAccounting
 from ToplevelClasses import Kinetics_Spectrum_Toplevel, new_decay_times_Toplevel, CompareRightSVsWithFit_Toplevel
 
 class SVDGF_Heatmap():
-    def __init__(self, parent, filename, matrix_bounds_dict, components_list, temp_resolution, time_zero, tab_idx, tab_idx_difference, initial_fit_parameter_values, user_defined_fit_function, colormaps_dict, target_model_configuration_file):
+    def __init__(self, parent, filename, matrix_bounds_dict, components_list, temp_resolution, time_zero, tab_idx, tab_idx_difference, initial_fit_parameter_values, user_defined_fit_function, colormaps_dict, target_model_configuration_file, saved_result_file=None,
+                    fit_time_zero=False, fit_temp_resolution=False):
         """A class to make a heatmap of via SVD_GlobalFit reconstructed TA data.
         * the (default, i.e. non user defined) global fit should:\n
             # fit the selection (the selected components)\n
@@ -38,14 +35,17 @@ class SVDGF_Heatmap():
             filename (str): full path of the datafile to be reconstructed
             matrix_bounds_dict (dict): contains the indeces that dictate the which part of complete data matrix to use
             components_list (list of ints): list of integers that represent the SVD components to be used for the reconstruction
-            temp_resolution (float): number that represents the temporal resolution of the used detector setup in data collection (FWHM) (might be used for convolution in fit function)
-            time_zero (float): number used in the convolution of the fitting function (convolution might not be implemented)
+            temp_resolution (float): the temporal resolution of the used detector setup in data collection (FWHM of the IRF), if > 0 the fit function is convoluted with a gaussian IRF
+            time_zero (float): the center of the IRF, only used if temp_resolution > 0
             tab_idx (int): the index of the tab of the ttk notebook of the GUI, (on which the SVDGF heatmap will be put)
             tab_idx_difference (int):the index of the tab of the ttk notebook of the GUI, (on which the difference heatmap will be put)
             initial_fit_parameter_values (dict): the dictionary that defines the initial values for the fit parameters
             user_defined_fit_function (bool): True if you want to use the user defined fit function
             colormaps_dict (dict): dictionary containing the colormap names for the heatmaps
             target_model_configuration_file (string): path to target model configuration file
+            saved_result_file (str, optional): a result_data.npz saved by this class. If given, the result is loaded from it instead of being computed.
+            fit_time_zero (bool, optional): fit time_zero instead of keeping it fixed (only with IRF).
+            fit_temp_resolution (bool, optional): fit the FWHM of the IRF instead of keeping it fixed.
 
         Returns:
             NoneType: None
@@ -53,6 +53,11 @@ class SVDGF_Heatmap():
 
         self.parent = parent
         self.fit_method_name = self.parent.get_fit_method_name()
+        self.fit_weighting = self.parent.get_fit_weighting()
+        self.fit_engine = self.parent.get_fit_engine()
+        self.kinetic_scheme = self.parent.get_kinetic_scheme()
+        self.best_fit_methods_file = self.parent.best_fit_methods_file
+        self.precision = self.parent.get_precision()
         self.notebook_container_SVDGF = self.parent.nbCon_SVDGF
         self.notebook_container_diff = self.parent.nbCon_difference
 
@@ -81,19 +86,15 @@ class SVDGF_Heatmap():
 
         self.initial_fit_parameter_values = initial_fit_parameter_values
         self.colormaps_dict = colormaps_dict
+        self.saved_result_file = saved_result_file
+        self.fit_time_zero = fit_time_zero
+        self.fit_temp_resolution = fit_temp_resolution
 
         self.num_ticks = 10
         self.label_format = '{:.1f}'
 
         return None
 
-    def return_gui_to_initial_state(self):
-        self.parent.return_some_gui_widgets_to_initial_state(button=self.parent.btn_show_SVDGF_reconstructed_data_heatmap, label=self.parent.lbl_reassuring_SVDGF, tab_control=self.notebook_container_SVDGF.tab_control)
-        self.parent.return_some_gui_widgets_to_initial_state(tab_control=self.notebook_container_diff.tab_control)
-        self.delete_attributes()
-
-        return None
-
     def make_reconstruction_plot(self, update_with_selected_DAS=False):
         sns.set(font_scale = 1.3, rc={"xtick.bottom" : True, "ytick.left" : True})
 
@@ -106,9 +107,9 @@ class SVDGF_Heatmap():
             self.axes.get_figure().set_figwidth(self.parent.heatmaps_figure_geometry_list[0])
             self.axes.get_figure().set_figheight(self.parent.heatmaps_figure_geometry_list[1])
 
-        self.data = self.SVDGF_reconstructed_data.astype(float)
+        self.data = self.SVDGF_reconstructed_data
         if update_with_selected_DAS:
-            self.data = self.SVDGF_reconstructed_data_selected_DAS.astype(float)
+            self.data = self.SVDGF_reconstructed_data_selected_DAS
         self.base_filename = os.path.splitext(os.path.basename(self.filename))[0]
         self.time_index = self.time_delays.index(str(self.start_time))
         self.time_delays = self.time_delays[self.time_index:]
@@ -166,7 +167,7 @@ class SVDGF_Heatmap():
             self.axes_difference.get_figure().set_figwidth(self.parent.heatmaps_figure_geometry_list[0])
             self.axes_difference.get_figure().set_figheight(self.parent.heatmaps_figure_geometry_list[1])
 
-        self.difference_data = self.difference_matrix_selected_DAS.astype(float)
+        self.difference_data = self.difference_matrix_selected_DAS
 
         # the index of the position of self.yticks
         self.yticks = np.linspace(0, len(self.wavelengths) - 1, self.num_ticks, dtype=np.int)
@@ -212,6 +213,10 @@ class SVDGF_Heatmap():
 
     # this is done in main gui thread.
     def make_canvas(self):
+        # warnings of the fit are only shown now, in the gui thread
+        for warning in self.fit_warnings:
+            tk.messagebox.showwarning("Warning,", warning)
+
         self.make_reconstruction_plot()
         self.make_difference_plot()
 
@@ -271,7 +276,8 @@ class SVDGF_Heatmap():
 
     def compare_rightSVs_with_fit(self):
         if not self.use_user_defined_fit_function:
-            compareWindow = CompareRightSVsWithFit_Toplevel.CompareWindow(self.parent, self.use_user_defined_fit_function, self.tab_idx_difference, self.components_list, self.time_delays, self.retained_rSVs, self.retained_singular_values, self.fit_result_decay_times_as_dict, self.fit_result_amplitudes, self.filename, self.full_path_to_final_dir, start_time=self.start_time, matrix_bounds_dict=self.matrix_bounds_dict)
+            compareWindow = CompareRightSVsWithFit_Toplevel.CompareWindow(self.parent, self.use_user_defined_fit_function, self.tab_idx_difference, self.components_list, self.time_delays, self.retained_rSVs, self.retained_singular_values, self.fit_result_decay_times_as_dict, self.fit_result_amplitudes, self.filename, self.full_path_to_final_dir, start_time=self.start_time, matrix_bounds_dict=self.matrix_bounds_dict,
+                                                                            irf_parameters=get_SVDGFit_parameters.get_irf_parameters(self.resulting_SVDGF_fit_parameters))
         else:
             compareWindow = CompareRightSVsWithFit_Toplevel.CompareWindow(self.parent, self.use_user_defined_fit_function, self.tab_idx_difference, self.components_list, self.time_delays, self.retained_rSVs, self.retained_singular_values, self.fit_result_decay_times_as_dict, self.fit_result_amplitudes, self.filename, self.full_path_to_final_dir, self.parsed_summands_of_user_defined_fit_function, start_time=self.start_time, matrix_bounds_dict=self.matrix_bounds_dict)
 
@@ -314,11 +320,13 @@ class SVDGF_Heatmap():
             self.how_to_continue = self.display_toplevel_to_change_decay_times_used_for_DAS()
 
             if self.how_to_continue == "compute with old decay times":
-                self.SVDGF_reconstructed_data_selected_DAS = get_SVDGF_reconstructed_data.run(self.DAS[:,self.indeces_for_DAS_matrix], [self.user_selected_decay_times[x] for x in self.indeces_for_DAS_matrix], self.time_delays, self.wavelengths, self.indeces_for_DAS_matrix, self.start_time)
+                self.SVDGF_reconstructed_data_selected_DAS = get_SVDGF_reconstructed_data.run(self.DAS[:,self.indeces_for_DAS_matrix], [self.user_selected_decay_times[x] for x in self.indeces_for_DAS_matrix], self.time_delays, self.wavelengths, self.indeces_for_DAS_matrix, self.start_time,
+                                                                                                    **get_SVDGFit_parameters.get_irf_parameters(self.resulting_SVDGF_fit_parameters))
             if self.how_to_continue == "compute with new decay times":
-                self.SVDGF_reconstructed_data_selected_DAS = get_SVDGF_reconstructed_data.run(self.DAS[:,self.indeces_for_DAS_matrix], [self.user_selected_decay_times[x] for x in self.indeces_for_DAS_matrix], self.time_delays, self.wavelengths, self.indeces_for_DAS_matrix, self.start_time)
+                self.SVDGF_reconstructed_data_selected_DAS = get_SVDGF_reconstructed_data.run(self.DAS[:,self.indeces_for_DAS_matrix], [self.user_selected_decay_times[x] for x in self.indeces_for_DAS_matrix], self.time_delays, self.wavelengths, self.indeces_for_DAS_matrix, self.start_time,
+                                                                                                    **get_SVDGFit_parameters.get_irf_parameters(self.resulting_SVDGF_fit_parameters))
 
-            self.difference_matrix_selected_DAS = self.data_matrix.astype(float) - self.SVDGF_reconstructed_data_selected_DAS.astype(float)
+            self.difference_matrix_selected_DAS = self.data_matrix - self.SVDGF_reconstructed_data_selected_DAS
 
         except (ValueError, FloatingPointError) as error:
             tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(error)} message: \n"+ str(error)
@@ -357,170 +365,229 @@ class SVDGF_Heatmap():
         print(f"\nuser has put in useable new decay times! {self.user_selected_decay_times=}")
         return "compute with new decay times"
 
-    def get_summands_of_user_defined_fit_function_from_file(self, target_model_configuration_file):
-        try:
-            with open(target_model_configuration_file, mode='r') as dict_file:
-                summands_of_user_defined_fit_function = ast.literal_eval(dict_file.read().strip())
-        except (SyntaxError, FileNotFoundError):
-            raise ValueError("getting the user defined summands for fit function from file failed, or the dict was empty.\n"
-                            +"Check the file!\n"
-                            +"computation is discontinued!")
-
-        return summands_of_user_defined_fit_function
-
-    def parse_summands_of_user_defined_fit_function_to_actual_code(self, all_summands_dict: dict):
-        parsed_summands_list = []
-
-        selected_components_summands_dict = {}
-        for component in self.components_list:
-            selected_components_summands_dict[f"summand_component{component}"] = all_summands_dict[f"summand_component{component}"]
-
-        for summand_str in selected_components_summands_dict.values():
-            parsed_summands_list.append(self.parse_summand(summand_str))
-
-        return parsed_summands_list
+    # this is done in thread separate from gui main thread.
+    # no messageboxes here: errors of the TA_analysis_pipeline are raised and shown by the gui once the job has failed.
+    def make_data(self, job_scheduler, on_done=None, **job_options):
+        """ queues the computation of the data of this tab on job_scheduler, job_options are the keyword arguments of JobScheduler.submit.
+        A saved result is loaded in a thread. Otherwise the data is loaded in a thread and then fitted by TA_analysis_pipeline.run_SVDGF
+        in a process, its result is assigned to self in the gui thread before on_done is called. """
+        if self.saved_result_file is not None:
+            job_scheduler.submit(self.load_saved_result, on_done=on_done, **job_options)
+            return None
 
-    def parse_summand(self, summand_str: str):
-        if summand_str == "":
-            return "0"
-        summand_str_with_time_delays_parsed = summand_str.replace("t", "time_delays")
-        summand_str_with_decay_constants_parsed = summand_str_with_time_delays_parsed
-        list_of_ks_in_summand_str = re.findall(r'k\d+', summand_str_with_time_delays_parsed)
-        for k_str in list_of_ks_in_summand_str:
-            summand_str_with_decay_constants_parsed = re.sub(r'k\d+', f"taus[\"component{k_str[1:]}\"]", summand_str_with_decay_constants_parsed, count=1)
+        job_scheduler.submit(self.load_data, on_done=lambda job: self.submit_fit(job_scheduler, on_done, job_options), **job_options)
 
-        summand_str_with_brackets_added = "(" +summand_str_with_decay_constants_parsed+ ")"
+        return None
 
-        return summand_str_with_brackets_added
+    def load_data(self):
+        # the data to be fitted, the fit method and the paths to which the data of this tab is saved
+        self.TA_data = TA_analysis_pipeline.load_and_crop_data(self.filename, self.matrix_bounds_dict, self.precision)
+        self.data_matrix, self.time_delays, self.wavelengths = self.TA_data.data_matrix, self.TA_data.time_delays, self.TA_data.wavelengths
 
-    # this is done in thread separate from gui main thread.
-    def make_data(self):
-        # compute the SVDGF data for plot. the needed data (SVDGF_reconstructed_data, time_delays and wavelengths) are assigned to self
-        try:
-            self.data_matrix_complete, self.time_delays, self.wavelengths = get_TA_data_after_start_time.run(self.filename, "-999999")
-            if not self.matrix_bounds_dict == {}:
-                self.data_matrix = self.data_matrix_complete[self.min_wavelength_index:self.max_wavelength_index+1, self.min_time_delay_index:self.max_time_delay_index+1]
-                self.time_delays = self.time_delays[self.min_time_delay_index:self.max_time_delay_index+1]
-                self.wavelengths = self.wavelengths[self.min_wavelength_index:self.max_wavelength_index+1]
-            else:
-                self.data_matrix = self.data_matrix_complete
+        # set start time to the actual time delay that is closest to user input (is used in tab title)
+        self.start_time = self.TA_data.start_time
 
-            # set start time to the actual time delay that is closest to user input (is used in tab title)
-            self.start_time = self.time_delays[0]
+        # already set paths to which data from this data object is to be saved - this way the path stays the same
+        # and can also be used in corresponding Toplevel classes!
+        # i can not do this in __init__, as there the start time is not corrected yet!
+        self.date_dir, self.final_dir = saveData.get_directory_paths(self.start_time, self.tab_idx, components=self.components_list)
+        self.base_directory = os.getcwd()
+        self.full_path_to_final_dir = saveData.get_final_path(self.base_directory, self.date_dir, "/SVDGF_reconstruction_data/", self.final_dir, self.filename)
 
-            # already set paths to which data from this data object is to be saved - this way the path stays the same
-            # and can also be used in corresponding Toplevel classes!
-            # i can not do this in __init__, as there the start time is not corrected yet!
-            self.date_dir, self.final_dir = saveData.get_directory_paths(self.start_time, self.tab_idx, components=self.components_list)
-            self.base_directory = os.getcwd()
-            self.full_path_to_final_dir = saveData.get_final_path(self.base_directory, self.date_dir, "/SVDGF_reconstruction_data/", self.final_dir, self.filename)
+        # "auto": the best method of the last fit method race of this kind of fit
+        self.fit_method_name = TA_analysis_pipeline.resolve_fit_method(self.fit_method_name, self.best_fit_methods_file, self.components_list, self.temp_resolution,
+                                                                        self.use_user_defined_fit_function, self.fit_weighting)
 
-        except ValueError as error:
-            tk.messagebox.showerror("Warning,", "an exception occurred!""\nProbably due to a problem with the entered start time!\n"+
-                                    f"Exception {type(error)} message: \n"+ str(error)+"\n")
-
-            self.return_gui_to_initial_state()
-            return None
+        return None
 
-        # get the selected rSVs, singular values and lSVs - input is TA data after time and self.components_list
-        self.retained_rSVs, self.retained_lSVs, self.retained_singular_values = get_retained_rightSVs_leftSVs_singularvs.run(self.data_matrix, self.components_list)
+    def submit_fit(self, job_scheduler, on_done, job_options):
+        # SVD, fit (with the user defined fit function if the corresponding checkbox in main gui is checked), DAS and reconstruction.
+        # runs in a process, so the gui and the thread jobs are not slowed down by the fit
+        job_scheduler.submit(TA_analysis_pipeline.run_SVDGF, self.filename, self.components_list, self.initial_fit_parameter_values, time_zero=self.time_zero, temp_resolution=self.temp_resolution,
+                                target_model_configuration_file=self.target_model_configuration_file if self.use_user_defined_fit_function else None,
+                                fit_method_name=self.fit_method_name, indeces_for_DAS_matrix=self.indeces_for_DAS_matrix, ta_data=self.TA_data,
+                                fit_time_zero=self.fit_time_zero, fit_temp_resolution=self.fit_temp_resolution, weighting=self.fit_weighting,
+                                fit_engine=self.fit_engine, kinetic_scheme=self.kinetic_scheme, executor_type="process",
+                                on_done=lambda job: self.assign_SVDGF_result_when_job_done(job, on_done), **job_options)
 
-        # get the parsed summands of user defined fit function, if the corresponding checkbox in main gui is checked:
-        self.parsed_summands_of_user_defined_fit_function = []
-        if self.use_user_defined_fit_function:
-            try:
-                self.summands_of_user_defined_fit_function = self.get_summands_of_user_defined_fit_function_from_file(self.target_model_configuration_file)
-                self.parsed_summands_of_user_defined_fit_function = self.parse_summands_of_user_defined_fit_function_to_actual_code(self.summands_of_user_defined_fit_function)
-            except (ValueError, KeyError) as error:
-                tk.messagebox.showerror("Warning,", "an exception occurred!""\nProbably due to a problem with the user defined fit function file!\n"+
-                                    f"Exception {type(error)} message: \n"+ str(error)+"\n")
+        return None
 
-                self.return_gui_to_initial_state()
-                return None
+    def assign_SVDGF_result_when_job_done(self, job, on_done):
+        self.assign_SVDGF_result(job.result)
+        # the finished job is kept in the job list, it should not keep the result alive
+        job.result = None
+        if on_done is not None:
+            on_done(job)
 
-        # do the fit: input: selected rSVs and singular values, self.temp_resolution, self.components_list - output: decay constants, amplitudes
-        try:
-            self.fit_result, self.resulting_SVDGF_fit_parameters = get_SVDGFit_parameters.run(self.retained_rSVs, self.retained_singular_values, self.components_list, self.time_delays, self.start_time, self.initial_fit_parameter_values, self.time_zero, self.temp_resolution, parsed_user_defined_summands=self.parsed_summands_of_user_defined_fit_function, fit_method_name=self.fit_method_name)
-        except (ValueError,TypeError) as error:
-            if str(error) == "":
-                tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(error)} message: \n"+ str(error)+ "\n"+
-                                        "\nProbably due to a ValueError occurring in fit down the line, \ni.e.: the fit might not have converged. "
-                                        +"\n\nMaybe try it with another fit method (Fit method menu) or changed initial fit parameter values (button in bottom left corner),"
-                                        +" or another start time-value or another set of components ...")
-            else: tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(error)} message: \n"+ str(error))
-
-            self.return_gui_to_initial_state()
-            return None
+        return None
 
-        # get the DAS: input: selected lSVs and resulting amplitudes
-        self.DAS = get_DAS_from_lSVs_res_amplitudes.run(self.retained_lSVs, self.resulting_SVDGF_fit_parameters, self.components_list, self.wavelengths, self.filename, self.start_time)
-
-        # get the SVD-GFit reconstructed data: inputs: DAS, resulting decay consts
-        try:
-            self.fit_result_decay_times = ['{:.9f}'.format(self.resulting_SVDGF_fit_parameters['tau_component%i' % (j)].value) for j in self.components_list]
-            self.fit_result_amplitudes = {}
-            self.fit_result_decay_times_as_dict = {}
-            for component in self.components_list:
-                self.fit_result_decay_times_as_dict[f"tau_component{component}"] = self.resulting_SVDGF_fit_parameters[f"tau_component{component}"].value
-                for component_index in range(len(self.components_list)):
-                    self.fit_result_amplitudes[f"amp_rSV{component_index}_component{component}"] = self.resulting_SVDGF_fit_parameters[f"amp_rSV{component_index}_component{component}"].value
-
-            self.SVDGF_reconstructed_data = get_SVDGF_reconstructed_data.run(self.DAS[:,self.indeces_for_DAS_matrix], [self.fit_result_decay_times[x] for x in self.indeces_for_DAS_matrix], self.time_delays, self.wavelengths, self.indeces_for_DAS_matrix, self.start_time)
-        except (ValueError,FloatingPointError) as error:
-            tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(error)} message: \n"+ str(error)
-                                    +"\nif FloatingPointError: probably happened in "+ str(os.path.basename(get_SVDGF_reconstructed_data.__file__))
-                                    +"\n\nLikely due to some error in fit procedure which lead to very small fitted decay constants in course of which we get numbers like exp(-bigNumber),"
-                                    +" which underflows a float."
-                                    +f"\n{self.fit_result_decay_times=}"
-                                    +"\n\nMaybe try it with another fit method (Fit method Menu) or changed initial fit parameter values (button in bottom left corner),"
-                                    +" or another set of components or another start time-value...")
-            self.return_gui_to_initial_state()
-            return None
+    def assign_SVDGF_result(self, SVDGF_result):
+        """ the data for the plots (SVDGF_reconstructed_data, DAS, ...) from the result of TA_analysis_pipeline.run_SVDGF. """
+        self.SVDGF_result = SVDGF_result
+        # the data matrix has been copied to the process of the fit, use the one of the result from now on
+        self.TA_data = self.SVDGF_result.data
+        self.data_matrix, self.time_delays, self.wavelengths = self.TA_data.data_matrix, self.TA_data.time_delays, self.TA_data.wavelengths
+
+        self.retained_rSVs = self.SVDGF_result.components.retained_rSVs
+        self.retained_lSVs = self.SVDGF_result.components.retained_lSVs
+        self.retained_singular_values = self.SVDGF_result.components.retained_singular_values
+        self.parsed_summands_of_user_defined_fit_function = self.SVDGF_result.fit.parsed_user_defined_summands
+        self.fit_result = self.SVDGF_result.fit.fit_result
+        self.resulting_SVDGF_fit_parameters = self.SVDGF_result.fit.fit_params
+        self.fit_warnings = self.SVDGF_result.fit.warnings
+        # None for an unweighted fit
+        self.noise_weights = self.SVDGF_result.fit.noise_weights
+        self.DAS = self.SVDGF_result.DAS
+        self.fit_result_decay_times = self.SVDGF_result.fit.decay_times
+        self.fit_result_decay_times_as_dict = self.SVDGF_result.fit.decay_times_as_dict
+        self.fit_result_amplitudes = self.SVDGF_result.fit.amplitudes
+        self.SVDGF_reconstructed_data = self.SVDGF_result.SVDGF_reconstructed_data
+        # None without a kinetic scheme
+        self.SAS = self.SVDGF_result.SAS
+        self.populations = self.SVDGF_result.populations
+        self.kinetic_scheme_description = None if self.SVDGF_result.kinetic_scheme is None else self.SVDGF_result.kinetic_scheme.get_description()
 
         # the difference matrix between full reconstruction data and original data
-        self.difference_matrix = self.data_matrix.astype(float) - self.SVDGF_reconstructed_data.astype(float)
+        self.difference_matrix = self.data_matrix - self.SVDGF_reconstructed_data
         # the difference matrix between reconstruction data using only selected DAS and original data
         # is used in Kinetics_Spectrum_Toplevel class, thus i set it here already
         self.difference_matrix_selected_DAS = self.difference_matrix
 
         return None
 
+    def load_saved_result(self):
+        """ reopen a result saved in binary format, neither the fit nor the reconstruction is recomputed. """
+        arrays, metadata = saveData.load_result_data_binary(self.saved_result_file)
+        if metadata["result_type"] != "SVDGF":
+            raise ValueError(f"{self.saved_result_file} contains a {metadata['result_type']} result, not an SVDGF result.")
+
+        self.data_matrix = arrays["data_matrix"]
+        self.time_delays = arrays["time_delays"].tolist()
+        self.wavelengths = arrays["wavelengths"].tolist()
+        self.start_time = metadata["start_time"]
+        self.fit_method_name = metadata["fit_method"]
+        self.fit_weighting = metadata.get("fit_weighting", "none")
+        self.fit_engine = metadata.get("fit_engine", "SVD vectors")
+        self.kinetic_scheme_description = metadata.get("kinetic_scheme")
+
+        self.retained_rSVs = arrays["retained_right_SVs"]
+        self.retained_lSVs = arrays["retained_left_SVs"]
+        self.retained_singular_values = arrays["retained_sing_values"]
+        self.parsed_summands_of_user_defined_fit_function = metadata.get("parsed_summands_of_user_defined_fit_function", [])
+
+        # the minimizer result itself is not saved, only its report and the fitted parameters
+        self.fit_result = None
+        self.fit_report = metadata["fit_report_complete"]
+        self.fit_statistics = (metadata.get("chisqr"), metadata.get("redchi"))
+        self.resulting_SVDGF_fit_parameters = lmfit.Parameters().loads(metadata["fit_parameters"])
+        # the warnings have already been shown when the fit was computed
+        self.fit_warnings = []
+        self.fit_result_decay_times, self.fit_result_decay_times_as_dict, self.fit_result_amplitudes = TA_analysis_pipeline.get_decay_times_and_amplitudes(self.resulting_SVDGF_fit_parameters, self.components_list)
+        # results saved before the noise weights were saved do not have them
+        self.noise_weights = None
+        if "wavelength_noise" in arrays:
+            self.noise_weights = get_noise_weights.NoiseWeights(arrays["wavelength_noise"], arrays["time_noise"], self.fit_weighting)
+
+        self.DAS = arrays["DAS"]
+        self.SAS = arrays.get("SAS")
+        self.populations = arrays.get("populations")
+        self.SVDGF_reconstructed_data = arrays["SVDGF_reconstruction_matrix"]
+        self.difference_matrix = arrays["difference_matrix"]
+        self.difference_matrix_selected_DAS = self.difference_matrix
+
+        # saving again writes into the directory the result was loaded from
+        self.full_path_to_final_dir = os.path.dirname(os.path.abspath(self.saved_result_file))
+
+        return None
+
+    def get_fit_report(self):
+        if self.fit_result is None:
+            return self.fit_report
+        return lmfit.fit_report(self.fit_result)
+
+    def get_fit_statistics(self):
+        """ chi-square and reduced chi-square of the fit. """
+        if self.fit_result is None:
+            return self.fit_statistics
+        return self.fit_result.chisqr, self.fit_result.redchi
+
+    def get_uncertainty_inputs(self):
+        """ the keyword arguments of get_SVDGFit_uncertainties.run for this fit, also for a reopened result.
+        None for a reopened weighted fit whose noise weights were not saved, its uncertainties can not be estimated. """
+        if self.fit_weighting != "none" and self.noise_weights is None:
+            return None
+        return {"retained_rSVs": self.retained_rSVs, "retained_singular_values": self.retained_singular_values, "retained_lSVs": self.retained_lSVs,
+                "retained_components": self.components_list, "time_delays": self.time_delays, "fit_params": self.resulting_SVDGF_fit_parameters,
+                "data_matrix": self.data_matrix, "parsed_user_defined_summands": self.parsed_summands_of_user_defined_fit_function, "fit_method_name": self.fit_method_name,
+                "noise_weights": self.noise_weights}
+
+    def get_race_inputs(self):
+        """ the keyword arguments of TA_analysis_pipeline.race_fit_methods for this fit, None for a reopened result (its SVD is not saved with the fit). """
+        if getattr(self, "SVDGF_result", None) is None:
+            return None
+        return {"SVDGF_result": self.SVDGF_result, "initial_fit_parameter_values": self.initial_fit_parameter_values, "time_zero": self.time_zero,
+                "temp_resolution": self.temp_resolution, "fit_time_zero": self.fit_time_zero, "fit_temp_resolution": self.fit_temp_resolution}
+
     def save_data_to_file(self):
         print(f"\nsaving data: SVDGF reconstruction object at tab: {self.tab_idx+1}\n")
 
-        # check if directory exists:
-        if not os.path.exists(self.full_path_to_final_dir):
-            os.makedirs(self.full_path_to_final_dir)
+        # the figures and data are written in the background, the save task takes a snapshot of them now
+        save_task = BackgroundWriter.SaveTask(f"SVDGF tab {self.tab_idx+1}", self.full_path_to_final_dir)
 
         # save data
         today = datetime.now() # including the time of saving into figure file name to prevent overwriting figure files if all DAS are used
-        self.notebook_container_SVDGF.figs[self.tab_idx].savefig(self.full_path_to_final_dir+"/reconstruction_heatmap_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S"))+".png")
-        self.notebook_container_diff.figs[self.tab_idx_difference].savefig(self.full_path_to_final_dir+"/difference_heatmap_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S"))+".png")
-        saveData.make_log_file(self.full_path_to_final_dir, filename=self.filename, start_time=self.start_time, components=self.components_list, matrix_bounds_dict=self.matrix_bounds_dict, use_user_defined_fit_function=self.use_user_defined_fit_function)
-        self.result_data_to_save = {"retained_sing_values": self.retained_singular_values, "DAS": self.DAS, "fit_report_complete": lmfit.fit_report(self.fit_result), "time_delays": self.time_delays, "wavelengths": self.wavelengths, "retained_left_SVs": self.retained_lSVs, "retained_right_SVs": self.retained_rSVs}
+        save_task.add_figure(self.notebook_container_SVDGF.figs[self.tab_idx], self.full_path_to_final_dir+"/reconstruction_heatmap_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S"))+".png")
+        save_task.add_figure(self.notebook_container_diff.figs[self.tab_idx_difference], self.full_path_to_final_dir+"/difference_heatmap_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S"))+".png")
+        save_task.add(saveData.make_log_file, self.full_path_to_final_dir, filename=self.filename, start_time=self.start_time, components=self.components_list, matrix_bounds_dict=self.matrix_bounds_dict, use_user_defined_fit_function=self.use_user_defined_fit_function,
+                        time_zero=self.time_zero, temp_resolution=self.temp_resolution, fit_time_zero=self.fit_time_zero, fit_temp_resolution=self.fit_temp_resolution, fit_weighting=self.fit_weighting,
+                        fit_engine=self.fit_engine, kinetic_scheme=self.kinetic_scheme_description)
+        self.result_data_to_save = {"retained_sing_values": self.retained_singular_values, "DAS": self.DAS, "fit_report_complete": self.get_fit_report(), "time_delays": self.time_delays, "wavelengths": self.wavelengths, "retained_left_SVs": self.retained_lSVs, "retained_right_SVs": self.retained_rSVs}
+        if self.SAS is not None:
+            self.result_data_to_save.update({"SAS": self.SAS, "populations": self.populations})
         if self.parsed_summands_of_user_defined_fit_function: # if dictionary with parsed user defined fit function exists, add it to data to be saved.
             self.result_data_to_save["parsed_summands_of_user_defined_fit_function"] = self.parsed_summands_of_user_defined_fit_function
-        saveData.save_result_data(self.full_path_to_final_dir, self.result_data_to_save)
+        save_format = self.parent.get_save_format()
+        chisqr, redchi = self.get_fit_statistics()
 
-        # save data matrices
-        try:
-            self.data_matrices_to_save = {"SVDGF_reconstruction_matrix": self.SVDGF_reconstructed_data.T, "difference_matrix": self.difference_data.T, "data_matrix": self.data_matrix.T, "difference_matrix_selected_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S")): self.difference_matrix_selected_DAS.T, "SVDGF_reconstructed_data_selected_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S")): self.SVDGF_reconstructed_data_selected_DAS.T}
-        except AttributeError:
-            self.data_matrices_to_save = {"SVDGF_reconstruction_matrix": self.SVDGF_reconstructed_data.T, "difference_matrix": self.difference_data.T, "data_matrix": self.data_matrix.T, "difference_matrix_selected_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S")): self.difference_matrix_selected_DAS.T}
-        saveData.save_formatted_data_matrix_after_time(self.full_path_to_final_dir, self.time_delays, self.wavelengths, self.data_matrices_to_save)
+        if saveData.save_text_formats(save_format):
+            save_task.add(saveData.save_result_data, self.full_path_to_final_dir, self.result_data_to_save)
+
+            # save data matrices
+            try:
+                self.data_matrices_to_save = {"SVDGF_reconstruction_matrix": self.SVDGF_reconstructed_data.T, "difference_matrix": self.difference_data.T, "data_matrix": self.data_matrix.T, "difference_matrix_selected_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S")): self.difference_matrix_selected_DAS.T, "SVDGF_reconstructed_data_selected_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S")): self.SVDGF_reconstructed_data_selected_DAS.T}
+            except AttributeError:
+                self.data_matrices_to_save = {"SVDGF_reconstruction_matrix": self.SVDGF_reconstructed_data.T, "difference_matrix": self.difference_data.T, "data_matrix": self.data_matrix.T, "difference_matrix_selected_DAS"+str(self.indeces_for_DAS_matrix)+"_"+str(today.strftime("%H_%M_%S")): self.difference_matrix_selected_DAS.T}
+            save_task.add(saveData.save_formatted_data_matrix_after_time, self.full_path_to_final_dir, self.time_delays, self.wavelengths, self.data_matrices_to_save)
+
+        if saveData.save_binary_format(save_format):
+            # the complete result, the user selected DAS views can be recomputed from it
+            arrays_to_save = {name: value for name, value in self.result_data_to_save.items() if name not in ("fit_report_complete", "parsed_summands_of_user_defined_fit_function")}
+            arrays_to_save.update({"SVDGF_reconstruction_matrix": self.SVDGF_reconstructed_data, "difference_matrix": self.difference_matrix, "data_matrix": self.data_matrix})
+            if self.noise_weights is not None:
+                # needed to estimate the uncertainties of a reopened weighted fit
+                arrays_to_save.update({"wavelength_noise": self.noise_weights.wavelength_noise, "time_noise": self.noise_weights.time_noise})
+            metadata = {"filename": self.filename, "start_time": self.start_time, "components": self.components_list, "matrix_bounds_dict": self.matrix_bounds_dict,
+                        "use_user_defined_fit_function": self.use_user_defined_fit_function, "fit_method": self.fit_method_name, "time_zero": self.time_zero, "temp_resolution": self.temp_resolution,
+                        "fit_time_zero": self.fit_time_zero, "fit_temp_resolution": self.fit_temp_resolution, "fit_weighting": self.fit_weighting, "fit_engine": self.fit_engine,
+                        "kinetic_scheme": self.kinetic_scheme_description, "target_model_configuration_file": self.target_model_configuration_file, "fit_parameters": self.resulting_SVDGF_fit_parameters.dumps(),
+                        "fit_report_complete": self.result_data_to_save["fit_report_complete"], "parsed_summands_of_user_defined_fit_function": self.parsed_summands_of_user_defined_fit_function,
+                        "chisqr": chisqr, "redchi": redchi}
+            save_task.add(saveData.save_result_data_binary, self.full_path_to_final_dir, "SVDGF", arrays_to_save, metadata)
+
+        # only indexed once all files are written
+        save_task.add(ResultsIndex.add_result, ResultsIndex.get_index_path(self.parent.base_directory), "SVDGF", self.filename, self.full_path_to_final_dir, start_time=self.start_time,
+                        matrix_bounds_dict=self.matrix_bounds_dict, components=self.components_list, fit_method=self.fit_method_name, use_target_model=self.use_user_defined_fit_function,
+                        decay_times=ResultsIndex.get_decay_times_with_stderrs(self.resulting_SVDGF_fit_parameters, self.components_list), chisqr=chisqr, redchi=redchi,
+                        binary_file=self.full_path_to_final_dir+"/"+saveData.BINARY_RESULT_FILENAME if saveData.save_binary_format(save_format) else None)
+
+        self.parent.save_in_background(save_task)
 
         return None
 
     # to delete instance attributes to free up memory. is called when tab is removed.
     def delete_attributes(self):
-        attr_lst = list(vars(self))
-        for attr in attr_lst:
-            delattr(self, attr)
-
-        del attr_lst
-        del self
-
-        gc.collect()
+        # the widgets of the tab are destroyed, all attributes dropped and the garbage collected once
+        MemoryAccounting.release(self)
 
         return None
 
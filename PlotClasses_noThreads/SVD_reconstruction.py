@@ -2,19 +2,18 @@
 # -*- coding: utf-8 -*-
 """ A module to produce a plot of SVD-reconstructed data on the GUI"""
 
-import gc
 import numpy as np
 import seaborn as sns
 import tkinter as tk
 import os
 
 # my own modules
-from FunctionsUsedByPlotClasses import get_TA_data_after_start_time, get_SVD_reconstructed_data_for_GUI, get_retained_rightSVs_leftSVs_singularvs, get_retained_rightSVs_leftSVs_singularvs
-from SupportClasses import ToolTip, saveData, SmallToolbar
+from FunctionsUsedByPlotClasses import TA_analysis_pipeline
+from SupportClasses import ToolTip, saveData, SmallToolbar, BackgroundWriter, ResultsIndex, MemoryAccounting
 from ToplevelClasses import Kinetics_Spectrum_Toplevel
 
 class SVD_Heatmap():
-    def __init__(self, parent, filename, matrix_bounds_dict, components_list, tab_idx, tab_idx_difference, colormaps_dict):
+    def __init__(self, parent, filename, matrix_bounds_dict, components_list, tab_idx, tab_idx_difference, colormaps_dict, saved_result_file=None):
         """ A class to produce a plot of SVD-reconstructed data on the GUI:\n\n
             * parent is the Gui App that creates the instance of this class\n
             * filename is the full path of the datafile to be reconstructed\n
@@ -22,9 +21,13 @@ class SVD_Heatmap():
             * components_list is a list of integers that represent the SVD components to be used for the reconstruction\n
             * tab_idx is used to put the plot on the correct that of the ttk notebook of the GUI\n
             * tab_idx_difference is the the same as tab_idx but used with the difference notebook\n
-            * colormaps_dict (dict): dictionary containing the colormap names for the heatmaps\n\n
+            * colormaps_dict (dict): dictionary containing the colormap names for the heatmaps\n
+            * saved_result_file (str, optional): a result_data.npz saved by this class, if given, the result is loaded from it instead of being computed\n\n
         """
         self.parent = parent
+        self.precision = self.parent.get_precision()
+        # None unless the SVD of growing data files is to be updated incrementally
+        self.SVD_cache = self.parent.get_SVD_cache()
         self.notebook_container_SVD = self.parent.nbCon_SVD
         self.notebook_container_diff = self.parent.nbCon_difference
 
@@ -39,6 +42,7 @@ class SVD_Heatmap():
         self.tab_idx_difference = tab_idx_difference
         self.components_list = components_list
         self.colormaps_dict = colormaps_dict
+        self.saved_result_file = saved_result_file
 
         self.num_ticks = 10
         self.label_format = '{:.1f}'
@@ -53,7 +57,7 @@ class SVD_Heatmap():
         self.axes.get_figure().set_figwidth(self.parent.heatmaps_figure_geometry_list[0])
         self.axes.get_figure().set_figheight(self.parent.heatmaps_figure_geometry_list[1])
 
-        self.data = self.SVD_reconstructed_data.astype(float)
+        self.data = self.SVD_reconstructed_data
         self.base_filename = os.path.splitext(os.path.basename(self.filename))[0]
         self.time_index = self.time_delays.index(str(self.start_time))
         self.time_delays = self.time_delays[self.time_index:]
@@ -103,7 +107,7 @@ class SVD_Heatmap():
         self.axes_difference.get_figure().set_figwidth(self.parent.heatmaps_figure_geometry_list[0])
         self.axes_difference.get_figure().set_figheight(self.parent.heatmaps_figure_geometry_list[1])
 
-        self.difference_data = self.difference_matrix.astype(float)
+        self.difference_data = self.difference_matrix
 
         # the index of the position of self.yticks
         self.yticks = np.linspace(0, len(self.wavelengths) - 1, self.num_ticks, dtype=np.int)
@@ -195,78 +199,98 @@ class SVD_Heatmap():
         return None
 
     # this is done in thread separate from gui main thread.
+    # no messageboxes here: errors of the TA_analysis_pipeline are raised and shown by the gui once the job has failed.
     def make_data(self):
-        try:
-            self.data_matrix_complete, self.time_delays, self.wavelengths = get_TA_data_after_start_time.run(self.filename, "-999999")
-            if not self.matrix_bounds_dict == {}:
-                self.data_matrix = self.data_matrix_complete[self.min_wavelength_index:self.max_wavelength_index+1, self.min_time_delay_index:self.max_time_delay_index+1]
-                self.time_delays = self.time_delays[self.min_time_delay_index:self.max_time_delay_index+1]
-                self.wavelengths = self.wavelengths[self.min_wavelength_index:self.max_wavelength_index+1]
-            else:
-                self.data_matrix = self.data_matrix_complete
+        if self.saved_result_file is not None:
+            self.load_saved_result()
+            return None
 
-            # set start time to the actual time delay that is closest to user input (is used in tab title)
-            self.start_time = self.time_delays[0]
+        self.TA_data = TA_analysis_pipeline.load_and_crop_data(self.filename, self.matrix_bounds_dict, self.precision)
+        self.data_matrix, self.time_delays, self.wavelengths = self.TA_data.data_matrix, self.TA_data.time_delays, self.TA_data.wavelengths
 
-            # already set paths to which data from this data object is to be saved - this way the path stays the same
-            # and can also be used in corresponding Toplevel classes!
-            # i can not do this in __init__, as there the start time is not corrected yet!
-            self.date_dir, self.final_dir = saveData.get_directory_paths(self.start_time, self.tab_idx, components=self.components_list)
-            self.base_directory = os.getcwd()
-            self.full_path_to_final_dir = saveData.get_final_path(self.base_directory, self.date_dir, "/SVD_reconstruction_data/", self.final_dir, self.filename)
+        # set start time to the actual time delay that is closest to user input (is used in tab title)
+        self.start_time = self.TA_data.start_time
 
-        except ValueError as error:
-            tk.messagebox.showerror("Warning,", "an exception occurred!""\nProbably due to a problem with the entered start time!\n"+
-                                    f"Exception {type(error)} message: \n"+ str(error)+"\n")
+        # already set paths to which data from this data object is to be saved - this way the path stays the same
+        # and can also be used in corresponding Toplevel classes!
+        # i can not do this in __init__, as there the start time is not corrected yet!
+        self.date_dir, self.final_dir = saveData.get_directory_paths(self.start_time, self.tab_idx, components=self.components_list)
+        self.base_directory = os.getcwd()
+        self.full_path_to_final_dir = saveData.get_final_path(self.base_directory, self.date_dir, "/SVD_reconstruction_data/", self.final_dir, self.filename)
 
-            # return gui to initial state if above data preparation failed
-            self.parent.return_some_gui_widgets_to_initial_state(button=self.parent.btn_show_SVD_reconstructed_data_heatmap, label=self.parent.lbl_reassuring_SVD, tab_control=self.notebook_container_SVD.tab_control)
-            self.parent.return_some_gui_widgets_to_initial_state(tab_control=self.notebook_container_diff.tab_control)
+        # the retained rSVs, singular values and lSVs as well as the reconstruction from them
+        self.SVD_result = TA_analysis_pipeline.get_SVD_reconstruction(self.TA_data, self.components_list, SVD_cache=self.SVD_cache)
+        self.retained_rSVs = self.SVD_result.components.retained_rSVs
+        self.retained_lSVs = self.SVD_result.components.retained_lSVs
+        self.retained_singular_values = self.SVD_result.components.retained_singular_values
+        self.SVD_reconstructed_data = self.SVD_result.SVD_reconstructed_data
+        self.singular_values, self.U_matrix, self.VT_matrix = self.SVD_result.singular_values, self.SVD_result.U_matrix, self.SVD_result.VT_matrix
+        self.difference_matrix = self.SVD_result.difference_matrix
 
-            self.delete_attributes()
-            return None
+        return None
+
+    def load_saved_result(self):
+        """ reopen a result saved in binary format, nothing is recomputed. """
+        arrays, metadata = saveData.load_result_data_binary(self.saved_result_file)
+        if metadata["result_type"] != "SVD":
+            raise ValueError(f"{self.saved_result_file} contains a {metadata['result_type']} result, not an SVD result.")
 
-        # get the selected rSVs, singular values and lSVs - input is TA data after time and self.components_list
-        self.retained_rSVs, self.retained_lSVs, self.retained_singular_values = get_retained_rightSVs_leftSVs_singularvs.run(self.data_matrix, self.components_list)
+        self.data_matrix = arrays["data_matrix"]
+        self.time_delays = arrays["time_delays"].tolist()
+        self.wavelengths = arrays["wavelengths"].tolist()
+        self.start_time = metadata["start_time"]
 
-        self.SVD_reconstructed_data, self.singular_values, self.U_matrix, self.VT_matrix = get_SVD_reconstructed_data_for_GUI.run(self.data_matrix, self.components_list)
+        self.retained_rSVs = arrays["retained_right_SVs"]
+        self.retained_lSVs = arrays["retained_left_SVs"]
+        self.retained_singular_values = arrays["retained_sing_values"]
+        self.SVD_reconstructed_data = arrays["SVD_reconstruction_matrix"]
+        self.singular_values, self.U_matrix, self.VT_matrix = arrays["singular_values"], arrays["U_matrix"], arrays["VT_matrix"]
+        self.difference_matrix = arrays["difference_matrix"]
 
-        self.difference_matrix = self.data_matrix.astype(float) - self.SVD_reconstructed_data.astype(float)
+        # saving again writes into the directory the result was loaded from
+        self.full_path_to_final_dir = os.path.dirname(os.path.abspath(self.saved_result_file))
 
         return None
 
     def save_data_to_file(self):
         print(f"\nsaving data: SVD reconstruction object at tab: {self.tab_idx+1}\n")
 
-        # check if directory exists:
-        if not os.path.exists(self.full_path_to_final_dir):
-            os.makedirs(self.full_path_to_final_dir)
+        # the figures and data are written in the background, the save task takes a snapshot of them now
+        save_task = BackgroundWriter.SaveTask(f"SVD tab {self.tab_idx+1}", self.full_path_to_final_dir)
 
         # save data
-        self.notebook_container_SVD.figs[self.tab_idx].savefig(self.full_path_to_final_dir+"/SVD_reconstruction_heatmap.png")
-        self.notebook_container_diff.figs[self.tab_idx_difference].savefig(self.full_path_to_final_dir+"/SVD_difference_heatmap.png")
+        save_task.add_figure(self.notebook_container_SVD.figs[self.tab_idx], self.full_path_to_final_dir+"/SVD_reconstruction_heatmap.png")
+        save_task.add_figure(self.notebook_container_diff.figs[self.tab_idx_difference], self.full_path_to_final_dir+"/SVD_difference_heatmap.png")
 
-        saveData.make_log_file(self.full_path_to_final_dir, filename=self.filename, start_time=self.start_time, components=self.components_list, matrix_bounds=self.matrix_bounds_dict)
+        save_task.add(saveData.make_log_file, self.full_path_to_final_dir, filename=self.filename, start_time=self.start_time, components=self.components_list, matrix_bounds=self.matrix_bounds_dict)
 
         self.result_data_to_save = {"time_delays": self.time_delays, "wavelengths": self.wavelengths, "singular_values": self.singular_values, "U_matrix": self.U_matrix, "VT_matrix": self.VT_matrix, "retained_right_SVs": self.retained_rSVs, "retained_left_SVs": self.retained_lSVs, "retained_sing_values": self.retained_singular_values,}
-        saveData.save_result_data(self.full_path_to_final_dir, self.result_data_to_save)
+        save_format = self.parent.get_save_format()
 
-        # save data matrices
-        self.data_matrices_to_save = {"SVD_reconstruction_matrix": self.SVD_reconstructed_data.T, "difference_matrix": self.difference_data.T, "data_matrix": self.data_matrix.T}
-        saveData.save_formatted_data_matrix_after_time(self.full_path_to_final_dir, self.time_delays, self.wavelengths, self.data_matrices_to_save)
+        if saveData.save_text_formats(save_format):
+            save_task.add(saveData.save_result_data, self.full_path_to_final_dir, self.result_data_to_save)
+
+            # save data matrices
+            self.data_matrices_to_save = {"SVD_reconstruction_matrix": self.SVD_reconstructed_data.T, "difference_matrix": self.difference_data.T, "data_matrix": self.data_matrix.T}
+            save_task.add(saveData.save_formatted_data_matrix_after_time, self.full_path_to_final_dir, self.time_delays, self.wavelengths, self.data_matrices_to_save)
+
+        if saveData.save_binary_format(save_format):
+            arrays_to_save = dict(self.result_data_to_save, SVD_reconstruction_matrix=self.SVD_reconstructed_data, difference_matrix=self.difference_matrix, data_matrix=self.data_matrix)
+            save_task.add(saveData.save_result_data_binary, self.full_path_to_final_dir, "SVD", arrays_to_save, {"filename": self.filename, "start_time": self.start_time, "components": self.components_list, "matrix_bounds_dict": self.matrix_bounds_dict})
+
+        # only indexed once all files are written
+        save_task.add(ResultsIndex.add_result, ResultsIndex.get_index_path(self.parent.base_directory), "SVD", self.filename, self.full_path_to_final_dir, start_time=self.start_time,
+                        matrix_bounds_dict=self.matrix_bounds_dict, components=self.components_list,
+                        binary_file=self.full_path_to_final_dir+"/"+saveData.BINARY_RESULT_FILENAME if saveData.save_binary_format(save_format) else None)
+
+        self.parent.save_in_background(save_task)
 
         return None
 
     # to delete instance attributes to free up memory.
     def delete_attributes(self):
-        attr_lst = list(vars(self))
-        for attr in attr_lst:
-            delattr(self, attr)
-
-        del attr_lst
-        del self
-
-        gc.collect()
+        # the widgets of the tab are destroyed, all attributes dropped and the garbage collected once
+        MemoryAccounting.release(self)
 
         return None
 
@@ -0,0 +1,79 @@
+""" benchmark of MultiExcitation.compute_data_matrix (element wise loops) against compute_data_matrix_vectorized.\n
+For each matrix size the components and noise of the input config file are simulated with both methods.
+Besides the run times, the mean and std deviation of (simulated data - noiseless model) are printed for both,
+which have to agree (up to sampling error) as both use the same statistical model.
+
+usage (from within the SimulateData directory):
+    python benchmark_sim_MultiExcitation.py --sizes 50 100 200 1000 --max-loop-size 200
+"""
+
+import argparse
+import ast
+import configparser
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import sim_MultiExcitation
+
+def write_config_file_with_size(template_config_file, nr_of_steps, directory):
+    """ copy of template_config_file with step sizes such that the data matrix has about nr_of_steps x nr_of_steps elements. """
+    conf_parser = configparser.ConfigParser()
+    conf_parser.read(template_config_file)
+
+    for range_key, step_key in [("wavelength_range", "wavelength_stepsize"), ("time_range", "time_stepsize")]:
+        interval = ast.literal_eval(conf_parser["matrix_dimensions"][range_key])
+        conf_parser["matrix_dimensions"][step_key] = str((interval[1] - interval[0]) / nr_of_steps)
+
+    config_file = os.path.join(directory, f"benchmark_{nr_of_steps}.ini")
+    with open(config_file, "w") as file:
+        conf_parser.write(file)
+
+    return config_file
+
+def get_noiseless_data_matrix(simulation):
+    noiseless_data_matrix = np.zeros_like(simulation.data_matrix)
+    for component in range(simulation.nr_of_components):
+        gaussian = simulation.compute_gaussian(simulation.components_dict["amplitudes"][component], simulation.wavelength_steps, simulation.components_dict["wavelength_expectation_values"][component], simulation.components_dict["wavelength_std_deviations"][component])
+        noiseless_data_matrix += np.outer(np.exp(-simulation.time_steps/simulation.components_dict["decay_constants"][component]), gaussian)
+
+    return noiseless_data_matrix
+
+def run_method(config_file, vectorized):
+    simulation = sim_MultiExcitation.MultiExcitation(config_file, vectorized=vectorized)
+    start = time.perf_counter()
+    if vectorized:
+        simulation.compute_data_matrix_vectorized()
+    else:
+        simulation.compute_data_matrix()
+    run_time = time.perf_counter() - start
+
+    residuals = simulation.data_matrix - get_noiseless_data_matrix(simulation)
+
+    return run_time, residuals.mean(), residuals.std(), simulation.data_matrix.shape
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the loop and the vectorized simulation of MultiExcitation")
+    parser.add_argument("--config-file", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "configFiles", "temporal_overlap", "temp_overlap0.ini"))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[50, 100, 200, 1000], help="nr of time steps (and wavelengths) of the simulated matrices")
+    parser.add_argument("--max-loop-size", type=int, default=200, help="the loop is only run up to this size, it takes minutes for 1000 x 1000")
+    args = parser.parse_args()
+
+    print(f"{'shape':>14} {'loop s':>10} {'vectorized s':>13} {'speedup':>9}   residual mean/std loop | vectorized")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            config_file = write_config_file_with_size(args.config_file, size, directory)
+
+            vectorized_time, vectorized_mean, vectorized_std, shape = run_method(config_file, vectorized=True)
+            if size <= args.max_loop_size:
+                loop_time, loop_mean, loop_std, _ = run_method(config_file, vectorized=False)
+                print(f"{str(shape):>14} {loop_time:>10.3f} {vectorized_time:>13.4f} {loop_time/vectorized_time:>8.0f}x   {loop_mean:+.4f}/{loop_std:.4f} | {vectorized_mean:+.4f}/{vectorized_std:.4f}")
+            else:
+                print(f"{str(shape):>14} {'skipped':>10} {vectorized_time:>13.4f} {'':>9}   {'':>20} | {vectorized_mean:+.4f}/{vectorized_std:.4f}")
+
+    return None
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import configparser
 import ast
-from numpy.random import default_rng
+from numpy.random import default_rng, SeedSequence
 import numpy as np
 import time
 import os
+import argparse
 
 # make things a bit faster with multiprocessing:
 from concurrent import futures
@@ -13,7 +14,7 @@ import matplotlib
 import seaborn as sns
 
 class MultiExcitation():
-    def __init__(self, config_file, results_dir="", make_plots = False) -> None:
+    def __init__(self, config_file, results_dir="", make_plots = False, vectorized = True, seed = None) -> None:
         """
         computes Ta data matrix from using MULTIPLE gaussians as the initial excitations of material.\n
         simulation of components as defined in config_file.\n
@@ -24,11 +25,14 @@ class MultiExcitation():
             config_file (String): path to configuration (.ini) file.
             results_dir (String): used to create dir to save simulation data to if not empty string. Default is empty String.
             make_plots (Boolean): whether or not to make plots. Default is False.
+            vectorized (Boolean): compute the data matrix with whole arrays (compute_data_matrix_vectorized) instead of element wise loops (compute_data_matrix). Default is True.
+            seed (None, int or SeedSequence): seed of all random numbers of this simulation. The same seed gives the same data matrix. Default is None, i.e. not reproducible.
         """
         self.config_file_name = config_file
         self.results_dir = results_dir
         self.final_dir = os.getcwd()+"/simulatedData/"+self.results_dir
         self.make_plots = make_plots
+        self.vectorized = vectorized
         self.config_file_base_name = os.path.splitext(os.path.basename(self.config_file_name))[0]
         self.save_matrix_file_name = self.config_file_base_name+".txt"
         self.save_heatmap_file_name = self.config_file_base_name+"_heatmap.png"
@@ -39,13 +43,16 @@ class MultiExcitation():
         self.nr_of_components = len(self.components_dict["amplitudes"])
         self.noise_dict = self.configuration_dict["noise"]
 
-        self.random_number_generator = default_rng()
+        # all generators of this simulation (also those of the chunks in run_chunked_simulation) are derived from this SeedSequence
+        self.seed_sequence = seed if isinstance(seed, SeedSequence) else SeedSequence(seed)
+        self.random_number_generator = default_rng(self.seed_sequence)
 
         # compute time_steps and wavelengths from interval and step size
         self.wavelength_steps = self.compute_steps(self.matrix_dimensions_dict["wavelength_range"], self.matrix_dimensions_dict["wavelength_stepsize"])
         self.time_steps = self.compute_steps(self.matrix_dimensions_dict["time_range"], self.matrix_dimensions_dict["time_stepsize"])
 
-        self.data_matrix = np.zeros((len(self.time_steps), len(self.wavelength_steps)))
+        # only allocated once it is computed, the chunked simulation never holds the complete matrix
+        self.data_matrix = None
 
         self.noise_scale = self.noise_dict["scale"]
         self.pump_noise_scale = self.noise_scale * self.noise_dict["pump_noise_scale"]
@@ -55,25 +62,123 @@ class MultiExcitation():
 
     def run_simulation(self):
 
-        self.compute_data_matrix()
+        if self.vectorized:
+            self.compute_data_matrix_vectorized()
+        else:
+            self.compute_data_matrix()
         self.save_and_format_data_matrix()
 
         return None
 
     # new "excitation" generated for each measurement at certain time delay
     def compute_data_matrix(self):
+        self.data_matrix = np.zeros((len(self.time_steps), len(self.wavelength_steps)))
         for time_step_index, time_step in enumerate(self.time_steps):
             noisy_excitations = [self.add_normal_noise_to_array(self.compute_gaussian(self.components_dict["amplitudes"][i], self.wavelength_steps, self.components_dict["wavelength_expectation_values"][i], self.components_dict["wavelength_std_deviations"][i]), self.pump_noise_scale) for i in range(self.nr_of_components) ]
             for component in range(self.nr_of_components):
                 decay_constant = self.components_dict["decay_constants"][component]
                 for wavelength_index in range(len(self.wavelength_steps)):
                     data_point = noisy_excitations[component][wavelength_index] * np.exp(-time_step/decay_constant)
-                    self.data_matrix[time_step_index, wavelength_index] += data_point + self.probe_noise_scale * self.get_rand_nrs_from_somewhat_normal_distribution()
+                    self.data_matrix[time_step_index, wavelength_index] += data_point + self.probe_noise_scale * self.get_rand_nrs_from_somewhat_normal_distribution()[0]
+
+        if self.make_plots:
+            # some code to make and store plots of simulated data
+            self.make_and_save_plots(self.wavelength_steps, self.time_steps)
+
+    def compute_data_matrix_vectorized(self):
+        """same statistical model as compute_data_matrix, but computed with whole (time steps x wavelengths) arrays per component:\n
+        data = sum over components of (gaussian(wavelengths) + pump noise(time step, wavelength)) * exp(-time_step/decay_constant) + probe noise.\n
+        compute_data_matrix draws one probe noise number per component and matrix element. The sum of these independent normal numbers
+        is drawn here at once, i.e. with a std deviation that is sqrt(nr_of_components) times larger.
+        """
+        self.data_matrix = self.compute_data_rows(self.time_steps, self.random_number_generator)
 
         if self.make_plots:
             # some code to make and store plots of simulated data
             self.make_and_save_plots(self.wavelength_steps, self.time_steps)
 
+    def compute_data_rows(self, time_steps, random_number_generator):
+        """the rows of the data matrix at time_steps, see compute_data_matrix_vectorized. Used for the complete matrix and for chunks of it."""
+        matrix_shape = (len(time_steps), len(self.wavelength_steps))
+        data_rows = np.zeros(matrix_shape)
+
+        for component in range(self.nr_of_components):
+            gaussian = self.compute_gaussian(self.components_dict["amplitudes"][component], self.wavelength_steps, self.components_dict["wavelength_expectation_values"][component], self.components_dict["wavelength_std_deviations"][component])
+            exp_decay = np.exp(-time_steps/self.components_dict["decay_constants"][component])
+
+            # a new noisy excitation for every time step, computed in place to keep only one temporary matrix
+            noisy_excitations = self.get_rand_nrs_from_somewhat_normal_distribution(how_many_numbers=matrix_shape, random_number_generator=random_number_generator)
+            noisy_excitations *= self.pump_noise_scale
+            noisy_excitations += gaussian[np.newaxis, :]
+            noisy_excitations *= exp_decay[:, np.newaxis]
+            data_rows += noisy_excitations
+            del noisy_excitations
+
+        probe_noise = self.get_rand_nrs_from_somewhat_normal_distribution(how_many_numbers=matrix_shape, random_number_generator=random_number_generator)
+        probe_noise *= self.probe_noise_scale * np.sqrt(self.nr_of_components)
+        data_rows += probe_noise
+
+        return data_rows
+
+    def get_chunk_seed_sequence(self, chunk_index):
+        """the SeedSequence of chunk chunk_index. Same as self.seed_sequence.spawn() would give, but independent of how often spawn was called before."""
+        return SeedSequence(self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + (chunk_index,), pool_size=self.seed_sequence.pool_size)
+
+    def get_chunk_bounds(self, chunk_size):
+        return [(start, min(start + chunk_size, len(self.time_steps))) for start in range(0, len(self.time_steps), chunk_size)]
+
+    def run_chunked_simulation(self, chunk_size=1000, max_workers=None, use_memmap=False):
+        """compute the data matrix in chunks of chunk_size time steps (rows) in a process pool and stream them into the output file,
+        so that only a few chunks are in memory at any time.\n
+        Every chunk has its own generator derived from self.seed_sequence, thus the result only depends on the seed and the chunk_size,
+        not on the number of workers or the order in which the chunks are finished.
+
+        Args:
+            chunk_size (int): number of time steps per chunk. Default is 1000.
+            max_workers (int): number of worker processes. Default is None, i.e. nr of cpus.
+            use_memmap (Boolean): write a .npy file via a memmap (the workers write their chunks directly) instead of the text file. Default is False.
+
+        Returns:
+            String: path to the written file.
+        """
+        if self.make_plots:
+            print(f"{self.config_file_base_name}: no plots are made in the chunked simulation, the complete matrix is never in memory.")
+
+        if not os.path.exists(self.final_dir):
+            os.makedirs(self.final_dir)
+
+        chunk_bounds = self.get_chunk_bounds(chunk_size)
+        with futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            if use_memmap:
+                output_file = os.path.join(self.final_dir, self.config_file_base_name + ".npy")
+                # same layout as the text file: wavelengths in the first row, time steps in the first column
+                formatted_data_matrix = np.lib.format.open_memmap(output_file, mode="w+", dtype=float, shape=(len(self.time_steps)+1, len(self.wavelength_steps)+1))
+                formatted_data_matrix[0, 1:] = self.wavelength_steps
+                formatted_data_matrix[1:, 0] = self.time_steps
+                formatted_data_matrix.flush()
+                del formatted_data_matrix
+
+                chunk_futures = [executor.submit(compute_chunk_of_data_matrix, self, chunk_index, start, stop, output_file) for chunk_index, (start, stop) in enumerate(chunk_bounds)]
+                for chunk_future in futures.as_completed(chunk_futures):
+                    chunk_future.result()
+            else:
+                output_file = os.path.join(self.final_dir, self.save_matrix_file_name)
+                with open(output_file, "w") as file:
+                    np.savetxt(file, np.concatenate(([0.0], self.wavelength_steps))[np.newaxis, :], delimiter = '\t', fmt='%.7e')
+
+                    # chunks have to be written in order: at most 2*workers chunks are submitted ahead of the one to be written next
+                    max_chunks_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+                    submitted_chunks = {}
+                    for chunk_index, (start, stop) in enumerate(chunk_bounds):
+                        while len(submitted_chunks) < max_chunks_in_flight and chunk_index + len(submitted_chunks) < len(chunk_bounds):
+                            next_index = chunk_index + len(submitted_chunks)
+                            submitted_chunks[next_index] = executor.submit(compute_chunk_of_data_matrix, self, next_index, *chunk_bounds[next_index])
+                        data_rows = submitted_chunks.pop(chunk_index).result()
+                        np.savetxt(file, np.column_stack((self.time_steps[start:stop], data_rows)), delimiter = '\t', fmt='%.7e')
+                        del data_rows
+
+        return output_file
+
     def compute_amplitude_of_exp_decay_at_time_step(self, time_step, decay_const):
         return np.exp(-time_step/decay_const)
 
@@ -81,8 +186,10 @@ class MultiExcitation():
         nr_of_steps = (interval[1] - interval[0]) / step_size
         return np.linspace(interval[0], interval[1], int(nr_of_steps))
 
-    def get_rand_nrs_from_somewhat_normal_distribution(self, how_many_numbers=1):
-        return self.random_number_generator.normal(loc=0.0, scale=2.0, size=how_many_numbers)
+    def get_rand_nrs_from_somewhat_normal_distribution(self, how_many_numbers=1, random_number_generator=None):
+        if random_number_generator is None:
+            random_number_generator = self.random_number_generator
+        return random_number_generator.normal(loc=0.0, scale=2.0, size=how_many_numbers)
 
     def compute_gaussian(self, amplitude, steps, exp_value, std_deviation):
         gaussian = np.array(amplitude * np.exp(-((steps - exp_value)**2)/(2*(std_deviation**2))), dtype=float)
@@ -164,6 +271,21 @@ class MultiExcitation():
         return None
 
 
+def compute_chunk_of_data_matrix(simulation, chunk_index, start, stop, memmap_file=None):
+    """runs in a worker process: the rows start:stop of the data matrix, computed with the generator of chunk chunk_index.
+    If memmap_file is given, the rows are written into it directly (shifted by the wavelength row and time step column) instead of being returned."""
+    data_rows = simulation.compute_data_rows(simulation.time_steps[start:stop], default_rng(simulation.get_chunk_seed_sequence(chunk_index)))
+
+    if memmap_file is None:
+        return data_rows
+
+    formatted_data_matrix = np.lib.format.open_memmap(memmap_file, mode="r+")
+    formatted_data_matrix[start+1:stop+1, 1:] = data_rows
+    formatted_data_matrix.flush()
+    del formatted_data_matrix
+
+    return None
+
 if __name__ == "__main__":
 
     # config_files_dir = os.getcwd()+"/configFiles/wavelength_overlap/"
@@ -177,16 +299,32 @@ if __name__ == "__main__":
     results_dir = "MultiExcitation/temporal_overlap_reduced_noise_factor10/"
 
 
+    parser = argparse.ArgumentParser(description="simulate TA data matrices for all config files in a directory")
+    parser.add_argument("--config-files-dir", default=config_files_dir)
+    parser.add_argument("--results-dir", default=results_dir, help="sub directory of simulatedData to save the results to")
+    parser.add_argument("--seed", type=int, default=None, help="root seed, every config file gets its own generator spawned from it. Default: not reproducible")
+    parser.add_argument("--chunk-size", type=int, default=None, help="compute each matrix in chunks of this many time steps across the workers and stream them to file (memory bounded, no plots)")
+    parser.add_argument("--memmap", action="store_true", help="with --chunk-size: write a .npy memmap instead of the text file")
+    parser.add_argument("--workers", type=int, default=None, help="nr of worker processes. Default: nr of cpus")
+    args = parser.parse_args()
+
     """loop over configFile subdirectory"""
     start = time.time()
-    files_in_dir = [f for f in os.listdir(config_files_dir) if os.path.isfile(os.path.join(config_files_dir, f))]
-    multi_excitation_objs = [MultiExcitation(config_files_dir+file, results_dir=results_dir, make_plots=True) for file in files_in_dir]
-
-    with futures.ProcessPoolExecutor() as executor:
-        results = [executor.submit(multi_excitation_obj.run_simulation) for multi_excitation_obj in multi_excitation_objs]
-
-        for result in futures.as_completed(results):
-            print(result)
+    # sorted, so that each file always gets the same child of the root SeedSequence
+    files_in_dir = sorted(f for f in os.listdir(args.config_files_dir) if os.path.isfile(os.path.join(args.config_files_dir, f)))
+    file_seed_sequences = SeedSequence(args.seed).spawn(len(files_in_dir))
+    multi_excitation_objs = [MultiExcitation(os.path.join(args.config_files_dir, file), results_dir=args.results_dir, make_plots=args.chunk_size is None, seed=file_seed_sequence) for file, file_seed_sequence in zip(files_in_dir, file_seed_sequences)]
+
+    if args.chunk_size is not None:
+        # the chunks of one file are spread across the workers, the files are done one after the other
+        for multi_excitation_obj in multi_excitation_objs:
+            print(multi_excitation_obj.run_chunked_simulation(chunk_size=args.chunk_size, max_workers=args.workers, use_memmap=args.memmap))
+    else:
+        with futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = [executor.submit(multi_excitation_obj.run_simulation) for multi_excitation_obj in multi_excitation_objs]
+
+            for result in futures.as_completed(results):
+                print(result)
 
     print(f'MultiExcitation excecution time: {time.time()-start}')
 
@@ -0,0 +1,122 @@
+""" Background saving for the TA analysis GUI.\n
+Saving used to run savefig and np.savetxt in the tk main thread, which froze the gui for seconds with large matrices.
+A SaveTask takes a snapshot of everything one save button writes while it is filled in the gui thread: figures are pickled (that detaches them
+from their tk canvas) and all other arguments are deep-copied, so the user can go on working with the plots and data in the meantime.
+The BackgroundWriter runs the SaveTasks in the single "writer" thread of the JobScheduler, one after the other, and renders the figures there
+with the Agg backend. At most max_pending_saves SaveTasks are queued at once, so snapshots of large matrices can not pile up in memory.
+Completion and errors are reported back in the gui thread.
+"""
+
+import copy
+import os
+import pickle
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+def render_figure(pickled_figure, path, savefig_kwargs):
+    """ runs in the writer thread: a copy of the figure, independent of the gui, is drawn with Agg and saved. """
+    figure = pickle.loads(pickled_figure)
+    FigureCanvasAgg(figure)
+    figure.savefig(path, **savefig_kwargs)
+
+    return None
+
+class SaveTask():
+    def __init__(self, name, directory):
+        """the writes of one save, e.g. of the "save data" button of a tab. Has to be filled in the gui thread.
+
+        Args:
+            name (str): shown in the job list and in the notifications.
+            directory (str): created before anything is written.
+        """
+        self.name = name
+        self.directory = directory
+        self.writes = []
+
+        return None
+
+    def add_figure(self, figure, path, **savefig_kwargs):
+        """ figure.savefig(path, **savefig_kwargs) of the figure as it looks now. """
+        self.writes.append((render_figure, (pickle.dumps(figure), path, savefig_kwargs), {}))
+
+        return None
+
+    def add(self, write_function, *args, **kwargs):
+        """ write_function(*args, **kwargs), e.g. of saveData. The arguments are copied now. """
+        self.writes.append((write_function, copy.deepcopy(args), copy.deepcopy(kwargs)))
+
+        return None
+
+    def run(self):
+        """ runs in the writer thread. """
+        os.makedirs(self.directory, exist_ok=True)
+        for write_function, args, kwargs in self.writes:
+            write_function(*args, **kwargs)
+
+        # release the snapshots
+        self.writes = []
+
+        return self.directory
+
+class BackgroundWriter():
+    def __init__(self, job_scheduler, notify, max_pending_saves=4):
+        """runs SaveTasks in the writer thread of job_scheduler.
+
+        Args:
+            job_scheduler (JobScheduler): delivers the results in the gui thread.
+            notify (callable): called as notify(message, is_error) in the gui thread whenever a save is queued, done or failed.
+            max_pending_saves (int, optional): further saves are refused (with an error notification) as long as this many are pending. Defaults to 4.
+        """
+        self.job_scheduler = job_scheduler
+        self.notify = notify
+        self.max_pending_saves = max_pending_saves
+
+        return None
+
+    def get_nr_of_pending_saves(self):
+        return len(self.job_scheduler.get_jobs(group="save"))
+
+    def has_pending_saves(self):
+        return self.get_nr_of_pending_saves() > 0
+
+    def submit(self, save_task, on_done=None):
+        """queue save_task. Has to be called from the gui thread.
+
+        Returns:
+            Job or None: None if too many saves are pending.
+        """
+        nr_of_pending_saves = self.get_nr_of_pending_saves()
+        if nr_of_pending_saves >= self.max_pending_saves:
+            self.notify(f"{nr_of_pending_saves} saves are still being written, {save_task.name} was not saved.\nTry again once they are done.", True)
+            return None
+
+        job = self.job_scheduler.submit(save_task.run, name="save " + save_task.name, executor_type="writer", group="save",
+                                        on_done=lambda job: self.save_done(job, save_task, on_done),
+                                        on_error=lambda job: self.save_failed(job, save_task),
+                                        on_cancel=lambda job: self.save_failed(job, save_task))
+        self.notify(f"saving {save_task.name} ({nr_of_pending_saves + 1} pending)", False)
+
+        return job
+
+    def save_done(self, job, save_task, on_done):
+        self.notify(f"saved {save_task.name}" + (f" ({self.get_nr_of_pending_saves()} pending)" if self.has_pending_saves() else ""), False)
+        print(f"saved {save_task.name} to {job.result}")
+        if on_done is not None:
+            on_done(job)
+
+        return None
+
+    def save_failed(self, job, save_task):
+        if job.error is not None:
+            self.notify(f"saving {save_task.name} to {save_task.directory} failed:\n{type(job.error).__name__}: {job.error}", True)
+        else:
+            self.notify(f"saving {save_task.name} was cancelled.", True)
+
+        return None
+
+    def wait_until_done(self, poll_interval_s=0.05):
+        """ blocks the gui thread until all pending saves are written, e.g. before quitting. """
+        while self.has_pending_saves():
+            self.job_scheduler.wait_for_events(poll_interval_s)
+
+        return None
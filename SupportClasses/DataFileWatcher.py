@@ -0,0 +1,101 @@
+""" Live mode of the TA analysis GUI.\n
+A DataFileWatcher calls read_new_data in its own thread once per refresh interval, e.g. to parse the rows appended to a data file
+or the scan files that newly appeared in a directory. What it returns is put on a queue, which is pumped from the tk main loop via after(),
+so that on_new_data is called in the gui thread. Reading and parsing never block the gui.
+"""
+
+import queue
+import threading
+import traceback
+
+class DataFileWatcher():
+    def __init__(self, tk_widget, read_new_data, on_new_data, on_error=None, refresh_interval_s=1.0, name="data file watcher"):
+        """watches for new data until stop() is called or read_new_data raised.
+
+        Args:
+            tk_widget (tk.Widget): any widget of the gui, used to pump the queue via after().
+            read_new_data (callable): called without arguments in the watcher thread, returns the new data or None if there is none.
+            on_new_data (callable): called with the new data in the gui thread.
+            on_error (callable, optional): called with the exception in the gui thread, the watcher has stopped then. Defaults to None.
+            refresh_interval_s (float, optional): seconds between two reads. Defaults to 1.0.
+            name (str, optional): name of the thread. Defaults to "data file watcher".
+        """
+        self.tk_widget = tk_widget
+        self.read_new_data = read_new_data
+        self.on_new_data = on_new_data
+        self.on_error = on_error
+        self.refresh_interval_s = refresh_interval_s
+
+        self.event_queue = queue.Queue()
+        # set by stop() and once read_new_data raised
+        self.stop_event = threading.Event()
+        self.stopped = False
+        self.pump_after_id = None
+
+        self.thread = threading.Thread(target=self.watch, name=name, daemon=True)
+        self.thread.start()
+        self.pump()
+
+        return None
+
+    def set_refresh_interval(self, refresh_interval_s):
+        """ takes effect after the current interval. """
+        self.refresh_interval_s = refresh_interval_s
+
+        return None
+
+    def is_running(self):
+        return not self.stopped
+
+    def watch(self):
+        """ runs in the watcher thread. """
+        while not self.stop_event.wait(self.refresh_interval_s):
+            try:
+                new_data = self.read_new_data()
+            except Exception as error:
+                self.event_queue.put(("error", error))
+                self.stop_event.set()
+                break
+
+            if new_data is not None:
+                self.event_queue.put(("data", new_data))
+
+        return None
+
+    def pump(self):
+        """ runs in the gui thread: delivers what the watcher thread has read, then reschedules itself. """
+        self.pump_after_id = None
+
+        while True:
+            try:
+                kind, content = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "error":
+                self.stopped = True
+                print(f"\n{self.thread.name} stopped, an exception occurred: {type(content).__name__}\n {content}\nTraceback:\n")
+                traceback.print_tb(content.__traceback__)
+                if self.on_error is not None:
+                    self.on_error(content)
+                return None
+
+            # data read after stop() is discarded
+            if self.stopped:
+                return None
+            self.on_new_data(content)
+
+        if not self.stopped:
+            self.pump_after_id = self.tk_widget.after(max(10, int(self.refresh_interval_s*1000/2)), self.pump)
+
+        return None
+
+    def stop(self):
+        """ stops watching, new data is not delivered anymore. the thread finishes once a running read_new_data has returned. """
+        self.stopped = True
+        self.stop_event.set()
+        if self.pump_after_id is not None:
+            self.tk_widget.after_cancel(self.pump_after_id)
+            self.pump_after_id = None
+
+        return None
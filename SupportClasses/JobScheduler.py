@@ -0,0 +1,280 @@
+""" A job scheduler for the TA analysis GUI.\n
+Jobs are kept in a priority queue and handed to a bounded thread pool (I/O and the tk-bound data objects),
+to a bounded process pool (pure, picklable compute functions, e.g. the fit of an SVDGF tab) or to the single writer thread (saving files, in order)
+whenever a worker is free. The computations that manage a process pool of their own (the uncertainties and the fit method race) are thread jobs.
+Finished futures are put on a single event queue, which is pumped from the tk main loop via after(),
+so that all job callbacks are executed in the gui thread.
+"""
+
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import traceback
+from concurrent import futures
+
+# job priorities, lower number = handed to a worker first
+PRIORITY_RENDER = 0
+PRIORITY_DEFAULT = 10
+PRIORITY_SPECULATIVE = 100
+
+# job status strings
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class Job():
+    def __init__(self, job_id, name, fn, args, kwargs, executor_type, priority, group, on_done, on_error, on_cancel):
+        """a unit of work of the JobScheduler. The callbacks are called with the job as only argument, in the gui thread.
+
+        Args:
+            job_id (int): unique, increasing id of the job.
+            name (str): name displayed e.g. in the job list window.
+            fn (callable): the function to execute. Must be picklable (module level function) for executor_type "process".
+            args (tuple): positional arguments for fn.
+            kwargs (dict): keyword arguments for fn.
+            executor_type (str): "thread", "process" or "writer".
+            priority (int): lower numbers are started first.
+            group (str or None): used to query / cancel related jobs, e.g. all jobs of one notebook.
+            on_done (callable or None): called with the job once fn has returned. The return value is in job.result.
+            on_error (callable or None): called with the job if fn raised. The exception is in job.error.
+            on_cancel (callable or None): called with the job if it has been cancelled.
+        """
+        self.job_id = job_id
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.executor_type = executor_type
+        self.priority = priority
+        self.group = group
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+
+        self.status = QUEUED
+        self.future = None
+        self.result = None
+        self.error = None
+
+        # a running job can not be interrupted, but long running thread jobs may poll this event.
+        # the result of a job that is cancelled while running is discarded.
+        self.cancel_requested = threading.Event()
+
+        return None
+
+    def is_pending(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def __repr__(self):
+        return f"Job({self.job_id}, {self.name!r}, {self.status}, priority={self.priority})"
+
+class JobScheduler():
+    def __init__(self, tk_widget, max_thread_workers=2, max_process_workers=None, poll_interval_ms=50):
+        """schedules jobs on bounded worker pools and delivers their results to tk.
+
+        Args:
+            tk_widget (tk.Widget): any widget of the gui, used to pump the event queue via after().
+            max_thread_workers (int, optional): size of the thread pool. Defaults to 2.
+            max_process_workers (int, optional): size of the process pool. Defaults to (nr of cpus - 1), at least 1.
+            poll_interval_ms (int, optional): how often the event queue is pumped while jobs are pending. Defaults to 50.
+        """
+        self.tk_widget = tk_widget
+        # one writer thread: files are written one after the other and saving never waits for a long computation
+        self.max_workers = {"thread": max_thread_workers, "process": max_process_workers or max(1, (os.cpu_count() or 2) - 1), "writer": 1}
+        self.poll_interval_ms = poll_interval_ms
+
+        # the executors are only created when they are needed for the first time
+        self.executors = {"thread": None, "process": None, "writer": None}
+        self.nr_of_running_jobs = {"thread": 0, "process": 0, "writer": 0}
+
+        self.job_heap = []
+        self.all_jobs = []
+        self.job_ids = itertools.count()
+        self.event_queue = queue.Queue()
+        self.pump_after_id = None
+
+        return None
+
+    def submit(self, fn, *args, name="", executor_type="thread", priority=PRIORITY_DEFAULT, group=None, on_done=None, on_error=None, on_cancel=None, **kwargs):
+        """queue fn(*args, **kwargs) for execution. Has to be called from the gui thread.
+
+        Returns:
+            Job: the queued job, can be used to query the status or to cancel it.
+        """
+        if executor_type not in self.executors:
+            raise ValueError(f"unknown executor type {executor_type!r}, use 'thread', 'process' or 'writer'.")
+
+        job = Job(next(self.job_ids), name or getattr(fn, "__name__", "job"), fn, args, kwargs, executor_type, priority, group, on_done, on_error, on_cancel)
+        self.all_jobs.append(job)
+        heapq.heappush(self.job_heap, (job.priority, job.job_id, job))
+
+        self.dispatch()
+        self.start_pump()
+
+        return job
+
+    def cancel(self, job):
+        """cancel a job. A queued job is never started, the result of a running job is discarded.
+
+        Returns:
+            bool: False if the job had already finished.
+        """
+        if not job.is_pending():
+            return False
+
+        job.cancel_requested.set()
+        if job.status == QUEUED:
+            # it stays on the heap, but dispatch() skips it
+            self.finish_job(job, CANCELLED)
+        elif job.future is not None and job.future.cancel():
+            self.nr_of_running_jobs[job.executor_type] -= 1
+            self.finish_job(job, CANCELLED)
+
+        return True
+
+    def cancel_group(self, group):
+        for job in self.get_jobs(group=group):
+            self.cancel(job)
+
+        return None
+
+    def get_jobs(self, group=None, include_finished=False):
+        return [job for job in self.all_jobs if (group is None or job.group == group) and (include_finished or job.is_pending())]
+
+    def has_pending_jobs(self, group=None):
+        return len(self.get_jobs(group=group)) > 0
+
+    def clear_finished_jobs(self):
+        self.all_jobs = [job for job in self.all_jobs if job.is_pending()]
+
+        return None
+
+    def get_executor(self, executor_type):
+        if self.executors[executor_type] is None:
+            if executor_type == "thread":
+                self.executors[executor_type] = futures.ThreadPoolExecutor(max_workers=self.max_workers["thread"], thread_name_prefix="TA_gui_job")
+            elif executor_type == "writer":
+                self.executors[executor_type] = futures.ThreadPoolExecutor(max_workers=self.max_workers["writer"], thread_name_prefix="TA_gui_writer")
+            else:
+                # the gui process runs threads, which must not be forked
+                mp_context = multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+                self.executors[executor_type] = futures.ProcessPoolExecutor(max_workers=self.max_workers["process"], mp_context=mp_context)
+
+        return self.executors[executor_type]
+
+    def dispatch(self):
+        """hand queued jobs to the executors, highest priority first, as long as workers are free.
+        Jobs are only submitted when a worker is free, so that queued jobs can still be reordered and cancelled."""
+        postponed = []
+        while self.job_heap:
+            priority, job_id, job = heapq.heappop(self.job_heap)
+            if job.status != QUEUED:
+                continue
+            if self.nr_of_running_jobs[job.executor_type] >= self.max_workers[job.executor_type]:
+                postponed.append((priority, job_id, job))
+                continue
+
+            job.status = RUNNING
+            self.nr_of_running_jobs[job.executor_type] += 1
+            job.future = self.get_executor(job.executor_type).submit(job.fn, *job.args, **job.kwargs)
+            # is called in the worker thread (or a management thread of the process pool), so only put it on the queue
+            job.future.add_done_callback(lambda _, job=job: self.event_queue.put(job))
+
+        for entry in postponed:
+            heapq.heappush(self.job_heap, entry)
+
+        return None
+
+    def start_pump(self):
+        if self.pump_after_id is None:
+            self.pump_after_id = self.tk_widget.after(self.poll_interval_ms, self.pump)
+
+        return None
+
+    def pump(self):
+        """runs in the gui thread: deliver all finished jobs, start queued ones and reschedule itself while jobs are pending."""
+        self.pump_after_id = None
+
+        while True:
+            try:
+                job = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if job.status != RUNNING:
+                # already handled, e.g. a cancelled future
+                continue
+
+            self.nr_of_running_jobs[job.executor_type] -= 1
+            if job.cancel_requested.is_set() or job.future.cancelled():
+                self.finish_job(job, CANCELLED)
+                continue
+
+            error = job.future.exception()
+            if error is not None:
+                job.error = error
+                self.finish_job(job, FAILED)
+            else:
+                job.result = job.future.result()
+                self.finish_job(job, DONE)
+
+        self.dispatch()
+
+        if self.has_pending_jobs():
+            self.start_pump()
+
+        return None
+
+    def wait_for_events(self, timeout):
+        """blocks the gui thread for up to timeout seconds until a job has finished, then delivers the finished jobs.
+        Only meant for waiting on jobs outside of the tk main loop, e.g. when quitting."""
+        try:
+            job = self.event_queue.get(timeout=timeout)
+            self.event_queue.put(job)
+        except queue.Empty:
+            pass
+
+        self.pump()
+
+        return None
+
+    def finish_job(self, job, status):
+        job.status = status
+        callback = {DONE: job.on_done, FAILED: job.on_error, CANCELLED: job.on_cancel}[status]
+
+        if status == FAILED and callback is None:
+            print(f"\nAn exception occurred in job {job.name}: {type(job.error)}\n {job.error}\nTraceback:\n")
+            traceback.print_tb(job.error.__traceback__)
+
+        if callback is not None:
+            try:
+                callback(job)
+            except Exception as error:
+                print(f"\nAn exception occurred in a callback of job {job.name}: {type(error)}\n {error}\nTraceback:\n")
+                traceback.print_tb(error.__traceback__)
+
+        # release references to (possibly large) arguments
+        job.fn, job.args, job.kwargs = None, (), {}
+
+        return None
+
+    def shutdown(self):
+        """cancel all queued jobs and shut the executors down without waiting for running jobs."""
+        for job in self.get_jobs():
+            if job.status == QUEUED:
+                self.cancel(job)
+
+        if self.pump_after_id is not None:
+            self.tk_widget.after_cancel(self.pump_after_id)
+            self.pump_after_id = None
+
+        for executor in self.executors.values():
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+        return None
@@ -0,0 +1,63 @@
+""" Lazy module loading for the TA analysis GUI.\n
+lazy_import("package.module") returns a placeholder module that imports the real module on the first attribute access.
+This keeps the heavy scientific stack (matplotlib, seaborn, scipy, lmfit, asteval) and rarely used Toplevels out of the startup of the GUI.
+"""
+
+import importlib
+import sys
+import threading
+import time
+import types
+
+# called as on_module_loaded(module_name, seconds) whenever a lazy module is actually imported, e.g. by the StartupProfiler
+on_module_loaded = None
+
+# the data objects are created in worker threads, two threads must not import the same module at once
+_import_lock = threading.RLock()
+
+class LazyModule(types.ModuleType):
+    def __init__(self, module_name):
+        super().__init__(module_name)
+        self.__dict__["_lazy_module_name"] = module_name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        if self.__dict__["_lazy_module"] is None:
+            with _import_lock:
+                if self.__dict__["_lazy_module"] is None:
+                    module_name = self.__dict__["_lazy_module_name"]
+                    is_first_import = module_name not in sys.modules
+                    start = time.perf_counter()
+                    module = importlib.import_module(module_name)
+                    if is_first_import and on_module_loaded is not None:
+                        on_module_loaded(module_name, time.perf_counter() - start)
+                    self.__dict__["_lazy_module"] = module
+
+        return self.__dict__["_lazy_module"]
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded yet"
+        return f"<lazy module {self.__dict__['_lazy_module_name']!r} ({state})>"
+
+def lazy_import(module_name):
+    """returns the module if it is already imported, else a LazyModule that imports it once it is used.
+
+    Args:
+        module_name (str): absolute module name, e.g. "ToplevelClasses.DAS_Toplevel".
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    return LazyModule(module_name)
+
+def is_loaded(module):
+    return not isinstance(module, LazyModule) or module.__dict__["_lazy_module"] is not None
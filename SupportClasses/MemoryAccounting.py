@@ -0,0 +1,161 @@
+""" Memory accounting of the tabs of the TA analysis GUI.\n
+get_usage counts the bytes a data object of a tab holds, by CATEGORIES: numpy arrays in its attributes and in the results it keeps
+(SVD and fit results, dataclasses, lists and dicts of arrays, recursively), and its matplotlib figures (the rendered RGBA buffer of the canvas
+and the image data). Every array buffer is counted once, also if it is shared by several attributes (e.g. the data matrix of a TAData and of the object).
+The attributes are classified by their type and name, see get_category.\n
+release frees a data object deterministically when its tab is removed: its widgets are destroyed (before, they were only hidden and
+their commands and tooltips kept them alive), every attribute is dropped and the garbage is collected once.\n
+get_rss is the resident memory of the process, from /proc on linux or psutil if it is installed, None otherwise.
+"""
+
+import dataclasses
+import gc
+import os
+import re
+import tkinter as tk
+
+import numpy as np
+
+CATEGORIES = ("matrices", "SVD factors", "fit results", "figures")
+# attributes that are not owned by the data object of a tab
+SHARED_ATTRIBUTES = ("parent", "SVD_cache")
+# classes whose arrays are counted in their category, everything else that is not a figure is counted by the name of the attribute
+SVD_CLASSES = ("LazySVD", "SVDComponents", "IncrementalSVD")
+FIT_RESULT_CLASSES = ("GlobalFitResult", "SVDGFResult", "FitUncertainties", "MinimizerResult", "Parameters", "MethodRace", "KineticScheme")
+SVD_ATTRIBUTE_PATTERN = re.compile(r"SVs|singular_values|sing_values|VT_matrix|lazy_SVD")
+FIT_RESULT_ATTRIBUTE_PATTERN = re.compile(r"DAS|SAS|populations|fit_|_fit|uncertaint")
+# results are searched for arrays this deep (e.g. SVDGFResult.fit.minimizer_result.residual)
+MAX_DEPTH = 4
+
+def is_figure(value):
+    return type(value).__module__.startswith("matplotlib.") and hasattr(value, "get_figure")
+
+def get_category(name, value):
+    if is_figure(value):
+        return "figures"
+    class_name = type(value).__name__
+    if class_name in SVD_CLASSES:
+        return "SVD factors"
+    if class_name in FIT_RESULT_CLASSES:
+        return "fit results"
+    if SVD_ATTRIBUTE_PATTERN.search(name):
+        return "SVD factors"
+    if FIT_RESULT_ATTRIBUTE_PATTERN.search(name):
+        return "fit results"
+
+    return "matrices"
+
+def get_array_nbytes(value, counted_buffers, depth=0):
+    """ the bytes of the arrays in value that are not in counted_buffers yet (ids of the arrays that own the memory), which are added to it. """
+    if isinstance(value, np.ndarray):
+        owner = value
+        while isinstance(owner.base, np.ndarray):
+            owner = owner.base
+        if id(owner) in counted_buffers:
+            return 0
+        counted_buffers.add(id(owner))
+        nbytes = owner.nbytes
+        if isinstance(value, np.ma.MaskedArray) and value.mask is not np.ma.nomask:
+            nbytes += get_array_nbytes(value.mask, counted_buffers, depth)
+        return nbytes
+
+    if depth >= MAX_DEPTH or isinstance(value, (str, bytes, int, float, tk.Misc)):
+        return 0
+    if isinstance(value, dict):
+        return sum(get_array_nbytes(item, counted_buffers, depth + 1) for item in value.values())
+    if isinstance(value, (list, tuple, set)):
+        return sum(get_array_nbytes(item, counted_buffers, depth + 1) for item in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sum(get_array_nbytes(getattr(value, field.name), counted_buffers, depth + 1) for field in dataclasses.fields(value))
+    if type(value).__name__ in SVD_CLASSES + FIT_RESULT_CLASSES and hasattr(value, "__dict__"):
+        return sum(get_array_nbytes(item, counted_buffers, depth + 1) for item in vars(value).values())
+
+    return 0
+
+def get_figure_nbytes(figure, counted_buffers):
+    """ the RGBA buffer of the rendered figure and the data of its images. """
+    if id(figure) in counted_buffers:
+        return 0
+    counted_buffers.add(id(figure))
+    width, height = figure.get_size_inches()*figure.dpi
+    nbytes = int(width)*int(height)*4
+    for axes in figure.get_axes():
+        for image in axes.get_images():
+            nbytes += get_array_nbytes(image.get_array(), counted_buffers)
+
+    return nbytes
+
+def get_usage(data_obj):
+    """ {category: bytes} held by the data object of a tab, see CATEGORIES. All 0 for a released data object. """
+    usage = dict.fromkeys(CATEGORIES, 0)
+    counted_buffers = set()
+    # plain arrays first: an array that is also part of a result (e.g. the data matrix in SVDGF_result) is counted as what the tab shows
+    # a copy, the data object might be filled by its job in a worker thread meanwhile
+    attributes = sorted(((name, value) for name, value in dict(vars(data_obj)).items() if name not in SHARED_ATTRIBUTES),
+                        key=lambda attribute: not isinstance(attribute[1], np.ndarray))
+    for name, value in attributes:
+        category = get_category(name, value)
+        if category == "figures":
+            usage[category] += get_figure_nbytes(value.get_figure(), counted_buffers)
+        else:
+            usage[category] += get_array_nbytes(value, counted_buffers)
+
+    return usage
+
+def get_tab_usages(notebook_containers):
+    """ [(notebook name, tab index, {category: bytes})] of every tab with a data object, notebook_containers: {notebook name: NotebookContainer}. """
+    tab_usages = []
+    for notebook_name, notebook_container in notebook_containers.items():
+        for tab_idx, data_obj in enumerate(notebook_container.data_objs):
+            if data_obj is not None and vars(data_obj):
+                tab_usages.append((notebook_name, tab_idx, get_usage(data_obj)))
+
+    return tab_usages
+
+def get_rss():
+    """ resident memory of this process in bytes, None if it can not be measured. """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    return psutil.Process().memory_info().rss
+
+def format_bytes(nbytes):
+    for unit in ("B", "kB", "MB"):
+        if abs(nbytes) < 1024:
+            return f"{nbytes:.1f} {unit}" if unit != "B" else f"{nbytes} B"
+        nbytes /= 1024
+
+    return f"{nbytes:.2f} GB"
+
+def destroy_widgets(value):
+    """ destroys the widgets in value (a widget or a list of them) that a data object made on its tab. """
+    if isinstance(value, list):
+        for item in value:
+            destroy_widgets(item)
+    elif isinstance(value, tk.Widget) and not isinstance(value, tk.Toplevel):
+        value.destroy()
+
+    return None
+
+def release(data_obj):
+    """ destroys the widgets of the data object, drops all of its attributes and collects the garbage once.
+
+    Returns:
+        int: the bytes that were accounted to the data object (see get_usage).
+    """
+    nbytes = sum(get_usage(data_obj).values())
+    for name in list(vars(data_obj)):
+        if name not in SHARED_ATTRIBUTES:
+            destroy_widgets(vars(data_obj)[name])
+        delattr(data_obj, name)
+
+    gc.collect()
+
+    return nbytes
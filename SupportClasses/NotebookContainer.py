@@ -1,8 +1,26 @@
 import tkinter as tk
 import tkinter.ttk as ttk
 
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+class LazilyCreatedList():
+    """a list of fixed length whose items are only created (by create_item(index)) when they are accessed for the first time."""
+
+    def __init__(self, length, create_item):
+        self.items = [None for _ in range(length)]
+        self.create_item = create_item
+
+    def __getitem__(self, index):
+        if self.items[index] is None:
+            self.items[index] = self.create_item(index)
+        return self.items[index]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self.items)))
+
+    def is_created(self, index):
+        return self.items[index] is not None
 
 class NotebookContainer():
     """a class to contain all the notebook frames, figures, FigureCanvasTkAgg and data_objects as needed\n
@@ -38,9 +56,9 @@ class NotebookContainer():
             self.figure_frames[i].rowconfigure(0, weight=1)
 
         # figures to put on canvases. The axes with data are created and cleared in plot class.
-        self.figs = [Figure(figsize=self.figsize, dpi=self.dpi) for _ in range(self.nr_of_tabs)]
-
-        self.canvases = [FigureCanvasTkAgg(self.figs[i], self.figure_frames[i]) for i in range(self.nr_of_tabs)]
+        # figures and canvases are only created (together, in the gui thread) once a tab is used for the first time, most tabs never are.
+        self.canvases = LazilyCreatedList(self.nr_of_tabs, self.make_figure_canvas)
+        self.figs = LazilyCreatedList(self.nr_of_tabs, lambda tab_idx: self.canvases[tab_idx].figure)
 
         # initialize list with None types.
         # To be filled with actual data objects, e.g. SVD_reconstruction.SVD_Heatmap once these objects are instantiated in GUI.
@@ -48,6 +66,13 @@ class NotebookContainer():
 
         return None
 
+    def make_figure_canvas(self, tab_idx):
+        # imported here, so that matplotlib is only loaded once the first plot is made
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        return FigureCanvasTkAgg(Figure(figsize=self.figsize, dpi=self.dpi), self.figure_frames[tab_idx])
+
     def add_indexed_tab(self, tab_idx, title=""):
         """adds a new tab to the notebook, inserts it at the position as given by tab_idx, and gives focus to that tab.
 
@@ -0,0 +1,221 @@
+""" A SQLite index of all saved results, DataFiles/ResultData/results_index.sqlite.\n
+Every save of the GUI and of the batch runner adds one row per result directory, with the sha256 hash of the data file,
+the matrix bounds, components, fit method, chi-square and the fitted decay times with their standard errors.
+Past analyses can then be found with query_results (or TA_results_index.py, or the results browser of the GUI)
+without walking the directory tree and parsing log files.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import lmfit
+
+from SupportClasses import saveData
+
+INDEX_FILENAME = "results_index.sqlite"
+
+# one row per result directory, saving the same result again replaces its row
+CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    result_type TEXT NOT NULL,
+    data_file TEXT NOT NULL,
+    data_file_hash TEXT,
+    start_time REAL,
+    matrix_bounds TEXT,
+    components TEXT,
+    nr_of_components INTEGER,
+    fit_method TEXT,
+    use_target_model INTEGER,
+    chisqr REAL,
+    redchi REAL,
+    result_dir TEXT NOT NULL UNIQUE,
+    binary_file TEXT,
+    source TEXT,
+    saved_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS decay_times (
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    component INTEGER NOT NULL,
+    tau REAL,
+    stderr REAL
+);
+CREATE INDEX IF NOT EXISTS results_data_file_hash ON results(data_file_hash);
+CREATE INDEX IF NOT EXISTS decay_times_result_id ON decay_times(result_id);
+"""
+
+# data file hashes, key: (path, size, modification time)
+_data_file_hashes = {}
+
+def get_index_path(base_directory):
+    return os.path.join(base_directory, "DataFiles", "ResultData", INDEX_FILENAME)
+
+def connect(index_path):
+    """ opens (and if needed creates) the index. Several processes may write at once, sqlite serializes them. """
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    connection = sqlite3.connect(index_path, timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(CREATE_TABLES)
+
+    return connection
+
+def get_data_file_hash(filename):
+    """ sha256 of the content of filename, None if it does not exist (anymore). """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime)
+    if key not in _data_file_hashes:
+        sha256 = hashlib.sha256()
+        with open(filename, "rb") as data_file:
+            for block in iter(lambda: data_file.read(1 << 20), b""):
+                sha256.update(block)
+        _data_file_hashes[key] = sha256.hexdigest()
+
+    return _data_file_hashes[key]
+
+def get_decay_times_with_stderrs(fit_params, components_list):
+    """ {component: (tau, stderr)} of lmfit parameters of the SVDGF fit. """
+    return {component: (fit_params[f"tau_component{component}"].value, fit_params[f"tau_component{component}"].stderr) for component in components_list}
+
+def format_decay_times(decay_times):
+    """ e.g. "tau1 = 0.523 ± 0.012, tau2 = 12.4 ± 0.3" """
+    return ", ".join(f"tau{component} = {tau:.4g}" + (f" ± {stderr:.2g}" if stderr is not None else "") for component, (tau, stderr) in decay_times.items())
+
+def add_result(index_path, result_type, data_file, result_dir, start_time=None, matrix_bounds_dict=None, components=None, fit_method=None, use_target_model=False,
+                decay_times=None, chisqr=None, redchi=None, binary_file=None, source="gui"):
+    """adds (or replaces) the row of the result saved to result_dir.
+
+    Args:
+        index_path (str): see get_index_path.
+        result_type (str): "ORIG", "SVD" or "SVDGF".
+        data_file (str): the analysed data file, its hash is stored along with its path.
+        result_dir (str): the directory the result has been saved to.
+        decay_times (dict, optional): {component: (tau, stderr)}, see get_decay_times_with_stderrs.
+        binary_file (str, optional): the result_data.npz of the result, if it has been saved in binary format (then it can be reopened).
+        source (str, optional): "gui" or "batch".
+
+    Returns:
+        int: the id of the row.
+    """
+    components = list(components) if components is not None else []
+    with connect(index_path) as connection:
+        connection.execute("DELETE FROM results WHERE result_dir = ?", (os.path.abspath(result_dir),))
+        cursor = connection.execute("INSERT INTO results (result_type, data_file, data_file_hash, start_time, matrix_bounds, components, nr_of_components, fit_method, use_target_model,"
+                                    + " chisqr, redchi, result_dir, binary_file, source, saved_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (result_type, os.path.abspath(data_file), get_data_file_hash(data_file), None if start_time is None else float(start_time),
+                                    json.dumps(matrix_bounds_dict or {}, default=saveData.to_json_compatible), json.dumps(components), len(components), fit_method, int(bool(use_target_model)),
+                                    chisqr, redchi, os.path.abspath(result_dir), None if binary_file is None else os.path.abspath(binary_file), source, datetime.now().isoformat(timespec="seconds")))
+        result_id = cursor.lastrowid
+        for component, (tau, stderr) in (decay_times or {}).items():
+            connection.execute("INSERT INTO decay_times (result_id, component, tau, stderr) VALUES (?, ?, ?, ?)", (result_id, int(component), tau, stderr))
+    connection.close()
+
+    return result_id
+
+def query_results(index_path, data_file=None, data_file_hash=None, result_type=None, components=None, nr_of_components=None, fit_method=None, tau_bounds=None, only_binary=False):
+    """the results that match all given conditions, newest first.
+
+    Args:
+        data_file (str, optional): part of the data file path, e.g. the sample name.
+        data_file_hash (str, optional): only results of exactly this data file content.
+        result_type (str, optional): "ORIG", "SVD" or "SVDGF".
+        components (list of ints, optional): exactly these components.
+        nr_of_components (int, optional): exactly this many components.
+        fit_method (str, optional): lmfit method name.
+        tau_bounds (list of (component, min, max), optional): the decay time of component has to be within [min, max], None for no bound,
+            e.g. [(1, None, 2)] for tau1 < 2 ps.
+        only_binary (bool, optional): only results that can be reopened in the GUI.
+
+    Returns:
+        list of dicts: the columns of the results table, matrix_bounds and components decoded, and "decay_times": {component: (tau, stderr)}.
+    """
+    conditions, parameters = [], []
+    if data_file:
+        conditions.append("data_file LIKE ?")
+        parameters.append(f"%{data_file}%")
+    if data_file_hash:
+        conditions.append("data_file_hash = ?")
+        parameters.append(data_file_hash)
+    if result_type:
+        conditions.append("result_type = ?")
+        parameters.append(result_type)
+    if components is not None:
+        conditions.append("components = ?")
+        parameters.append(json.dumps(sorted(components)))
+    if nr_of_components is not None:
+        conditions.append("nr_of_components = ?")
+        parameters.append(nr_of_components)
+    if fit_method:
+        conditions.append("fit_method = ?")
+        parameters.append(fit_method)
+    if only_binary:
+        conditions.append("binary_file IS NOT NULL")
+    for component, tau_min, tau_max in (tau_bounds or []):
+        tau_condition = "EXISTS (SELECT 1 FROM decay_times WHERE decay_times.result_id = results.id AND component = ?"
+        parameters.append(component)
+        if tau_min is not None:
+            tau_condition += " AND tau >= ?"
+            parameters.append(tau_min)
+        if tau_max is not None:
+            tau_condition += " AND tau <= ?"
+            parameters.append(tau_max)
+        conditions.append(tau_condition + ")")
+
+    if not os.path.exists(index_path):
+        return []
+
+    with connect(index_path) as connection:
+        rows = connection.execute("SELECT * FROM results" + (" WHERE " + " AND ".join(conditions) if conditions else "") + " ORDER BY saved_at DESC, id DESC", parameters).fetchall()
+        results = []
+        for row in rows:
+            result = dict(row)
+            result["matrix_bounds"] = json.loads(result["matrix_bounds"])
+            result["components"] = json.loads(result["components"])
+            result["decay_times"] = {decay_time["component"]: (decay_time["tau"], decay_time["stderr"])
+                                        for decay_time in connection.execute("SELECT component, tau, stderr FROM decay_times WHERE result_id = ? ORDER BY component", (row["id"],))}
+            results.append(result)
+    connection.close()
+
+    return results
+
+def remove_missing_results(index_path):
+    """ removes the rows whose result directory does not exist anymore. Returns their number. """
+    with connect(index_path) as connection:
+        missing_ids = [(row["id"],) for row in connection.execute("SELECT id, result_dir FROM results") if not os.path.isdir(row["result_dir"])]
+        connection.executemany("DELETE FROM results WHERE id = ?", missing_ids)
+    connection.close()
+
+    return len(missing_ids)
+
+def add_binary_results_in_directory(index_path, result_data_directory):
+    """ (re)indexes all result_data.npz below result_data_directory, e.g. results that were saved before the index existed.
+    Results saved only as text files are not found, their log files are not parsed. Returns the nr of indexed results. """
+    nr_of_results = 0
+    for directory, _, filenames in os.walk(result_data_directory):
+        if saveData.BINARY_RESULT_FILENAME not in filenames:
+            continue
+
+        binary_file = os.path.join(directory, saveData.BINARY_RESULT_FILENAME)
+        try:
+            metadata = saveData.read_binary_result_metadata(binary_file)
+        except (OSError, ValueError) as error:
+            print(f"skipping {binary_file}: {error}")
+            continue
+
+        decay_times = None
+        if metadata["result_type"] == "SVDGF":
+            decay_times = get_decay_times_with_stderrs(lmfit.Parameters().loads(metadata["fit_parameters"]), metadata["components"])
+
+        add_result(index_path, metadata["result_type"], metadata["filename"], directory, start_time=metadata.get("start_time"), matrix_bounds_dict=metadata.get("matrix_bounds_dict"),
+                    components=metadata.get("components"), fit_method=metadata.get("fit_method"), use_target_model=metadata.get("use_user_defined_fit_function", False),
+                    decay_times=decay_times, chisqr=metadata.get("chisqr"), redchi=metadata.get("redchi"), binary_file=binary_file, source="reindexed")
+        nr_of_results += 1
+
+    return nr_of_results
@@ -0,0 +1,90 @@
+""" Startup profiling of the TA analysis GUI, used with: python TA_analysis_GUI.py --profile-startup\n
+Reports the import time of every module imported during startup (inclusive and self time, like python -X importtime),
+the time of the initialization stages of the GUI and the time to the first window.
+Modules that are loaded lazily later on (SupportClasses.LazyImport) are reported as they are imported.
+"""
+
+import builtins
+import sys
+import time
+
+from SupportClasses import LazyImport
+
+class StartupProfiler():
+    def __init__(self, nr_of_modules_to_report=25):
+        self.nr_of_modules_to_report = nr_of_modules_to_report
+        self.start = time.perf_counter()
+        self.last_stage_end = self.start
+        self.import_times = {}      # module name: [inclusive time, self time]
+        self.import_stack = []
+        self.stage_times = []
+        self.original_import = None
+
+        return None
+
+    def start_import_timing(self):
+        """wrap builtins.__import__, so that the time of every module that is imported for the first time is recorded."""
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+        LazyImport.on_module_loaded = self.report_lazy_module_loaded
+
+        return None
+
+    def stop_import_timing(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+        return None
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        nr_of_modules_before = len(sys.modules)
+        is_new_module = name not in sys.modules
+
+        self.import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            inclusive_time = time.perf_counter() - start
+            time_of_nested_imports = self.import_stack.pop()
+            if self.import_stack:
+                self.import_stack[-1] += inclusive_time
+
+            # only imports that actually loaded something are of interest
+            if len(sys.modules) > nr_of_modules_before:
+                key = name if (is_new_module or not fromlist) else f"{name} ({', '.join(fromlist)})"
+                key = "." * level + key
+                if key not in self.import_times:
+                    self.import_times[key] = [inclusive_time, inclusive_time - time_of_nested_imports]
+
+    def record_stage(self, stage_name):
+        """record the time since the last recorded stage."""
+        now = time.perf_counter()
+        self.stage_times.append((stage_name, now - self.last_stage_end))
+        self.last_stage_end = now
+
+        return None
+
+    def report_lazy_module_loaded(self, module_name, seconds):
+        print(f"[profile-startup] lazily loaded {module_name} in {seconds*1000:.1f} ms ({time.perf_counter()-self.start:.2f} s after start)")
+
+        return None
+
+    def report(self):
+        self.stop_import_timing()
+        total_time = time.perf_counter() - self.start
+
+        print("\n[profile-startup] imports during startup (slowest first):")
+        print(f"{'module':<70}{'inclusive ms':>14}{'self ms':>10}")
+        sorted_import_times = sorted(self.import_times.items(), key=lambda item: item[1][0], reverse=True)
+        for module_name, (inclusive_time, self_time) in sorted_import_times[:self.nr_of_modules_to_report]:
+            print(f"{module_name[:70]:<70}{inclusive_time*1000:>14.1f}{self_time*1000:>10.1f}")
+
+        print("\n[profile-startup] initialization stages:")
+        for stage_name, seconds in self.stage_times:
+            print(f"{stage_name:<70}{seconds*1000:>14.1f} ms")
+
+        print(f"\n[profile-startup] time to first window: {total_time:.3f} s\n")
+
+        return None
@@ -1,8 +1,15 @@
 from datetime import datetime
+import json
 import os
 import numpy as np
 
-def get_directory_paths(start_time, tab_idx, components=None):
+# the save formats the user can choose from. "binary" writes one compressed result_data.npz per result directory.
+SAVE_FORMATS = ("text", "binary", "text and binary")
+BINARY_RESULT_FILENAME = "result_data.npz"
+BINARY_FORMAT_VERSION = 1
+
+def get_directory_paths(start_time, tab_idx, components=None, run_name=None):
+    """ run_name replaces the "tab<nr>" part of the final directory, e.g. for results that were not computed in a gui tab. """
     today = datetime.now()
     day = today.strftime('%A')
     day_nr = today.day
@@ -12,10 +19,12 @@ def get_directory_paths(start_time, tab_idx, components=None):
     minute = today.strftime('%M')
 
     date_dir = day + "_" + str(day_nr) + "_" + month +"_" +year
-    final_dir = "starttime_"+str(start_time)+"_tab"+str(tab_idx+1)+"_created_at_"+str(hour)+"h_"+str(minute)+"min"
+    if run_name is None:
+        run_name = "tab"+str(tab_idx+1)
+    final_dir = "starttime_"+str(start_time)+"_"+run_name+"_created_at_"+str(hour)+"h_"+str(minute)+"min"
 
     if components is not None:
-        final_dir = str(components)+"/starttime_"+str(start_time)+"_tab"+str(tab_idx+1)+"_created_at_"+str(hour)+"h_"+str(minute)+"min"
+        final_dir = str(components)+"/"+final_dir
 
     return date_dir, final_dir
 
@@ -25,6 +34,18 @@ def get_final_path(base_dir, date_dir, result_type, final_dir, data_file):
 
     return full_path_to_final_dir
 
+def make_unique_directory(path):
+    """ creates the directory path, or path_2, path_3, ... if it exists already (e.g. a data file with the same name in another directory
+    or a second run within the same minute), so that no result is overwritten. Returns the created directory. """
+    unique_path, counter = path, 1
+    while True:
+        try:
+            os.makedirs(unique_path)
+            return unique_path
+        except FileExistsError:
+            counter += 1
+            unique_path = f"{path}_{counter}"
+
 def make_log_file(final_dir, **kwargs):
     today = datetime.now()
 
@@ -38,7 +59,7 @@ def make_log_file(final_dir, **kwargs):
 
 def save_result_data(final_dir, data_dict):
     for kw,arg in data_dict.items():
-        if kw in ["DAS", "U_matrix", "VT_matrix", "retained_left_SVs"] :
+        if kw in ["DAS", "U_matrix", "VT_matrix", "retained_left_SVs", "SAS", "populations"] :
             np.savetxt(final_dir+"/"+kw+".txt", arg, delimiter = '\t', fmt='%.7e')
         else:
             with open(final_dir+"/"+kw+".txt", "w") as myfile:
@@ -47,6 +68,17 @@ def save_result_data(final_dir, data_dict):
 
     return None
 
+def save_fit_uncertainties(final_dir, fit_uncertainties):
+    """ the FitUncertainties of get_SVDGFit_uncertainties: the report with the confidence intervals, the fitted values of all replicates
+    and the lower and upper band of the DAS (same layout as DAS.txt). """
+    with open(final_dir+"/fit_uncertainties.txt", "w") as myfile:
+        myfile.write(fit_uncertainties.get_report()+"\n")
+    np.savetxt(final_dir+"/fit_uncertainties_replicates.txt", fit_uncertainties.replicate_values, delimiter='\t', fmt='%.7e', header="\t".join(fit_uncertainties.parameter_names))
+    for bound, DAS_band in zip(("lower", "upper"), fit_uncertainties.DAS_bands):
+        np.savetxt(final_dir+f"/DAS_{bound}_band.txt", DAS_band, delimiter='\t', fmt='%.7e')
+
+    return None
+
 def get_data_matrix_formatted(data, time_delays, wavelengths):
     """
     saves the input data matrix, time_delay and wavelength array in the same format as data_full_0.txt
@@ -69,3 +101,61 @@ def save_formatted_data_matrix_after_time(final_dir, time_delays, wavelengths, d
         np.savetxt(final_dir+"/"+matrix_name+".txt", formatted_matrix, delimiter = '\t', fmt='%.7e')
 
     return None
+
+def save_data_file(filename, time_delays, wavelengths, data_matrix):
+    """ saves data_matrix (shape (nr of wavelengths, nr of time delays)) as a data file that the gui can open, comma separated if filename ends with .csv. """
+    np.savetxt(filename, get_data_matrix_formatted(data_matrix.T, time_delays, wavelengths), delimiter="," if filename.endswith(".csv") else "\t", fmt='%.7e')
+
+    return None
+
+def save_text_formats(save_format):
+    return save_format in ("text", "text and binary")
+
+def save_binary_format(save_format):
+    return save_format in ("binary", "text and binary")
+
+def to_json_compatible(obj):
+    """ numpy scalars and arrays as python numbers and lists, everything else as its string. """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+def save_result_data_binary(final_dir, result_type, arrays_dict, metadata_dict):
+    """
+    saves all arrays of a result into one compressed final_dir/result_data.npz, which can be reopened with load_result_data_binary.\n
+    The arrays are stored as they are used in the data objects (data matrices with shape (nr of wavelengths, nr of time delays)),
+    i.e. not transposed as in the text files. Their full precision is kept.\n
+    metadata_dict holds everything else (log file entries, fit parameters, fit report, ...), it is stored as json in the entry "metadata".
+    """
+    metadata = {"result_type": result_type, "format_version": BINARY_FORMAT_VERSION, "saved_at": datetime.now().strftime("%a %d %b %H:%M:%S %Y")}
+    metadata.update(metadata_dict)
+
+    arrays_to_save = {name: np.asarray(array) for name, array in arrays_dict.items()}
+    arrays_to_save["metadata"] = np.array(json.dumps(metadata, default=to_json_compatible))
+
+    np.savez_compressed(os.path.join(final_dir, BINARY_RESULT_FILENAME), **arrays_to_save)
+
+    return None
+
+def read_binary_result_metadata(path):
+    """ only reads the metadata entry of a result_data.npz, the arrays are not loaded. """
+    with np.load(path, allow_pickle=False) as npz_file:
+        if "metadata" not in npz_file.files:
+            raise ValueError(f"{path} is no result file saved by this program (it has no metadata).")
+        return json.loads(str(npz_file["metadata"]))
+
+def load_result_data_binary(path):
+    """
+    the arrays and metadata of a result_data.npz saved by save_result_data_binary.\n
+    Returns:
+        tuple: (dict of arrays, metadata dict)
+    """
+    with np.load(path, allow_pickle=False) as npz_file:
+        if "metadata" not in npz_file.files:
+            raise ValueError(f"{path} is no result file saved by this program (it has no metadata).")
+        metadata = json.loads(str(npz_file["metadata"]))
+        arrays_dict = {name: npz_file[name] for name in npz_file.files if name != "metadata"}
+
+    return arrays_dict, metadata
@@ -1,25 +1,46 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import sys
+
+# with --profile-startup the time of all imports and of the initialization is reported once the first window is shown
+if __name__ == '__main__' and "--profile-startup" in sys.argv:
+    from SupportClasses import StartupProfiler
+    startup_profiler = StartupProfiler.StartupProfiler()
+    startup_profiler.start_import_timing()
+else:
+    startup_profiler = None
+
 import tkinter as tk
 import tkinter.ttk as ttk
 
-import matplotlib
-matplotlib.use('TkAgg')
 import platform
 import os
 import traceback
-import lmfit
 import ast
 
-# threading
-import threading
-
 # own modules:
-from PlotClasses_noThreads import ORIGData, SVDGF_reconstruction, SVD_reconstruction
-from FunctionsUsedByPlotClasses import get_TA_data_after_start_time
-from SupportClasses import ToolTip, NotebookContainer, saveData
-from ToplevelClasses import FitResult_Toplevel, DAS_Toplevel, initial_fit_parameter_values_Toplevel, target_model_Toplevel, ChooseColorMaps_Toplevel, MatrixBounds_Toplevel
+from SupportClasses import ToolTip, NotebookContainer, JobScheduler, LazyImport
+
+# the plot classes (matplotlib, seaborn, scipy, lmfit, asteval) and the Toplevels are only needed once the user clicks something,
+# so they are imported on first use to keep the startup short.
+lmfit = LazyImport.lazy_import("lmfit")
+ORIGData = LazyImport.lazy_import("PlotClasses_noThreads.ORIGData")
+SVD_reconstruction = LazyImport.lazy_import("PlotClasses_noThreads.SVD_reconstruction")
+SVDGF_reconstruction = LazyImport.lazy_import("PlotClasses_noThreads.SVDGF_reconstruction")
+get_TA_data_after_start_time = LazyImport.lazy_import("FunctionsUsedByPlotClasses.get_TA_data_after_start_time")
+saveData = LazyImport.lazy_import("SupportClasses.saveData")
+FitResult_Toplevel = LazyImport.lazy_import("ToplevelClasses.FitResult_Toplevel")
+DAS_Toplevel = LazyImport.lazy_import("ToplevelClasses.DAS_Toplevel")
+initial_fit_parameter_values_Toplevel = LazyImport.lazy_import("ToplevelClasses.initial_fit_parameter_values_Toplevel")
+target_model_Toplevel = LazyImport.lazy_import("ToplevelClasses.target_model_Toplevel")
+ChooseColorMaps_Toplevel = LazyImport.lazy_import("ToplevelClasses.ChooseColorMaps_Toplevel")
+MatrixBounds_Toplevel = LazyImport.lazy_import("ToplevelClasses.MatrixBounds_Toplevel")
+JobList_Toplevel = LazyImport.lazy_import("ToplevelClasses.JobList_Toplevel")
+MemoryUsage_Toplevel = LazyImport.lazy_import("ToplevelClasses.MemoryUsage_Toplevel")
+BackgroundWriter = LazyImport.lazy_import("SupportClasses.BackgroundWriter")
+ResultsBrowser_Toplevel = LazyImport.lazy_import("ToplevelClasses.ResultsBrowser_Toplevel")
+get_incremental_SVD = LazyImport.lazy_import("FunctionsUsedByPlotClasses.get_incremental_SVD")
 
 class GuiAppTAAnalysis(tk.Frame):
 
@@ -35,6 +56,9 @@ class GuiAppTAAnalysis(tk.Frame):
         self.initial_fit_parameter_values_file = self.config_files_directory + "/Initial_fit_parameter_values.txt"
         self.colormaps_dict_file = self.config_files_directory + "/colormaps_for_heatmaps.txt"
         self.target_model_fit_function_file = self.config_files_directory + "/target_model_summands.txt"
+        self.kinetic_scheme_file = self.config_files_directory + "/kinetic_scheme.txt"
+        # written by the fit method race, read by the fit method "auto"
+        self.best_fit_methods_file = self.config_files_directory + "/best_fit_methods.txt"
 
         self.read_initial_fit_parameter_values_from_file()
         self.read_currently_used_cmaps_from_file()
@@ -85,6 +109,12 @@ class GuiAppTAAnalysis(tk.Frame):
         self.last_window_dimensions = (root.winfo_width(), root.winfo_height())
         self.set_heatmaps_frame_size_depending_on_root_size()
 
+        # all computations of data objects are run as jobs of this scheduler (bounded worker pools, results delivered in gui thread)
+        self.job_scheduler = JobScheduler.JobScheduler(self)
+        # writes the files of the save buttons in the writer thread of the job scheduler, created on the first save
+        self.background_writer = None
+        self.hide_save_status_after_id = None
+
         # initializing gui
         self.initialize_GUI()
 
@@ -246,24 +276,115 @@ class GuiAppTAAnalysis(tk.Frame):
 
         return None
 
-    def monitor_thread(self, thread_object, data_object, button, label):
-        if thread_object.is_alive():
-            # check the thread every 100ms
-            self.after(100, lambda: self.monitor_thread(thread_object, data_object, button, label))
+    def submit_make_data_job(self, data_object, job_group, label, tabs):
+        """queue data_object.make_data on the job scheduler (SVDGF_Heatmap.make_data queues its jobs itself). Once it is done, the plot is made in the gui thread.
+
+        Args:
+            data_object (ORIGData_Heatmap, SVD_Heatmap or SVDGF_Heatmap): the data object of the new tab.
+            job_group (str): group of the job in the scheduler, one per notebook type.
+            label (tk.Label): reassuring label, shown as long as jobs of that group are pending.
+            tabs (list of (ttk.Notebook, tk.Frame)): the tabs belonging to the data object, removed if the job is cancelled.
+        """
+        label.grid(row=self.btn_quit.grid_info()["row"], column=self.btn_quit.grid_info()["column"])
+
+        job_options = {"name": f"{job_group} tab: " + ", ".join(notebook.tab(frame, "text") for notebook, frame in tabs), "group": job_group, "priority": JobScheduler.PRIORITY_RENDER,
+                        "on_done": lambda job: self.make_canvas_when_job_done(data_object, job_group, label),
+                        "on_error": lambda job: self.remove_tabs_of_unfinished_job(job, data_object, job_group, label, tabs),
+                        "on_cancel": lambda job: self.remove_tabs_of_unfinished_job(job, data_object, job_group, label, tabs)}
+        if job_group == "SVDGF":
+            # queues its fit on the process pool of the job scheduler itself
+            data_object.make_data(self.job_scheduler, **job_options)
         else:
-            # data has been computed, now make plot and put it on canvas
-            try:
-                data_object.make_canvas()
-            except AttributeError as error:
-                print(f"\nAn exception occurred: {type(error)}\n {error}." +
-                        "\nThis is likely due to something not working as expected in the above data preparation of that data object.\n"
-                        +"\nTraceback:\n")
-                traceback.print_tb(error.__traceback__)
-            # return Gui to initial state
-            button['state'] = tk.NORMAL
+            self.job_scheduler.submit(data_object.make_data, **job_options)
+
+        return None
+
+    def make_canvas_when_job_done(self, data_object, job_group, label):
+        # data has been computed, now make plot and put it on canvas
+        try:
+            data_object.make_canvas()
+        except AttributeError as error:
+            print(f"\nAn exception occurred: {type(error)}\n {error}." +
+                    "\nThis is likely due to something not working as expected in the above data preparation of that data object.\n"
+                    +"\nTraceback:\n")
+            traceback.print_tb(error.__traceback__)
+
+        if not self.job_scheduler.has_pending_jobs(group=job_group):
             label.grid_remove()
 
-            return None
+        return None
+
+    def remove_tabs_of_unfinished_job(self, job, data_object, job_group, label, tabs):
+        if job.error is not None:
+            print(f"\nAn exception occurred in job {job.name}: {type(job.error)}\n {job.error}\nTraceback:\n")
+            traceback.print_tb(job.error.__traceback__)
+            # the data objects raise their errors instead of showing messageboxes from the worker thread
+            tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(job.error).__name__} message: \n"+ str(job.error))
+
+        for notebook, frame in tabs:
+            self.return_some_gui_widgets_to_initial_state(tab_control=notebook, tab=frame)
+
+        # the data object might already have deleted its attributes, if its data preparation failed
+        if vars(data_object):
+            data_object.delete_attributes()
+
+        if not self.job_scheduler.has_pending_jobs(group=job_group):
+            label.grid_remove()
+
+        return None
+
+    def show_job_list_toplevel(self):
+        JobList_Toplevel.JobList_Window(self, self.job_scheduler)
+
+        return None
+
+    def show_memory_usage_toplevel(self):
+        MemoryUsage_Toplevel.MemoryUsage_Window(self)
+
+        return None
+
+    def save_in_background(self, save_task, on_done=None):
+        """queue a BackgroundWriter.SaveTask of a data object or Toplevel, its figures and files are written without blocking the gui.
+
+        Returns:
+            Job or None: None if the save has been refused, as too many saves are pending.
+        """
+        if self.background_writer is None:
+            self.background_writer = BackgroundWriter.BackgroundWriter(self.job_scheduler, self.notify_save_status)
+
+        return self.background_writer.submit(save_task, on_done)
+
+    def notify_save_status(self, message, is_error):
+        """ called by the background writer in the gui thread. """
+        if self.hide_save_status_after_id is not None:
+            self.after_cancel(self.hide_save_status_after_id)
+            self.hide_save_status_after_id = None
+
+        self.lbl_save_status.configure(text=message.splitlines()[0])
+        self.lbl_save_status.grid(row=self.btn_quit.grid_info()["row"], column=self.btn_quit.grid_info()["column"], sticky="se", padx=(0, 100), pady=3)
+
+        if is_error:
+            tk.messagebox.showerror("Warning, saving failed!", message)
+        if not self.background_writer.has_pending_saves():
+            self.hide_save_status_after_id = self.after(5000, self.hide_save_status)
+
+        return None
+
+    def hide_save_status(self):
+        self.hide_save_status_after_id = None
+        self.lbl_save_status.grid_remove()
+
+        return None
+
+    def quit_app(self):
+        # files that are still being written would be incomplete
+        if self.background_writer is not None and self.background_writer.has_pending_saves():
+            self.lbl_save_status.configure(text=f"finishing {self.background_writer.get_nr_of_pending_saves()} saves before quitting ...")
+            self.update_idletasks()
+            self.background_writer.wait_until_done()
+
+        self.job_scheduler.shutdown()
+        quit()
 
     def flash_target_model_btn_callback(self):
         if self.checkbox_use_target_model["state"] == tk.DISABLED:
@@ -296,6 +417,16 @@ class GuiAppTAAnalysis(tk.Frame):
 
         return components_to_use
 
+    def preselect_components(self, components):
+        """ ticks the component checkbuttons of components, e.g. those suggested by the rank estimation, unless some are ticked already. """
+        if any(var.get() == 1 for var in self.checkbutton_vars_reconstruct_data):
+            return None
+
+        for i, var in enumerate(self.checkbutton_vars_reconstruct_data):
+            var.set(1 if i in components else 0)
+
+        return None
+
     def set_curr_fileVar(self, file_var):
         filename = tk.filedialog.askopenfilename(initialdir=self.base_directory+"/DataFiles", title="Select a file to work with", filetypes=self.ftypes)
 
@@ -377,6 +508,41 @@ class GuiAppTAAnalysis(tk.Frame):
     def get_fit_method_name(self):
         return self.fit_method_name
 
+    def set_fit_weighting(self):
+        print(f"new global fits use the weighting: {self.fit_weighting_strVar.get()}")
+
+        return None
+
+    def get_fit_weighting(self):
+        return self.fit_weighting_strVar.get()
+
+    def set_fit_engine(self):
+        print(f"new global fits fit: {self.fit_engine_strVar.get()}")
+
+        return None
+
+    def get_fit_engine(self):
+        return self.fit_engine_strVar.get()
+
+    def set_kinetic_scheme(self):
+        if self.kinetic_scheme_strVar.get() == "from file" and not os.path.exists(self.kinetic_scheme_file):
+            tk.messagebox.showwarning("Warning!", f"{self.kinetic_scheme_file} does not exist, new global fits compute no SAS!\n\n"
+                                        +"It should contain one python dictionary, e.g. {'transfers': [(0, 1, 1.0), (1, 2, 0.6), (1, 3, 0.4)], 'initial_populations': {0: 1.0}}, "
+                                        +"see the README.")
+            self.kinetic_scheme_strVar.set("none")
+        print(f"new global fits use the kinetic scheme: {self.kinetic_scheme_strVar.get()}")
+
+        return None
+
+    def get_kinetic_scheme(self):
+        """ None, one of the presets or the kinetic scheme file, as TA_analysis_pipeline.run_SVDGF takes it. """
+        kinetic_scheme = self.kinetic_scheme_strVar.get()
+        if kinetic_scheme == "none":
+            return None
+        if kinetic_scheme == "from file":
+            return self.kinetic_scheme_file
+        return kinetic_scheme
+
     def define_target_model_fit_function(self):
         self.components_to_use = self.get_components_to_use()
         if (self.components_to_use is None):
@@ -496,13 +662,17 @@ class GuiAppTAAnalysis(tk.Frame):
         return True
 
     """ methods to clear Gui variables and frames and tabs """
-    def return_some_gui_widgets_to_initial_state(self, button=None, label=None, tab_control=None):
+    def return_some_gui_widgets_to_initial_state(self, button=None, label=None, tab_control=None, tab=None):
+        """ tab: the frame of the tab to remove from tab_control. If None, the current tab is removed. """
         if button:
             button["state"] = tk.ACTIVE
         if label:
             label.grid_remove()
         if tab_control:
-            tab_control.forget("current")
+            if tab is None:
+                tab_control.forget("current")
+            elif str(tab) in tab_control.tabs():
+                tab_control.forget(tab)
 
             if tab_control.index(tk.END) == 0:
                 tab_control.grid_remove()
@@ -522,7 +692,8 @@ class GuiAppTAAnalysis(tk.Frame):
 
         try:
             data_obj = self.nbCon_SVDGF.data_objs[tab_index]
-            self.fit_report_toplevels.append(FitResult_Toplevel.FitResult_Window(self, tab_index, lmfit.fit_report(data_obj.fit_result), data_obj.filename))
+            self.fit_report_toplevels.append(FitResult_Toplevel.FitResult_Window(self, tab_index, data_obj.get_fit_report(), data_obj.filename,
+                                                                                    race_inputs=data_obj.get_race_inputs()))
 
         except (IndexError, AttributeError) as error:
             tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(error)} message: \n"+ str(error)+"\n"
@@ -542,7 +713,8 @@ class GuiAppTAAnalysis(tk.Frame):
 
         try:
             data_obj = self.nbCon_SVDGF.data_objs[tab_index]
-            self.DAS_toplevels.append(DAS_Toplevel.DAS_Window(self, tab_index, data_obj.DAS, data_obj.wavelengths, data_obj.resulting_SVDGF_fit_parameters, data_obj.components_list, data_obj.filename, data_obj.start_time, data_obj.full_path_to_final_dir))
+            self.DAS_toplevels.append(DAS_Toplevel.DAS_Window(self, tab_index, data_obj.DAS, data_obj.wavelengths, data_obj.resulting_SVDGF_fit_parameters, data_obj.components_list, data_obj.filename, data_obj.start_time, data_obj.full_path_to_final_dir,
+                                                                uncertainty_inputs=data_obj.get_uncertainty_inputs(), SAS=data_obj.SAS))
 
         except (IndexError, AttributeError) as error:
             tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(error)} message: \n"+ str(error)+"\n"
@@ -564,12 +736,6 @@ class GuiAppTAAnalysis(tk.Frame):
         if file_state == "Cancelled":
             return None
 
-        # disable the used button during computation
-        self.btn_show_orig_data_heatmap['state'] = tk.DISABLED
-
-        # put a reassuring label on gui because this computation takes some time
-        self.lbl_reassuring_orig.grid(row=self.btn_quit.grid_info()["row"], column=self.btn_quit.grid_info()["column"])
-
         # make tabs with heatmap plots:
         self.next_tab_idx_orig = self.get_index_of_next_tab_for_nb(self.nbCon_orig.tab_control, self.NR_OF_TABS)
         if not self.nbCon_orig.tab_control.winfo_ismapped():
@@ -577,9 +743,8 @@ class GuiAppTAAnalysis(tk.Frame):
         self.nbCon_orig.add_indexed_tab(self.next_tab_idx_orig, title=str(self.curr_reconstruct_data_start_time_value.get()) + " " + self.truncated_filename)
 
         self.nbCon_orig.data_objs[self.next_tab_idx_orig] = ORIGData.ORIGData_Heatmap(self, self.next_tab_idx_orig, self.curr_reconstruct_data_file_strVar.get(), self.data_matrix_bounds_dict, self.truncated_filename, self.currently_used_cmaps_dict)
-        thread_instance_orig = threading.Thread(target=self.nbCon_orig.data_objs[self.next_tab_idx_orig].make_data)
-        thread_instance_orig.start()
-        self.monitor_thread(thread_instance_orig, self.nbCon_orig.data_objs[self.next_tab_idx_orig], self.btn_show_orig_data_heatmap, self.lbl_reassuring_orig)
+        # the computation is queued, so further tabs can be requested while this one is computed. a reassuring label is shown meanwhile.
+        self.submit_make_data_job(self.nbCon_orig.data_objs[self.next_tab_idx_orig], "ORIG", self.lbl_reassuring_orig, [(self.nbCon_orig.tab_control, self.nbCon_orig.figure_frames[self.next_tab_idx_orig])])
 
         return None
 
@@ -600,26 +765,26 @@ class GuiAppTAAnalysis(tk.Frame):
             # getting components failed, do nothing
             return None
 
-        # disable the used button during computation
-        self.btn_show_SVD_reconstructed_data_heatmap['state'] = tk.DISABLED
-        # a reassuring label because this computation takes some time
-        self.lbl_reassuring_SVD.grid(row=self.btn_quit.grid_info()["row"], column=self.btn_quit.grid_info()["column"])
+        self.add_SVD_tabs(self.curr_reconstruct_data_file_strVar.get(), self.data_matrix_bounds_dict, self.components_to_use)
 
+        return None
+
+    def add_SVD_tabs(self, filename, matrix_bounds_dict, components, saved_result_file=None):
+        """ adds the SVD tab and its difference tab and queues the computation (or the loading of saved_result_file) of their data. """
         # make tabs with heatmap plots:
         self.next_tab_idx_SVD = self.get_index_of_next_tab_for_nb(self.nbCon_SVD.tab_control, self.NR_OF_TABS)
         if not self.nbCon_SVD.tab_control.winfo_ismapped():
             self.nbCon_SVD.tab_control.grid(row=0, column=1, sticky="nw")
-        self.nbCon_SVD.add_indexed_tab(self.next_tab_idx_SVD, title=str(self.components_to_use))
+        self.nbCon_SVD.add_indexed_tab(self.next_tab_idx_SVD, title=str(components))
 
         self.next_tab_idx_difference = self.get_index_of_next_tab_for_nb(self.nbCon_difference.tab_control, self.NR_OF_DIFFERENCE_TABS)
         if not self.nbCon_difference.tab_control.winfo_ismapped():
             self.nbCon_difference.tab_control.grid(row=1, column=2, sticky="ne")
         self.nbCon_difference.add_indexed_tab(self.next_tab_idx_difference, title="SVD "+str(self.next_tab_idx_SVD+1))
 
-        self.nbCon_SVD.data_objs[self.next_tab_idx_SVD] = SVD_reconstruction.SVD_Heatmap(self, self.curr_reconstruct_data_file_strVar.get(), self.data_matrix_bounds_dict, self.components_to_use, self.next_tab_idx_SVD, self.next_tab_idx_difference, self.currently_used_cmaps_dict)
-        thread_instance_SVD = threading.Thread(target=self.nbCon_SVD.data_objs[self.next_tab_idx_SVD].make_data)
-        thread_instance_SVD.start()
-        self.monitor_thread(thread_instance_SVD, self.nbCon_SVD.data_objs[self.next_tab_idx_SVD], self.btn_show_SVD_reconstructed_data_heatmap, self.lbl_reassuring_SVD)
+        self.nbCon_SVD.data_objs[self.next_tab_idx_SVD] = SVD_reconstruction.SVD_Heatmap(self, filename, matrix_bounds_dict, components, self.next_tab_idx_SVD, self.next_tab_idx_difference, self.currently_used_cmaps_dict, saved_result_file=saved_result_file)
+        # the computation is queued, so further tabs can be requested while this one is computed. a reassuring label is shown meanwhile.
+        self.submit_make_data_job(self.nbCon_SVD.data_objs[self.next_tab_idx_SVD], "SVD", self.lbl_reassuring_SVD, [(self.nbCon_SVD.tab_control, self.nbCon_SVD.figure_frames[self.next_tab_idx_SVD]), (self.nbCon_difference.tab_control, self.nbCon_difference.figure_frames[self.next_tab_idx_difference])])
 
         return None
 
@@ -640,31 +805,131 @@ class GuiAppTAAnalysis(tk.Frame):
             # getting components failed, do nothing
             return None
 
-        # convolution in fit is not yet implemented!
+        # a temporal resolution > 0 convolutes the fit function with the IRF
         self.temporal_resolution_in_ps = int(self.ent_temporal_resolution_in_fs.get())/1000
         self.time_zero_in_ps = int(self.ent_time_zero.get())/1000
 
-        # disable the used button during computation
-        self.btn_show_SVDGF_reconstructed_data_heatmap['state'] = tk.DISABLED
+        self.add_SVDGF_tabs(self.curr_reconstruct_data_file_strVar.get(), self.data_matrix_bounds_dict, self.components_to_use, self.temporal_resolution_in_ps, self.time_zero_in_ps,
+                            self.initial_fit_parameter_values, bool(self.checkbox_var_use_target_model.get()), self.target_model_fit_function_file,
+                            fit_time_zero=bool(self.checkbox_var_fit_time_zero.get()), fit_temp_resolution=bool(self.checkbox_var_fit_temporal_resolution.get()))
 
-        # put a reassuring label on gui because this computation takes some time
-        self.lbl_reassuring_SVDGF.grid(row=self.btn_quit.grid_info()["row"], column=self.btn_quit.grid_info()["column"])
+        return None
 
+    def add_SVDGF_tabs(self, filename, matrix_bounds_dict, components, temp_resolution, time_zero, initial_fit_parameter_values, use_target_model, target_model_configuration_file, saved_result_file=None,
+                        fit_time_zero=False, fit_temp_resolution=False):
+        """ adds the SVDGF tab and its difference tab and queues the fit (or the loading of saved_result_file) of their data. """
         # make tabs with heatmap plots:
         self.next_tab_idx_SVDGF = self.get_index_of_next_tab_for_nb(self.nbCon_SVDGF.tab_control, self.NR_OF_TABS)
         if not self.nbCon_SVDGF.tab_control.winfo_ismapped():
             self.nbCon_SVDGF.tab_control.grid(row=1, column=1, sticky="nw")
-        self.nbCon_SVDGF.add_indexed_tab(self.next_tab_idx_SVDGF, title=str(self.components_to_use))
+        self.nbCon_SVDGF.add_indexed_tab(self.next_tab_idx_SVDGF, title=str(components))
 
         self.next_tab_idx_difference = self.get_index_of_next_tab_for_nb(self.nbCon_difference.tab_control, self.NR_OF_DIFFERENCE_TABS)
         if not self.nbCon_difference.tab_control.winfo_ismapped():
             self.nbCon_difference.tab_control.grid(row=1, column=2, sticky="ne")
         self.nbCon_difference.add_indexed_tab(self.next_tab_idx_difference, title="SVDGF "+str(self.next_tab_idx_SVDGF+1))
 
-        self.nbCon_SVDGF.data_objs[self.next_tab_idx_SVDGF] = SVDGF_reconstruction.SVDGF_Heatmap(self, self.curr_reconstruct_data_file_strVar.get(), self.data_matrix_bounds_dict, self.components_to_use, self.temporal_resolution_in_ps, self.time_zero_in_ps, self.next_tab_idx_SVDGF, self.next_tab_idx_difference, self.initial_fit_parameter_values, bool(self.checkbox_var_use_target_model.get()), self.currently_used_cmaps_dict, self.target_model_fit_function_file)
-        thread_instance_SVDGF = threading.Thread(target=self.nbCon_SVDGF.data_objs[self.next_tab_idx_SVDGF].make_data)
-        thread_instance_SVDGF.start()
-        self.monitor_thread(thread_instance_SVDGF, self.nbCon_SVDGF.data_objs[self.next_tab_idx_SVDGF], self.btn_show_SVDGF_reconstructed_data_heatmap, self.lbl_reassuring_SVDGF)
+        self.nbCon_SVDGF.data_objs[self.next_tab_idx_SVDGF] = SVDGF_reconstruction.SVDGF_Heatmap(self, filename, matrix_bounds_dict, components, temp_resolution, time_zero, self.next_tab_idx_SVDGF, self.next_tab_idx_difference, initial_fit_parameter_values, use_target_model, self.currently_used_cmaps_dict, target_model_configuration_file, saved_result_file=saved_result_file,
+                                                                                                    fit_time_zero=fit_time_zero, fit_temp_resolution=fit_temp_resolution)
+        # the computation is queued, so further tabs can be requested while this one is computed. a reassuring label is shown meanwhile.
+        self.submit_make_data_job(self.nbCon_SVDGF.data_objs[self.next_tab_idx_SVDGF], "SVDGF", self.lbl_reassuring_SVDGF, [(self.nbCon_SVDGF.tab_control, self.nbCon_SVDGF.figure_frames[self.next_tab_idx_SVDGF]), (self.nbCon_difference.tab_control, self.nbCon_difference.figure_frames[self.next_tab_idx_difference])])
+
+        return None
+
+    def open_saved_result(self):
+        """ reopen a result that has been saved in binary format (result_data.npz) in a new SVD or SVDGF tab, without recomputing it. """
+        saved_result_file = tk.filedialog.askopenfilename(initialdir=self.base_directory+"/DataFiles/ResultData", title="Select a saved result to open", filetypes=[('saved results', '*.npz')])
+        if saved_result_file == "" or saved_result_file == ():
+            return None
+
+        self.open_saved_result_file(saved_result_file)
+
+        return None
+
+    def open_saved_result_file(self, saved_result_file):
+        try:
+            metadata = saveData.read_binary_result_metadata(saved_result_file)
+            result_type = metadata["result_type"]
+        except (OSError, ValueError, KeyError) as error:
+            tk.messagebox.showerror("Warning, could not open the result!", f"Exception {type(error).__name__} message: \n"+ str(error))
+            return None
+
+        if result_type == "SVD":
+            if self.too_many_such_tabs(self.nbCon_SVD.tab_control, "next_tab_idx_SVD", self.NR_OF_TABS):
+                return None
+            self.add_SVD_tabs(metadata["filename"], metadata["matrix_bounds_dict"], metadata["components"], saved_result_file=saved_result_file)
+
+        elif result_type == "SVDGF":
+            if self.too_many_such_tabs(self.nbCon_SVDGF.tab_control, "next_tab_idx_SVDGF", self.NR_OF_TABS):
+                return None
+            self.add_SVDGF_tabs(metadata["filename"], metadata["matrix_bounds_dict"], metadata["components"], metadata["temp_resolution"], metadata["time_zero"], self.initial_fit_parameter_values,
+                                metadata["use_user_defined_fit_function"], metadata["target_model_configuration_file"], saved_result_file=saved_result_file,
+                                fit_time_zero=metadata.get("fit_time_zero", False), fit_temp_resolution=metadata.get("fit_temp_resolution", False))
+
+        else:
+            tk.messagebox.showerror("Warning, could not open the result!", f"results of type {result_type} can not be opened.")
+
+        return None
+
+    def show_results_browser_toplevel(self):
+        ResultsBrowser_Toplevel.ResultsBrowser_Window(self)
+
+        return None
+
+    def set_save_format(self):
+        print(f"results are saved as: {self.save_format_strVar.get()}")
+
+        return None
+
+    def get_save_format(self):
+        return self.save_format_strVar.get()
+
+    def set_precision(self):
+        print(f"new computations use precision: {self.precision_strVar.get()}")
+
+        return None
+
+    def get_precision(self):
+        return self.precision_strVar.get()
+
+    def set_incremental_SVD(self):
+        if self.incremental_SVD_intVar.get() == 1:
+            print("the SVD of data files that only have new time delays since the last SVD tab is updated incrementally")
+        else:
+            print("every SVD tab computes a full SVD")
+            self.SVD_cache = None
+
+        return None
+
+    def get_SVD_cache(self):
+        """ the cache of incrementally updated SVDs used by the SVD tabs, None if they compute full SVDs. """
+        if self.incremental_SVD_intVar.get() == 0:
+            return None
+        if self.SVD_cache is None:
+            self.SVD_cache = get_incremental_SVD.SVDCache()
+
+        return self.SVD_cache
+
+    def get_live_mode(self):
+        return self.live_mode_strVar.get()
+
+    def get_live_refresh_interval(self):
+        """ seconds between two reads of a growing data file, 1 s if nothing valid has been entered. """
+        try:
+            refresh_interval_in_ms = int(self.ent_live_refresh_interval_in_ms.get())
+        except ValueError:
+            return 1.0
+        if refresh_interval_in_ms <= 0:
+            return 1.0
+
+        return refresh_interval_in_ms/1000
+
+    def set_live_refresh_interval(self, event=None):
+        """ applies the entered refresh interval to the original data tabs that are live already. """
+        refresh_interval_s = self.get_live_refresh_interval()
+        for data_obj in self.nbCon_orig.data_objs:
+            if getattr(data_obj, "data_file_watcher", None) is not None:
+                data_obj.set_live_refresh_interval(refresh_interval_s)
 
         return None
 
@@ -706,6 +971,29 @@ class GuiAppTAAnalysis(tk.Frame):
         self.btn_change_reconstruct_start_time_value = tk.Button(self.frm_orig_data_tab1, text="change matrix bounds", command=self.set_matrix_bounds_values)
         self.btn_change_reconstruct_start_time_value.grid(row=2, column=0, padx=3, pady=5, sticky="ew")
 
+        """ live mode: new original data tabs keep reading their data file (or its directory) while it is written """
+        self.frm_live_mode = tk.Frame(self.frm_orig_data_tab1, bg=self.gold)
+        self.lbl_live_mode = tk.Label(self.frm_live_mode, text="live:", fg=self.violet)
+        ttp_lbl_live_mode = ToolTip.CreateToolTip(self.lbl_live_mode, \
+        'Used for new original data tabs: '
+        '"append rows" reads the rows (time delays) that are appended to the data file, '
+        '"new files in directory" averages every new data file of the directory of the data file (one file per scan). '
+        'The heatmap and open kinetics/spectrum windows of the tab are updated, the SVD tabs are not.'
+        '\n\nrefresh [ms]: time between two reads, <Return> applies it to open live tabs.')
+        self.live_mode_strVar = tk.StringVar(value="off")
+        # same as TA_analysis_pipeline.LIVE_MODES, not taken from there so that the pipeline is not imported at startup
+        self.opt_live_mode = tk.OptionMenu(self.frm_live_mode, self.live_mode_strVar, "off", "append rows", "new files in directory")
+        self.lbl_live_refresh_interval = tk.Label(self.frm_live_mode, text="refresh [ms]:", fg=self.violet)
+        self.ent_live_refresh_interval_in_ms = tk.Entry(self.frm_live_mode, width=6, fg=self.violet, validate="key", justify=tk.RIGHT, validatecommand=(self.register(self.test_value_digits_only),'%P','%d'))
+        self.ent_live_refresh_interval_in_ms.insert(0, 1000)
+        self.ent_live_refresh_interval_in_ms.bind("<Return>", self.set_live_refresh_interval)
+
+        self.lbl_live_mode.grid(row=0, column=0, padx=3, sticky="w")
+        self.opt_live_mode.grid(row=0, column=1, padx=3, sticky="ew")
+        self.lbl_live_refresh_interval.grid(row=1, column=0, padx=3, sticky="w")
+        self.ent_live_refresh_interval_in_ms.grid(row=1, column=1, padx=3, sticky="e")
+        self.frm_live_mode.grid(row=3, column=0, padx=3, pady=5, sticky="ew")
+
         """ widgets for SVD_reconstruction data heatmap generation """
         self.frm_update_reconstruct_data_tab1 = tk.Frame(self.frm_main, bg=self.gold,)
         self.frm_update_reconstruct_data_tab1.grid_propagate(1)                                   # 0 fixes the frame size, no matter what widgets it contains
@@ -750,11 +1038,11 @@ class GuiAppTAAnalysis(tk.Frame):
         self.ent_temporal_resolution_in_fs = tk.Entry(self.frm_update_reconstruct_data_tab1, width=6, fg=self.violet, validate="key", justify=tk.RIGHT, validatecommand=(self.register(self.test_value_digits_only),'%P','%d'))
         self.ent_temporal_resolution_in_fs.insert(0, 0)
         ttp_lbl_temporal_resolution = ToolTip.CreateToolTip(self.lbl_temporal_resolution, \
-        'NOT USED AT THE MOMENT!\n'
-        'Might be Used for SVDGF reconstruction: '
+        'Used for SVDGF reconstruction: '
         'Entered value will be internally reformatted to [ps], e.g.: 500 fs => 0.5 ps. '
-        'The reformatted value is used by the fit function for the convolution. '
-        'The value corresponds to the instrument response function\'s FWHM.')
+        'The value corresponds to the instrument response function\'s FWHM. '
+        'If it is > 0, the exponentials of the fit function start at time zero and are convoluted with a gaussian IRF of this FWHM.'
+        '\n\nThe IRF is not used with a target model. 0 means no IRF.')
 
         self.lbl_temporal_resolution.grid(padx=3, pady=5, sticky="w")
         grid_info_lbl_temporal_resolution = self.lbl_temporal_resolution.grid_info()
@@ -764,14 +1052,26 @@ class GuiAppTAAnalysis(tk.Frame):
         self.ent_time_zero = tk.Entry(self.frm_update_reconstruct_data_tab1, width=6, fg=self.violet, validate="key", justify=tk.RIGHT, validatecommand=(self.register(self.test_value_digits_only),'%P','%d'))
         self.ent_time_zero.insert(0, 0)
         ttp_lbl_time_zero = ToolTip.CreateToolTip(self.lbl_time_zero, \
-        'NOT USED AT THE MOMENT!\n'
-        'Might be Used for SVDGF reconstruction: '
+        'Used for SVDGF reconstruction, if the temporal resolution is > 0: '
         'Entered value will be internally reformatted to [ps], e.g.: 500 fs => 0.5 ps. '
-        'The reformatted value is used by the fit function for the convolution.')
+        'The center of the IRF, i.e. the time at which the exponentials of the fit function start.')
 
         self.lbl_time_zero.grid(padx=3, pady=5, sticky="w")
         self.ent_time_zero.grid(row=self.lbl_time_zero.grid_info()["row"], padx=3, pady=5, sticky="e")
 
+        # optionally fit time zero and the FWHM of the IRF instead of using the entered values
+        self.frm_fit_IRF = tk.Frame(self.frm_update_reconstruct_data_tab1)
+        self.checkbox_var_fit_time_zero = tk.IntVar(value=0)
+        self.checkbox_var_fit_temporal_resolution = tk.IntVar(value=0)
+        self.lbl_fit_IRF = tk.Label(self.frm_fit_IRF, text="fit IRF:", fg=self.violet)
+        ttp_lbl_fit_IRF = ToolTip.CreateToolTip(self.lbl_fit_IRF, \
+        'Fit time zero and/or the FWHM of the IRF, starting from the entered values.'
+        '\nOnly used if the temporal resolution is > 0.')
+        self.lbl_fit_IRF.grid(row=0, column=0, sticky="w")
+        tk.Checkbutton(self.frm_fit_IRF, text="t0", variable=self.checkbox_var_fit_time_zero).grid(row=0, column=1, sticky="w")
+        tk.Checkbutton(self.frm_fit_IRF, text="FWHM", variable=self.checkbox_var_fit_temporal_resolution).grid(row=0, column=2, sticky="w")
+        self.frm_fit_IRF.grid(padx=3, pady=0, sticky="w")
+
         self.btn_show_SVDGF_reconstructed_data_heatmap = tk.Button(self.frm_update_reconstruct_data_tab1, text="show SVD fit data", command=self.show_SVD_GlobalFit_reconstructed_data_heatmap)
         self.btn_show_SVDGF_reconstructed_data_heatmap.grid(column=0, padx=3, pady=5, sticky="ew")
 
@@ -847,7 +1147,8 @@ class GuiAppTAAnalysis(tk.Frame):
                             'cg': 'Conjugate-Gradient',
                             'cobyla': 'Cobyla',
                             'bfgs': 'BFGS',
-                            'tnc': 'Truncated Newton'}
+                            'tnc': 'Truncated Newton',
+                            'auto': 'the best method of the last fit method race for this kind of fit (fit results window), else leastsq'}
 
         self.menubar = tk.Menu(self.parent)
         self.fit_method_menu = tk.Menu(self.menubar, tearoff=0)
@@ -859,7 +1160,62 @@ class GuiAppTAAnalysis(tk.Frame):
         for index, fit_method in enumerate(self.fit_methods_dict.keys()):
             self.fit_method_menu.add_command(label=menu_strings[index], command = lambda x=fit_method, i=index: self.set_fit_method_name(x, i))
 
+        # weighting of the residuals by the noise, the weights are computed once per fit
+        self.fit_method_menu.add_separator()
+        self.fit_weighting_strVar = tk.StringVar(value="none")
+        # same as TA_analysis_pipeline.WEIGHTINGS, not taken from there so that the pipeline is not imported at startup
+        self.fit_method_menu.add_radiobutton(label="weighting: none (default)", variable=self.fit_weighting_strVar, value="none", command=self.set_fit_weighting)
+        self.fit_method_menu.add_radiobutton(label="weighting: noise of each wavelength before time zero", variable=self.fit_weighting_strVar, value="noise before time zero", command=self.set_fit_weighting)
+        self.fit_method_menu.add_radiobutton(label="weighting: noise map of averaged scans (<data file>_noise_map)", variable=self.fit_weighting_strVar, value="noise map", command=self.set_fit_weighting)
+
+        # the retained right SVs or the complete data matrix, e.g. if the SVD truncation loses weak components
+        self.fit_method_menu.add_separator()
+        self.fit_engine_strVar = tk.StringVar(value="SVD vectors")
+        # same as TA_analysis_pipeline.FIT_ENGINES
+        self.fit_method_menu.add_radiobutton(label="fit the retained right SVs (default)", variable=self.fit_engine_strVar, value="SVD vectors", command=self.set_fit_engine)
+        self.fit_method_menu.add_radiobutton(label="fit the full data matrix (DAS by variable projection)", variable=self.fit_engine_strVar, value="full matrix", command=self.set_fit_engine)
+
+        # SAS of a kinetic scheme of the selected components, computed from the DAS after the fit
+        self.fit_method_menu.add_separator()
+        self.kinetic_scheme_strVar = tk.StringVar(value="none")
+        # presets same as TA_analysis_pipeline.KINETIC_SCHEME_PRESETS
+        self.fit_method_menu.add_radiobutton(label="kinetic scheme: none, DAS only (default)", variable=self.kinetic_scheme_strVar, value="none", command=self.set_kinetic_scheme)
+        self.fit_method_menu.add_radiobutton(label="kinetic scheme: sequential (SAS)", variable=self.kinetic_scheme_strVar, value="sequential", command=self.set_kinetic_scheme)
+        self.fit_method_menu.add_radiobutton(label="kinetic scheme: parallel (SAS = DAS)", variable=self.kinetic_scheme_strVar, value="parallel", command=self.set_kinetic_scheme)
+        self.fit_method_menu.add_radiobutton(label="kinetic scheme: from configFiles/kinetic_scheme.txt (SAS)", variable=self.kinetic_scheme_strVar, value="from file", command=self.set_kinetic_scheme)
+
         self.menubar.add_cascade(label="Fit method", menu=self.fit_method_menu)
+
+        # menu to inspect and cancel queued and running computations
+        self.jobs_menu = tk.Menu(self.menubar, tearoff=0)
+        self.jobs_menu.add_command(label="show jobs", command=self.show_job_list_toplevel)
+        self.jobs_menu.add_command(label="show memory usage of the tabs", command=self.show_memory_usage_toplevel)
+        self.menubar.add_cascade(label="Jobs", menu=self.jobs_menu)
+
+        # menu to reopen saved results and to choose the format results are saved in
+        self.results_menu = tk.Menu(self.menubar, tearoff=0)
+        self.results_menu.add_command(label="open saved result (.npz)", command=self.open_saved_result)
+        self.results_menu.add_command(label="browse saved results", command=self.show_results_browser_toplevel)
+        self.results_menu.add_separator()
+        self.save_format_strVar = tk.StringVar(value="text")
+        # same as saveData.SAVE_FORMATS, not taken from there so that saveData (numpy) is not imported at startup
+        for save_format in ("text", "binary", "text and binary"):
+            self.results_menu.add_radiobutton(label="save as "+save_format, variable=self.save_format_strVar, value=save_format, command=self.set_save_format)
+        self.menubar.add_cascade(label="Results", menu=self.results_menu)
+
+        # precision policy of new computations, the fit itself always runs in float64
+        self.precision_menu = tk.Menu(self.menubar, tearoff=0)
+        self.precision_strVar = tk.StringVar(value="float64")
+        # same as TA_analysis_pipeline.PRECISIONS, not taken from there so that the pipeline is not imported at startup
+        self.precision_menu.add_radiobutton(label="float64 (default)", variable=self.precision_strVar, value="float64", command=self.set_precision)
+        self.precision_menu.add_radiobutton(label="float32 (half the memory, faster SVD and plots)", variable=self.precision_strVar, value="float32", command=self.set_precision)
+        # a data file that is re-read during a measurement only has new time delays, its cached SVD is updated instead of recomputed
+        self.precision_menu.add_separator()
+        self.incremental_SVD_intVar = tk.IntVar(value=0)
+        self.SVD_cache = None
+        self.precision_menu.add_checkbutton(label="update the SVD of growing data files incrementally (SVD tabs)", variable=self.incremental_SVD_intVar, onvalue=1, offvalue=0, command=self.set_incremental_SVD)
+        self.menubar.add_cascade(label="Precision", menu=self.precision_menu)
+
         self.parent.config(menu=self.menubar)
 
         return None
@@ -883,10 +1239,23 @@ class GuiAppTAAnalysis(tk.Frame):
         self.btn_set_initial_fit_parameter_values.grid(sticky="sw", padx=0, pady=3, ipady=2, ipadx=0)
 
         # quit button
-        self.btn_quit = tk.Button(self.parent, text="Quit App", command=quit)
+        self.btn_quit = tk.Button(self.parent, text="Quit App", command=self.quit_app)
         self.btn_quit.grid(sticky="se", padx=5, pady=3, ipady=2, ipadx=5, row=self.btn_set_initial_fit_parameter_values.grid_info()["row"])
 
+        # shows the progress of saves that are written in the background
+        self.lbl_save_status = tk.Label(self.parent, text="", fg=self.violet)
+
 if __name__ == '__main__':
+    if startup_profiler is not None:
+        startup_profiler.record_stage("imports")
     root=tk.Tk()
+    if startup_profiler is not None:
+        startup_profiler.record_stage("tk.Tk()")
     app=GuiAppTAAnalysis(root)
+    if startup_profiler is not None:
+        startup_profiler.record_stage("GuiAppTAAnalysis.__init__")
+        # draw the first window before the report
+        root.update()
+        startup_profiler.record_stage("first window drawn")
+        startup_profiler.report()
     root.mainloop()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Headless batch analysis of many TA data files.\n
+Runs the SVD or SVD-GlobalFit pipeline (FunctionsUsedByPlotClasses/TA_analysis_pipeline) for every file that matches the given glob patterns
+in a process pool and saves the same result files as the GUI does (into DataFiles/ResultData/...).
+At the end a summary csv with the fitted decay times, their standard errors and chi-square of each file is written.
+
+With --merge-scans the files are repeated scans of one sample instead: they are averaged (outlier scans are rejected) into one data file
+with a noise map next to it, which is then analysed.
+
+example:
+    python TA_analysis_batch.py "DataFiles/*.txt" --components 0 1 2 --bounds 400 700 0.5 1000
+    python TA_analysis_batch.py "DataFiles/sample1_scan*.txt" --merge-scans DataFiles/sample1_average.txt
+"""
+
+import argparse
+import ast
+import csv
+import glob
+import os
+import time
+from concurrent import futures
+from datetime import datetime
+
+import lmfit
+
+from FunctionsUsedByPlotClasses import TA_analysis_pipeline
+from SupportClasses import ResultsIndex, saveData
+
+def read_dict_from_file(path):
+    """ the config files in configFiles contain python dict literals. """
+    try:
+        with open(path, mode='r') as dict_file:
+            return ast.literal_eval(dict_file.read().strip())
+    except (SyntaxError, ValueError, OSError) as error:
+        raise ValueError(f"could not read a dict from {path}: {error}")
+
+def save_SVD_result(SVD_result, full_path_to_final_dir, save_format="text"):
+    """ saves the same result data as SVD_Heatmap.save_data_to_file (without the heatmap figures). """
+    ta_data = SVD_result.data
+    saveData.make_log_file(full_path_to_final_dir, filename=ta_data.filename, start_time=ta_data.start_time, components=SVD_result.components.components_list, matrix_bounds=ta_data.matrix_bounds_dict)
+
+    result_data_to_save = {"time_delays": ta_data.time_delays, "wavelengths": ta_data.wavelengths, "singular_values": SVD_result.singular_values, "U_matrix": SVD_result.U_matrix, "VT_matrix": SVD_result.VT_matrix,
+                            "retained_right_SVs": SVD_result.components.retained_rSVs, "retained_left_SVs": SVD_result.components.retained_lSVs, "retained_sing_values": SVD_result.components.retained_singular_values}
+    if saveData.save_text_formats(save_format):
+        saveData.save_result_data(full_path_to_final_dir, result_data_to_save)
+
+        data_matrices_to_save = {"SVD_reconstruction_matrix": SVD_result.SVD_reconstructed_data.T, "difference_matrix": SVD_result.difference_matrix.T, "data_matrix": ta_data.data_matrix.T}
+        saveData.save_formatted_data_matrix_after_time(full_path_to_final_dir, ta_data.time_delays, ta_data.wavelengths, data_matrices_to_save)
+
+    if saveData.save_binary_format(save_format):
+        arrays_to_save = dict(result_data_to_save, SVD_reconstruction_matrix=SVD_result.SVD_reconstructed_data, difference_matrix=SVD_result.difference_matrix, data_matrix=ta_data.data_matrix)
+        saveData.save_result_data_binary(full_path_to_final_dir, "SVD", arrays_to_save, {"filename": ta_data.filename, "start_time": ta_data.start_time, "components": SVD_result.components.components_list,
+                                                                                        "matrix_bounds_dict": ta_data.matrix_bounds_dict})
+
+    return None
+
+def get_kinetic_scheme_description(SVDGF_result):
+    return None if SVDGF_result.kinetic_scheme is None else SVDGF_result.kinetic_scheme.get_description()
+
+def save_SVDGF_result(SVDGF_result, full_path_to_final_dir, save_format="text", time_zero=0, temp_resolution=0, target_model_configuration_file=None, fit_time_zero=False, fit_temp_resolution=False):
+    """ saves the same result data as SVDGF_Heatmap.save_data_to_file (without the heatmap figures). """
+    ta_data = SVDGF_result.data
+    saveData.make_log_file(full_path_to_final_dir, filename=ta_data.filename, start_time=ta_data.start_time, components=SVDGF_result.components.components_list, matrix_bounds_dict=ta_data.matrix_bounds_dict,
+                            use_user_defined_fit_function=bool(SVDGF_result.fit.parsed_user_defined_summands), fit_method=SVDGF_result.fit.fit_method_name,
+                            time_zero=time_zero, temp_resolution=temp_resolution, fit_time_zero=fit_time_zero, fit_temp_resolution=fit_temp_resolution, fit_weighting=SVDGF_result.fit.weighting,
+                            fit_engine=SVDGF_result.fit.fit_engine, kinetic_scheme=get_kinetic_scheme_description(SVDGF_result))
+
+    result_data_to_save = {"retained_sing_values": SVDGF_result.components.retained_singular_values, "DAS": SVDGF_result.DAS, "fit_report_complete": lmfit.fit_report(SVDGF_result.fit.fit_result),
+                            "time_delays": ta_data.time_delays, "wavelengths": ta_data.wavelengths, "retained_left_SVs": SVDGF_result.components.retained_lSVs, "retained_right_SVs": SVDGF_result.components.retained_rSVs}
+    if SVDGF_result.SAS is not None:
+        result_data_to_save.update({"SAS": SVDGF_result.SAS, "populations": SVDGF_result.populations})
+    if SVDGF_result.fit.parsed_user_defined_summands:
+        result_data_to_save["parsed_summands_of_user_defined_fit_function"] = SVDGF_result.fit.parsed_user_defined_summands
+    if saveData.save_text_formats(save_format):
+        saveData.save_result_data(full_path_to_final_dir, result_data_to_save)
+
+        data_matrices_to_save = {"SVDGF_reconstruction_matrix": SVDGF_result.SVDGF_reconstructed_data.T, "difference_matrix": SVDGF_result.difference_matrix.T, "data_matrix": ta_data.data_matrix.T}
+        saveData.save_formatted_data_matrix_after_time(full_path_to_final_dir, ta_data.time_delays, ta_data.wavelengths, data_matrices_to_save)
+
+    if saveData.save_binary_format(save_format):
+        # same entries as saved by SVDGF_Heatmap.save_data_to_file, so the GUI can reopen batch results
+        arrays_to_save = {name: value for name, value in result_data_to_save.items() if name not in ("fit_report_complete", "parsed_summands_of_user_defined_fit_function")}
+        arrays_to_save.update({"SVDGF_reconstruction_matrix": SVDGF_result.SVDGF_reconstructed_data, "difference_matrix": SVDGF_result.difference_matrix, "data_matrix": ta_data.data_matrix})
+        if SVDGF_result.fit.noise_weights is not None:
+            arrays_to_save.update({"wavelength_noise": SVDGF_result.fit.noise_weights.wavelength_noise, "time_noise": SVDGF_result.fit.noise_weights.time_noise})
+        metadata = {"filename": ta_data.filename, "start_time": ta_data.start_time, "components": SVDGF_result.components.components_list, "matrix_bounds_dict": ta_data.matrix_bounds_dict,
+                    "use_user_defined_fit_function": bool(SVDGF_result.fit.parsed_user_defined_summands), "fit_method": SVDGF_result.fit.fit_method_name, "time_zero": time_zero, "temp_resolution": temp_resolution,
+                    "fit_time_zero": fit_time_zero, "fit_temp_resolution": fit_temp_resolution, "fit_weighting": SVDGF_result.fit.weighting, "fit_engine": SVDGF_result.fit.fit_engine,
+                    "kinetic_scheme": get_kinetic_scheme_description(SVDGF_result), "target_model_configuration_file": target_model_configuration_file, "fit_parameters": SVDGF_result.fit.fit_params.dumps(),
+                    "fit_report_complete": result_data_to_save["fit_report_complete"], "parsed_summands_of_user_defined_fit_function": SVDGF_result.fit.parsed_user_defined_summands,
+                    "chisqr": SVDGF_result.fit.chisqr, "redchi": SVDGF_result.fit.redchi}
+        saveData.save_result_data_binary(full_path_to_final_dir, "SVDGF", arrays_to_save, metadata)
+
+    return None
+
+def analyse_file(filename, settings):
+    """ runs in a worker process: analyses one file, saves its results and returns its row of the summary csv.
+    Errors of the pipeline do not stop the batch, they are reported in the summary. """
+    summary_row = {"file": filename, "status": "done", "mode": settings["mode"], "components": settings["components"], "fit_method": settings["fit_method"], "weighting": settings["weighting"],
+                    "fit_engine": settings["fit_engine"], "precision": settings["precision"]}
+    start = time.time()
+
+    try:
+        ta_data = TA_analysis_pipeline.load_data(filename, settings["precision"])
+        if settings["bounds"] is not None:
+            ta_data = TA_analysis_pipeline.crop_data(ta_data, TA_analysis_pipeline.get_matrix_bounds_dict(ta_data, *settings["bounds"]))
+        summary_row["start_time"] = ta_data.start_time
+
+        if settings["mode"] == "SVD":
+            result = TA_analysis_pipeline.get_SVD_reconstruction(ta_data, settings["components"])
+            result_type = "/SVD_reconstruction_data/"
+        else:
+            # "auto": the best method of the last fit method race of this kind of fit in the gui
+            fit_method_name = TA_analysis_pipeline.resolve_fit_method(settings["fit_method"], settings["best_fit_methods_file"], settings["components"], settings["temp_resolution"],
+                                                                        settings["target_model_configuration_file"] is not None, settings["weighting"])
+            result = TA_analysis_pipeline.run_SVDGF(filename, settings["components"], settings["initial_fit_parameter_values"], target_model_configuration_file=settings["target_model_configuration_file"],
+                                                    fit_method_name=fit_method_name, ta_data=ta_data, time_zero=settings["time_zero"], temp_resolution=settings["temp_resolution"],
+                                                    fit_time_zero=settings["fit_time_zero"], fit_temp_resolution=settings["fit_temp_resolution"], weighting=settings["weighting"],
+                                                    fit_engine=settings["fit_engine"], kinetic_scheme=settings["kinetic_scheme"])
+            result_type = "/SVDGF_reconstruction_data/"
+            summary_row["fit_method"] = fit_method_name
+
+            stderrs = result.fit.get_stderrs_as_dict()
+            for component in settings["components"]:
+                summary_row[f"tau_component{component}"] = result.fit.decay_times_as_dict[f"tau_component{component}"]
+                summary_row[f"stderr_tau_component{component}"] = stderrs[f"tau_component{component}"]
+            summary_row.update(result.fit.irf_parameters)
+            summary_row["chisqr"] = result.fit.chisqr
+            summary_row["redchi"] = result.fit.redchi
+            summary_row["warnings"] = " ".join(warning.splitlines()[0] for warning in result.fit.warnings)
+
+            fit_uncertainties = None
+            if settings["uncertainties"] is not None:
+                fit_uncertainties = TA_analysis_pipeline.estimate_fit_uncertainties(result, settings["uncertainties"], max_workers=settings["uncertainty_workers"])
+                for name, (lower, upper) in fit_uncertainties.get_intervals_as_dict().items():
+                    summary_row[f"lower_{name}"] = lower
+                    summary_row[f"upper_{name}"] = upper
+                summary_row["uncertainty_replicates"] = fit_uncertainties.nr_of_replicates
+                summary_row["uncertainty_converged"] = fit_uncertainties.converged
+
+        date_dir, final_dir = saveData.get_directory_paths(ta_data.start_time, 0, components=settings["components"], run_name="batch")
+        full_path_to_final_dir = saveData.make_unique_directory(saveData.get_final_path(settings["base_directory"], date_dir, result_type, final_dir, filename))
+        if settings["mode"] == "SVD":
+            save_SVD_result(result, full_path_to_final_dir, settings["save_format"])
+        else:
+            save_SVDGF_result(result, full_path_to_final_dir, settings["save_format"], time_zero=settings["time_zero"], temp_resolution=settings["temp_resolution"],
+                                target_model_configuration_file=settings["target_model_configuration_file"], fit_time_zero=settings["fit_time_zero"], fit_temp_resolution=settings["fit_temp_resolution"])
+            if fit_uncertainties is not None:
+                saveData.save_fit_uncertainties(full_path_to_final_dir, fit_uncertainties)
+        summary_row["output_dir"] = full_path_to_final_dir
+
+        binary_file = full_path_to_final_dir + "/" + saveData.BINARY_RESULT_FILENAME if saveData.save_binary_format(settings["save_format"]) else None
+        if settings["mode"] == "SVD":
+            ResultsIndex.add_result(ResultsIndex.get_index_path(settings["base_directory"]), "SVD", filename, full_path_to_final_dir, start_time=ta_data.start_time,
+                                    matrix_bounds_dict=ta_data.matrix_bounds_dict, components=settings["components"], binary_file=binary_file, source="batch")
+        else:
+            ResultsIndex.add_result(ResultsIndex.get_index_path(settings["base_directory"]), "SVDGF", filename, full_path_to_final_dir, start_time=ta_data.start_time,
+                                    matrix_bounds_dict=ta_data.matrix_bounds_dict, components=settings["components"], fit_method=result.fit.fit_method_name,
+                                    use_target_model=bool(result.fit.parsed_user_defined_summands), decay_times=ResultsIndex.get_decay_times_with_stderrs(result.fit.fit_params, settings["components"]),
+                                    chisqr=result.fit.chisqr, redchi=result.fit.redchi, binary_file=binary_file, source="batch")
+
+    except TA_analysis_pipeline.PipelineError as error:
+        summary_row["status"] = "failed"
+        summary_row["error"] = " ".join(str(error).split())
+
+    summary_row["seconds"] = round(time.time() - start, 3)
+
+    return summary_row
+
+def merge_scan_files(scan_files, output_filename, outlier_threshold):
+    """ averages scan_files into output_filename and saves the noise map next to it. """
+    ta_data, scan_average = TA_analysis_pipeline.merge_scans(scan_files, {}, outlier_threshold=outlier_threshold)
+    saveData.save_data_file(output_filename, ta_data.time_delays, ta_data.wavelengths, ta_data.data_matrix)
+    saveData.save_data_file(TA_analysis_pipeline.get_noise_map_filename(output_filename), ta_data.time_delays, ta_data.wavelengths, ta_data.noise_map)
+    print(f"{scan_average.get_summary()}\nsaved to {output_filename}")
+
+    return None
+
+def write_summary_csv(path, summary_rows):
+    fieldnames = []
+    for row in summary_rows:
+        fieldnames.extend(key for key in row if key not in fieldnames)
+
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(summary_rows)
+
+    return None
+
+def get_data_files(patterns):
+    data_files = []
+    for pattern in patterns:
+        data_files.extend(file for file in sorted(glob.glob(pattern)) if os.path.isfile(file) and file not in data_files)
+
+    return data_files
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="SVD / SVD-GlobalFit analysis of many TA data files without the GUI.")
+    parser.add_argument("patterns", nargs="+", help="glob patterns of the data files, e.g. \"DataFiles/*.txt\" (quote them to let python expand them)")
+    parser.add_argument("--mode", choices=["SVD", "SVDGF"], default="SVDGF", help="SVD reconstruction only, or SVD-GlobalFit (default)")
+    parser.add_argument("--components", nargs="+", type=int, default=[0, 1, 2], help="SVD components to use (default: 0 1 2)")
+    parser.add_argument("--bounds", nargs=4, type=float, default=None, metavar=("MIN_WAVELENGTH", "MAX_WAVELENGTH", "MIN_TIME", "MAX_TIME"),
+                        help="use only this part of the data matrix, the closest values in the data file are used (default: complete matrix)")
+    parser.add_argument("--initial-values", default=os.path.join("configFiles", "Initial_fit_parameter_values.txt"), help="initial fit parameter values file")
+    parser.add_argument("--target-model", default=None, help="target model summands file, if given it is used as fit function (e.g. configFiles/target_model_summands.txt)")
+    parser.add_argument("--kinetic-scheme", default=None,
+                        help=f"also compute the SAS of a kinetic scheme of the components: one of {list(TA_analysis_pipeline.KINETIC_SCHEME_PRESETS)} or a kinetic scheme file (e.g. configFiles/kinetic_scheme.txt)")
+    parser.add_argument("--temp-resolution", type=float, default=0, help="FWHM of the gaussian IRF in ps, if > 0 the fit function is convoluted with it (default: 0, no IRF)")
+    parser.add_argument("--time-zero", type=float, default=0, help="center of the IRF in ps (default: 0)")
+    parser.add_argument("--fit-time-zero", action="store_true", help="fit the time zero of the IRF")
+    parser.add_argument("--fit-temp-resolution", action="store_true", help="fit the FWHM of the IRF")
+    parser.add_argument("--fit-method", default="leastsq", help="lmfit fit method, or auto for the best method of the last fit method race of this kind of fit in the GUI (default: leastsq)")
+    parser.add_argument("--best-fit-methods", default=os.path.join("configFiles", "best_fit_methods.txt"), help="file of the best fit methods used by --fit-method auto")
+    parser.add_argument("--fit-engine", choices=list(TA_analysis_pipeline.FIT_ENGINES), default="SVD vectors",
+                        help="fit the retained right singular vectors, or the complete data matrix with the DAS computed by variable projection (default: SVD vectors)")
+    parser.add_argument("--weighting", choices=list(TA_analysis_pipeline.WEIGHTINGS), default="none",
+                        help="weight the residuals of the fit by the noise of each wavelength before --time-zero, or by the noise map saved next to the data file by --merge-scans (default: none)")
+    parser.add_argument("--uncertainties", choices=list(TA_analysis_pipeline.UNCERTAINTY_METHODS), default=None,
+                        help="also estimate confidence intervals of the decay times and DAS bands by resampling: bootstrap of the residuals, monte carlo noise or bootstrap of the wavelengths")
+    parser.add_argument("--uncertainty-workers", type=int, default=1,
+                        help="worker processes per file for the resampling, the files are already analysed in parallel (default: 1)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: nr of cpus)")
+    parser.add_argument("--precision", choices=list(TA_analysis_pipeline.PRECISIONS), default=TA_analysis_pipeline.DEFAULT_PRECISION,
+                        help="dtype of the data matrix, SVD, DAS and reconstruction, the fit always runs in float64 (default: float64)")
+    parser.add_argument("--save-format", choices=saveData.SAVE_FORMATS, default="text", help="text files as saved by the GUI, one compressed result_data.npz per result (can be reopened in the GUI), or both (default: text)")
+    parser.add_argument("--merge-scans", default=None, metavar="OUTPUT_FILE",
+                        help="the data files are repeated scans: average them into OUTPUT_FILE (and its noise map OUTPUT_FILE_noise_map) and analyse only that")
+    parser.add_argument("--outlier-threshold", type=float, default=TA_analysis_pipeline.OUTLIER_THRESHOLD,
+                        help=f"with --merge-scans: scans whose modified z-score of their distance from the other scans is above this are not averaged (default: {TA_analysis_pipeline.OUTLIER_THRESHOLD})")
+    parser.add_argument("--summary", default=None, help="path of the summary csv (default: DataFiles/ResultData/batch_summary_<date>.csv)")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+
+    data_files = get_data_files(args.patterns)
+    if not data_files:
+        print(f"no data files match {args.patterns}")
+        return 1
+
+    try:
+        initial_fit_parameter_values = read_dict_from_file(args.initial_values) if args.mode == "SVDGF" else {}
+    except ValueError as error:
+        print(f"could not read the initial fit parameter values: {error}")
+        return 1
+
+    if args.merge_scans is not None:
+        try:
+            # e.g. the average of an earlier run that matches the patterns as well
+            scan_files = [data_file for data_file in data_files if not TA_analysis_pipeline.is_noise_map_file(data_file) and os.path.abspath(data_file) != os.path.abspath(args.merge_scans)]
+            merge_scan_files(scan_files, args.merge_scans, args.outlier_threshold)
+        except TA_analysis_pipeline.PipelineError as error:
+            print(f"could not merge the scans: {error}")
+            return 1
+        data_files = [args.merge_scans]
+
+    settings = {"mode": args.mode, "components": sorted(set(args.components)), "bounds": args.bounds, "fit_method": args.fit_method, "target_model_configuration_file": args.target_model,
+                "initial_fit_parameter_values": initial_fit_parameter_values, "base_directory": os.getcwd(), "save_format": args.save_format,
+                "precision": args.precision, "time_zero": args.time_zero, "temp_resolution": args.temp_resolution, "fit_time_zero": args.fit_time_zero,
+                "fit_temp_resolution": args.fit_temp_resolution, "uncertainties": args.uncertainties, "uncertainty_workers": args.uncertainty_workers, "weighting": args.weighting, "fit_engine": args.fit_engine,
+                "kinetic_scheme": args.kinetic_scheme, "best_fit_methods_file": args.best_fit_methods}
+
+    start = time.time()
+    summary_rows = []
+    with futures.ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = {executor.submit(analyse_file, data_file, settings): data_file for data_file in data_files}
+
+        for result in futures.as_completed(results):
+            try:
+                summary_row = result.result()
+            except Exception as error:
+                # anything the pipeline does not know about, e.g. a crashed worker
+                summary_row = {"file": results[result], "status": "failed", "error": f"{type(error).__name__}: {error}"}
+            summary_rows.append(summary_row)
+            print(f"{len(summary_rows)}/{len(data_files)} {summary_row['status']}: {summary_row['file']}" + (f" ({summary_row['error']})" if "error" in summary_row else ""))
+
+    # same order as the data files, independent of which finished first
+    summary_rows.sort(key=lambda row: data_files.index(row["file"]))
+
+    summary_path = args.summary
+    if summary_path is None:
+        os.makedirs(os.path.join("DataFiles", "ResultData"), exist_ok=True)
+        summary_path = os.path.join("DataFiles", "ResultData", "batch_summary_" + datetime.now().strftime("%Y_%m_%d_%Hh_%Mmin_%Ss") + ".csv")
+    write_summary_csv(summary_path, summary_rows)
+
+    nr_of_failed = sum(row["status"] != "done" for row in summary_rows)
+    print(f"\nanalysed {len(data_files)} files in {time.time()-start:.1f} s, {nr_of_failed} failed. summary: {summary_path}")
+
+    return 1 if nr_of_failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Query the index of saved results (DataFiles/ResultData/results_index.sqlite, see SupportClasses/ResultsIndex).\n
+The GUI and TA_analysis_batch.py add every saved result to the index.
+
+examples:
+    python TA_results_index.py --file maryam --type SVDGF --tau 1 0 2
+    python TA_results_index.py --nr-of-components 3 --fit-method leastsq --csv fits.csv
+    python TA_results_index.py --reindex          (adds binary results saved before the index existed)
+    python TA_results_index.py --remove-missing   (removes results whose directory has been deleted)
+"""
+
+import argparse
+import csv
+import os
+
+from SupportClasses import ResultsIndex
+
+def write_results_csv(path, results):
+    fieldnames = ["id", "result_type", "data_file", "start_time", "components", "fit_method", "use_target_model", "chisqr", "redchi", "saved_at", "source", "result_dir", "binary_file"]
+    components = sorted({component for result in results for component in result["decay_times"]})
+    fieldnames += [f"{name}_component{component}" for component in components for name in ("tau", "stderr_tau")]
+
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for result in results:
+            row = dict(result, components=" ".join(str(component) for component in result["components"]))
+            for component, (tau, stderr) in result["decay_times"].items():
+                row[f"tau_component{component}"] = tau
+                row[f"stderr_tau_component{component}"] = stderr
+            writer.writerow(row)
+
+    return None
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Find saved TA analysis results in the results index.")
+    parser.add_argument("--index", default=ResultsIndex.get_index_path(os.getcwd()), help="path of the index (default: DataFiles/ResultData/results_index.sqlite)")
+    parser.add_argument("--file", default=None, help="part of the data file path, e.g. the sample name")
+    parser.add_argument("--type", choices=["ORIG", "SVD", "SVDGF"], default=None, help="result type")
+    parser.add_argument("--components", nargs="+", type=int, default=None, help="exactly these SVD components")
+    parser.add_argument("--nr-of-components", type=int, default=None, help="exactly this many SVD components")
+    parser.add_argument("--fit-method", default=None, help="lmfit fit method")
+    parser.add_argument("--tau", nargs=3, action="append", default=[], metavar=("COMPONENT", "MIN", "MAX"),
+                        help="decay time of COMPONENT within [MIN, MAX], use - for no bound (can be given several times)")
+    parser.add_argument("--only-binary", action="store_true", help="only results saved as result_data.npz, they can be reopened in the GUI")
+    parser.add_argument("--csv", default=None, help="write the matching results to this csv file instead of printing them")
+    parser.add_argument("--reindex", action="store_true", help="first add all result_data.npz below DataFiles/ResultData to the index")
+    parser.add_argument("--remove-missing", action="store_true", help="first remove results whose directory does not exist anymore")
+
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_arguments(argv)
+
+    if args.reindex:
+        nr_of_results = ResultsIndex.add_binary_results_in_directory(args.index, os.path.dirname(os.path.abspath(args.index)))
+        print(f"indexed {nr_of_results} binary results")
+    if args.remove_missing:
+        print(f"removed {ResultsIndex.remove_missing_results(args.index)} missing results")
+
+    tau_bounds = [(int(component), None if tau_min == "-" else float(tau_min), None if tau_max == "-" else float(tau_max)) for component, tau_min, tau_max in args.tau]
+    results = ResultsIndex.query_results(args.index, data_file=args.file, result_type=args.type, components=args.components, nr_of_components=args.nr_of_components,
+                                            fit_method=args.fit_method, tau_bounds=tau_bounds, only_binary=args.only_binary)
+
+    if args.csv is not None:
+        write_results_csv(args.csv, results)
+        print(f"{len(results)} results written to {args.csv}")
+        return 0
+
+    for result in results:
+        print(f"{result['saved_at']}  {result['result_type']:5}  {os.path.basename(result['data_file'])}  components {result['components']}"
+                + (f"  {result['fit_method']}, redchi = {result['redchi']:.4g}" if result["redchi"] is not None else "")
+                + (f"\n    {ResultsIndex.format_decay_times(result['decay_times'])}" if result["decay_times"] else "")
+                + f"\n    {result['result_dir']}" + ("  (binary)" if result["binary_file"] else ""))
+    print(f"{len(results)} results")
+
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,10 @@
 import gc
 
-import numpy as np
-import seaborn as sns
-import matplotlib
-matplotlib.use("TkAgg")
-from matplotlib.figure import Figure
-
-# OO backend (Tkinter) tkagg() function:
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-
-from SupportClasses import ToolTip
+from FunctionsUsedByPlotClasses import get_colormap_thumbnails
+from SupportClasses import ToolTip, JobScheduler
 
 import tkinter as tk
+from tkinter import ttk
 
 class SetColorMapWindow(tk.Toplevel):
 
@@ -71,13 +64,13 @@ class SetColorMapWindow(tk.Toplevel):
 
     def make_widgets(self):
         self.make_scrollable_listbox()
-        self.figure, self.axes, self.figure_canvas = self.make_frame_figure_and_axes()
+        self.make_frame_preview()
         self.btn_quit = tk.Button(self, text="close", command=self.delete_attrs_and_destroy)
 
+        self.render_thumbnails()
         self.update_axes()
 
         self.make_selection_btns()
-        self.figure_canvas.get_tk_widget().grid(row=0, column=0)
         self.btn_quit.grid(row=99, column=99, sticky="se", pady=3)
 
         return None
@@ -110,30 +103,64 @@ class SetColorMapWindow(tk.Toplevel):
         self.lbl_current_selection_dict.grid(row=3, column=2, columnspan=7)
 
     def make_scrollable_listbox(self):
-        self.listbox = tk.Listbox(self, background='white', width=35, selectbackground="cornflowerblue", height=12)
+        # a treeview instead of a listbox, its items can show the colormap thumbnails
+        self.listbox = ttk.Treeview(self, show="tree", selectmode="browse", height=12)
+        self.listbox.column("#0", width=260)
         self.listbox_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL)
         self.listbox.config(yscrollcommand=self.listbox_scrollbar.set)
         self.listbox_scrollbar.configure(command=self.listbox.yview)
 
+        self.listbox_items = {}
         for cmap_type in self.cmaps_dict:
-            self.listbox.insert(tk.END, "---"+cmap_type+"---")
-            self.listbox.itemconfig(tk.END, bg="lightgrey", selectbackground="grey")
+            type_item = self.listbox.insert("", tk.END, text="---"+cmap_type+"---", open=True)
             for cmap in self.cmaps_dict[cmap_type]:
-                self.listbox.insert(tk.END, cmap)
+                self.listbox_items[cmap] = self.listbox.insert(type_item, tk.END, text=cmap)
 
-        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        self.listbox.bind("<<TreeviewSelect>>", self.on_select)
 
         self.listbox.grid(row=0, sticky="w")
         self.listbox_scrollbar.grid(row=0, column=1, sticky="ns")
 
-        self.listbox.select_set(3)
+        self.selected_colormap = "viridis"
+        self.listbox.selection_set(self.listbox_items[self.selected_colormap])
+
+        return None
+
+    def get_preview_data(self):
+        """ the downsampled data matrix of the last opened original data tab, None if there is none. """
+        for data_obj in reversed(self.parent.nbCon_orig.data_objs):
+            if getattr(data_obj, "data_matrix", None) is not None:
+                return get_colormap_thumbnails.get_downsampled_data(data_obj.data_matrix)
+
+        return None
+
+    def render_thumbnails(self):
+        # the images are rendered in a background thread and shown as soon as they are done, until then a selected colormap is rendered on selection
+        self.thumbnails, self.previews = {}, {}
+        self.normalized_preview_data = get_colormap_thumbnails.get_normalized(self.get_preview_data())
+        colormap_names = [cmap for cmaps in self.cmaps_dict.values() for cmap in cmaps]
+        self.parent.job_scheduler.submit(get_colormap_thumbnails.render, colormap_names, self.normalized_preview_data, name="colormap thumbnails",
+                                            group="colormap thumbnails", priority=JobScheduler.PRIORITY_SPECULATIVE, on_done=self.show_thumbnails)
+
+        return None
+
+    def show_thumbnails(self, job):
+        # the window might have been closed in the meantime
+        if getattr(self, "listbox", None) is None or not self.winfo_exists():
+            return None
+
+        for cmap, (thumbnail, preview) in job.result.items():
+            # PhotoImages have to be made in the tk thread, the references keep them alive
+            self.thumbnails[cmap] = tk.PhotoImage(master=self, data=thumbnail, format="PPM")
+            self.previews.setdefault(cmap, tk.PhotoImage(master=self, data=preview, format="PPM"))
+            self.listbox.item(self.listbox_items[cmap], image=self.thumbnails[cmap])
 
         return None
 
     def apply_cmap_selection(self):
         for checkbtn, checkbtn_variable in zip(self.check_buttons, self.check_button_variables):
             if checkbtn_variable.get() == 1:
-                self.currently_used_colormaps_dict[checkbtn["text"]] = self.listbox.get(self.listbox.curselection()[0])
+                self.currently_used_colormaps_dict[checkbtn["text"]] = self.selected_colormap
 
         self.assignement_handler(self.currently_used_colormaps_dict)
 
@@ -145,48 +172,44 @@ class SetColorMapWindow(tk.Toplevel):
         return None
 
     def on_select(self, event):
-        event_widget = event.widget
-        if str(event_widget.get(event_widget.curselection()[0]))[0] == "-":
-            self.listbox.itemconfigure(event_widget.curselection()[0], selectbackground="red")
-            self.after(400, self.return_listbox_item_selectbackground_to_original_color, self.listbox, event_widget.curselection()[0])
-        else:
-            self.update_axes(event_widget.get(event_widget.curselection()[0]))
-
-    def return_listbox_item_selectbackground_to_original_color(self, listbox, listbox_item_index):
-        listbox.itemconfigure(listbox_item_index, selectbackground="lightgrey")
-        listbox.selection_clear(0, tk.END)
-        listbox.activate(listbox_item_index+1)
-        listbox.select_set(listbox_item_index+1)
-        self.update_axes(listbox.get(listbox.curselection()[0]))
-
-    def make_frame_figure_and_axes(self):
-        frm_figure = tk.Frame(self)
-        frm_figure.grid(row=0, column=2, columnspan=99)
-
-        fig = Figure(figsize=(7,2))
-        axes = fig.add_subplot(1,1,1)
-        canvas = FigureCanvasTkAgg(fig, frm_figure)
-
-        return fig, axes, canvas
+        selection = self.listbox.selection()
+        if not selection:
+            return None
+        if self.listbox.parent(selection[0]) == "":
+            # colormap types are no colormaps, go back to the last selected colormap
+            self.listbox.selection_set(self.listbox_items[self.selected_colormap])
+            return None
 
-    def update_axes(self, colormap_name="viridis"):
-        self.axes.clear()
+        self.selected_colormap = self.listbox.item(selection[0], "text")
+        self.update_axes(self.selected_colormap)
 
-        gradient = np.linspace(0, 1, 256)
-        gradient = np.vstack((gradient, gradient))
+        return None
 
-        if colormap_name == "default":
-            default_cmap = sns.diverging_palette(220, 20, s=300, as_cmap=True)
-            self.axes.imshow(gradient, aspect='auto', cmap=default_cmap)
-        else:
-            self.axes.imshow(gradient, aspect='auto', cmap=matplotlib.cm.get_cmap(colormap_name))
+    def make_frame_preview(self):
+        frm_preview = tk.Frame(self)
+        frm_preview.grid(row=0, column=2, columnspan=99)
 
-        self.axes.set_title(colormap_name, fontsize=12)
+        self.lbl_preview_title = tk.Label(frm_preview, font=("", 12))
+        self.lbl_preview_title.grid(row=0, column=0)
+        self.lbl_preview = tk.Label(frm_preview)
+        self.lbl_preview.grid(row=1, column=0, padx=10, pady=5)
 
-        self.axes.set_axis_off()
+        return None
+
+    def update_axes(self, colormap_name="viridis"):
+        """ shows the preview of the colormap, with the data of the last opened original data tab if there is one. """
+        if colormap_name not in self.previews:
+            try:
+                preview = get_colormap_thumbnails.get_preview(colormap_name, self.normalized_preview_data)
+            except ValueError as error:
+                tk.messagebox.showerror("Warning!", f"the colormap {colormap_name} is not available: {error}", parent=self)
+                return None
+            self.previews[colormap_name] = tk.PhotoImage(master=self, data=preview, format="PPM")
+
+        self.lbl_preview.config(image=self.previews[colormap_name])
+        self.lbl_preview_title.config(text=colormap_name + ("" if self.normalized_preview_data is not None else " (open original data to preview it)"))
 
-        # actually draw the plot
-        self.figure.canvas.draw_idle()
+        return None
 
     def delete_attrs_and_destroy(self):
         self.destroy()
@@ -13,13 +13,13 @@ import seaborn as sns
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from FunctionsUsedByPlotClasses import get_SVDGFit_parameters
-from SupportClasses import ToolTip, saveData
+from SupportClasses import ToolTip, saveData, BackgroundWriter
 
 import tkinter as tk
 
 class CompareWindow(tk.Toplevel):
 
-    def __init__(self, parent, is_target_model, tab_index, components, time_steps, rightSVs, singular_values, decay_times_parameter_values, amplitudes_parameter_values, data_file_name, save_dir, parsed_summands_of_user_defined_fit_function=None, is_from_initial_values_window=None, start_time=None, matrix_bounds_dict=None):
+    def __init__(self, parent, is_target_model, tab_index, components, time_steps, rightSVs, singular_values, decay_times_parameter_values, amplitudes_parameter_values, data_file_name, save_dir, parsed_summands_of_user_defined_fit_function=None, is_from_initial_values_window=None, start_time=None, matrix_bounds_dict=None, irf_parameters=None):
         """Compare the right singular vectors (kinetics) of data matrix with the fit results in a plot.
 
         Args:
@@ -36,6 +36,7 @@ class CompareWindow(tk.Toplevel):
             save_dir (String): path to directory to save figure to.
             parsed_summands_of_user_defined_fit_function (list of Strings, Default is None): the parsed summands of the user defined fit function.
             is_from_initial_values_window (boolean, Default is None): whether or not the window is opened from initial fit params value window.
+            irf_parameters (dict, Default is None): time_zero and irf_fwhm if the fit function was convoluted with the IRF (see get_SVDGFit_parameters.get_irf_parameters).
         """
         super().__init__(parent)
         self.parent = parent
@@ -58,6 +59,7 @@ class CompareWindow(tk.Toplevel):
         self.is_from_initial_values_window = is_from_initial_values_window
         self.start_time = start_time
         self.matrix_bounds_dict = matrix_bounds_dict
+        self.irf_parameters = irf_parameters or {}
 
         return None
 
@@ -129,7 +131,7 @@ class CompareWindow(tk.Toplevel):
             for component in self.components_list:
                 curr_amplitudes.append(self.amplitudes[f'amp_rSV{component_index}_component{component}'])
             if not self.is_target_model:
-                reconstructed_rSVs_from_fit_results[component_index, :] = get_SVDGFit_parameters.model_func(time_steps_array, curr_amplitudes, decay_constants, index_of_first_increased_time_interval=0, gaussian_for_convolution=0)
+                reconstructed_rSVs_from_fit_results[component_index, :] = get_SVDGFit_parameters.model_func(time_steps_array, curr_amplitudes, decay_constants, index_of_first_increased_time_interval=0, gaussian_for_convolution=0, **self.irf_parameters)
             else:
                 reconstructed_rSVs_from_fit_results[component_index, :] = get_SVDGFit_parameters.model_func_user_defined(time_steps_array, curr_amplitudes, decay_constants, self.components_list, self.parsed_summands_of_user_defined_fit_function)
 
@@ -146,7 +148,7 @@ class CompareWindow(tk.Toplevel):
             for component in self.components_list:
                 curr_amplitudes.append(self.amplitudes[f'amp_rSV{component_index}_component{component}'])
             if not self.is_target_model:
-                reconstructed_rSVs_from_fit_results[component_index, :] = get_SVDGFit_parameters.model_func(time_steps_array, curr_amplitudes, decay_constants, index_of_first_increased_time_interval=0, gaussian_for_convolution=0)
+                reconstructed_rSVs_from_fit_results[component_index, :] = get_SVDGFit_parameters.model_func(time_steps_array, curr_amplitudes, decay_constants, index_of_first_increased_time_interval=0, gaussian_for_convolution=0, **self.irf_parameters)
             else:
                 reconstructed_rSVs_from_fit_results[component_index, :] = get_SVDGFit_parameters.model_func_user_defined(time_steps_array, curr_amplitudes, decay_constants, self.components_list, self.parsed_summands_of_user_defined_fit_function)
 
@@ -193,19 +195,20 @@ class CompareWindow(tk.Toplevel):
             self.save_current_figure_and_more_data_to_file()
             return None
 
-        # check if directory exists:
-        if not os.path.exists(self.save_dir):
-            os.makedirs(self.save_dir)
+        # written in the background, the save task takes a snapshot of the figure and data now
+        save_task = BackgroundWriter.SaveTask("rightSVs vs fit", self.save_dir)
 
-        saveData.make_log_file(self.save_dir, filename=self.data_file_name, start_time=self.start_time, components=self.components_list, matrix_bounds=self.matrix_bounds_dict, parsed_target_model_summands=self.parsed_summands_of_user_defined_fit_function)
+        save_task.add(saveData.make_log_file, self.save_dir, filename=self.data_file_name, start_time=self.start_time, components=self.components_list, matrix_bounds=self.matrix_bounds_dict, parsed_target_model_summands=self.parsed_summands_of_user_defined_fit_function)
 
         # save current figure:
-        self.figure.savefig(self.save_dir+"/rightSVs_"+str(self.currently_plotted_components)+"_Vs_Fit.png")
+        save_task.add_figure(self.figure, self.save_dir+"/rightSVs_"+str(self.currently_plotted_components)+"_Vs_Fit.png")
 
         data_dict = {'initial_decay_constants_values': self.decay_times, 'initial_amplitudes_values':self.amplitudes, 'right_SVectors':self.rightSVs, 'singular_values':self.singular_values}
         if self.is_target_model:
             data_dict['user_defined_model_summands'] = self.parsed_summands_of_user_defined_fit_function
-        saveData.save_result_data(self.save_dir, data_dict)
+        save_task.add(saveData.save_result_data, self.save_dir, data_dict)
+
+        self.parent.save_in_background(save_task)
 
         return None
 
@@ -219,21 +222,22 @@ class CompareWindow(tk.Toplevel):
 
         final_dir = self.save_dir+ "saved_at_"+str(hour)+"h_"+str(minute)+"min_"+str(second)+"sec"
 
-        # check if directory exists:
-        if not os.path.exists(final_dir):
-            os.makedirs(final_dir)
+        # written in the background, the save task takes a snapshot of the figure and data now
+        save_task = BackgroundWriter.SaveTask("rightSVs vs initial values fit", final_dir)
 
-        saveData.make_log_file(final_dir, filename=self.data_file_name, start_time=self.start_time, components=self.components_list, matrix_bounds=self.matrix_bounds_dict, parsed_target_model_summands=self.parsed_summands_of_user_defined_fit_function)
+        save_task.add(saveData.make_log_file, final_dir, filename=self.data_file_name, start_time=self.start_time, components=self.components_list, matrix_bounds=self.matrix_bounds_dict, parsed_target_model_summands=self.parsed_summands_of_user_defined_fit_function)
 
         data_dict = {'initial_decay_constants_values': self.decay_times, 'initial_amplitudes_values':self.amplitudes, 'right_SVectors':self.rightSVs, 'singular_values':self.singular_values}
         if self.is_target_model:
             data_dict['user_defined_model_summands'] = self.parsed_summands_of_user_defined_fit_function
-        saveData.save_result_data(final_dir, data_dict)
+        save_task.add(saveData.save_result_data, final_dir, data_dict)
 
         # save current figure:
-        self.figure.savefig(final_dir+"/rightSVs_"+str(self.currently_plotted_components)+"_Vs_initial_values_fit.png")
+        save_task.add_figure(self.figure, final_dir+"/rightSVs_"+str(self.currently_plotted_components)+"_Vs_initial_values_fit.png")
+
+        self.parent.save_in_background(save_task)
 
-        pass
+        return None
 
     def delete_attrs_and_destroy(self):
         self.destroy()
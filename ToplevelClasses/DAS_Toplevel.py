@@ -6,11 +6,13 @@ from matplotlib.figure import Figure
 import os
 import numpy as np
 import gc
+import threading
 
-from SupportClasses import ToolTip
+from FunctionsUsedByPlotClasses import get_SVDGFit_uncertainties
+from SupportClasses import ToolTip, BackgroundWriter, saveData
 
 class DAS_Window(tk.Toplevel):
-    def __init__(self, parent, tab_index, DAS, wavelengths, resulting_fit_parameters_dict, components_list, filename, start_time, full_path_to_final_dir):
+    def __init__(self, parent, tab_index, DAS, wavelengths, resulting_fit_parameters_dict, components_list, filename, start_time, full_path_to_final_dir, uncertainty_inputs=None, SAS=None):
         super().__init__(parent)
         self.parent = parent
         self.mapped = True
@@ -26,6 +28,9 @@ class DAS_Window(tk.Toplevel):
         self.make_figure_and_frame()
 
         self.DAS = DAS
+        # species associated spectra of a kinetic scheme, None without one
+        self.SAS = SAS
+        self.show_SAS_intVar = tk.IntVar(value=0)
         self.wavelengths = wavelengths
         self.resulting_fit_parameters_dict = resulting_fit_parameters_dict
         self.components_list = components_list
@@ -37,17 +42,27 @@ class DAS_Window(tk.Toplevel):
         except TypeError:
             self.decay_constants_std_errors = ["not computed" for _ in self.components_list]
 
+        # confidence intervals by resampling, see estimate_uncertainties. uncertainty_inputs are the arguments of get_SVDGFit_uncertainties.run
+        self.uncertainty_inputs = uncertainty_inputs
+        self.fit_uncertainties = None
+        self.uncertainty_job = None
+        self.stop_uncertainty_estimation = threading.Event()
+
         self.nr_of_DAS = self.DAS.shape[1]
         self.which_DAS_list = [i for i in range(self.nr_of_DAS)]
         self.update_DAS_plot()
         self.make_checkbuttons()
+        self.make_uncertainty_widgets()
+        if self.SAS is not None:
+            self.make_SAS_checkbutton()
 
         self.btn_close = tk.Button(self, text='Close', command=self.destroy_and_give_focus_to_other_toplevel)
         self.btn_close.grid(padx=3, pady=5, sticky="se", column=99)
 
         self.btn_save_current_figures = tk.Button(self, text='save current figure', command=self.save_current_figures_to_file)
         self.ttp_btn_save_current_figures = ToolTip.CreateToolTip(self.btn_save_current_figures, \
-        'This saves the current figure to the same file as saving the data of the SVDGF data tab buttons does. ')
+        'This saves the current figure to the same file as saving the data of the SVDGF data tab buttons does. '
+        '\nIf uncertainties have been estimated, their intervals and the DAS bands are saved too.')
         self.btn_save_current_figures.grid(padx=3, pady=5, sticky="sw", column=98, row=self.btn_close.grid_info()["row"])
 
         self.btn_close_all = tk.Button(self, text='Close all', command=self.destroy_all)
@@ -86,8 +101,20 @@ class DAS_Window(tk.Toplevel):
         self.xticklabels = [float(self.wavelengths[idx]) for idx in self.xticks]
         self.xticklabels = [self.label_format.format(x) for x in self.xticklabels]
 
+        if self.show_SAS_intVar.get():
+            self.plot_SAS()
+            return None
+
         for i in self.which_DAS_list:
-            self.ax.plot(self.wavelengths, self.DAS[:, i], label=fr'DAS_comp{self.components_list[i]}, $\tau$ = {self.decay_constants[i]} $\pm$ {self.decay_constants_std_errors[i]}')
+            if self.fit_uncertainties is None:
+                label = fr'DAS_comp{self.components_list[i]}, $\tau$ = {self.decay_constants[i]} $\pm$ {self.decay_constants_std_errors[i]}'
+            else:
+                lower, upper = self.fit_uncertainties.get_intervals_as_dict()[f"tau_component{self.components_list[i]}"]
+                label = fr'DAS_comp{self.components_list[i]}, $\tau$ = {self.decay_constants[i]} ({self.fit_uncertainties.confidence_level:.0%}: {lower:.2f} .. {upper:.2f})'
+            line, = self.ax.plot(self.wavelengths, self.DAS[:, i], label=label)
+
+            if self.fit_uncertainties is not None:
+                self.ax.fill_between(line.get_xdata(orig=False), self.fit_uncertainties.DAS_bands[0][:, i], self.fit_uncertainties.DAS_bands[1][:, i], color=line.get_color(), alpha=0.25)
 
         self.ax.legend()
         self.ax.set_xticks(self.xticks)
@@ -100,6 +127,33 @@ class DAS_Window(tk.Toplevel):
         self.fig.tight_layout()
         self.canvas.draw_idle()
 
+    def plot_SAS(self):
+        """ the SAS instead of the DAS, the uncertainty bands are those of the DAS and are not shown. """
+        for i in self.which_DAS_list:
+            self.ax.plot(self.wavelengths, self.SAS[:, i], label=fr'SAS_comp{self.components_list[i]}, $\tau$ = {self.decay_constants[i]} $\pm$ {self.decay_constants_std_errors[i]}')
+
+        self.ax.legend()
+        self.ax.set_xticks(self.xticks)
+        self.ax.set_xticklabels(self.xticklabels)
+        self.ax.set_ylabel("SAS amplitude")
+        self.ax.set_xlabel("wavelengths")
+        self.basefilename = os.path.splitext(os.path.basename(self.filename))[0]
+        self.ax.set_title("SAS for " + self.basefilename + " start time:" + self.label_format.format(float(self.start_time)))
+
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
+
+        return None
+
+    def make_SAS_checkbutton(self):
+        self.checkbox_show_SAS = tk.Checkbutton(self, text="show SAS", variable=self.show_SAS_intVar, onvalue=1, offvalue=0, command=self.update_DAS_plot)
+        self.ttp_checkbox_show_SAS = ToolTip.CreateToolTip(self.checkbox_show_SAS, \
+        'Shows the species associated spectra of the kinetic scheme (Fit method menu) instead of the DAS.'
+        '\nThe SAS are computed from the DAS and the fitted decay times, the fit itself is the same.')
+        self.checkbox_show_SAS.grid(row=3, column=98, sticky="e", padx=3)
+
+        return None
+
     def update_which_DAS_list(self):
         self.which_DAS_list = []
         for i in range(len(self.DAS_checkbutton_vars)):
@@ -129,15 +183,84 @@ class DAS_Window(tk.Toplevel):
 
         return None
 
+    def make_uncertainty_widgets(self):
+        self.frm_uncertainties = tk.Frame(self)
+        tk.Label(self.frm_uncertainties, text="uncertainties:").grid(row=0, column=0, sticky="w")
+
+        self.uncertainty_method_strVar = tk.StringVar(value=get_SVDGFit_uncertainties.METHODS[0])
+        self.opt_uncertainty_method = tk.OptionMenu(self.frm_uncertainties, self.uncertainty_method_strVar, *get_SVDGFit_uncertainties.METHODS)
+        self.opt_uncertainty_method.grid(row=0, column=1, sticky="w", padx=3)
+
+        self.btn_estimate_uncertainties = tk.Button(self.frm_uncertainties, text="estimate", command=self.estimate_uncertainties)
+        self.ttp_btn_estimate_uncertainties = ToolTip.CreateToolTip(self.btn_estimate_uncertainties, \
+        'Estimates 95% confidence intervals of the decay times and bands of the DAS by resampling the fit and refitting every replicate, in parallel.'
+        '\nresiduals: bootstrap of the residuals of the fit (time delays are drawn with replacement).'
+        '\nmonte carlo: gaussian noise of the size of the residuals is added to the fit.'
+        '\nwavelengths: bootstrap of the wavelengths of the data matrix, the SVD is recomputed (slower).'
+        '\nThe resampling stops as soon as the intervals do not change anymore, at the latest after 1000 replicates.'
+        '\nThis also works if lmfit could not compute the standard errors.')
+        self.btn_estimate_uncertainties.grid(row=0, column=2, sticky="w", padx=3)
+
+        self.lbl_uncertainty_status = tk.Label(self.frm_uncertainties, text="")
+        self.lbl_uncertainty_status.grid(row=0, column=3, sticky="w", padx=3)
+
+        self.frm_uncertainties.grid(row=3, column=0, columnspan=98, sticky="w", padx=3, pady=3)
+
+        return None
+
+    def estimate_uncertainties(self):
+        if self.uncertainty_inputs is None:
+            tk.messagebox.showerror("Warning!", "the data of the fit is not available, uncertainties can not be estimated.", parent=self)
+            return None
+        if self.uncertainty_job is not None and self.uncertainty_job.is_pending():
+            return None
+
+        method = self.uncertainty_method_strVar.get()
+        self.btn_estimate_uncertainties.config(state="disabled")
+        self.lbl_uncertainty_status.config(text=f"resampling ({method}) ...")
+        # runs in a thread of the job scheduler, the replicates are fitted on a process pool of their own
+        self.uncertainty_job = self.parent.job_scheduler.submit(get_SVDGFit_uncertainties.run, name="uncertainties: " + self.title(), group="uncertainties",
+                                                                on_done=self.show_uncertainties, on_error=self.uncertainty_estimation_failed, on_cancel=self.uncertainty_estimation_failed,
+                                                                method=method, should_stop=self.stop_uncertainty_estimation.is_set, **self.uncertainty_inputs)
+
+        return None
+
+    def show_uncertainties(self, job):
+        # the window might have been closed in the meantime
+        if not getattr(self, "mapped", False):
+            return None
+
+        self.fit_uncertainties = job.result
+        self.btn_estimate_uncertainties.config(state="normal")
+        self.lbl_uncertainty_status.config(text=self.fit_uncertainties.get_report().splitlines()[0])
+        print(self.fit_uncertainties.get_report())
+        self.update_DAS_plot()
+
+        return None
+
+    def uncertainty_estimation_failed(self, job):
+        if not getattr(self, "mapped", False):
+            return None
+
+        self.btn_estimate_uncertainties.config(state="normal")
+        self.lbl_uncertainty_status.config(text="")
+        if job.error is not None:
+            tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(job.error).__name__} message: \n"+ str(job.error), parent=self)
+
+        return None
+
     def save_current_figures_to_file(self):
         print("saving current DAS figure to file!")
 
-        # check if directory exists:
-        if not os.path.exists(self.full_path_to_final_dir):
-            os.makedirs(self.full_path_to_final_dir)
+        # rendered and written in the background, the save task takes a snapshot of the figure now
+        save_task = BackgroundWriter.SaveTask("DAS figure", self.full_path_to_final_dir)
 
         # save current figures:
-        self.fig.savefig(self.full_path_to_final_dir+"/DAS_fig_"+str(self.which_DAS_list)+".png")
+        save_task.add_figure(self.fig, self.full_path_to_final_dir+("/SAS_fig_" if self.show_SAS_intVar.get() else "/DAS_fig_")+str(self.which_DAS_list)+".png")
+        if self.fit_uncertainties is not None:
+            save_task.add(saveData.save_fit_uncertainties, self.full_path_to_final_dir, self.fit_uncertainties)
+
+        self.parent.save_in_background(save_task)
 
         return None
 
@@ -167,6 +290,9 @@ class DAS_Window(tk.Toplevel):
         return None
 
     def delete_attributes(self):
+        # a running uncertainty estimation stops after its current chunk of replicates
+        self.stop_uncertainty_estimation.set()
+
         attr_lst = list(vars(self))
         attr_lst.remove('parent')
         for attr in attr_lst:
@@ -2,12 +2,15 @@ import tkinter as tk
 import tkinter.scrolledtext as scrolledtext
 import os
 
+from FunctionsUsedByPlotClasses import TA_analysis_pipeline
+from SupportClasses import ToolTip
+
 class FitResult_Window(tk.Toplevel):
-    def __init__(self, parent, tab_index, fit_report, filename):
+    def __init__(self, parent, tab_index, fit_report, filename, race_inputs=None):
         super().__init__(parent)
         self.parent = parent
         self.mapped = True
-        self.geometry(f'900x400')
+        self.geometry(f'900x440')
 
         self.filename = os.path.basename(filename)
         self.title('SVDGF fit results for tab: ' + str(tab_index + 1) + " - file: "+self.filename)
@@ -16,6 +19,11 @@ class FitResult_Window(tk.Toplevel):
         self.scrtxt.grid(sticky='', pady=5, padx=3)
         self.scrtxt.insert(tk.END, fit_report)
 
+        # race of the fit methods on this fit, race_inputs are the arguments of TA_analysis_pipeline.race_fit_methods
+        self.race_inputs = race_inputs
+        self.race_job = None
+        self.make_race_widgets()
+
         self.btn_close = tk.Button(self, text='Close', fg=self.parent.violet, command=self.destroy_and_give_focus_to_other_toplevel)
         self.btn_close.grid(padx=3, pady=5, sticky="se")
 
@@ -24,8 +32,83 @@ class FitResult_Window(tk.Toplevel):
 
         return None
 
+    def make_race_widgets(self):
+        self.frm_race = tk.Frame(self)
+        tk.Label(self.frm_race, text="time budget [s]:").grid(row=0, column=0, sticky="w")
+        self.ent_race_time_budget = tk.Entry(self.frm_race, width=6, justify=tk.RIGHT)
+        self.ent_race_time_budget.insert(0, "60")
+        self.ent_race_time_budget.grid(row=0, column=1, sticky="w", padx=3)
+
+        self.btn_race_fit_methods = tk.Button(self.frm_race, text="race fit methods", command=self.race_fit_methods)
+        self.ttp_btn_race_fit_methods = ToolTip.CreateToolTip(self.btn_race_fit_methods, \
+        'Fits the right SVs of this fit with every fit method of the Fit method menu, from the initial fit parameter values and in parallel, '
+        'all within the time budget (methods that are not done by then are stopped).'
+        '\nThe chi-square, time and number of function evaluations of every method are shown here. '
+        'The best method is remembered for this kind of fit (nr of components, IRF, target model, weighting) '
+        'and used by new fits with the fit method "auto".')
+        self.btn_race_fit_methods.grid(row=0, column=2, sticky="w", padx=3)
+        if self.race_inputs is None:
+            self.btn_race_fit_methods.config(state="disabled")
+
+        self.lbl_race_status = tk.Label(self.frm_race, text="" if self.race_inputs is not None else "(not for reopened results)")
+        self.lbl_race_status.grid(row=0, column=3, sticky="w", padx=3)
+        self.frm_race.grid(sticky="w", padx=3, pady=3)
+
+        return None
+
+    def race_fit_methods(self):
+        if self.race_job is not None and self.race_job.is_pending():
+            return None
+        try:
+            time_budget = float(self.ent_race_time_budget.get())
+        except ValueError:
+            tk.messagebox.showerror("Warning!", "the time budget has to be a number of seconds!", parent=self)
+            return None
+
+        self.btn_race_fit_methods.config(state="disabled")
+        self.lbl_race_status.config(text=f"racing the fit methods for at most {time_budget:g} s ...")
+        # runs in a thread of the job scheduler, the methods are fitted on a process pool of their own
+        self.race_job = self.parent.job_scheduler.submit(TA_analysis_pipeline.race_fit_methods, name="fit method race: " + self.title(), group="fit method race",
+                                                            on_done=self.show_race_result, on_error=self.race_failed, on_cancel=self.race_failed,
+                                                            time_budget=time_budget, **self.race_inputs)
+
+        return None
+
+    def show_race_result(self, job):
+        # the window might have been closed in the meantime
+        if not getattr(self, "mapped", False):
+            return None
+
+        method_race = job.result
+        self.btn_race_fit_methods.config(state="normal")
+        self.scrtxt.insert(tk.END, "\n\n" + method_race.get_report())
+        dataset_type = TA_analysis_pipeline.get_dataset_type(self.race_inputs["SVDGF_result"].fit, self.race_inputs["SVDGF_result"].components.components_list)
+        try:
+            best_method = TA_analysis_pipeline.remember_best_fit_method(self.parent.best_fit_methods_file, method_race, dataset_type)
+        except TA_analysis_pipeline.PipelineError as error:
+            tk.messagebox.showerror("Warning, the best fit method could not be saved!", str(error), parent=self)
+            best_method = None
+        if best_method is not None:
+            self.scrtxt.insert(tk.END, f"\n\n{best_method} is remembered for: {dataset_type}, new fits of this kind use it with the fit method \"auto\".")
+        self.scrtxt.see(tk.END)
+        self.lbl_race_status.config(text=method_race.get_report().splitlines()[0])
+
+        return None
+
+    def race_failed(self, job):
+        if not getattr(self, "mapped", False):
+            return None
+
+        self.btn_race_fit_methods.config(state="normal")
+        self.lbl_race_status.config(text="")
+        if job.error is not None:
+            tk.messagebox.showerror("Warning, an exception occurred!", f"Exception {type(job.error).__name__} message: \n"+ str(job.error), parent=self)
+
+        return None
+
     def destroy_all(self):
         for toplevel in self.parent.fit_report_toplevels:
+            toplevel.mapped = False
             toplevel.destroy()
         self.parent.fit_report_toplevels = []
         self.parent.focus_set()
@@ -0,0 +1,79 @@
+import tkinter as tk
+
+from SupportClasses import ToolTip, JobScheduler
+
+class JobList_Window(tk.Toplevel):
+    def __init__(self, parent, job_scheduler):
+        """a toplevel that lists the jobs of the job scheduler with their status and allows to cancel them.
+
+        Args:
+            parent (GUIApp): parent is the Gui App that creates the instance of this class.
+            job_scheduler (JobScheduler.JobScheduler): the scheduler whose jobs are listed.
+        """
+        super().__init__(parent)
+        self.parent = parent
+        self.job_scheduler = job_scheduler
+        self.refresh_interval_ms = 500
+        self.refresh_after_id = None
+        self.listed_jobs = []
+
+        self.title('Jobs - queued, running and finished computations')
+
+        self.listbox = tk.Listbox(self, background='white', width=80, height=15, selectbackground="cornflowerblue", selectmode=tk.EXTENDED)
+        self.listbox_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL)
+        self.listbox.config(yscrollcommand=self.listbox_scrollbar.set)
+        self.listbox_scrollbar.configure(command=self.listbox.yview)
+        self.listbox.grid(row=0, column=0, columnspan=3, sticky="nsew", padx=3, pady=3)
+        self.listbox_scrollbar.grid(row=0, column=3, sticky="ns")
+
+        self.btn_cancel_selected = tk.Button(self, text="cancel selected jobs", fg=self.parent.violet, command=self.cancel_selected_jobs)
+        ttp_btn_cancel_selected = ToolTip.CreateToolTip(self.btn_cancel_selected, \
+        'Queued jobs are not started at all, the results of running jobs are discarded once they have finished.')
+        self.btn_cancel_selected.grid(row=1, column=0, sticky="sw", padx=3, pady=5)
+
+        self.btn_clear_finished = tk.Button(self, text="clear finished jobs", fg=self.parent.violet, command=self.clear_finished_jobs)
+        self.btn_clear_finished.grid(row=1, column=1, sticky="s", padx=3, pady=5)
+
+        self.btn_close = tk.Button(self, text="Close", fg=self.parent.violet, command=self.destroy_self)
+        self.btn_close.grid(row=1, column=2, sticky="se", padx=3, pady=5)
+
+        self.refresh_job_list()
+
+        return None
+
+    def refresh_job_list(self):
+        selected_job_ids = [self.listed_jobs[index].job_id for index in self.listbox.curselection() if index < len(self.listed_jobs)]
+
+        self.listed_jobs = self.job_scheduler.get_jobs(include_finished=True)
+        self.listbox.delete(0, tk.END)
+        for index, job in enumerate(self.listed_jobs):
+            self.listbox.insert(tk.END, f"{job.job_id:>4}  {job.status:<10} priority {job.priority:<4} {job.executor_type:<8} {job.name}")
+            if job.status == JobScheduler.RUNNING:
+                self.listbox.itemconfig(index, bg="lightblue")
+            elif job.status == JobScheduler.FAILED:
+                self.listbox.itemconfig(index, bg="salmon")
+            if job.job_id in selected_job_ids:
+                self.listbox.select_set(index)
+
+        self.refresh_after_id = self.after(self.refresh_interval_ms, self.refresh_job_list)
+
+        return None
+
+    def cancel_selected_jobs(self):
+        for index in self.listbox.curselection():
+            self.job_scheduler.cancel(self.listed_jobs[index])
+
+        return None
+
+    def clear_finished_jobs(self):
+        self.job_scheduler.clear_finished_jobs()
+
+        return None
+
+    def destroy_self(self):
+        if self.refresh_after_id is not None:
+            self.after_cancel(self.refresh_after_id)
+
+        self.destroy()
+
+        return None
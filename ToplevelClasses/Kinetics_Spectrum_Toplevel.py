@@ -12,13 +12,16 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 import tkinter.ttk as ttk
 
-from SupportClasses import ToolTip
+from SupportClasses import ToolTip, BackgroundWriter
+from FunctionsUsedByPlotClasses import get_appended_TA_data
 
 
 class Kinetics_Spectrum_Window(tk.Toplevel):
     def __init__(self, parent, tab_index, data_dict):
         """a class to make a toplevel with two plots on it. \n
         The plots can be used to inspect the kinetics of a certain wavelength / the spectrum at a certain time delay of a TA data matrix.\n
+        In the (default) interactive mode the axes, ticks etc. are cached as a static background and only the moving line
+        and the title are redrawn (blitted) when a slider is moved. Slider events are coalesced to the refresh interval.
 
         Args:
             parent (GUIApp): parent is the Gui App that creates the instance of this class.
@@ -34,7 +37,7 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
         self.data_dict = data_dict
         self.full_path_to_final_dir = self.data_dict["save_dir"]
 
-        self.geometry(f'{1200}x{470}+{100}+{100}')
+        self.geometry(f'{1200}x{500}+{100}+{100}')
 
         self.frm_inspection_figure = tk.Frame(self)
         self.frm_inspection_figure.columnconfigure(0, weight=1)
@@ -58,6 +61,20 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
         'This saves the current figures to the same file as saving the data of the SVDGF / SVD tab buttons does. ')
         self.btn_save_current_figures.grid(padx=3, pady=5, sticky="sw", column=0, row=2)
 
+        # interactive mode: blit only the moving lines, coalesce slider events to roughly the display refresh rate
+        self.interactive_mode = tk.IntVar()
+        self.interactive_mode.set(1)
+        self.slider_refresh_interval_ms = 16
+        self.slider_update_after_id = None
+        self.wavelength_kinetics_background = None
+        self.spectrum_at_time_delay_background = None
+
+        self.checkbox_interactive_mode = tk.Checkbutton(self, text="fast slider updates", variable=self.interactive_mode, onvalue=1, offvalue=0, command=self.toggle_interactive_mode)
+        self.ttp_checkbox_interactive_mode = ToolTip.CreateToolTip(self.checkbox_interactive_mode, \
+        'If checked, only the plotted lines are redrawn when moving the sliders and the y-axes are fixed to the value range of the whole matrix. '
+        'Uncheck to redraw the complete plots (with autoscaled y-axes) on every slider step.')
+        self.checkbox_interactive_mode.grid(padx=3, sticky="w", column=0, row=1)
+
         # some styling for plots
         matplotlib.style.use("default")
         matplotlib.rcParams.update({'axes.labelsize': 12.0, 'axes.titlesize': 14.0, 'xtick.labelsize':10, 'ytick.labelsize':12.0, "axes.edgecolor":"black", "axes.linewidth":1, "axes.grid": True, "grid.linestyle":"--"})
@@ -80,11 +97,38 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
         if self.data_dict["type"] == "fit_data":
             self.selected_DAS = self.data_dict["DAS_indeces"]
 
+        # convert the matrix to floats only once and keep both a row major copy (wavelength kinetics)
+        # and a column major copy (spectra), so that every slider step is a contiguous slice without any conversion.
+        self.data_as_float = np.asarray(self.data, dtype=float)
+        self.wavelength_kinetics_rows = np.ascontiguousarray(self.data_as_float)
+        self.spectra_columns = np.ascontiguousarray(self.data_as_float.T)
+        # only made if new time delays are appended in live mode, see update_data
+        self.growing_wavelength_kinetics_rows = None
+        self.growing_spectra_columns = None
+
+        # the x positions of the lines. (time delays and wavelengths are strings, plotting them directly results in the same positions)
+        self.time_delay_positions = np.arange(len(self.time_delays))
+        self.wavelength_positions = np.arange(len(self.wavelengths))
+
+        # fixed y-limits for interactive mode, the background can only be reused if the axes do not change
+        self.fixed_ylims = self.get_fixed_ylims(self.data_as_float)
+
         # unnecessary things to have "correct" linecolors in wavelength_kinetics plot
         self.wavelengths_are_ascending = self.is_ascending(self.wavelengths)
 
         return None
 
+    def get_fixed_ylims(self, data):
+        """ returns the value range of the whole data matrix with a small margin, used as fixed ylims in interactive mode """
+        finite_data = data[np.isfinite(data)]
+        if finite_data.size == 0:
+            return (-1.0, 1.0)
+
+        min_value, max_value = finite_data.min(), finite_data.max()
+        margin = 0.05*(max_value - min_value) if max_value > min_value else 1.0
+
+        return (min_value - margin, max_value + margin)
+
     def is_ascending(self, arr):
         arr = [float(nr) for nr in arr]
         previous = arr[0]
@@ -95,6 +139,13 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
 
         return True
 
+    def get_wavelength_kinetics_line_color(self):
+        # unnecessary things to have "correct" linecolors in wavelength_kinetics plot
+        if self.wavelengths_are_ascending:
+            return self.cmap(self.nr_of_wavelength/len(self.wavelengths))
+
+        return self.cmap((len(self.wavelengths) - self.nr_of_wavelength)/len(self.wavelengths))
+
     def make_wavelength_kinetics_plot(self):
         self.wavelength_kinetics_fig = Figure(figsize=(6,4))
 
@@ -103,32 +154,61 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
         self.num_ticks = 10
         self.label_format = '{:.1f}'
 
-        # the index of the position of self.yticks
+        self.set_time_delay_xticks()
+
+        self.setup_wavelength_kinetics_axes()
+
+        self.wavelength_kinetics_fig.tight_layout()
+
+        self.wavelength_kinetics_canvas = FigureCanvasTkAgg(self.wavelength_kinetics_fig, self.frm_inspection_figure)
+        self.wavelength_kinetics_canvas.get_tk_widget().grid(row=0, column=0)
+        self.wavelength_kinetics_canvas.mpl_connect("draw_event", self.cache_wavelength_kinetics_background)
+
+        self.make_wavelength_slider()
+
+        return None
+
+    def set_time_delay_xticks(self):
+        # the index of the position of self.xticks
         self.xticks = np.linspace(0, len(self.time_delays) - 1, self.num_ticks, dtype=np.int)
-        # the content of labels of these self.yticks
+        # the content of labels of these self.xticks
         self.xticklabels = [float(self.time_delays[idx]) for idx in self.xticks]
 
         self.xticklabels = [self.label_format.format(x) for x in self.xticklabels]
 
-        self.wavelength_kinetics_axes.set_xticks(self.xticks)
-        self.wavelength_kinetics_axes.set_xticklabels(self.xticklabels, fontsize=10, rotation=30)
-
-        self.wavelength_kinetics_axes.set_title('wavelength = ' + self.label_format.format(float(self.wavelengths[self.nr_of_wavelength])))
-        self.wavelength_kinetics_axes.set_xlabel("Time delays")
-        self.wavelength_kinetics_axes.set_ylabel("amplitude")
+        return None
 
-        # unnecessary things to have "correct" linecolors in wavelength_kinetics plot
-        if self.wavelengths_are_ascending:
-            self.wavelength_kinetics_axes.plot(self.time_delays, self.wavelength_kinetics, color=self.cmap(0))
+    def update_data(self, time_delays, data_matrix):
+        """ live mode of the original data tab: new time delays are appended to the float copies, any other change
+        (e.g. a new scan averaged into the data) replaces them. The sliders keep their positions. """
+        nr_of_known_time_delays = len(self.time_delays)
+        self.data_dict["time_delays"], self.data_dict["data_matrix"] = time_delays, data_matrix
+
+        if len(time_delays) > nr_of_known_time_delays and time_delays[:nr_of_known_time_delays] == self.time_delays:
+            new_columns = np.asarray(data_matrix[:, nr_of_known_time_delays:], dtype=float)
+            if self.growing_wavelength_kinetics_rows is None:
+                self.growing_wavelength_kinetics_rows = get_appended_TA_data.GrowingMatrix(self.wavelength_kinetics_rows, axis=1)
+                self.growing_spectra_columns = get_appended_TA_data.GrowingMatrix(self.spectra_columns, axis=0)
+            self.wavelength_kinetics_rows = self.growing_wavelength_kinetics_rows.append(new_columns)
+            self.spectra_columns = self.growing_spectra_columns.append(new_columns.T)
+            self.data_as_float = self.wavelength_kinetics_rows
+
+            new_ylims = self.get_fixed_ylims(new_columns)
+            self.fixed_ylims = (min(self.fixed_ylims[0], new_ylims[0]), max(self.fixed_ylims[1], new_ylims[1]))
+            self.time_delays = time_delays
+            self.time_delay_positions = np.arange(len(self.time_delays))
         else:
-            self.wavelength_kinetics_axes.plot(self.time_delays, self.wavelength_kinetics, color=self.cmap(len(self.wavelengths)))
-
-        self.wavelength_kinetics_fig.tight_layout()
+            self.get_data()
 
-        self.wavelength_kinetics_canvas = FigureCanvasTkAgg(self.wavelength_kinetics_fig, self.frm_inspection_figure)
-        self.wavelength_kinetics_canvas.get_tk_widget().grid(row=0, column=0)
+        self.set_time_delay_xticks()
+        self.slider_time_delays.configure(to=len(self.time_delays)-1)
+        self.set_wavelength_kinetics(self.nr_of_wavelength)
+        self.set_spectrum_at_time_delay(min(self.nr_of_time_delay, len(self.time_delays)-1))
 
-        self.make_wavelength_slider()
+        self.setup_wavelength_kinetics_axes()
+        self.setup_spectrum_at_time_delay_axes()
+        self.wavelength_kinetics_fig.canvas.draw_idle()
+        self.spectrum_at_time_delay_fig.canvas.draw_idle()
 
         return None
 
@@ -144,24 +224,56 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
 
         self.spectrum_at_time_delay_xticklabels = [self.label_format.format(x) for x in self.spectrum_at_time_delay_xticklabels]
 
-        self.spectrum_at_time_delay_axes.set_xticks(self.spectrum_at_time_delay_xticks)
-        self.spectrum_at_time_delay_axes.set_xticklabels(self.spectrum_at_time_delay_xticklabels, fontsize=10, rotation=30)
-
-        self.spectrum_at_time_delay_axes.set_title('time delay = ' + self.label_format.format(float(self.time_delays[self.nr_of_time_delay])))
-        self.spectrum_at_time_delay_axes.set_xlabel("Wavelengths")
-        self.spectrum_at_time_delay_axes.set_ylabel("amplitude")
-
-        self.spectrum_at_time_delay_axes.plot(self.wavelengths, self.spectrum_at_time_delay, color="cornflowerblue")
+        self.setup_spectrum_at_time_delay_axes()
 
         self.spectrum_at_time_delay_fig.tight_layout()
 
         self.spectrum_at_time_delay_canvas = FigureCanvasTkAgg(self.spectrum_at_time_delay_fig, self.frm_inspection_figure)
         self.spectrum_at_time_delay_canvas.get_tk_widget().grid(row=0, column=3)
+        self.spectrum_at_time_delay_canvas.mpl_connect("draw_event", self.cache_spectrum_at_time_delay_background)
 
         self.make_time_delay_slider()
 
         return None
 
+    def setup_wavelength_kinetics_axes(self):
+        """ (re)draws the complete wavelength kinetics axes. in interactive mode the line and the title are animated artists,
+        i.e. they are not part of the cached background. """
+        animated = bool(self.interactive_mode.get())
+
+        self.wavelength_kinetics_axes.clear()
+        self.wavelength_kinetics_axes.set_xticks(self.xticks)
+        self.wavelength_kinetics_axes.set_xticklabels(self.xticklabels, fontsize=10, rotation=30)
+        self.wavelength_kinetics_axes.set_title('wavelength = ' + self.label_format.format(float(self.wavelengths[self.nr_of_wavelength])))
+        self.wavelength_kinetics_axes.set_xlabel("Time delays")
+        self.wavelength_kinetics_axes.set_ylabel("amplitude")
+
+        self.wavelength_kinetics_line, = self.wavelength_kinetics_axes.plot(self.time_delay_positions, self.wavelength_kinetics, color=self.get_wavelength_kinetics_line_color(), animated=animated)
+        self.wavelength_kinetics_axes.title.set_animated(animated)
+        if animated:
+            self.wavelength_kinetics_axes.set_ylim(self.fixed_ylims)
+
+        return None
+
+    def setup_spectrum_at_time_delay_axes(self):
+        """ (re)draws the complete spectrum axes. in interactive mode the line and the title are animated artists,
+        i.e. they are not part of the cached background. """
+        animated = bool(self.interactive_mode.get())
+
+        self.spectrum_at_time_delay_axes.clear()
+        self.spectrum_at_time_delay_axes.set_xticks(self.spectrum_at_time_delay_xticks)
+        self.spectrum_at_time_delay_axes.set_xticklabels(self.spectrum_at_time_delay_xticklabels, fontsize=10, rotation=30)
+        self.spectrum_at_time_delay_axes.set_title('time delay = ' + self.label_format.format(float(self.time_delays[self.nr_of_time_delay])))
+        self.spectrum_at_time_delay_axes.set_xlabel("Wavelengths")
+        self.spectrum_at_time_delay_axes.set_ylabel("amplitude")
+
+        self.spectrum_at_time_delay_line, = self.spectrum_at_time_delay_axes.plot(self.wavelength_positions, self.spectrum_at_time_delay, color="cornflowerblue", animated=animated)
+        self.spectrum_at_time_delay_axes.title.set_animated(animated)
+        if animated:
+            self.spectrum_at_time_delay_axes.set_ylim(self.fixed_ylims)
+
+        return None
+
     def make_wavelength_slider(self):
         self.current_wavelength_index = tk.IntVar()
 
@@ -172,7 +284,7 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
             length=400,
             orient='horizontal',
             variable=self.current_wavelength_index,
-            command=lambda x: self.update_wavelength_kinetics_plot()    # need to call it with lambda as otherwise i get an error
+            command=lambda x: self.wavelength_slider_moved()    # need to call it with lambda as otherwise i get an error
         )
 
         self.slider_wavelengths.grid(row=3, pady=3)
@@ -192,7 +304,7 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
             length=400,
             orient='horizontal',
             variable=self.current_time_delay_index,
-            command=lambda x: self.update_spectrum_at_time_delay_plot()    # need to call it with lambda as otherwise i get an error
+            command=lambda x: self.time_delay_slider_moved()    # need to call it with lambda as otherwise i get an error
         )
 
         self.slider_time_delays.grid(row=3, column=3, pady=3)
@@ -202,21 +314,114 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
 
         return None
 
+    def wavelength_slider_moved(self):
+        if self.interactive_mode.get():
+            self.schedule_slider_update()
+        else:
+            self.update_wavelength_kinetics_plot()
+
+        return None
+
+    def time_delay_slider_moved(self):
+        if self.interactive_mode.get():
+            self.schedule_slider_update()
+        else:
+            self.update_spectrum_at_time_delay_plot()
+
+        return None
+
+    def schedule_slider_update(self):
+        """ coalesces slider events: however many events arrive, the plots are updated at most once per refresh interval
+        and only with the latest slider positions. """
+        if self.slider_update_after_id is None:
+            self.slider_update_after_id = self.after(self.slider_refresh_interval_ms, self.flush_slider_updates)
+
+        return None
+
+    def flush_slider_updates(self):
+        self.slider_update_after_id = None
+
+        if self.current_wavelength_index.get() != self.nr_of_wavelength:
+            self.set_wavelength_kinetics(self.current_wavelength_index.get())
+            self.blit_wavelength_kinetics_plot()
+
+        if self.current_time_delay_index.get() != self.nr_of_time_delay:
+            self.set_spectrum_at_time_delay(self.current_time_delay_index.get())
+            self.blit_spectrum_at_time_delay_plot()
+
+        return None
+
+    def toggle_interactive_mode(self):
+        self.setup_wavelength_kinetics_axes()
+        self.setup_spectrum_at_time_delay_axes()
+
+        self.wavelength_kinetics_fig.canvas.draw_idle()
+        self.spectrum_at_time_delay_fig.canvas.draw_idle()
+
+        return None
+
+    def cache_wavelength_kinetics_background(self, event=None):
+        """ draw_event callback: the full draw does not contain the animated artists, so store it as background and draw them on top """
+        if not self.interactive_mode.get():
+            return None
+
+        self.wavelength_kinetics_background = self.wavelength_kinetics_canvas.copy_from_bbox(self.wavelength_kinetics_fig.bbox)
+        self.wavelength_kinetics_axes.draw_artist(self.wavelength_kinetics_line)
+        self.wavelength_kinetics_axes.draw_artist(self.wavelength_kinetics_axes.title)
+
+        return None
+
+    def cache_spectrum_at_time_delay_background(self, event=None):
+        """ draw_event callback: the full draw does not contain the animated artists, so store it as background and draw them on top """
+        if not self.interactive_mode.get():
+            return None
+
+        self.spectrum_at_time_delay_background = self.spectrum_at_time_delay_canvas.copy_from_bbox(self.spectrum_at_time_delay_fig.bbox)
+        self.spectrum_at_time_delay_axes.draw_artist(self.spectrum_at_time_delay_line)
+        self.spectrum_at_time_delay_axes.draw_artist(self.spectrum_at_time_delay_axes.title)
+
+        return None
+
+    def blit_wavelength_kinetics_plot(self):
+        self.wavelength_kinetics_line.set_ydata(self.wavelength_kinetics)
+        self.wavelength_kinetics_line.set_color(self.get_wavelength_kinetics_line_color())
+        self.wavelength_kinetics_axes.title.set_text('wavelength = ' + self.label_format.format(float(self.wavelengths[self.nr_of_wavelength])))
+
+        # no background cached yet (first draw still pending), a normal draw caches it
+        if self.wavelength_kinetics_background is None:
+            self.wavelength_kinetics_canvas.draw_idle()
+            return None
+
+        self.wavelength_kinetics_canvas.restore_region(self.wavelength_kinetics_background)
+        self.wavelength_kinetics_axes.draw_artist(self.wavelength_kinetics_line)
+        self.wavelength_kinetics_axes.draw_artist(self.wavelength_kinetics_axes.title)
+        self.wavelength_kinetics_canvas.blit(self.wavelength_kinetics_fig.bbox)
+
+        return None
+
+    def blit_spectrum_at_time_delay_plot(self):
+        self.spectrum_at_time_delay_line.set_ydata(self.spectrum_at_time_delay)
+        self.spectrum_at_time_delay_axes.title.set_text('time delay = ' + self.label_format.format(float(self.time_delays[self.nr_of_time_delay])))
+
+        # no background cached yet (first draw still pending), a normal draw caches it
+        if self.spectrum_at_time_delay_background is None:
+            self.spectrum_at_time_delay_canvas.draw_idle()
+            return None
+
+        self.spectrum_at_time_delay_canvas.restore_region(self.spectrum_at_time_delay_background)
+        self.spectrum_at_time_delay_axes.draw_artist(self.spectrum_at_time_delay_line)
+        self.spectrum_at_time_delay_axes.draw_artist(self.spectrum_at_time_delay_axes.title)
+        self.spectrum_at_time_delay_canvas.blit(self.spectrum_at_time_delay_fig.bbox)
+
+        return None
+
     def update_spectrum_at_time_delay_plot(self):
         # set new data
         self.nr_of_time_delay = self.current_time_delay_index.get()
         self.set_spectrum_at_time_delay(self.nr_of_time_delay)
 
         # make new plot
-        self.spectrum_at_time_delay_axes.clear()
-        self.spectrum_at_time_delay_axes.set_xticks(self.spectrum_at_time_delay_xticks)
-        self.spectrum_at_time_delay_axes.set_xticklabels(self.spectrum_at_time_delay_xticklabels, fontsize=10, rotation=30)
-
-        self.spectrum_at_time_delay_axes.set_title('time delay = ' + self.label_format.format(float(self.time_delays[self.nr_of_time_delay])))
-        self.spectrum_at_time_delay_axes.set_xlabel("Wavelengths")
-        self.spectrum_at_time_delay_axes.set_ylabel("amplitude")
-
-        self.spectrum_at_time_delay_axes.plot(self.wavelengths, self.spectrum_at_time_delay, color="cornflowerblue")
+        self.setup_spectrum_at_time_delay_axes()
 
         self.spectrum_at_time_delay_fig.canvas.draw_idle()
 
@@ -228,18 +433,7 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
         self.set_wavelength_kinetics(self.nr_of_wavelength)
 
         # make new plot
-        self.wavelength_kinetics_axes.clear()
-        self.wavelength_kinetics_axes.set_xticks(self.xticks)
-        self.wavelength_kinetics_axes.set_xticklabels(self.xticklabels, fontsize=10, rotation=30)
-        self.wavelength_kinetics_axes.set_title('wavelength = ' + self.label_format.format(float(self.wavelengths[self.nr_of_wavelength])) )
-        self.wavelength_kinetics_axes.set_xlabel("Time delays")
-        self.wavelength_kinetics_axes.set_ylabel("amplitude")
-
-        # unnecessary things to have "correct" linecolors in wavelength_kinetics plot
-        if self.wavelengths_are_ascending:
-            self.wavelength_kinetics_axes.plot(self.time_delays, self.wavelength_kinetics, color=self.cmap(self.nr_of_wavelength/len(self.wavelengths)))
-        else:
-            self.wavelength_kinetics_axes.plot(self.time_delays, self.wavelength_kinetics, color=self.cmap((len(self.wavelengths) - self.nr_of_wavelength)/len(self.wavelengths)))
+        self.setup_wavelength_kinetics_axes()
 
         self.wavelength_kinetics_fig.canvas.draw_idle()
 
@@ -247,39 +441,43 @@ class Kinetics_Spectrum_Window(tk.Toplevel):
 
     def set_spectrum_at_time_delay(self, nr_of_time_delay):
         self.nr_of_time_delay = nr_of_time_delay
-        self.spectrum_at_time_delay = self.data[:,self.nr_of_time_delay].astype(float)
+        self.spectrum_at_time_delay = self.spectra_columns[self.nr_of_time_delay]
 
         return None
 
     def set_wavelength_kinetics(self, nr_of_wavelength):
         self.nr_of_wavelength = nr_of_wavelength
-        self.wavelength_kinetics = self.data[self.nr_of_wavelength,:].astype(float)
+        self.wavelength_kinetics = self.wavelength_kinetics_rows[self.nr_of_wavelength]
 
         return None
 
     def save_current_figures_to_file(self):
         print("\nsaving current wavelength kinetics and spectrum at time delay figures to file!")
 
-        # check if directory exists:
-        if not os.path.exists(self.full_path_to_final_dir):
-            os.makedirs(self.full_path_to_final_dir)
+        # rendered and written in the background, the save task takes a snapshot of the figures now
+        save_task = BackgroundWriter.SaveTask("kinetics and spectrum figures", self.full_path_to_final_dir)
 
         # save current figures:
         if self.data_dict["type"] == "fit_data":
-            self.wavelength_kinetics_fig.savefig(self.full_path_to_final_dir+"/wavelength_"+'{:,.3f}'.format(float(self.wavelengths[self.nr_of_wavelength]))+"[nm]_kinetics_with_selected_DAS"+str(self.selected_DAS)+".png")
-            self.spectrum_at_time_delay_fig.savefig(self.full_path_to_final_dir+"/time_delay_"+'{:,.3f}'.format(float(self.time_delays[self.nr_of_time_delay]))+"[ps]_spectra_with_selected_DAS"+str(self.selected_DAS)+".png")
+            save_task.add_figure(self.wavelength_kinetics_fig, self.full_path_to_final_dir+"/wavelength_"+'{:,.3f}'.format(float(self.wavelengths[self.nr_of_wavelength]))+"[nm]_kinetics_with_selected_DAS"+str(self.selected_DAS)+".png")
+            save_task.add_figure(self.spectrum_at_time_delay_fig, self.full_path_to_final_dir+"/time_delay_"+'{:,.3f}'.format(float(self.time_delays[self.nr_of_time_delay]))+"[ps]_spectra_with_selected_DAS"+str(self.selected_DAS)+".png")
 
         else:
-            self.wavelength_kinetics_fig.savefig(self.full_path_to_final_dir+"/wavelength_"+'{:,.3f}'.format(float(self.wavelengths[self.nr_of_wavelength]))+"[nm]_kinetics.png")
-            self.spectrum_at_time_delay_fig.savefig(self.full_path_to_final_dir+"/time_delay_"+'{:,.3f}'.format(float(self.time_delays[self.nr_of_time_delay]))+"[ps]_spectra.png")
+            save_task.add_figure(self.wavelength_kinetics_fig, self.full_path_to_final_dir+"/wavelength_"+'{:,.3f}'.format(float(self.wavelengths[self.nr_of_wavelength]))+"[nm]_kinetics.png")
+            save_task.add_figure(self.spectrum_at_time_delay_fig, self.full_path_to_final_dir+"/time_delay_"+'{:,.3f}'.format(float(self.time_delays[self.nr_of_time_delay]))+"[ps]_spectra.png")
+
+        self.parent.save_in_background(save_task)
 
         return None
 
     def destroy_self(self):
+        if self.slider_update_after_id is not None:
+            self.after_cancel(self.slider_update_after_id)
 
         # purely for asthetic reasons when toplevel is closed:
         self.btn_close.grid_remove()
         self.btn_save_current_figures.grid_remove()
+        self.checkbox_interactive_mode.grid_remove()
         self.frm_inspection_figure.grid_remove()
 
         self.destroy()
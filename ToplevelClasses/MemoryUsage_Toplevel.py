@@ -0,0 +1,91 @@
+import tkinter as tk
+from tkinter import ttk
+
+from SupportClasses import ToolTip, MemoryAccounting
+
+class MemoryUsage_Window(tk.Toplevel):
+    def __init__(self, parent):
+        """a toplevel that lists the memory held by the data object of each tab, by category (see SupportClasses/MemoryAccounting), and the memory of the process.
+
+        Args:
+            parent (GUIApp): parent is the Gui App that creates the instance of this class.
+        """
+        super().__init__(parent)
+        self.parent = parent
+        self.refresh_interval_ms = 2000
+        self.refresh_after_id = None
+        self.notebook_containers = {"ORIG": self.parent.nbCon_orig, "SVD": self.parent.nbCon_SVD, "SVDGF": self.parent.nbCon_SVDGF}
+
+        self.title('Memory usage of the tabs')
+        self.protocol("WM_DELETE_WINDOW", self.destroy_self)
+
+        self.columns = ("tab",) + MemoryAccounting.CATEGORIES + ("total",)
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=12, selectmode="none")
+        for column, width in zip(self.columns, (260, 90, 90, 90, 90, 90)):
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=width, anchor="w" if column == "tab" else "e")
+        self.tree_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.tree_scrollbar.set)
+        self.tree.grid(row=0, column=0, columnspan=2, sticky="nsew", padx=3, pady=3)
+        self.tree_scrollbar.grid(row=0, column=2, sticky="ns")
+
+        self.lbl_process_memory = tk.Label(self, text="", fg=self.parent.violet, anchor="w")
+        self.ttp_lbl_process_memory = ToolTip.CreateToolTip(self.lbl_process_memory, \
+        'accounted: the numpy arrays and figures held by the tabs, each buffer counted once. '
+        'The resident memory of the process also contains python, tk, matplotlib and memory that numpy keeps for reuse, '
+        'it does not necessarily shrink by the memory of a removed tab.')
+        self.lbl_process_memory.grid(row=1, column=0, sticky="w", padx=3, pady=5)
+
+        self.btn_close = tk.Button(self, text="Close", fg=self.parent.violet, command=self.destroy_self)
+        self.btn_close.grid(row=1, column=1, sticky="se", padx=3, pady=5)
+
+        self.refresh_memory_usage()
+
+        return None
+
+    def get_tab_name(self, notebook_name, tab_idx):
+        notebook_container = self.notebook_containers[notebook_name]
+        try:
+            return f"{notebook_name} " + notebook_container.tab_control.tab(notebook_container.figure_frames[tab_idx], "text")
+        except tk.TclError:
+            # the tab is not on the notebook (anymore), e.g. its computation is still queued
+            return f"{notebook_name} tab {tab_idx+1}"
+
+    def refresh_memory_usage(self):
+        self.tree.delete(*self.tree.get_children())
+
+        total_usage = dict.fromkeys(MemoryAccounting.CATEGORIES, 0)
+        for notebook_name, tab_idx, usage in MemoryAccounting.get_tab_usages(self.notebook_containers):
+            self.insert_row(self.get_tab_name(notebook_name, tab_idx), usage)
+            for category, nbytes in usage.items():
+                total_usage[category] += nbytes
+
+        # shared by the SVD tabs of the same data file
+        if self.parent.SVD_cache is not None:
+            SVD_cache_usage = dict.fromkeys(MemoryAccounting.CATEGORIES, 0)
+            SVD_cache_usage["SVD factors"] = MemoryAccounting.get_array_nbytes(list(self.parent.SVD_cache.entries.values()), set())
+            self.insert_row("incremental SVD cache", SVD_cache_usage)
+            total_usage["SVD factors"] += SVD_cache_usage["SVD factors"]
+        self.insert_row("all", total_usage)
+
+        rss = MemoryAccounting.get_rss()
+        self.lbl_process_memory["text"] = (f"accounted: {MemoryAccounting.format_bytes(sum(total_usage.values()))}, "
+                                            + f"resident memory of the process: {MemoryAccounting.format_bytes(rss) if rss is not None else 'not available'}")
+
+        self.refresh_after_id = self.after(self.refresh_interval_ms, self.refresh_memory_usage)
+
+        return None
+
+    def insert_row(self, name, usage):
+        self.tree.insert("", tk.END, values=(name,) + tuple(MemoryAccounting.format_bytes(usage[category]) for category in MemoryAccounting.CATEGORIES)
+                                                + (MemoryAccounting.format_bytes(sum(usage.values())),))
+
+        return None
+
+    def destroy_self(self):
+        if self.refresh_after_id is not None:
+            self.after_cancel(self.refresh_after_id)
+
+        self.destroy()
+
+        return None
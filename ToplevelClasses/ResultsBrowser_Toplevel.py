@@ -0,0 +1,143 @@
+import os
+import tkinter as tk
+from tkinter import ttk
+
+from SupportClasses import ToolTip, ResultsIndex
+
+class ResultsBrowser_Window(tk.Toplevel):
+    def __init__(self, parent):
+        """a toplevel to search the index of saved results (see SupportClasses/ResultsIndex) and reopen binary results.
+
+        Args:
+            parent (GUIApp): parent is the Gui App that creates the instance of this class.
+        """
+        super().__init__(parent)
+        self.parent = parent
+        self.index_path = ResultsIndex.get_index_path(self.parent.base_directory)
+        self.listed_results = {}
+
+        self.title('Saved results')
+
+        # filters
+        self.frm_filters = tk.Frame(self)
+        self.filter_strVars = {}
+        for column, (name, label) in enumerate([("data_file", "data file contains"), ("components", "components"), ("fit_method", "fit method")]):
+            tk.Label(self.frm_filters, text=label, fg=self.parent.violet).grid(row=0, column=column, sticky="w", padx=3)
+            self.filter_strVars[name] = tk.StringVar(value="")
+            tk.Entry(self.frm_filters, textvariable=self.filter_strVars[name], width=18).grid(row=1, column=column, sticky="w", padx=3)
+
+        tk.Label(self.frm_filters, text="type", fg=self.parent.violet).grid(row=0, column=3, sticky="w", padx=3)
+        self.result_type_strVar = tk.StringVar(value="all")
+        tk.OptionMenu(self.frm_filters, self.result_type_strVar, "all", "ORIG", "SVD", "SVDGF").grid(row=1, column=3, sticky="w", padx=3)
+
+        tk.Label(self.frm_filters, text="tau bounds", fg=self.parent.violet).grid(row=0, column=4, sticky="w", padx=3)
+        self.filter_strVars["tau_bounds"] = tk.StringVar(value="")
+        self.ent_tau_bounds = tk.Entry(self.frm_filters, textvariable=self.filter_strVars["tau_bounds"], width=18)
+        ttp_ent_tau_bounds = ToolTip.CreateToolTip(self.ent_tau_bounds, \
+        'component:min:max, separated by spaces, leave min or max empty for no bound.'
+        '\ne.g. 1::2 3:10: finds fits with tau1 <= 2 and tau3 >= 10.')
+        self.ent_tau_bounds.grid(row=1, column=4, sticky="w", padx=3)
+
+        self.only_binary_intVar = tk.IntVar(value=0)
+        tk.Checkbutton(self.frm_filters, text="only reopenable", variable=self.only_binary_intVar).grid(row=1, column=5, sticky="w", padx=3)
+
+        self.btn_search = tk.Button(self.frm_filters, text="search", fg=self.parent.violet, command=self.search)
+        self.btn_search.grid(row=1, column=6, sticky="w", padx=3)
+        self.frm_filters.grid(row=0, column=0, columnspan=4, sticky="nw", padx=3, pady=3)
+
+        # results
+        self.columns = ("saved_at", "result_type", "data_file", "components", "fit_method", "redchi", "decay_times")
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=15, selectmode="browse")
+        for column, width in zip(self.columns, (140, 50, 180, 80, 90, 80, 320)):
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=width, anchor="w")
+        self.tree_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.tree_scrollbar.set)
+        self.tree.bind("<Double-1>", lambda event: self.open_selected_result())
+        self.tree.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=3, pady=3)
+        self.tree_scrollbar.grid(row=1, column=3, sticky="ns")
+
+        self.lbl_result_dir = tk.Label(self, text="", anchor="w")
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self.show_result_dir())
+        self.lbl_result_dir.grid(row=2, column=0, columnspan=4, sticky="w", padx=3)
+
+        self.btn_open = tk.Button(self, text="open selected result", fg=self.parent.violet, command=self.open_selected_result)
+        ttp_btn_open = ToolTip.CreateToolTip(self.btn_open, \
+        'Opens the selected result in a new SVD or SVDGF tab, without recomputing it.'
+        '\nOnly results that have been saved in binary format can be reopened.')
+        self.btn_open.grid(row=3, column=0, sticky="sw", padx=3, pady=5)
+
+        self.btn_remove_missing = tk.Button(self, text="remove deleted results", fg=self.parent.violet, command=self.remove_missing_results)
+        self.btn_remove_missing.grid(row=3, column=1, sticky="s", padx=3, pady=5)
+
+        self.btn_close = tk.Button(self, text="Close", fg=self.parent.violet, command=self.destroy)
+        self.btn_close.grid(row=3, column=2, sticky="se", padx=3, pady=5)
+
+        self.search()
+
+        return None
+
+    def get_tau_bounds(self):
+        tau_bounds = []
+        for tau_bound in self.filter_strVars["tau_bounds"].get().split():
+            component, tau_min, tau_max = tau_bound.split(":")
+            tau_bounds.append((int(component), float(tau_min) if tau_min else None, float(tau_max) if tau_max else None))
+
+        return tau_bounds
+
+    def search(self):
+        try:
+            components = [int(component) for component in self.filter_strVars["components"].get().replace(",", " ").split()] or None
+            tau_bounds = self.get_tau_bounds()
+            results = ResultsIndex.query_results(self.index_path, data_file=self.filter_strVars["data_file"].get().strip() or None,
+                                                    result_type=None if self.result_type_strVar.get() == "all" else self.result_type_strVar.get(), components=components,
+                                                    fit_method=self.filter_strVars["fit_method"].get().strip() or None, tau_bounds=tau_bounds, only_binary=bool(self.only_binary_intVar.get()))
+        except ValueError as error:
+            tk.messagebox.showerror("Warning, invalid filter!", f"Exception {type(error).__name__} message: \n"+ str(error), parent=self)
+            return None
+
+        self.tree.delete(*self.tree.get_children())
+        self.listed_results = {}
+        for result in results:
+            item = self.tree.insert("", tk.END, values=(result["saved_at"], result["result_type"], os.path.basename(result["data_file"]), " ".join(str(component) for component in result["components"]),
+                                                        result["fit_method"] or "", "" if result["redchi"] is None else f"{result['redchi']:.4g}",
+                                                        ResultsIndex.format_decay_times(result["decay_times"])))
+            self.listed_results[item] = result
+        self.lbl_result_dir.config(text=f"{len(results)} results")
+
+        return None
+
+    def get_selected_result(self):
+        selection = self.tree.selection()
+        if not selection:
+            return None
+
+        return self.listed_results[selection[0]]
+
+    def show_result_dir(self):
+        result = self.get_selected_result()
+        if result is not None:
+            self.lbl_result_dir.config(text=result["result_dir"] + ("" if result["binary_file"] else "  (text files only)"))
+
+        return None
+
+    def open_selected_result(self):
+        result = self.get_selected_result()
+        if result is None:
+            return None
+
+        if result["binary_file"] is None or not os.path.exists(result["binary_file"]):
+            tk.messagebox.showerror("Warning, can not open the result!", "Only results that have been saved in binary format (result_data.npz) can be reopened."
+                                    f"\nThe files of this result are in:\n{result['result_dir']}", parent=self)
+            return None
+
+        self.parent.open_saved_result_file(result["binary_file"])
+
+        return None
+
+    def remove_missing_results(self):
+        nr_of_removed_results = ResultsIndex.remove_missing_results(self.index_path)
+        self.search()
+        self.lbl_result_dir.config(text=f"removed {nr_of_removed_results} deleted results")
+
+        return None
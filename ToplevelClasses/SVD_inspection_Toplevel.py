@@ -12,8 +12,8 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 
 # own classes
-from SupportClasses import ToolTip
-from FunctionsUsedByPlotClasses import get_retained_rightSVs_leftSVs_singularvs
+from SupportClasses import ToolTip, BackgroundWriter, JobScheduler
+from FunctionsUsedByPlotClasses import get_SVD_rank_estimate
 
 class SVD_inspection_Window(tk.Toplevel):
     def __init__(self, parent, tab_index, data_obj):
@@ -34,7 +34,7 @@ class SVD_inspection_Window(tk.Toplevel):
         self.data_obj = data_obj
         self.full_path_to_final_dir = self.data_obj.full_path_to_final_dir
 
-        self.geometry(f'{1050}x{720}+{100}+{50}')
+        self.geometry(f'{1050}x{750}+{100}+{50}')
 
         self.frm_sing_values_figure = tk.Frame(self)
         self.frm_sing_values_figure.columnconfigure(0, weight=1)
@@ -60,12 +60,28 @@ class SVD_inspection_Window(tk.Toplevel):
         self.max_nr_of_sing_vectors = 11        # set this to a higher number if you want to be able to inspect even less significant singular vectors
         self.max_nr_of_sing_values = 51         # set this to a higher number if you want to be able to inspect even less significant singular values
 
-        # set which singular vectors are to be displayed when initially opening the window
-        self.leftSVs_components_list = [0,1,2]
-        self.rightSVs_components_list = [0,1,2]
+        # only the singular vectors that are plotted are computed (partial SVD), more of them when more are plotted
+        self.get_data(int(self.ent_nr_of_sing_values.get()))
+
+        # the singular vectors of the suggested components are displayed once the rank is estimated (in the background, it needs all singular values),
+        # until then those of the components ticked in the main window
+        self.rank_estimate = None
+        self.leftSVs_components_list = [i for i, var in enumerate(self.parent.checkbutton_vars_reconstruct_data) if var.get() == 1 and i < self.max_nr_of_sing_vectors] or [0]
+        self.rightSVs_components_list = list(self.leftSVs_components_list)
+        self.extend_data(self.leftSVs_components_list)
 
         self.make_checkbuttons()
 
+        self.lbl_rank_estimate = tk.Label(self, text="estimating the nr of components ...", fg=self.parent.violet, wraplength=480, justify=tk.LEFT)
+        self.ttp_lbl_rank_estimate = ToolTip.CreateToolTip(self.lbl_rank_estimate, \
+        'The number of components that carry signal, estimated from the singular values and vectors. '
+        'noise floor: singular values above those of noise of the size before time zero. '
+        'Marchenko-Pastur: singular values above the optimal threshold for unknown noise (dotted lines). '
+        'autocorrelation: smooth left and right singular vectors (values above the markers, > 0.8). '
+        'cross validation: smallest error when predicting left out parts of the data. '
+        'The smallest of these is suggested and has been ticked in the main window, unless components were ticked already.')
+        self.lbl_rank_estimate.grid(column=0, row=3, sticky='nw', pady=5, padx=3)
+
         self.btn_close = tk.Button(self, text='Close', fg=self.parent.violet, command=self.destroy_self)
         self.btn_close.grid(padx=3, pady=5, sticky="se", column=self.max_nr_of_sing_vectors+1, row=99)
 
@@ -78,7 +94,6 @@ class SVD_inspection_Window(tk.Toplevel):
         matplotlib.style.use("default")
         matplotlib.rcParams.update({'axes.labelsize': 12.0, 'axes.titlesize': 14.0, 'xtick.labelsize':10, 'ytick.labelsize':12.0, "axes.edgecolor":"black", "axes.linewidth":1, "axes.grid":True, "grid.linestyle":"--"})
 
-        self.get_data()
         self.make_all_figures_and_axes()
 
         self.update_sing_values_plot(event=None)
@@ -86,6 +101,8 @@ class SVD_inspection_Window(tk.Toplevel):
         self.update_leftSVs_plot()
         self.update_rightSVs_plot()
 
+        self.estimate_rank()
+
         return None
 
     def make_checkbuttons(self):
@@ -115,19 +132,68 @@ class SVD_inspection_Window(tk.Toplevel):
 
         return None
 
-    def get_data(self):
+    def get_data(self, nr_of_components):
+        """ the leading nr_of_components singular values and vectors, more are computed if they have not been yet. """
         self.data = self.data_obj.data_matrix
         self.time_delays = self.data_obj.time_delays
         self.wavelengths = self.data_obj.wavelengths
 
-        self.rightSVs, self.leftSVs, self.singValues = get_retained_rightSVs_leftSVs_singularvs.run(self.data, [i for i in range(self.max_nr_of_sing_values)])
+        # the SVD is cached by the data object, reopening this window does not compute it again
+        U, sigma, VT = self.data_obj.get_SVD().get_components(nr_of_components)
+        self.rightSVs, self.leftSVs, self.singValues = VT, U, sigma
+
+        self.leftSVs_scaled = self.leftSVs*self.singValues[np.newaxis, :]
+        self.rightSVs_scaled = self.singValues[:, np.newaxis]*self.rightSVs
+
+        return None
+
+    def extend_data(self, components_list):
+        """ computes the singular vectors of components_list if some of them are not known yet. """
+        if components_list and max(components_list) >= len(self.singValues):
+            self.get_data(max(components_list) + 1)
+
+        return None
+
+    def estimate_rank(self):
+        """ the rank estimation needs all singular values, it runs in the background. the suggested components are ticked in the main window if none are ticked yet. """
+        try:
+            time_zero = int(self.parent.ent_time_zero.get())/1000
+        except ValueError:
+            time_zero = 0.0
+
+        self.rank_estimate_job = self.parent.job_scheduler.submit(self.get_rank_estimate, self.data_obj.get_SVD(), self.data, self.time_delays, time_zero, name="rank estimate: " + self.filename,
+                                                                    group="rank estimate", priority=JobScheduler.PRIORITY_SPECULATIVE,
+                                                                    on_done=self.show_rank_estimate, on_error=self.show_rank_estimate)
+
+        return None
+
+    @staticmethod
+    def get_rank_estimate(lazy_SVD, data, time_delays, time_zero):
+        U, _, VT = lazy_SVD.get_components(get_SVD_rank_estimate.MAX_RANK)
+
+        return get_SVD_rank_estimate.run(lazy_SVD.get_singular_values(), U, VT, data, time_delays, time_zero=time_zero)
+
+    def show_rank_estimate(self, job):
+        # the window might have been closed in the meantime
+        if getattr(self, "lbl_rank_estimate", None) is None:
+            return None
+        if job.error is not None:
+            self.lbl_rank_estimate.config(text=f"the nr of components could not be estimated: {type(job.error).__name__}: {job.error}")
+            return None
 
-        self.leftSVs_scaled = np.zeros((len(self.wavelengths), self.max_nr_of_sing_vectors))
-        self.rightSVs_scaled = np.zeros((self.max_nr_of_sing_vectors, len(self.time_delays)))
+        self.rank_estimate = job.result
+        print("\n" + self.rank_estimate.get_report())
+        self.lbl_rank_estimate.config(text=self.rank_estimate.get_summary())
+
+        self.parent.preselect_components(self.rank_estimate.suggested_components)
+
+        # the singular vectors of the suggested components are displayed
         for i in range(self.max_nr_of_sing_vectors):
-            sing_value = self.singValues[i]
-            self.leftSVs_scaled[:, i] = sing_value*self.leftSVs[:, i]
-            self.rightSVs_scaled[i, :] = sing_value*self.rightSVs[i, :]
+            self.leftSVs_checkbutton_vars[i].set(1 if i in self.rank_estimate.suggested_components else 0)
+            self.rightSVs_checkbutton_vars[i].set(1 if i in self.rank_estimate.suggested_components else 0)
+        self.update_leftSVs_components_list()
+        self.update_rightSVs_components_list()
+        self.update_sing_values_plot(event=None)
 
         return None
 
@@ -162,6 +228,7 @@ class SVD_inspection_Window(tk.Toplevel):
             if self.leftSVs_checkbutton_vars[i].get() == 1:
                 self.leftSVs_components_list.append(i)
 
+        self.extend_data(self.leftSVs_components_list)
         self.update_leftSVs_plot()
 
     def update_rightSVs_components_list(self):
@@ -170,6 +237,7 @@ class SVD_inspection_Window(tk.Toplevel):
             if self.rightSVs_checkbutton_vars[i].get() == 1:
                 self.rightSVs_components_list.append(i)
 
+        self.extend_data(self.rightSVs_components_list)
         self.update_rightSVs_plot()
 
     def update_leftSVs_plot(self):
@@ -234,6 +302,8 @@ class SVD_inspection_Window(tk.Toplevel):
             self.lift()
             return None
 
+        self.extend_data([nr_of_singular_values_to_plot - 1])
+
         self.sing_values_axes.clear()
 
         self.num_xticks = nr_of_singular_values_to_plot if (nr_of_singular_values_to_plot<10) else 10
@@ -243,6 +313,17 @@ class SVD_inspection_Window(tk.Toplevel):
 
         self.sing_values_axes.plot(self.sing_values_xaxis, self.singValues[:nr_of_singular_values_to_plot], marker="o", linewidth=0, markersize=10)
 
+        # scores of the rank estimation: suggested components, thresholds and autocorrelations of the singular vectors
+        if self.rank_estimate is not None:
+            suggested_components = [i for i in self.rank_estimate.suggested_components if i < nr_of_singular_values_to_plot]
+            self.sing_values_axes.plot(suggested_components, self.singValues[suggested_components], marker="o", linewidth=0, markersize=10, color="tab:green", label="suggested")
+            for method, color in (("noise floor", "tab:red"), ("Marchenko-Pastur", "tab:purple")):
+                if method in self.rank_estimate.thresholds:
+                    self.sing_values_axes.axhline(self.rank_estimate.thresholds[method], color=color, linestyle=":", label=method)
+            for i in range(min(nr_of_singular_values_to_plot, self.rank_estimate.max_rank)):
+                self.sing_values_axes.annotate('{:.2f}'.format(self.rank_estimate.scores["autocorrelation"][i]), (i, self.singValues[i]), textcoords="offset points", xytext=(0, 8), ha="center", fontsize=7)
+            self.sing_values_axes.legend(fontsize=8, loc="lower left")
+
         self.sing_values_axes.set_yscale("log")
         self.sing_values_axes.set_ylabel("log(singular value)")
         self.sing_values_axes.set_xlabel("singular value index")
@@ -267,14 +348,15 @@ class SVD_inspection_Window(tk.Toplevel):
     def save_current_figures_to_file(self):
         print("saving current singular values and vectors figures to file!")
 
-        # check if directory exists:
-        if not os.path.exists(self.full_path_to_final_dir):
-            os.makedirs(self.full_path_to_final_dir)
+        # rendered and written in the background, the save task takes a snapshot of the figures now
+        save_task = BackgroundWriter.SaveTask("singular values and vectors figures", self.full_path_to_final_dir)
 
         # save current figures:
-        self.sing_values_fig.savefig(self.full_path_to_final_dir+"/singular_values_"+str(self.ent_nr_of_sing_values.get())+".png")
-        self.leftSVs_fig.savefig(self.full_path_to_final_dir+"/leftSVs_"+str(self.leftSVs_components_list)+".png")
-        self.rightSVs_fig.savefig(self.full_path_to_final_dir+"/rightSVs_"+str(self.rightSVs_components_list)+".png")
+        save_task.add_figure(self.sing_values_fig, self.full_path_to_final_dir+"/singular_values_"+str(self.ent_nr_of_sing_values.get())+".png")
+        save_task.add_figure(self.leftSVs_fig, self.full_path_to_final_dir+"/leftSVs_"+str(self.leftSVs_components_list)+".png")
+        save_task.add_figure(self.rightSVs_fig, self.full_path_to_final_dir+"/rightSVs_"+str(self.rightSVs_components_list)+".png")
+
+        self.parent.save_in_background(save_task)
 
         return None
 
@@ -288,6 +370,7 @@ class SVD_inspection_Window(tk.Toplevel):
         self.frm_rightSVs_figure.grid_remove()
         self.ent_nr_of_sing_values.grid_remove()
         self.lbl_nr_of_sing_values.grid_remove()
+        self.lbl_rank_estimate.grid_remove()
 
         for checkbox in range(self.max_nr_of_sing_vectors):
             self.leftSVs_checkbuttons[checkbox].grid_remove()
@@ -4,7 +4,7 @@ import tkinter as tk
 import numpy as np
 import gc
 
-from FunctionsUsedByPlotClasses import (get_closest_nr_from_array_like, get_retained_rightSVs_leftSVs_singularvs, get_TA_data_after_start_time)
+from FunctionsUsedByPlotClasses import (get_closest_nr_from_array_like, get_retained_rightSVs_leftSVs_singularvs, get_TA_data_after_start_time, TA_analysis_pipeline)
 from SupportClasses import ToolTip
 from ToplevelClasses import CompareRightSVsWithFit_Toplevel
 
@@ -87,42 +87,6 @@ class initial_fit_parameters_Window(tk.Toplevel):
         self.bind("<Return>", lambda x: self.update_show_rSVs_window())
 
 
-    def get_summands_of_user_defined_fit_function_from_file(self, target_model_configuration_file):
-        try:
-            with open(target_model_configuration_file, mode='r') as dict_file:
-                summands_of_user_defined_fit_function = ast.literal_eval(dict_file.read().strip())
-        except (SyntaxError, FileNotFoundError):
-            raise ValueError("getting the user defined summands for fit function from file failed, or the dict was empty.\n"
-                            +"Check the file!\n"
-                            +"computation is discontinued!")
-
-        return summands_of_user_defined_fit_function
-
-    def parse_summands_of_user_defined_fit_function_to_actual_code(self, all_summands_dict: dict):
-        parsed_summands_list = []
-
-        selected_components_summands_dict = {}
-        for component in self.components_list:
-            selected_components_summands_dict[f"summand_component{component}"] = all_summands_dict[f"summand_component{component}"]
-
-        for summand_str in selected_components_summands_dict.values():
-            parsed_summands_list.append(self.parse_summand(summand_str))
-
-        return parsed_summands_list
-
-    def parse_summand(self, summand_str: str):
-        if summand_str == "":
-            return "0"
-        summand_str_with_time_delays_parsed = summand_str.replace("t", "time_delays")
-        summand_str_with_decay_constants_parsed = summand_str_with_time_delays_parsed
-        list_of_ks_in_summand_str = re.findall(r'k\d+', summand_str_with_time_delays_parsed)
-        for k_str in list_of_ks_in_summand_str:
-            summand_str_with_decay_constants_parsed = re.sub(r'k\d+', f"taus[\"component{k_str[1:]}\"]", summand_str_with_decay_constants_parsed, count=1)
-
-        summand_str_with_brackets_added = "(" +summand_str_with_decay_constants_parsed+ ")"
-
-        return summand_str_with_brackets_added
-
     def set_new_initial_values_dicts_for_compare_window(self):
         try:
             self.initial_decay_constants_dict={f'tau_component{component}':self.new_initial_fit_parameter_values["time_constants"][component] for component in self.components_list}
@@ -195,8 +159,8 @@ class initial_fit_parameters_Window(tk.Toplevel):
         # parse model function if used
         if self.use_user_defined_fit_function:
             try:
-                self.summands_of_user_defined_fit_function = self.get_summands_of_user_defined_fit_function_from_file(self.target_model_configuration_file)
-                self.parsed_summands_of_user_defined_fit_function = self.parse_summands_of_user_defined_fit_function_to_actual_code(self.summands_of_user_defined_fit_function)
+                self.summands_of_user_defined_fit_function = TA_analysis_pipeline.read_target_model_summands(self.target_model_configuration_file)
+                self.parsed_summands_of_user_defined_fit_function = TA_analysis_pipeline.parse_target_model_summands(self.summands_of_user_defined_fit_function, self.components_list)
             except ValueError as error:
                 tk.messagebox.showerror("Warning,", "an exception occurred!""\nProbably due to a problem with the user defined fit function file!\n"+
                                     f"Exception {type(error)} message: \n"+ str(error)+"\n")